@@ -2,7 +2,8 @@
 Admin para API
 """
 from django.contrib import admin
-from apps.api.models import APIKey, APILog, RateLimitRecord, APIWebhook
+from apps.api.models import APIKey, APILog, RateLimitRecord, APIWebhook, WebhookDelivery
+from apps.api.key_cache import APIKeyCache
 
 
 @admin.register(APIKey)
@@ -30,6 +31,10 @@ class APIKeyAdmin(admin.ModelAdmin):
         ('Restricciones', {
             'fields': ('allowed_ips', 'allowed_endpoints', 'rate_limit', 'expires_at')
         }),
+        ('Logging', {
+            'fields': ('log_sample_rate', 'log_body_limit'),
+            'classes': ('collapse',)
+        }),
         ('Uso', {
             'fields': ('last_used_at', 'last_used_ip', 'total_requests'),
             'classes': ('collapse',)
@@ -48,12 +53,14 @@ class APIKeyAdmin(admin.ModelAdmin):
     def revoke_keys(self, request, queryset):
         """Revoca las API keys seleccionadas"""
         updated = queryset.update(status='revoked')
+        APIKeyCache.invalidate_queryset(queryset)
         self.message_user(request, f'{updated} API keys revocadas')
     revoke_keys.short_description = 'Revocar API keys seleccionadas'
     
     def activate_keys(self, request, queryset):
         """Activa las API keys seleccionadas"""
         updated = queryset.update(status='active')
+        APIKeyCache.invalidate_queryset(queryset)
         self.message_user(request, f'{updated} API keys activadas')
     activate_keys.short_description = 'Activar API keys seleccionadas'
 
@@ -148,6 +155,7 @@ class APIWebhookAdmin(admin.ModelAdmin):
     readonly_fields = [
         'secret', 'last_triggered_at', 'last_success_at', 'last_failure_at',
         'total_triggers', 'total_successes', 'total_failures',
+        'consecutive_failures', 'avg_latency_ms',
         'created_at', 'updated_at'
     ]
     
@@ -159,12 +167,16 @@ class APIWebhookAdmin(admin.ModelAdmin):
             'fields': ('events', 'status', 'is_active', 'headers', 'secret')
         }),
         ('Reintentos', {
-            'fields': ('retry_on_failure', 'max_retries')
+            'fields': (
+                'retry_on_failure', 'max_retries', 'batch_events',
+                'max_consecutive_failures', 'consecutive_failures'
+            )
         }),
         ('Estadísticas', {
             'fields': (
                 'last_triggered_at', 'last_success_at', 'last_failure_at',
-                'total_triggers', 'total_successes', 'total_failures'
+                'total_triggers', 'total_successes', 'total_failures',
+                'avg_latency_ms'
             ),
             'classes': ('collapse',)
         }),
@@ -213,3 +225,33 @@ class APIWebhookAdmin(admin.ModelAdmin):
         updated = queryset.update(is_active=False, status='inactive')
         self.message_user(request, f'{updated} webhooks desactivados')
     deactivate_webhooks.short_description = 'Desactivar webhooks'
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = [
+        'event', 'webhook', 'status', 'attempts', 'response_status',
+        'latency_ms', 'next_attempt_at', 'created_at'
+    ]
+    list_filter = ['status', 'event', 'created_at', 'organization']
+    search_fields = ['event', 'webhook__name', 'webhook__url']
+    readonly_fields = [
+        'webhook', 'organization', 'event', 'payload', 'attempts',
+        'next_attempt_at', 'locked_until', 'response_status', 'last_error',
+        'latency_ms', 'delivered_at', 'created_at'
+    ]
+    
+    actions = ['retry_deliveries']
+    
+    def has_add_permission(self, request):
+        """No permitir crear entregas manualmente"""
+        return False
+    
+    def retry_deliveries(self, request, queryset):
+        """Reprograma las entregas seleccionadas"""
+        from django.utils import timezone
+        updated = queryset.exclude(status='delivered').update(
+            status='pending', next_attempt_at=timezone.now(), locked_until=None
+        )
+        self.message_user(request, f'{updated} entregas reprogramadas')
+    retry_deliveries.short_description = 'Reintentar entregas seleccionadas'
@@ -0,0 +1,197 @@
+"""
+Cache de API Keys verificadas
+
+Cada petición autenticada con API key hashea el token y antes consultaba
+`APIKey` en la base de datos. Aquí se guarda, por hash, un descriptor
+inmutable con lo necesario para autorizar la petición (organización,
+scope, IPs permitidas, endpoints y expiración), sin la key en texto plano
+ni el usuario. Las keys inexistentes se cachean en negativo. Los signals de `APIKey` invalidan la entrada al
+revocar, rotar o eliminar una key.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class EndpointTrie:
+    """
+    Trie de prefijos por segmentos de path para los endpoints permitidos
+
+    `/api/v1/patients/` permite `/api/v1/patients/` y `/api/v1/patients/15/`,
+    pero no `/api/v1/patients-export/`. Un segmento `*` coincide con
+    cualquier segmento.
+    """
+
+    __slots__ = ('root',)
+
+    _END = '$'
+
+    def __init__(self, endpoints=()):
+        self.root = {}
+        for endpoint in endpoints:
+            self.add(endpoint)
+
+    @staticmethod
+    def _segments(path):
+        return [segment for segment in str(path).split('/') if segment]
+
+    def add(self, endpoint):
+        node = self.root
+        for segment in self._segments(endpoint):
+            node = node.setdefault(segment, {})
+        node[self._END] = True
+
+    def matches(self, path):
+        """Verifica si algún endpoint permitido es prefijo de `path`"""
+        nodes = [self.root]
+        for segment in self._segments(path):
+            if any(self._END in node for node in nodes):
+                return True
+            next_nodes = []
+            for node in nodes:
+                if segment in node:
+                    next_nodes.append(node[segment])
+                if '*' in node:
+                    next_nodes.append(node['*'])
+            if not next_nodes:
+                return False
+            nodes = next_nodes
+        return any(self._END in node for node in nodes)
+
+    def __bool__(self):
+        return bool(self.root)
+
+
+@dataclass(frozen=True)
+class VerifiedAPIKey:
+    """
+    Descriptor inmutable de una API key verificada
+
+    Solo guarda los campos escalares necesarios para autorizar la petición:
+    nunca la key en texto plano ni el usuario (con su hash de contraseña),
+    porque el descriptor se serializa en el cache compartido.
+    """
+
+    key_id: int
+    name: str
+    key_prefix: str
+    key_hash: str
+    user_id: Optional[int]
+    organization_id: Optional[int]
+    scope: str
+    status: str
+    rate_limit: int
+    log_sample_rate: float
+    log_body_limit: int
+    allowed_ips: frozenset
+    endpoints: Optional[EndpointTrie]
+    expires_at: Optional[datetime]
+
+    @classmethod
+    def from_instance(cls, api_key):
+        return cls(
+            key_id=api_key.pk,
+            name=api_key.name,
+            key_prefix=api_key.key_prefix,
+            key_hash=api_key.key_hash,
+            user_id=api_key.user_id,
+            organization_id=api_key.organization_id,
+            scope=api_key.scope,
+            status=api_key.status,
+            rate_limit=api_key.rate_limit,
+            log_sample_rate=api_key.log_sample_rate,
+            log_body_limit=api_key.log_body_limit,
+            allowed_ips=frozenset(api_key.allowed_ips or ()),
+            endpoints=EndpointTrie(api_key.allowed_endpoints) if api_key.allowed_endpoints else None,
+            expires_at=api_key.expires_at,
+        )
+
+    @property
+    def api_key(self):
+        """
+        Instancia de `APIKey` armada desde el descriptor, sin consultas
+
+        `user` y `organization` se cargan de forma perezosa al accederlos.
+        """
+        from apps.api.models import APIKey
+
+        values = {
+            'id': self.key_id,
+            'name': self.name,
+            'key_prefix': self.key_prefix,
+            'key_hash': self.key_hash,
+            'user_id': self.user_id,
+            'organization_id': self.organization_id,
+            'scope': self.scope,
+            'status': self.status,
+            'rate_limit': self.rate_limit,
+            'log_sample_rate': self.log_sample_rate,
+            'log_body_limit': self.log_body_limit,
+            'expires_at': self.expires_at,
+        }
+        # El resto de campos (incluida la key) quedan diferidos
+        field_names = [
+            field.attname for field in APIKey._meta.concrete_fields if field.attname in values
+        ]
+        return APIKey.from_db(
+            APIKey.objects.db, field_names, [values[name] for name in field_names]
+        )
+
+    def is_expired(self, now):
+        return self.expires_at is not None and self.expires_at < now
+
+    def can_access_from_ip(self, ip_address):
+        return not self.allowed_ips or ip_address in self.allowed_ips
+
+    def can_access_endpoint(self, endpoint):
+        return self.endpoints is None or self.endpoints.matches(endpoint)
+
+
+class APIKeyCache:
+    """Cache de descriptores de API keys indexado por hash"""
+
+    KEY_PREFIX = 'apikey:verified'
+    INVALID = 'invalid'
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'API_KEY_CACHE_TIMEOUT', 60)
+
+    @staticmethod
+    def negative_timeout():
+        return getattr(settings, 'API_KEY_NEGATIVE_CACHE_TIMEOUT', 30)
+
+    @classmethod
+    def cache_key(cls, key_hash):
+        return f"{cls.KEY_PREFIX}:{key_hash}"
+
+    @classmethod
+    def get(cls, key_hash):
+        """
+        Retorna el descriptor cacheado, `APIKeyCache.INVALID` si el hash se
+        sabe inválido, o None si no hay entrada
+        """
+        return cache.get(cls.cache_key(key_hash))
+
+    @classmethod
+    def set(cls, descriptor):
+        cache.set(cls.cache_key(descriptor.key_hash), descriptor, cls.timeout())
+
+    @classmethod
+    def set_invalid(cls, key_hash):
+        cache.set(cls.cache_key(key_hash), cls.INVALID, cls.negative_timeout())
+
+    @classmethod
+    def invalidate(cls, key_hash):
+        if key_hash:
+            cache.delete(cls.cache_key(key_hash))
+
+    @classmethod
+    def invalidate_queryset(cls, queryset):
+        """Invalida las keys de un queryset (para updates masivos sin signals)"""
+        hashes = list(queryset.values_list('key_hash', flat=True))
+        cache.delete_many([cls.cache_key(key_hash) for key_hash in hashes])
+        return len(hashes)
@@ -0,0 +1,60 @@
+"""
+Management command para entregar los webhooks pendientes del outbox
+Uso: python manage.py deliver_webhooks [--loop]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.api.services import WebhookDeliveryService
+
+
+class Command(BaseCommand):
+    help = 'Entrega los webhooks pendientes del outbox con reintentos y backoff'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Entregas a reclamar por lote (default: 100)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Envíos concurrentes (default: 8)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Ejecutar continuamente en lugar de procesar un solo lote'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando no hay entregas pendientes (default: 2)'
+        )
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = options['workers']
+        
+        while True:
+            result = WebhookDeliveryService.deliver_pending(limit=batch_size, workers=workers)
+            
+            if result['claimed']:
+                self.stdout.write(
+                    f"Entregados: {result['delivered']} | Fallidos: {result['failed']} | "
+                    f"Omitidos: {result['skipped']} | Latencia promedio: {result['avg_latency_ms']}ms"
+                )
+            
+            if not options['loop']:
+                break
+            
+            close_old_connections()
+            if result['claimed'] < batch_size:
+                time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS('✓ Entrega de webhooks completada'))
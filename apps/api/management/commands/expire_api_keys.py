@@ -4,6 +4,7 @@ Management command para verificar y expirar API Keys vencidas
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from apps.api.models import APIKey
+from apps.api.key_cache import APIKeyCache
 
 
 class Command(BaseCommand):
@@ -22,7 +23,13 @@ class Command(BaseCommand):
         count = expired_keys.count()
         
         if count > 0:
-            expired_keys.update(status='expired')
+            expired_keys = list(expired_keys)
+            expired_ids = [key.pk for key in expired_keys]
+            APIKey.objects.filter(pk__in=expired_ids).update(status='expired')
+            
+            # update() no dispara signals: invalidar el cache de keys verificadas
+            for key in expired_keys:
+                APIKeyCache.invalidate(key.key_hash)
             
             self.stdout.write(
                 self.style.SUCCESS(f'✓ {count} API Keys marcadas como expiradas')
@@ -2,10 +2,32 @@
 Middleware para logging automático de peticiones API
 """
 import time
-import json
-from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
-from apps.api.models import APILog, APIKey
+from apps.api.models import APIKey
+from apps.api.telemetry import capture_body, get_telemetry
+
+
+def add_rate_limit_headers(request, response):
+    """Agrega los headers X-RateLimit-* si un throttle evaluó la petición"""
+    result = getattr(request, 'rate_limit', None)
+    if result is None:
+        return response
+    
+    for header, value in result.as_headers().items():
+        if header not in response:
+            response[header] = value
+    
+    return response
+
+
+class RateLimitHeadersMiddleware(MiddlewareMixin):
+    """
+    Middleware que expone el estado del rate limit en la respuesta
+    (X-RateLimit-Limit, X-RateLimit-Remaining, X-RateLimit-Reset)
+    """
+    
+    def process_response(self, request, response):
+        return add_rate_limit_headers(request, response)
 
 
 class APILoggingMiddleware(MiddlewareMixin):
@@ -55,41 +77,16 @@ class APILoggingMiddleware(MiddlewareMixin):
         if not organization:
             return response
         
-        # Obtener IP
-        ip_address = self.get_client_ip(request)
-        
-        # Obtener user agent
-        user_agent = request.META.get('HTTP_USER_AGENT', '')
-        
-        # Obtener request body (limitado)
-        request_body = {}
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            try:
-                if hasattr(request, 'body'):
-                    request_body = json.loads(request.body.decode('utf-8'))
-                elif hasattr(request, 'data'):
-                    request_body = request.data
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                request_body = {'error': 'Could not decode body'}
-        
-        # Obtener query params
-        request_params = dict(request.GET)
+        telemetry = get_telemetry()
         
-        # Obtener response body (limitado)
-        response_body = {}
-        try:
-            if hasattr(response, 'data'):
-                response_body = response.data
-            elif hasattr(response, 'content'):
-                content = response.content.decode('utf-8')
-                if len(content) < 10000:  # Solo si es pequeño
-                    response_body = json.loads(content)
-        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
-            pass
-        
-        # Crear log asíncrono (no bloquear la respuesta)
-        try:
-            APILog.objects.create(
+        # Muestreo por API key (los errores siempre se registran)
+        if telemetry.should_log(api_key, response.status_code):
+            body_limit = telemetry.body_limit_for(api_key)
+            ip_address = self.get_client_ip(request)
+            user_agent = request.META.get('HTTP_USER_AGENT', '')
+            
+            # Encolar log (se escribe en lote desde un hilo en segundo plano)
+            telemetry.record_log(
                 api_key=api_key,
                 user=user,
                 organization=organization,
@@ -97,24 +94,17 @@ class APILoggingMiddleware(MiddlewareMixin):
                 endpoint=request.path,
                 full_path=request.get_full_path(),
                 request_headers=self.get_headers(request),
-                request_body=request_body,
-                request_params=request_params,
+                request_body=self.get_request_body(request, body_limit),
+                request_params=dict(request.GET),
                 response_status=response.status_code,
-                response_body=response_body,
+                response_body=self.get_response_body(response, body_limit),
                 response_time=response_time,
                 ip_address=ip_address,
                 user_agent=user_agent[:500] if user_agent else ''
             )
-        except Exception as e:
-            # No fallar si hay error en el logging
-            print(f"Error logging API request: {e}")
         
         # Agregar headers de rate limit si existen
-        if hasattr(request, 'rate_limit_remaining'):
-            response['X-RateLimit-Remaining'] = str(request.rate_limit_remaining)
-        
-        if hasattr(request, 'rate_limit_retry_after'):
-            response['X-RateLimit-Retry-After'] = str(request.rate_limit_retry_after)
+        add_rate_limit_headers(request, response)
         
         # Agregar tiempo de respuesta
         response['X-Response-Time'] = f"{response_time:.2f}ms"
@@ -131,6 +121,36 @@ class APILoggingMiddleware(MiddlewareMixin):
             ip = request.META.get('REMOTE_ADDR')
         return ip
     
+    @staticmethod
+    def get_request_body(request, limit):
+        """Obtiene el body de la petición sin leer más de `limit` bytes"""
+        if request.method not in ['POST', 'PUT', 'PATCH']:
+            return {}
+        
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        
+        if limit <= 0 or content_length > limit:
+            return {'captured': False, 'size': content_length}
+        
+        try:
+            return capture_body(request.body, limit)
+        except Exception:
+            return {'error': 'Could not read body'}
+    
+    @staticmethod
+    def get_response_body(response, limit):
+        """Obtiene el body de la respuesta si no excede `limit` bytes"""
+        if getattr(response, 'streaming', False):
+            return {}
+        
+        try:
+            return capture_body(response.content, limit)
+        except Exception:
+            return {}
+    
     @staticmethod
     def get_headers(request):
         """Obtiene los headers de la petición"""
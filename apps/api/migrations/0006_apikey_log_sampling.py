@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_apikey_allowed_endpoints_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='log_sample_rate',
+            field=models.FloatField(default=1.0, help_text='Fracción de peticiones exitosas a registrar en el log (0.0 - 1.0). Los errores siempre se registran', verbose_name='Muestreo de Logs'),
+        ),
+        migrations.AddField(
+            model_name='apikey',
+            name='log_body_limit',
+            field=models.IntegerField(blank=True, help_text='Bytes máximos de body a capturar en el log (null = valor global, 0 = no capturar)', null=True, verbose_name='Límite Body en Logs'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:30
+
+import apps.api.models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0025_alter_organization_owner'),
+        ('api', '0006_apikey_log_sampling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apiwebhook',
+            name='batch_events',
+            field=models.BooleanField(default=False, help_text='Enviar los eventos pendientes en un solo POST con la lista de eventos', verbose_name='Agrupar Eventos'),
+        ),
+        migrations.AddField(
+            model_name='apiwebhook',
+            name='max_consecutive_failures',
+            field=models.IntegerField(default=20, help_text='Entregas fallidas seguidas antes de desactivar el webhook', verbose_name='Máximo Fallos Consecutivos'),
+        ),
+        migrations.AddField(
+            model_name='apiwebhook',
+            name='consecutive_failures',
+            field=models.IntegerField(default=0, verbose_name='Fallos Consecutivos'),
+        ),
+        migrations.AddField(
+            model_name='apiwebhook',
+            name='avg_latency_ms',
+            field=models.FloatField(blank=True, null=True, verbose_name='Latencia Promedio (ms)'),
+        ),
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(db_index=True, max_length=100, verbose_name='Evento')),
+                ('payload', apps.api.models.JSONFieldCompatible(default=apps.api.models.JSONFieldCompatible._get_default, verbose_name='Payload')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('delivered', 'Entregado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo Intento')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Bloqueado Hasta')),
+                ('response_status', models.IntegerField(blank=True, null=True, verbose_name='Status Code')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('latency_ms', models.FloatField(blank=True, null=True, verbose_name='Latencia (ms)')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Entregado en')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha Creación')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhook_deliveries', to='organizations.organization', verbose_name='Organización')),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='api.apiwebhook', verbose_name='Webhook')),
+            ],
+            options={
+                'verbose_name': 'Entrega de Webhook',
+                'verbose_name_plural': 'Entregas de Webhooks',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='api_webhook_status_5921e6_idx'), models.Index(fields=['webhook', 'status'], name='api_webhook_webhook_87f323_idx'), models.Index(fields=['organization', 'created_at'], name='api_webhook_organiz_01db5e_idx')],
+            },
+        ),
+    ]
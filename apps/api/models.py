@@ -2,6 +2,7 @@
 Modelos para el sistema de API REST
 """
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -134,6 +135,19 @@ class APIKey(TenantModel):
         help_text='Requests por hora permitidos'
     )
     
+    log_sample_rate = models.FloatField(
+        'Muestreo de Logs',
+        default=1.0,
+        help_text='Fracción de peticiones exitosas a registrar en el log (0.0 - 1.0). Los errores siempre se registran'
+    )
+    
+    log_body_limit = models.IntegerField(
+        'Límite Body en Logs',
+        null=True,
+        blank=True,
+        help_text='Bytes máximos de body a capturar en el log (null = valor global, 0 = no capturar)'
+    )
+    
     expires_at = models.DateTimeField(
         'Expira en',
         null=True,
@@ -205,7 +219,8 @@ class APIKey(TenantModel):
         """Verifica si puede acceder a un endpoint específico"""
         if not self.allowed_endpoints:
             return True
-        return endpoint in self.allowed_endpoints
+        from apps.api.key_cache import EndpointTrie
+        return EndpointTrie(self.allowed_endpoints).matches(endpoint)
     
     def can_access_from_ip(self, ip_address):
         """Verifica si puede acceder desde una IP específica"""
@@ -484,6 +499,19 @@ class APIWebhook(TenantModel):
     retry_on_failure = models.BooleanField('Reintentar en Fallo', default=True)
     max_retries = models.IntegerField('Máximo Reintentos', default=3)
     
+    batch_events = models.BooleanField(
+        'Agrupar Eventos',
+        default=False,
+        help_text='Enviar los eventos pendientes en un solo POST con la lista de eventos'
+    )
+    max_consecutive_failures = models.IntegerField(
+        'Máximo Fallos Consecutivos',
+        default=20,
+        help_text='Entregas fallidas seguidas antes de desactivar el webhook'
+    )
+    consecutive_failures = models.IntegerField('Fallos Consecutivos', default=0)
+    avg_latency_ms = models.FloatField('Latencia Promedio (ms)', null=True, blank=True)
+    
     last_triggered_at = models.DateTimeField('Último Trigger', null=True, blank=True)
     last_success_at = models.DateTimeField('Último Éxito', null=True, blank=True)
     last_failure_at = models.DateTimeField('Último Fallo', null=True, blank=True)
@@ -540,3 +568,110 @@ class APIWebhook(TenantModel):
                 self.status = 'failed'
         
         self.save()
+    
+    def record_delivery(self, success, latency_ms=None):
+        """
+        Registra el resultado de una entrega del outbox con updates atómicos
+        
+        Los contadores y la latencia se calculan en la base de datos (F()),
+        así entregas concurrentes del mismo webhook no pisan sus valores.
+        Desactiva el webhook (status='failed') cuando acumula
+        `max_consecutive_failures` fallos seguidos.
+        """
+        now = timezone.now()
+        webhooks = APIWebhook.objects.filter(pk=self.pk)
+        updates = {
+            'last_triggered_at': now,
+            'total_triggers': models.F('total_triggers') + 1,
+        }
+        
+        if latency_ms is not None:
+            # Promedio móvil exponencial de la latencia (la primera entrega lo inicializa)
+            updates['avg_latency_ms'] = Coalesce(
+                models.F('avg_latency_ms') * 0.8 + latency_ms * 0.2,
+                models.Value(float(latency_ms)),
+                output_field=models.FloatField(),
+            )
+        
+        if success:
+            updates.update(
+                last_success_at=now,
+                total_successes=models.F('total_successes') + 1,
+                consecutive_failures=0,
+            )
+            webhooks.update(**updates)
+        else:
+            updates.update(
+                last_failure_at=now,
+                total_failures=models.F('total_failures') + 1,
+                consecutive_failures=models.F('consecutive_failures') + 1,
+            )
+            webhooks.update(**updates)
+            webhooks.filter(
+                consecutive_failures__gte=models.F('max_consecutive_failures')
+            ).exclude(status='failed').update(status='failed')
+        
+        self.refresh_from_db(fields=['consecutive_failures', 'avg_latency_ms', 'status'])
+
+
+class WebhookDelivery(TenantModel):
+    """
+    Outbox de entregas de webhooks
+    
+    Se escribe en la misma transacción que dispara el evento y un worker
+    (`python manage.py deliver_webhooks`) realiza el envío con reintentos.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('delivered', 'Entregado'),
+        ('failed', 'Fallido'),
+    ]
+    
+    webhook = models.ForeignKey(
+        APIWebhook,
+        on_delete=models.CASCADE,
+        verbose_name='Webhook',
+        related_name='deliveries'
+    )
+    
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        verbose_name='Organización',
+        related_name='webhook_deliveries'
+    )
+    
+    event = models.CharField('Evento', max_length=100, db_index=True)
+    payload = JSONFieldCompatible('Payload', default=dict)
+    
+    status = models.CharField(
+        'Estado',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    
+    attempts = models.IntegerField('Intentos', default=0)
+    next_attempt_at = models.DateTimeField('Próximo Intento', default=timezone.now)
+    locked_until = models.DateTimeField('Bloqueado Hasta', null=True, blank=True)
+    
+    response_status = models.IntegerField('Status Code', null=True, blank=True)
+    last_error = models.TextField('Último Error', blank=True)
+    latency_ms = models.FloatField('Latencia (ms)', null=True, blank=True)
+    
+    delivered_at = models.DateTimeField('Entregado en', null=True, blank=True)
+    created_at = models.DateTimeField('Fecha Creación', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Entrega de Webhook'
+        verbose_name_plural = 'Entregas de Webhooks'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['webhook', 'status']),
+            models.Index(fields=['organization', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event} → {self.webhook_id} ({self.status})"
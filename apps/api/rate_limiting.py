@@ -0,0 +1,303 @@
+"""
+Motor de rate limiting para la API
+
+Usa contadores atómicos en un backend intercambiable (cache de Django con
+`incr`, o un diccionario en memoria como respaldo) y semántica de ventana
+deslizante aproximada (sliding window counter): se combinan el contador de
+la ventana actual y el de la anterior ponderado por el tiempo transcurrido.
+
+Ya no se escribe un `RateLimitRecord` por petición. Opcionalmente, los
+agregados se persisten cada cierto tiempo en `RateLimitRecord` solo para
+analítica.
+"""
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult(namedtuple('RateLimitResult', [
+    'allowed', 'limit', 'remaining', 'reset', 'retry_after'
+])):
+    """
+    Resultado de evaluar un rate limit
+
+    Attributes:
+        allowed: Si la petición puede continuar
+        limit: Límite configurado para la ventana
+        remaining: Peticiones restantes estimadas
+        reset: Timestamp (epoch) en que termina la ventana actual
+        retry_after: Segundos a esperar antes de reintentar (0 si permitido)
+    """
+
+    def as_headers(self):
+        """Retorna los headers X-RateLimit-* para la respuesta"""
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(self.reset),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(self.retry_after)
+        return headers
+
+
+class CacheCounterBackend:
+    """
+    Contadores atómicos sobre el cache de Django (`add` + `incr`)
+
+    Con Redis o Memcached el incremento es atómico entre procesos; con
+    LocMem es atómico dentro del proceso.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key, 0)
+
+    def incr(self, key, ttl):
+        self.cache.add(key, 0, ttl)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # La llave expiró entre add() e incr()
+            self.cache.set(key, 1, ttl)
+            return 1
+
+    def decr(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass
+
+
+class LocalCounterBackend:
+    """
+    Contadores en memoria del proceso protegidos por un lock
+
+    Respaldo cuando el cache no está disponible. Los límites se aplican
+    por proceso.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        expired = [k for k, (_, exp) in self._counters.items() if exp <= now]
+        for key in expired:
+            del self._counters[key]
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._counters.get(key, (0, 0))
+            return value if expires > time.time() else 0
+
+    def incr(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            if len(self._counters) > 10000:
+                self._purge(now)
+            value, expires = self._counters.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + ttl
+            value += 1
+            self._counters[key] = (value, expires)
+            return value
+
+    def decr(self, key):
+        with self._lock:
+            if key in self._counters:
+                value, expires = self._counters[key]
+                self._counters[key] = (max(0, value - 1), expires)
+
+
+class RateLimitAggregator:
+    """
+    Acumula en memoria el conteo de peticiones por ventana y lo persiste
+    periódicamente en `RateLimitRecord` (solo para analítica)
+    """
+
+    def __init__(self, interval=0):
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def record(self, limit_type, identifier, endpoint, window_start, window_seconds, limit, allowed):
+        if not self.interval:
+            return
+
+        key = (limit_type, str(identifier)[:255], endpoint[:500], window_start)
+        with self._lock:
+            entry = self._pending.setdefault(key, {
+                'count': 0, 'limit': limit, 'blocked': False, 'window_seconds': window_seconds
+            })
+            if allowed:
+                entry['count'] += 1
+            else:
+                entry['blocked'] = True
+            due = time.time() - self._last_flush >= self.interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe los agregados pendientes en `RateLimitRecord`
+
+        Returns:
+            int: Número de registros actualizados
+        """
+        from apps.api.models import RateLimitRecord
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+
+        flushed = 0
+        for (limit_type, identifier, endpoint, window_start), entry in pending.items():
+            start = datetime.fromtimestamp(window_start, tz=dt_timezone.utc)
+            end = start + timedelta(seconds=entry['window_seconds'])
+            try:
+                with transaction.atomic():
+                    record, created = RateLimitRecord.objects.get_or_create(
+                        limit_type=limit_type,
+                        identifier=identifier,
+                        endpoint=endpoint,
+                        window_start=start,
+                        defaults={
+                            'window_end': end,
+                            'limit': entry['limit'],
+                            'request_count': entry['count'],
+                            'is_blocked': entry['blocked'],
+                            'blocked_until': end if entry['blocked'] else None,
+                            'organization': None
+                        }
+                    )
+                    if not created:
+                        updates = {'request_count': F('request_count') + entry['count']}
+                        if entry['blocked']:
+                            updates.update(is_blocked=True, blocked_until=end)
+                        RateLimitRecord.objects.filter(pk=record.pk).update(**updates)
+                flushed += 1
+            except Exception as e:
+                logger.warning(f"No se pudo persistir agregado de rate limit: {e}")
+
+        return flushed
+
+
+class SlidingWindowRateLimiter:
+    """
+    Rate limiter de ventana deslizante aproximada
+
+    Cada evaluación hace una lectura (ventana anterior) y un incremento
+    atómico (ventana actual). Si la petición se rechaza, el incremento se
+    revierte para no penalizar al cliente por peticiones bloqueadas.
+    """
+
+    KEY_PREFIX = 'ratelimit'
+
+    def __init__(self, backend=None, fallback=None, aggregator=None):
+        self.backend = backend or LocalCounterBackend()
+        self.fallback = fallback or LocalCounterBackend()
+        self.aggregator = aggregator or RateLimitAggregator()
+
+    def _key(self, limit_type, identifier, endpoint, window_index):
+        return f"{self.KEY_PREFIX}:{limit_type}:{identifier}:{endpoint}:{window_index}"
+
+    def check(self, identifier, limit_type, endpoint, limit, window_seconds=3600):
+        """
+        Evalúa y consume una petición del límite
+
+        Returns:
+            RateLimitResult
+        """
+        try:
+            return self._check(self.backend, identifier, limit_type, endpoint, limit, window_seconds)
+        except Exception as e:
+            if self.backend is self.fallback:
+                raise
+            logger.warning(f"Backend de rate limit no disponible, usando memoria local: {e}")
+            return self._check(self.fallback, identifier, limit_type, endpoint, limit, window_seconds)
+
+    def _check(self, backend, identifier, limit_type, endpoint, limit, window_seconds):
+        now = time.time()
+        window_index = int(now // window_seconds)
+        window_start = window_index * window_seconds
+        window_end = window_start + window_seconds
+        weight = 1 - (now - window_start) / window_seconds
+
+        previous = backend.get(self._key(limit_type, identifier, endpoint, window_index - 1))
+        current_key = self._key(limit_type, identifier, endpoint, window_index)
+        current = backend.incr(current_key, ttl=window_seconds * 2)
+
+        estimated = previous * weight + current
+        allowed = estimated <= limit
+
+        if allowed:
+            remaining = max(0, int(limit - estimated))
+            retry_after = 0
+        else:
+            backend.decr(current_key)
+            current -= 1
+            remaining = 0
+            retry_after = self._retry_after(previous, current, limit, now, window_start, window_seconds)
+
+        self.aggregator.record(
+            limit_type, identifier, endpoint, window_start, window_seconds, limit, allowed
+        )
+
+        return RateLimitResult(allowed, limit, remaining, int(window_end), retry_after)
+
+    @staticmethod
+    def _retry_after(previous, current, limit, now, window_start, window_seconds):
+        """Segundos hasta que la estimación vuelva a dejar espacio para 1 petición"""
+        until_window_end = window_start + window_seconds - now
+        if current >= limit or previous <= 0:
+            return max(1, math.ceil(until_window_end))
+
+        # previous * (1 - (t_elapsed / window)) + current <= limit - 1
+        excess = previous * (1 - (now - window_start) / window_seconds) + current - (limit - 1)
+        wait = excess * window_seconds / previous
+        return max(1, math.ceil(min(wait, until_window_end)))
+
+
+def build_rate_limiter():
+    """Construye el rate limiter según la configuración del proyecto"""
+    backend_name = getattr(settings, 'API_RATE_LIMIT_BACKEND', 'cache')
+    fallback = LocalCounterBackend()
+
+    if backend_name == 'local':
+        backend = fallback
+    else:
+        backend = CacheCounterBackend(getattr(settings, 'API_RATE_LIMIT_CACHE_ALIAS', 'default'))
+
+    aggregator = RateLimitAggregator(
+        interval=getattr(settings, 'API_RATE_LIMIT_PERSIST_INTERVAL', 0)
+    )
+    return SlidingWindowRateLimiter(backend=backend, fallback=fallback, aggregator=aggregator)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Retorna la instancia compartida del rate limiter del proceso"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = build_rate_limiter()
+    return _rate_limiter
@@ -20,6 +20,7 @@ class APIKeySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'key', 'key_prefix', 'scope', 'status',
             'allowed_ips', 'allowed_endpoints', 'rate_limit',
+            'log_sample_rate', 'log_body_limit',
             'expires_at', 'last_used_at', 'last_used_ip',
             'total_requests', 'notes', 'is_valid',
             'created_at', 'updated_at'
@@ -95,15 +96,17 @@ class APIWebhookSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'url', 'api_key', 'api_key_name',
             'events', 'status', 'headers', 'secret',
-            'retry_on_failure', 'max_retries',
+            'retry_on_failure', 'max_retries', 'batch_events',
+            'max_consecutive_failures', 'consecutive_failures',
             'last_triggered_at', 'last_success_at', 'last_failure_at',
             'total_triggers', 'total_successes', 'total_failures',
-            'success_rate', 'is_active',
+            'avg_latency_ms', 'success_rate', 'is_active',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
             'last_triggered_at', 'last_success_at', 'last_failure_at',
             'total_triggers', 'total_successes', 'total_failures',
+            'consecutive_failures', 'avg_latency_ms',
             'created_at', 'updated_at'
         ]
     
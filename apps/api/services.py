@@ -1,15 +1,28 @@
 """
 Servicios de lógica de negocio para API
 """
+from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import F, Q
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timedelta
 import requests
 import hmac
 import hashlib
 import json
+import logging
+import math
+import random
+import threading
+import time
 
-from apps.api.models import APIKey, APILog, RateLimitRecord, APIWebhook
+from apps.api.models import APIKey, APILog, RateLimitRecord, APIWebhook, WebhookDelivery
+from apps.api.rate_limiting import get_rate_limiter
+from apps.api.telemetry import get_telemetry
+from apps.api.key_cache import APIKeyCache, VerifiedAPIKey
+
+logger = logging.getLogger(__name__)
 
 
 class APIService:
@@ -33,38 +46,71 @@ class APIService:
             if len(key) < 8:
                 return False, None, "API key inválida"
             
-            key_prefix = key[:8]
             key_hash = APIKey.hash_key(key)
+            descriptor = APIService.get_verified_key(key[:8], key_hash)
             
-            # Buscar la key
-            api_key = APIKey.objects.filter(
-                key_prefix=key_prefix,
-                key_hash=key_hash
-            ).first()
-            
-            if not api_key:
+            if descriptor is None:
                 return False, None, "API key no encontrada"
             
+            api_key = descriptor.api_key
+            
             # Validar estado
-            if not api_key.is_valid():
-                return False, api_key, f"API key {api_key.status}"
+            if descriptor.status != 'active':
+                return False, api_key, f"API key {descriptor.status}"
+            
+            if descriptor.is_expired(timezone.now()):
+                APIKey.objects.filter(pk=descriptor.key_id).update(status='expired')
+                APIKeyCache.invalidate(key_hash)
+                api_key.status = 'expired'
+                return False, api_key, "API key expired"
             
             # Validar IP si está configurada
-            if ip_address and not api_key.can_access_from_ip(ip_address):
+            if ip_address and not descriptor.can_access_from_ip(ip_address):
                 return False, api_key, "IP no autorizada"
             
             # Validar endpoint si está configurado
-            if endpoint and not api_key.can_access_endpoint(endpoint):
+            if endpoint and not descriptor.can_access_endpoint(endpoint):
                 return False, api_key, "Endpoint no autorizado"
             
-            # Registrar uso
-            api_key.record_usage(ip_address)
+            # Registrar uso (se agrupa y se aplica con F() en el próximo flush)
+            get_telemetry().record_usage(api_key, ip_address)
             
             return True, api_key, None
             
         except Exception as e:
             return False, None, str(e)
     
+    @staticmethod
+    def get_verified_key(key_prefix, key_hash):
+        """
+        Obtiene el descriptor de una API key desde cache o base de datos
+        
+        Args:
+            key_prefix: Primeros 8 caracteres de la key
+            key_hash: Hash SHA256 de la key
+        
+        Returns:
+            VerifiedAPIKey o None si la key no existe
+        """
+        cached = APIKeyCache.get(key_hash)
+        if cached == APIKeyCache.INVALID:
+            return None
+        if cached is not None:
+            return cached
+        
+        api_key = APIKey.objects.filter(
+            key_prefix=key_prefix,
+            key_hash=key_hash
+        ).first()
+        
+        if not api_key:
+            APIKeyCache.set_invalid(key_hash)
+            return None
+        
+        descriptor = VerifiedAPIKey.from_instance(api_key)
+        APIKeyCache.set(descriptor)
+        return descriptor
+    
     @staticmethod
     def create_api_key(user, organization, name, scope='read', **kwargs):
         """
@@ -122,9 +168,9 @@ class RateLimitService:
     """Servicio para gestión de rate limiting"""
     
     @staticmethod
-    def check_rate_limit(identifier, limit_type, endpoint, limit, window_minutes=60):
+    def consume(identifier, limit_type, endpoint, limit, window_minutes=60):
         """
-        Verifica si se excedió el rate limit
+        Consume una petición del rate limit usando contadores atómicos
         
         Args:
             identifier: Identificador único (API key, IP, user ID)
@@ -134,53 +180,45 @@ class RateLimitService:
             window_minutes: Tamaño de la ventana en minutos
         
         Returns:
-            tuple: (can_proceed, remaining_requests, retry_after_seconds)
+            RateLimitResult: Resultado con datos para headers X-RateLimit-*
         """
-        now = timezone.now()
-        window_start = now - timedelta(minutes=window_minutes)
-        window_end = now
-        
-        # Buscar o crear registro
-        record, created = RateLimitRecord.objects.get_or_create(
-            limit_type=limit_type,
+        return get_rate_limiter().check(
             identifier=identifier,
+            limit_type=limit_type,
             endpoint=endpoint,
-            window_start__gte=window_start,
-            window_end__lte=window_end,
-            defaults={
-                'window_start': window_start,
-                'window_end': window_end,
-                'limit': limit,
-                'request_count': 0,
-                'organization': None  # No asignar organización para rate limits públicos
-            }
+            limit=limit,
+            window_seconds=window_minutes * 60
         )
+    
+    @staticmethod
+    def check_rate_limit(identifier, limit_type, endpoint, limit, window_minutes=60):
+        """
+        Verifica si se excedió el rate limit
         
-        # Si la ventana expiró, crear nueva
-        if now > record.window_end:
-            record = RateLimitRecord.objects.create(
-                limit_type=limit_type,
-                identifier=identifier,
-                endpoint=endpoint,
-                window_start=now,
-                window_end=now + timedelta(minutes=window_minutes),
-                limit=limit,
-                request_count=0,
-                organization=None  # No asignar organización para rate limits públicos
-            )
-        
-        # Verificar si puede hacer la petición
-        can_proceed = record.can_make_request()
+        Args:
+            identifier: Identificador único (API key, IP, user ID)
+            limit_type: Tipo de límite (api_key, ip_address, user)
+            endpoint: Endpoint específico o '*' para todos
+            limit: Número máximo de requests permitidos
+            window_minutes: Tamaño de la ventana en minutos
         
-        if can_proceed:
-            record.increment()
-            remaining = limit - record.request_count
-            retry_after = 0
-        else:
-            remaining = 0
-            retry_after = int((record.window_end - now).total_seconds())
+        Returns:
+            tuple: (can_proceed, remaining_requests, retry_after_seconds)
+        """
+        result = RateLimitService.consume(
+            identifier, limit_type, endpoint, limit, window_minutes
+        )
+        return result.allowed, result.remaining, result.retry_after
+    
+    @staticmethod
+    def flush_aggregates():
+        """
+        Persiste en RateLimitRecord los agregados pendientes del proceso
         
-        return can_proceed, remaining, retry_after
+        Returns:
+            int: Número de registros actualizados
+        """
+        return get_rate_limiter().aggregator.flush()
     
     @staticmethod
     def cleanup_old_records(days=7):
@@ -204,10 +242,40 @@ class RateLimitService:
 class WebhookService:
     """Servicio para gestión de webhooks"""
     
+    @staticmethod
+    def build_request(webhook, payload):
+        """
+        Prepara headers y body firmados para un webhook
+        
+        El body enviado es exactamente el JSON que se firma, para que el
+        receptor pueda verificar la firma sobre los bytes recibidos.
+        
+        Returns:
+            tuple: (headers, body)
+        """
+        body = json.dumps(payload, sort_keys=True, default=str)
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'OpticaApp-Webhook/1.0',
+            **(webhook.headers or {})
+        }
+        
+        # Firmar payload si hay secret
+        if webhook.secret:
+            signature = hmac.new(
+                webhook.secret.encode(),
+                body.encode(),
+                hashlib.sha256
+            ).hexdigest()
+            headers['X-Webhook-Signature'] = f'sha256={signature}'
+        
+        return headers, body
+    
     @staticmethod
     def trigger_webhook(webhook, payload):
         """
-        Dispara un webhook enviando el payload a la URL
+        Dispara un webhook enviando el payload a la URL (envío síncrono,
+        usado para pruebas manuales; los eventos pasan por el outbox)
         
         Args:
             webhook: Instancia de APIWebhook
@@ -220,29 +288,14 @@ class WebhookService:
             return False, {'error': 'Webhook no activo'}
         
         try:
-            # Preparar headers
-            headers = {
-                'Content-Type': 'application/json',
-                'User-Agent': 'OpticaApp-Webhook/1.0',
-                **webhook.headers
-            }
-            
-            # Firmar payload si hay secret
-            if webhook.secret:
-                payload_json = json.dumps(payload, sort_keys=True)
-                signature = hmac.new(
-                    webhook.secret.encode(),
-                    payload_json.encode(),
-                    hashlib.sha256
-                ).hexdigest()
-                headers['X-Webhook-Signature'] = f'sha256={signature}'
+            headers, body = WebhookService.build_request(webhook, payload)
             
             # Enviar request
-            response = requests.post(
+            response = get_http_session().post(
                 webhook.url,
-                json=payload,
+                data=body.encode(),
                 headers=headers,
-                timeout=30
+                timeout=WebhookDeliveryService.timeout()
             )
             
             # Verificar respuesta
@@ -267,7 +320,11 @@ class WebhookService:
     @staticmethod
     def trigger_event(organization, event, data):
         """
-        Dispara todos los webhooks suscritos a un evento
+        Encola en el outbox una entrega por cada webhook suscrito al evento
+        
+        Las entregas se escriben en la transacción actual, así que solo se
+        envían si la operación que disparó el evento se confirma. El envío
+        lo hace `python manage.py deliver_webhooks`.
         
         Args:
             organization: Organización
@@ -275,7 +332,7 @@ class WebhookService:
             data: Datos del evento
         
         Returns:
-            list: Lista de resultados para cada webhook
+            list: Lista de entregas encoladas para cada webhook
         """
         webhooks = APIWebhook.objects.filter(
             organization=organization,
@@ -283,27 +340,287 @@ class WebhookService:
             status='active'
         )
         
-        results = []
+        timestamp = timezone.now()
+        deliveries = []
         
         for webhook in webhooks:
             if webhook.is_subscribed_to(event):
-                payload = {
-                    'event': event,
-                    'data': data,
-                    'timestamp': timezone.now().isoformat(),
-                    'organization_id': organization.id
-                }
-                
-                success, response = WebhookService.trigger_webhook(webhook, payload)
-                
-                results.append({
-                    'webhook_id': webhook.id,
-                    'webhook_name': webhook.name,
-                    'success': success,
-                    'response': response
-                })
-        
-        return results
+                deliveries.append(WebhookDelivery(
+                    webhook=webhook,
+                    organization=organization,
+                    event=event,
+                    payload={
+                        'event': event,
+                        'data': data,
+                        'timestamp': timestamp.isoformat(),
+                        'organization_id': organization.id
+                    },
+                    next_attempt_at=timestamp
+                ))
+        
+        WebhookDelivery.objects.bulk_create(deliveries)
+        
+        return [
+            {
+                'webhook_id': delivery.webhook.id,
+                'webhook_name': delivery.webhook.name,
+                'delivery_id': delivery.id,
+                'queued': True
+            }
+            for delivery in deliveries
+        ]
+    
+    @staticmethod
+    def emit(organization, event, data):
+        """
+        Dispara un evento de dominio desde un signal (ej: paciente guardado)
+        
+        Las entregas se escriben en un savepoint de la transacción que guardó
+        el registro: si esta hace rollback no se envía nada, y un error al
+        encolarlas no afecta la operación.
+        
+        Returns:
+            list: Entregas encoladas (vacía si no hay organización o falló)
+        """
+        if organization is None:
+            return []
+        
+        try:
+            with transaction.atomic():
+                return WebhookService.trigger_event(organization, event, data)
+        except Exception as e:
+            logger.error(f"Error encolando webhooks de '{event}': {e}", exc_info=True)
+            return []
+
+
+_http_local = threading.local()
+
+
+def get_http_session():
+    """
+    Retorna una sesión HTTP por hilo para reutilizar conexiones (keep-alive)
+    """
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=20)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _http_local.session = session
+    return session
+
+
+class WebhookDeliveryService:
+    """
+    Worker del outbox de webhooks
+    
+    Reclama entregas pendientes, las envía en paralelo con sesiones HTTP
+    reutilizadas y reprograma los fallos con backoff exponencial.
+    """
+    
+    # Margen del lease sobre el peor caso de envío del lote
+    LEASE_MARGIN_SECONDS = 60
+    
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'WEBHOOK_TIMEOUT', 10)
+    
+    @staticmethod
+    def backoff_seconds(attempts):
+        """Backoff exponencial con jitter: 30s, 60s, 120s, ... (máx. 1 hora)"""
+        base = getattr(settings, 'WEBHOOK_RETRY_BASE_SECONDS', 30)
+        delay = min(base * (2 ** max(0, attempts - 1)), 3600)
+        return delay + random.uniform(0, delay * 0.1)
+    
+    @staticmethod
+    def lease_seconds(limit, workers):
+        """
+        Duración del lease para un lote: el peor caso es que todos los envíos
+        agoten el timeout, `workers` a la vez
+        """
+        rounds = math.ceil(limit / max(1, workers))
+        return rounds * WebhookDeliveryService.timeout() + WebhookDeliveryService.LEASE_MARGIN_SECONDS
+    
+    @staticmethod
+    def claim_batch(limit=100, lease_seconds=None):
+        """
+        Reclama entregas pendientes marcándolas con un lease
+        
+        Con PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED para que varios
+        workers no tomen las mismas filas. El UPDATE vuelve a exigir que la
+        entrega siga pendiente y sin lease vigente (en SQLite no hay SKIP
+        LOCKED), y solo se retornan las filas que quedaron con el lease de
+        este worker.
+        
+        Returns:
+            list: Entregas reclamadas (con webhook cargado)
+        """
+        now = timezone.now()
+        if lease_seconds is None:
+            lease_seconds = WebhookDeliveryService.lease_seconds(limit, 1)
+        locked_until = now + timedelta(seconds=lease_seconds)
+        
+        def due(queryset):
+            return queryset.filter(
+                status='pending',
+                next_attempt_at__lte=now
+            ).filter(
+                Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+            )
+        
+        with transaction.atomic():
+            queryset = due(WebhookDelivery.objects.all()).order_by('next_attempt_at')
+            
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            
+            ids = list(queryset.values_list('id', flat=True)[:limit])
+            if not ids:
+                return []
+            
+            claimed = due(WebhookDelivery.objects.filter(id__in=ids)).update(locked_until=locked_until)
+            if not claimed:
+                return []
+        
+        return list(
+            WebhookDelivery.objects.filter(id__in=ids, locked_until=locked_until)
+            .select_related('webhook')
+            .order_by('next_attempt_at')
+        )
+    
+    @staticmethod
+    def _group(deliveries):
+        """
+        Agrupa entregas en envíos: una por POST, o todas las de un webhook
+        con `batch_events` en un solo POST
+        """
+        sends = []
+        batched = {}
+        
+        for delivery in deliveries:
+            if delivery.webhook.batch_events:
+                batched.setdefault(delivery.webhook_id, []).append(delivery)
+            else:
+                sends.append((delivery.webhook, [delivery], delivery.payload))
+        
+        for group in batched.values():
+            webhook = group[0].webhook
+            payload = {
+                'events': [delivery.payload for delivery in group],
+                'count': len(group),
+                'timestamp': timezone.now().isoformat(),
+                'organization_id': webhook.organization_id
+            }
+            sends.append((webhook, group, payload))
+        
+        return sends
+    
+    @staticmethod
+    def _send(webhook, payload):
+        """
+        Envía un POST (se ejecuta en el pool de hilos, sin acceso a DB)
+        
+        Returns:
+            tuple: (success, status_code, error, latency_ms)
+        """
+        headers, body = WebhookService.build_request(webhook, payload)
+        started = time.monotonic()
+        try:
+            response = get_http_session().post(
+                webhook.url,
+                data=body.encode(),
+                headers=headers,
+                timeout=WebhookDeliveryService.timeout()
+            )
+            latency_ms = (time.monotonic() - started) * 1000
+            success = 200 <= response.status_code < 300
+            error = '' if success else response.text[:500]
+            return success, response.status_code, error, latency_ms
+        except requests.exceptions.Timeout:
+            return False, None, 'Timeout al conectar con webhook', (time.monotonic() - started) * 1000
+        except requests.exceptions.RequestException as e:
+            return False, None, str(e)[:500], (time.monotonic() - started) * 1000
+    
+    @staticmethod
+    def _record(webhook, group, success, status_code, error, latency_ms):
+        """Registra el resultado de un envío en las entregas y el webhook"""
+        now = timezone.now()
+        ids = [delivery.id for delivery in group]
+        
+        if success:
+            WebhookDelivery.objects.filter(id__in=ids).update(
+                status='delivered',
+                attempts=F('attempts') + 1,
+                response_status=status_code,
+                latency_ms=latency_ms,
+                last_error='',
+                delivered_at=now,
+                locked_until=None
+            )
+        else:
+            for delivery in group:
+                attempts = delivery.attempts + 1
+                exhausted = not webhook.retry_on_failure or attempts > webhook.max_retries
+                WebhookDelivery.objects.filter(id=delivery.id).update(
+                    status='failed' if exhausted else 'pending',
+                    attempts=attempts,
+                    response_status=status_code,
+                    latency_ms=latency_ms,
+                    last_error=error,
+                    next_attempt_at=now + timedelta(
+                        seconds=WebhookDeliveryService.backoff_seconds(attempts)
+                    ),
+                    locked_until=None
+                )
+        
+        webhook.record_delivery(success, latency_ms=latency_ms)
+    
+    @staticmethod
+    def deliver_pending(limit=100, workers=8):
+        """
+        Reclama y entrega un lote de webhooks pendientes
+        
+        Args:
+            limit: Máximo de entregas a reclamar
+            workers: Hilos de envío concurrentes
+        
+        Returns:
+            dict: Resumen con delivered, failed, skipped y avg_latency_ms
+        """
+        deliveries = WebhookDeliveryService.claim_batch(
+            limit, lease_seconds=WebhookDeliveryService.lease_seconds(limit, workers)
+        )
+        result = {'claimed': len(deliveries), 'delivered': 0, 'failed': 0, 'skipped': 0, 'avg_latency_ms': 0}
+        
+        active = []
+        for delivery in deliveries:
+            if delivery.webhook.is_active and delivery.webhook.status == 'active':
+                active.append(delivery)
+            else:
+                WebhookDelivery.objects.filter(id=delivery.id).update(
+                    status='failed', last_error='Webhook no activo', locked_until=None
+                )
+                result['skipped'] += 1
+        
+        sends = WebhookDeliveryService._group(active)
+        if not sends:
+            return result
+        
+        latencies = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(WebhookDeliveryService._send, webhook, payload): (webhook, group)
+                for webhook, group, payload in sends
+            }
+            for future in as_completed(futures):
+                webhook, group = futures[future]
+                success, status_code, error, latency_ms = future.result()
+                WebhookDeliveryService._record(webhook, group, success, status_code, error, latency_ms)
+                latencies.append(latency_ms)
+                result['delivered' if success else 'failed'] += len(group)
+        
+        result['avg_latency_ms'] = round(sum(latencies) / len(latencies), 2)
+        return result
 
 
 class APIDocumentationService:
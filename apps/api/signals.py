@@ -1,9 +1,10 @@
 """
 Signals para API
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from apps.api.models import APIKey
+from apps.api.key_cache import APIKeyCache
 
 
 @receiver(post_save, sender=APIKey)
@@ -11,6 +12,17 @@ def apikey_post_save(sender, instance, created, **kwargs):
     """
     Signal después de crear/actualizar API Key
     """
+    # Revocación, rotación o cambio de restricciones: invalidar cache
+    APIKeyCache.invalidate(instance.key_hash)
+    
     if created:
         # Log o notificación de creación de nueva API key
         print(f"Nueva API Key creada: {instance.name} ({instance.key_prefix}...)")
+
+
+@receiver(post_delete, sender=APIKey)
+def apikey_post_delete(sender, instance, **kwargs):
+    """
+    Signal después de eliminar API Key
+    """
+    APIKeyCache.invalidate(instance.key_hash)
@@ -0,0 +1,243 @@
+"""
+Pipeline de telemetría de la API
+
+Los logs de peticiones se acumulan en un ring buffer en memoria y se
+escriben en lote (`bulk_create`) desde un hilo en segundo plano. El uso de
+las API Keys (`total_requests`, `last_used_at`, `last_used_ip`) se agrupa por
+key y se aplica periódicamente con incrementos `F()`, en vez de guardar la
+fila de la key en cada petición.
+"""
+import atexit
+import json
+import logging
+import random
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def capture_body(raw, limit):
+    """
+    Decodifica un body JSON respetando un límite de tamaño
+
+    Args:
+        raw: Contenido en bytes
+        limit: Bytes máximos a capturar (0 = no capturar)
+
+    Returns:
+        dict: Body decodificado o un resumen si no se captura
+    """
+    if not raw:
+        return {}
+    if limit <= 0:
+        return {'captured': False, 'size': len(raw)}
+    if len(raw) > limit:
+        return {'truncated': True, 'size': len(raw)}
+    try:
+        return json.loads(raw.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {'error': 'Could not decode body', 'size': len(raw)}
+
+
+class APITelemetryPipeline:
+    """
+    Buffer de logs y contadores de uso de la API con flush en lote
+
+    Args:
+        capacity: Tamaño máximo del ring buffer (se descartan los más antiguos)
+        batch_size: Tamaño de lote para bulk_create
+        flush_interval: Segundos entre flushes del hilo en segundo plano
+        background: Si se debe iniciar el hilo de flush automáticamente
+    """
+
+    def __init__(self, capacity=5000, batch_size=500, flush_interval=5, background=True):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.background = background
+
+        self._logs = deque(maxlen=capacity)
+        self._usage = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+
+        self.dropped = 0
+        self.flushed_logs = 0
+        self.flushed_usage = 0
+
+    # ==================== MUESTREO ====================
+
+    @staticmethod
+    def default_sample_rate():
+        return getattr(settings, 'API_LOG_SAMPLE_RATE', 1.0)
+
+    @staticmethod
+    def default_body_limit():
+        return getattr(settings, 'API_LOG_MAX_BODY_BYTES', 4096)
+
+    def should_log(self, api_key, response_status):
+        """Decide si una petición se registra (los errores siempre se registran)"""
+        if response_status >= 400:
+            return True
+
+        rate = self.default_sample_rate()
+        if api_key is not None and api_key.log_sample_rate is not None:
+            rate = api_key.log_sample_rate
+
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        return random.random() < rate
+
+    def body_limit_for(self, api_key):
+        """Límite de captura de body para una API key"""
+        if api_key is not None and api_key.log_body_limit is not None:
+            return api_key.log_body_limit
+        return self.default_body_limit()
+
+    # ==================== REGISTRO ====================
+
+    def record_log(self, **fields):
+        """
+        Encola una entrada de log (mismos campos que APILog)
+        """
+        with self._lock:
+            if len(self._logs) == self.capacity:
+                self.dropped += 1
+            self._logs.append(fields)
+            full = len(self._logs) >= self.batch_size
+
+        self._ensure_worker()
+        if full:
+            self._wakeup.set()
+
+    def record_usage(self, api_key, ip_address=None):
+        """
+        Acumula el uso de una API key para aplicarlo en el próximo flush
+        """
+        now = timezone.now()
+        with self._lock:
+            entry = self._usage.get(api_key.pk)
+            if entry is None:
+                self._usage[api_key.pk] = [1, now, ip_address]
+            else:
+                entry[0] += 1
+                entry[1] = now
+                if ip_address:
+                    entry[2] = ip_address
+
+        # Mantener la instancia en memoria coherente para quien la use
+        api_key.last_used_at = now
+        if ip_address:
+            api_key.last_used_ip = ip_address
+
+        self._ensure_worker()
+
+    # ==================== FLUSH ====================
+
+    def flush(self):
+        """
+        Escribe los logs pendientes y aplica los contadores de uso
+
+        Returns:
+            tuple: (logs_escritos, keys_actualizadas)
+        """
+        from apps.api.models import APIKey, APILog
+
+        with self._flush_lock:
+            with self._lock:
+                logs = list(self._logs)
+                self._logs.clear()
+                usage, self._usage = self._usage, {}
+
+            written = 0
+            if logs:
+                try:
+                    created = APILog.objects.bulk_create(
+                        [APILog(**fields) for fields in logs],
+                        batch_size=self.batch_size
+                    )
+                    written = len(created)
+                except Exception as e:
+                    logger.error(f"Error escribiendo logs de API en lote: {e}")
+
+            updated = 0
+            for key_id, (count, last_used_at, last_ip) in usage.items():
+                updates = {
+                    'total_requests': F('total_requests') + count,
+                    'last_used_at': last_used_at,
+                }
+                if last_ip:
+                    updates['last_used_ip'] = last_ip
+                try:
+                    updated += APIKey.objects.filter(pk=key_id).update(**updates)
+                except Exception as e:
+                    logger.error(f"Error actualizando uso de API key {key_id}: {e}")
+
+            self.flushed_logs += written
+            self.flushed_usage += updated
+            return written, updated
+
+    def stats(self):
+        """Métricas del pipeline"""
+        with self._lock:
+            return {
+                'buffered_logs': len(self._logs),
+                'pending_keys': len(self._usage),
+                'dropped': self.dropped,
+                'flushed_logs': self.flushed_logs,
+                'flushed_usage': self.flushed_usage,
+            }
+
+    # ==================== HILO EN SEGUNDO PLANO ====================
+
+    def _ensure_worker(self):
+        if not self.background or (self._worker and self._worker.is_alive()):
+            return
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name='api-telemetry-flush', daemon=True
+            )
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error en flush de telemetría API: {e}")
+            finally:
+                close_old_connections()
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_telemetry():
+    """Retorna el pipeline de telemetría compartido del proceso"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = APITelemetryPipeline(
+                    capacity=getattr(settings, 'API_TELEMETRY_BUFFER_SIZE', 5000),
+                    batch_size=getattr(settings, 'API_TELEMETRY_BATCH_SIZE', 500),
+                    flush_interval=getattr(settings, 'API_TELEMETRY_FLUSH_INTERVAL', 5),
+                    background=getattr(settings, 'API_TELEMETRY_BACKGROUND', True),
+                )
+                atexit.register(_pipeline.flush)
+    return _pipeline
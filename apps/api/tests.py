@@ -228,6 +228,18 @@ class RateLimitServiceTestCase(TestCase):
         self.assertEqual(remaining, 0)
         self.assertGreater(retry_after, 0)
 
+    def test_client_ip_ignores_spoofed_forwarded_for(self):
+        """Test que la IP del throttle es la que agrega el proxy, no la que envía el cliente"""
+        from django.test import RequestFactory
+        from apps.api.throttling import IPRateThrottle
+
+        factory = RequestFactory()
+        spoofed = factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7', REMOTE_ADDR='10.0.0.1')
+        direct = factory.get('/', REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(IPRateThrottle.get_client_ip(spoofed), '203.0.113.7')
+        self.assertEqual(IPRateThrottle.get_client_ip(direct), '10.0.0.1')
+
 
 class APIWebhookTestCase(TestCase):
     """Tests para webhooks"""
@@ -285,3 +297,385 @@ class APIWebhookTestCase(TestCase):
         
         self.assertTrue(webhook.is_subscribed_to('patient.created'))
         self.assertTrue(webhook.is_subscribed_to('any.event'))
+
+
+class SlidingWindowRateLimiterTestCase(TestCase):
+    """Tests para el motor de rate limiting con contadores atómicos"""
+    
+    def setUp(self):
+        """Setup test data"""
+        from apps.api.rate_limiting import (
+            SlidingWindowRateLimiter, LocalCounterBackend, RateLimitAggregator
+        )
+        self.backend = LocalCounterBackend()
+        self.limiter = SlidingWindowRateLimiter(
+            backend=self.backend,
+            aggregator=RateLimitAggregator(interval=0)
+        )
+    
+    def test_no_db_writes_per_request(self):
+        """Test que evaluar el límite no crea registros en DB"""
+        for i in range(5):
+            self.limiter.check('ip_1', 'ip_address', '/api/test/', limit=10)
+        
+        self.assertEqual(RateLimitRecord.objects.count(), 0)
+    
+    def test_rejected_requests_are_not_counted(self):
+        """Test que las peticiones rechazadas no consumen el límite"""
+        for i in range(3):
+            self.limiter.check('ip_2', 'ip_address', '/api/test/', limit=3)
+        
+        for i in range(5):
+            result = self.limiter.check('ip_2', 'ip_address', '/api/test/', limit=3)
+            self.assertFalse(result.allowed)
+        
+        current = [v for k, (v, _) in self.backend._counters.items() if 'ip_2' in k]
+        self.assertEqual(current, [3])
+    
+    def test_rate_limit_headers(self):
+        """Test headers X-RateLimit-*"""
+        result = self.limiter.check('ip_3', 'ip_address', '/api/test/', limit=1)
+        headers = result.as_headers()
+        self.assertEqual(headers['X-RateLimit-Limit'], '1')
+        self.assertEqual(headers['X-RateLimit-Remaining'], '0')
+        self.assertNotIn('Retry-After', headers)
+        
+        result = self.limiter.check('ip_3', 'ip_address', '/api/test/', limit=1)
+        self.assertIn('Retry-After', result.as_headers())
+    
+    def test_persist_aggregates(self):
+        """Test persistencia periódica de agregados para analítica"""
+        from apps.api.rate_limiting import RateLimitAggregator
+        aggregator = RateLimitAggregator(interval=3600)
+        self.limiter.aggregator = aggregator
+        
+        for i in range(4):
+            self.limiter.check('key_1', 'api_key', '/api/test/', limit=2)
+        
+        self.assertEqual(RateLimitRecord.objects.count(), 0)
+        self.assertEqual(aggregator.flush(), 1)
+        
+        record = RateLimitRecord.objects.get(identifier='key_1')
+        self.assertEqual(record.request_count, 2)
+        self.assertTrue(record.is_blocked)
+
+
+class APITelemetryPipelineTestCase(TestCase):
+    """Tests para el pipeline de telemetría en lote"""
+    
+    def setUp(self):
+        """Setup test data"""
+        from apps.api.telemetry import APITelemetryPipeline
+        from apps.organizations.models import Organization
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.org = Organization.objects.create(
+            name='Test Org',
+            slug='test-org'
+        )
+        self.api_key = APIKey.objects.create(
+            name='Test Key',
+            user=self.user,
+            organization=self.org,
+            scope='read'
+        )
+        self.pipeline = APITelemetryPipeline(capacity=3, batch_size=10, background=False)
+    
+    def _log_fields(self, status=200):
+        return {
+            'api_key': self.api_key,
+            'user': self.user,
+            'organization': self.org,
+            'method': 'GET',
+            'endpoint': '/api/v1/test/',
+            'full_path': '/api/v1/test/',
+            'response_status': status,
+            'response_time': 10.0,
+            'ip_address': '127.0.0.1'
+        }
+    
+    def test_logs_are_buffered_and_bulk_written(self):
+        """Test que los logs se escriben en lote al hacer flush"""
+        for i in range(2):
+            self.pipeline.record_log(**self._log_fields())
+        
+        self.assertEqual(APILog.objects.count(), 0)
+        written, _ = self.pipeline.flush()
+        self.assertEqual(written, 2)
+        self.assertEqual(APILog.objects.count(), 2)
+    
+    def test_ring_buffer_drops_oldest(self):
+        """Test que el ring buffer descarta las entradas más antiguas"""
+        for i in range(5):
+            self.pipeline.record_log(**self._log_fields(status=200 + i))
+        
+        self.assertEqual(self.pipeline.stats()['dropped'], 2)
+        self.pipeline.flush()
+        self.assertEqual(
+            sorted(APILog.objects.values_list('response_status', flat=True)),
+            [202, 203, 204]
+        )
+    
+    def test_sampling_always_keeps_errors(self):
+        """Test muestreo por API key"""
+        self.api_key.log_sample_rate = 0
+        self.assertFalse(self.pipeline.should_log(self.api_key, 200))
+        self.assertTrue(self.pipeline.should_log(self.api_key, 500))
+    
+    def test_usage_is_coalesced(self):
+        """Test que el uso de la key se aplica como un solo incremento"""
+        for i in range(3):
+            self.pipeline.record_usage(self.api_key, '10.0.0.1')
+        
+        _, updated = self.pipeline.flush()
+        self.assertEqual(updated, 1)
+        
+        self.api_key.refresh_from_db()
+        self.assertEqual(self.api_key.total_requests, 3)
+        self.assertEqual(self.api_key.last_used_ip, '10.0.0.1')
+    
+    def test_body_capture_limit(self):
+        """Test límite de captura de body"""
+        from apps.api.telemetry import capture_body
+        self.assertEqual(capture_body(b'{"a": 1}', 100), {'a': 1})
+        self.assertEqual(capture_body(b'{"a": 1}', 4), {'truncated': True, 'size': 8})
+
+
+class APIKeyCacheTestCase(TestCase):
+    """Tests para el cache de API keys verificadas"""
+    
+    def setUp(self):
+        """Setup test data"""
+        from django.core.cache import cache
+        from apps.organizations.models import Organization
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.org = Organization.objects.create(
+            name='Test Org',
+            slug='test-org'
+        )
+        self.api_key = APIKey.objects.create(
+            name='Test Key',
+            user=self.user,
+            organization=self.org,
+            scope='read',
+            allowed_endpoints=['/api/v1/patients/']
+        )
+    
+    def test_cached_validation_skips_db(self):
+        """Test que la segunda validación no consulta la base de datos"""
+        APIService.validate_api_key(self.api_key.key)
+        
+        with self.assertNumQueries(0):
+            is_valid, api_key_obj, error = APIService.validate_api_key(
+                self.api_key.key, endpoint='/api/v1/patients/15/'
+            )
+        
+        self.assertTrue(is_valid)
+        self.assertEqual(api_key_obj.organization, self.org)
+        self.assertEqual(api_key_obj.user, self.user)
+    
+    def test_cache_stores_no_secrets(self):
+        """Test que el descriptor cacheado no incluye la key ni el usuario"""
+        import pickle
+        from apps.api.key_cache import APIKeyCache
+        
+        APIService.validate_api_key(self.api_key.key)
+        serialized = pickle.dumps(APIKeyCache.get(self.api_key.key_hash))
+        
+        self.assertNotIn(self.api_key.key.encode(), serialized)
+        self.assertNotIn(self.user.password.encode(), serialized)
+    
+    def test_negative_cache(self):
+        """Test cache negativo de keys inválidas"""
+        APIService.validate_api_key('invalid_key_12345')
+        
+        with self.assertNumQueries(0):
+            is_valid, _, _ = APIService.validate_api_key('invalid_key_12345')
+        
+        self.assertFalse(is_valid)
+    
+    def test_revoke_invalidates_cache(self):
+        """Test que revocar la key invalida el cache inmediatamente"""
+        self.assertTrue(APIService.validate_api_key(self.api_key.key)[0])
+        
+        self.api_key.status = 'revoked'
+        self.api_key.save()
+        
+        is_valid, _, error = APIService.validate_api_key(self.api_key.key)
+        self.assertFalse(is_valid)
+        self.assertEqual(error, 'API key revoked')
+    
+    def test_endpoint_trie(self):
+        """Test trie de prefijos de endpoints"""
+        from apps.api.key_cache import EndpointTrie
+        trie = EndpointTrie(['/api/v1/patients/', '/api/v1/*/export/'])
+        
+        self.assertTrue(trie.matches('/api/v1/patients/'))
+        self.assertTrue(trie.matches('/api/v1/patients/15/'))
+        self.assertTrue(trie.matches('/api/v1/invoices/export/'))
+        self.assertFalse(trie.matches('/api/v1/patients-export/'))
+        self.assertFalse(trie.matches('/api/v1/'))
+
+
+class WebhookOutboxTestCase(TestCase):
+    """Tests para el outbox de entregas de webhooks"""
+    
+    def setUp(self):
+        """Setup test data"""
+        from apps.organizations.models import Organization
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='testpass123'
+        )
+        self.org = Organization.objects.create(
+            name='Test Org',
+            slug='test-org'
+        )
+        self.api_key = APIKey.objects.create(
+            name='Test Key',
+            user=self.user,
+            organization=self.org,
+            scope='admin'
+        )
+        self.webhook = APIWebhook.objects.create(
+            name='Test Webhook',
+            url='https://example.com/webhook',
+            api_key=self.api_key,
+            organization=self.org,
+            events=['patient.created']
+        )
+    
+    def _mock_post(self, status_code):
+        from unittest import mock
+        response = mock.Mock(status_code=status_code, text='')
+        return mock.patch('apps.api.services.get_http_session', return_value=mock.Mock(
+            post=mock.Mock(return_value=response)
+        ))
+    
+    def test_trigger_event_only_enqueues(self):
+        """Test que disparar un evento no hace peticiones HTTP"""
+        from apps.api.models import WebhookDelivery
+        
+        with self._mock_post(200) as session:
+            results = WebhookService.trigger_event(self.org, 'patient.created', {'id': 1})
+            WebhookService.trigger_event(self.org, 'invoice.created', {'id': 1})
+        
+        session.assert_not_called()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(WebhookDelivery.objects.filter(status='pending').count(), 1)
+    
+    def test_domain_events_feed_outbox(self):
+        """Test que guardar pacientes y cancelar citas encola sus webhooks"""
+        from apps.api.models import WebhookDelivery
+        from apps.appointments.models import Appointment
+        from apps.patients.models import Patient
+        
+        self.webhook.events = ['patient.created', 'appointment.cancelled']
+        self.webhook.save()
+        
+        patient = Patient.objects.create(organization=self.org, full_name='Paciente', identification='123')
+        appointment = Appointment.objects.create(
+            organization=self.org, patient=patient, full_name='Paciente', phone_number='3001234567',
+            appointment_date=timezone.localdate() + timedelta(days=1), appointment_time='09:00'
+        )
+        appointment.status = 'cancelled'
+        appointment.save()
+        
+        deliveries = WebhookDelivery.objects.order_by('id')
+        self.assertEqual(
+            [(d.event, d.payload['data']['id']) for d in deliveries],
+            [('patient.created', patient.pk), ('appointment.cancelled', appointment.pk)]
+        )
+    
+    def test_deliver_pending(self):
+        """Test entrega exitosa desde el outbox"""
+        from apps.api.models import WebhookDelivery
+        from apps.api.services import WebhookDeliveryService
+        
+        WebhookService.trigger_event(self.org, 'patient.created', {'id': 1})
+        
+        with self._mock_post(200):
+            result = WebhookDeliveryService.deliver_pending(workers=2)
+        
+        self.assertEqual(result['delivered'], 1)
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.status, 'delivered')
+        self.assertIsNotNone(delivery.latency_ms)
+        
+        self.webhook.refresh_from_db()
+        self.assertEqual(self.webhook.total_successes, 1)
+        self.assertIsNotNone(self.webhook.avg_latency_ms)
+    
+    def test_failed_delivery_is_rescheduled_with_backoff(self):
+        """Test reintento con backoff exponencial"""
+        from apps.api.models import WebhookDelivery
+        from apps.api.services import WebhookDeliveryService
+        
+        WebhookService.trigger_event(self.org, 'patient.created', {'id': 1})
+        
+        with self._mock_post(500):
+            WebhookDeliveryService.deliver_pending()
+            # El reintento aún no está vencido
+            self.assertEqual(WebhookDeliveryService.deliver_pending()['claimed'], 0)
+        
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.status, 'pending')
+        self.assertEqual(delivery.attempts, 1)
+        self.assertGreater(delivery.next_attempt_at, timezone.now())
+    
+    def test_claim_batch_does_not_reclaim_leased_rows(self):
+        """Test que un segundo worker no reclama entregas con lease vigente"""
+        from apps.api.services import WebhookDeliveryService
+        
+        WebhookService.trigger_event(self.org, 'patient.created', {'id': 1})
+        
+        self.assertEqual(len(WebhookDeliveryService.claim_batch()), 1)
+        self.assertEqual(WebhookDeliveryService.claim_batch(), [])
+        # El lease cubre el peor caso del lote: 100 envíos, 8 a la vez, 10s cada uno
+        self.assertGreaterEqual(WebhookDeliveryService.lease_seconds(100, 8), 13 * 10)
+    
+    def test_webhook_disabled_after_consecutive_failures(self):
+        """Test desactivación de endpoints que fallan continuamente"""
+        from apps.api.services import WebhookDeliveryService
+        
+        self.webhook.max_consecutive_failures = 2
+        self.webhook.save()
+        
+        with self._mock_post(500):
+            for i in range(2):
+                WebhookService.trigger_event(self.org, 'patient.created', {'id': i})
+                WebhookDeliveryService.deliver_pending()
+        
+        self.webhook.refresh_from_db()
+        self.assertEqual(self.webhook.status, 'failed')
+        self.assertEqual(WebhookService.trigger_event(self.org, 'patient.created', {}), [])
+    
+    def test_batched_delivery(self):
+        """Test agrupación de eventos por endpoint"""
+        from apps.api.models import WebhookDelivery
+        from apps.api.services import WebhookDeliveryService
+        
+        self.webhook.batch_events = True
+        self.webhook.save()
+        
+        for i in range(3):
+            WebhookService.trigger_event(self.org, 'patient.created', {'id': i})
+        
+        with self._mock_post(200) as session:
+            result = WebhookDeliveryService.deliver_pending()
+        
+        self.assertEqual(session.return_value.post.call_count, 1)
+        self.assertEqual(result['delivered'], 3)
+        self.assertEqual(WebhookDelivery.objects.filter(status='delivered').count(), 3)
@@ -6,6 +6,15 @@ from apps.api.services import RateLimitService
 from apps.api.models import APIKey
 
 
+def attach_rate_limit(request, result):
+    """
+    Guarda el resultado del rate limit en el HttpRequest original para que
+    RateLimitHeadersMiddleware agregue los headers X-RateLimit-* a la respuesta
+    """
+    http_request = getattr(request, '_request', request)
+    http_request.rate_limit = result
+
+
 class APIKeyRateThrottle(BaseThrottle):
     """
     Throttle basado en el rate limit de la API Key
@@ -24,7 +33,7 @@ class APIKeyRateThrottle(BaseThrottle):
         endpoint = request.path
         
         # Verificar rate limit
-        can_proceed, remaining, retry_after = RateLimitService.check_rate_limit(
+        result = RateLimitService.consume(
             identifier=identifier,
             limit_type='api_key',
             endpoint=endpoint,
@@ -33,9 +42,10 @@ class APIKeyRateThrottle(BaseThrottle):
         )
         
         # Guardar para usar en headers
-        self.wait_time = retry_after
+        self.wait_time = result.retry_after
+        attach_rate_limit(request, result)
         
-        return can_proceed
+        return result.allowed
     
     def wait(self):
         """
@@ -49,6 +59,9 @@ class IPRateThrottle(BaseThrottle):
     Throttle basado en IP para requests sin autenticación
     """
     
+    limit = 100  # 100 requests por hora sin autenticación
+    window_minutes = 60
+    
     def allow_request(self, request, view):
         """
         Verifica si la petición está permitida según el rate limit de IP
@@ -61,17 +74,18 @@ class IPRateThrottle(BaseThrottle):
         endpoint = request.path
         
         # Límite más restrictivo para IPs no autenticadas
-        can_proceed, remaining, retry_after = RateLimitService.check_rate_limit(
+        result = RateLimitService.consume(
             identifier=ip_address,
             limit_type='ip_address',
             endpoint=endpoint,
-            limit=100,  # 100 requests por hora sin autenticación
-            window_minutes=60
+            limit=self.limit,
+            window_minutes=self.window_minutes
         )
         
-        self.wait_time = retry_after
+        self.wait_time = result.retry_after
+        attach_rate_limit(request, result)
         
-        return can_proceed
+        return result.allowed
     
     def wait(self):
         """Retorna el tiempo que debe esperar"""
@@ -79,13 +93,15 @@ class IPRateThrottle(BaseThrottle):
     
     @staticmethod
     def get_client_ip(request):
-        """Obtiene la IP del cliente"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        """
+        Obtiene la IP del cliente
+
+        Usa la última IP de X-Forwarded-For (la agrega el proxy propio; las
+        anteriores las controla el cliente y rotarlas evadiría el límite) o
+        REMOTE_ADDR sin proxy.
+        """
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        return forwarded[-1] if forwarded else request.META.get('REMOTE_ADDR')
 
 
 class GlobalRateThrottle(BaseThrottle):
@@ -109,7 +125,7 @@ class GlobalRateThrottle(BaseThrottle):
         endpoint = '*'  # Global para todos los endpoints
         
         # Límite global alto por organización
-        can_proceed, remaining, retry_after = RateLimitService.check_rate_limit(
+        result = RateLimitService.consume(
             identifier=identifier,
             limit_type='organization',
             endpoint=endpoint,
@@ -117,10 +133,29 @@ class GlobalRateThrottle(BaseThrottle):
             window_minutes=60
         )
         
-        self.wait_time = retry_after
+        self.wait_time = result.retry_after
         
-        return can_proceed
+        return result.allowed
     
     def wait(self):
         """Retorna el tiempo que debe esperar"""
         return self.wait_time if hasattr(self, 'wait_time') else None
+
+
+class PublicBookingRateThrottle(IPRateThrottle):
+    """
+    Throttle por IP para los endpoints públicos de agendamiento
+    
+    Los contadores viven en cache, así que proteger estos endpoints no
+    genera escrituras en la base de datos.
+    """
+    
+    limit = 300  # Consultas de fechas/horarios por IP por hora
+    window_minutes = 60
+
+
+class PublicBookingCreateRateThrottle(IPRateThrottle):
+    """Throttle por IP para la creación de citas desde la landing page"""
+    
+    limit = 20  # Citas por IP por hora
+    window_minutes = 60
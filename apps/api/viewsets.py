@@ -284,8 +284,10 @@ class APIWebhookViewSet(viewsets.ModelViewSet):
         """Obtiene el historial de triggers de un webhook"""
         webhook = self.get_object()
         
-        # Buscar logs relacionados con este webhook
-        # (esto requeriría un modelo adicional WebhookLog, por ahora retornamos stats)
+        recent_deliveries = webhook.deliveries.order_by('-created_at').values(
+            'id', 'event', 'status', 'attempts', 'response_status',
+            'latency_ms', 'last_error', 'delivered_at', 'created_at'
+        )[:50]
         
         return Response({
             'total_triggers': webhook.total_triggers,
@@ -295,7 +297,11 @@ class APIWebhookViewSet(viewsets.ModelViewSet):
                            if webhook.total_triggers > 0 else 100,
             'last_triggered_at': webhook.last_triggered_at,
             'last_success_at': webhook.last_success_at,
-            'last_failure_at': webhook.last_failure_at
+            'last_failure_at': webhook.last_failure_at,
+            'avg_latency_ms': webhook.avg_latency_ms,
+            'consecutive_failures': webhook.consecutive_failures,
+            'pending_deliveries': webhook.deliveries.filter(status='pending').count(),
+            'recent_deliveries': list(recent_deliveries)
         })
 
 
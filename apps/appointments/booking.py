@@ -0,0 +1,309 @@
+"""
+Reserva de horarios sin conflictos
+
+El constraint `unique_active_appointment_slot` (una cita activa por
+organización, fecha y hora) es la única fuente de verdad: la cita se inserta
+directamente y si otra petición ganó el horario el IntegrityError se traduce
+en `SlotTaken`, con horarios alternativos para ofrecer al paciente. No hay
+consulta previa de disponibilidad que pueda quedar desactualizada entre la
+verificación y el INSERT.
+
+Mientras el paciente llena el formulario puede retener el horario
+(`hold()`): la retención es una llave en el cache compartido creada con
+`cache.add` (atómico entre workers) que vence sola a los
+APPOINTMENT_SLOT_HOLD_SECONDS. Los demás visitantes ven el horario como no
+disponible y no pueden reservarlo con otro token. Los tokens los emite el
+servidor (uno enviado por el cliente solo se acepta si sigue vigente) y cada
+cliente puede tener a lo sumo APPOINTMENT_MAX_HOLDS_PER_CLIENT retenciones
+activas por organización: cada una ocupa uno de esos cupos, también tomados
+con `cache.add`.
+
+Las horas ocupadas por fecha se cachean por organización
+(`availability_cache`) para el listado público de horarios; los signals de
+apps/appointments/signals_setup.py invalidan la organización al confirmarse
+cualquier cambio de una cita.
+
+Uso:
+    from apps.appointments.booking import SlotBookingService, SlotTaken
+
+    token = SlotBookingService.hold(organization, date, time, client=hold_client_id(request))
+    try:
+        appointment = SlotBookingService.book(
+            organization, date, time, hold_token=token, full_name=..., phone_number=...
+        )
+    except SlotTaken as e:
+        e.alternatives  # [{'date': ..., 'time': ...}, ...]
+"""
+import logging
+import secrets
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from apps.core.cache import CacheNamespace
+
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+availability_cache = CacheNamespace('appointment_availability', timeout=120)
+
+# Horarios alternativos ofrecidos cuando el elegido ya fue tomado
+ALTERNATIVES_LIMIT = 3
+ALTERNATIVES_DAYS_AHEAD = 7
+
+HOLD_TOKEN_LENGTH = 16
+
+
+class HoldLimitReached(Exception):
+    """El cliente ya tiene el máximo de retenciones activas en la organización"""
+
+
+class SlotTaken(Exception):
+    """El horario ya tiene una cita activa o está retenido por otro visitante"""
+
+    def __init__(self, message='Este horario ya fue tomado', alternatives=()):
+        super().__init__(message)
+        self.message = message
+        self.alternatives = list(alternatives)
+
+
+def _org_id(organization):
+    return getattr(organization, 'pk', organization)
+
+
+def _as_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if isinstance(value, str) else value
+
+
+def _as_time(value):
+    if isinstance(value, str):
+        return datetime.strptime(value if value.count(':') == 2 else f'{value}:00', '%H:%M:%S').time()
+    return value
+
+
+def hold_client_id(request):
+    """
+    Identificador del visitante para limitar sus retenciones
+
+    La misma IP que usan los throttles de los endpoints públicos
+    (IPRateThrottle.get_client_ip).
+    """
+    from apps.api.throttling import IPRateThrottle
+
+    return IPRateThrottle.get_client_ip(request) or ''
+
+
+class SlotBookingService:
+    """Servicio de retención y reserva atómica de horarios"""
+
+    # ==================== RETENCIONES ====================
+
+    @staticmethod
+    def _hold_key(organization, date, time):
+        return f"appointment_hold:{_org_id(organization)}:{date.isoformat()}:{time.strftime('%H:%M:%S')}"
+
+    @staticmethod
+    def _token_key(token):
+        return f"appointment_hold_token:{token}"
+
+    @staticmethod
+    def _client_keys(organization, client):
+        return [
+            f"appointment_hold_client:{_org_id(organization)}:{client}:{index}"
+            for index in range(settings.APPOINTMENT_MAX_HOLDS_PER_CLIENT)
+        ]
+
+    @staticmethod
+    def _claim_client_slot(organization, client, token, seconds):
+        """
+        Toma uno de los cupos de retención del cliente en la organización
+
+        Un cupo cuyo token ya no está vigente (liberado, reservado o vencido)
+        se recupera.
+
+        Returns:
+            str: llave del cupo, o None si el cliente ya usa todos
+        """
+        keys = SlotBookingService._client_keys(organization, client)
+        owners = cache.get_many(keys)
+        for key in keys:
+            owner = owners.get(key)
+            if owner is not None and cache.get(SlotBookingService._token_key(owner)) is None:
+                cache.delete(key)
+                owner = None
+            if owner is None and cache.add(key, token, seconds):
+                return key
+        return None
+
+    @staticmethod
+    def hold(organization, date, time, token=None, client=None):
+        """
+        Retiene un horario durante APPOINTMENT_SLOT_HOLD_SECONDS
+
+        Un token retiene un solo horario: al retener otro se libera el
+        anterior. Retener de nuevo el mismo horario renueva el vencimiento.
+        Un `token` que el servidor no emitió (o ya venció) se ignora y se
+        emite uno nuevo.
+
+        Args:
+            client: Identificador del visitante (ej: IP) para limitar sus
+                    retenciones activas; None no limita
+
+        Returns:
+            str: token de la retención, o None si otro visitante lo retiene
+
+        Raises:
+            HoldLimitReached: si `client` ya tiene el máximo de retenciones
+        """
+        date, time = _as_date(date), _as_time(time)
+        seconds = settings.APPOINTMENT_SLOT_HOLD_SECONDS
+        key = SlotBookingService._hold_key(organization, date, time)
+
+        current = cache.get(SlotBookingService._token_key(token)) if token else None
+        if current is None:
+            token = secrets.token_urlsafe(HOLD_TOKEN_LENGTH)
+            client_slot = None
+            if client is not None:
+                client_slot = SlotBookingService._claim_client_slot(organization, client, token, seconds)
+                if client_slot is None:
+                    raise HoldLimitReached()
+        else:
+            client_slot = current['client_slot']
+
+        if not cache.add(key, token, seconds):
+            if cache.get(key) != token:
+                if current is None and client_slot:
+                    cache.delete(client_slot)
+                return None
+            cache.set(key, token, seconds)
+
+        if current and current['hold'] != key and cache.get(current['hold']) == token:
+            cache.delete(current['hold'])
+        if client_slot:
+            cache.set(client_slot, token, seconds)
+        cache.set(SlotBookingService._token_key(token), {'hold': key, 'client_slot': client_slot}, seconds)
+        return token
+
+    @staticmethod
+    def release(organization, date, time, token):
+        """Libera la retención si pertenece a `token`"""
+        key = SlotBookingService._hold_key(organization, _as_date(date), _as_time(time))
+        if token and cache.get(key) == token:
+            current = cache.get(SlotBookingService._token_key(token)) or {}
+            keys = [key, SlotBookingService._token_key(token)]
+            if current.get('client_slot') and cache.get(current['client_slot']) == token:
+                keys.append(current['client_slot'])
+            cache.delete_many(keys)
+
+    @staticmethod
+    def held_times(organization, date, times, exclude_token=None):
+        """Horas de `times` retenidas por otros visitantes (una sola lectura al cache)"""
+        keys = {SlotBookingService._hold_key(organization, date, time): time for time in times}
+        holds = cache.get_many(list(keys))
+        return {keys[key] for key, token in holds.items() if token != exclude_token}
+
+    # ==================== DISPONIBILIDAD ====================
+
+    @staticmethod
+    def booked_times(organization, date):
+        """Horas con cita activa en una fecha (cacheadas por organización)"""
+        return availability_cache.get_or_set(
+            f'booked:{date.isoformat()}',
+            lambda: frozenset(
+                Appointment.objects.unscoped().filter(organization=organization, appointment_date=date)
+                .exclude(status='cancelled')
+                .values_list('appointment_time', flat=True)
+            ),
+            organization=organization,
+        )
+
+    @staticmethod
+    def invalidate_availability(organization):
+        availability_cache.invalidate(organization=organization)
+
+    @staticmethod
+    def alternatives(organization, date, time, doctor_id=None, limit=ALTERNATIVES_LIMIT):
+        """
+        Horarios libres más cercanos al pedido: primero el mismo día
+        (ordenados por cercanía a la hora), luego los días siguientes
+
+        Returns:
+            list: [{'date': 'YYYY-MM-DD', 'time': 'HH:MM:SS'}]
+        """
+        from .utils import get_available_slots_for_date
+
+        requested = datetime.combine(date, time)
+        suggestions = []
+        for offset in range(ALTERNATIVES_DAYS_AHEAD + 1):
+            day = date + timedelta(days=offset)
+            slots = [
+                slot['time'] for slot in
+                get_available_slots_for_date(day, organization, doctor_id, only_available=True)
+                if not (offset == 0 and slot['time'] == time)
+            ]
+            if offset == 0:
+                slots.sort(key=lambda slot: abs(datetime.combine(day, slot) - requested))
+            for slot in slots[:limit - len(suggestions)]:
+                suggestions.append({'date': day.isoformat(), 'time': slot.strftime('%H:%M:%S')})
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    # ==================== RESERVA ====================
+
+    @staticmethod
+    def book(organization, date, time, hold_token=None, doctor_id=None, **fields):
+        """
+        Crea la cita reclamando el horario de forma atómica
+
+        Args:
+            organization: Organización de la cita
+            date, time: Horario (date/time o 'YYYY-MM-DD' / 'HH:MM[:SS]')
+            hold_token: Token de la retención del visitante (opcional)
+            doctor_id: Doctor elegido (para sugerir alternativas de su agenda)
+            **fields: Demás campos de Appointment
+
+        Raises:
+            SlotTaken: con alternativas si el horario está ocupado o retenido
+        """
+        date, time = _as_date(date), _as_time(time)
+
+        holder = cache.get(SlotBookingService._hold_key(organization, date, time))
+        if holder is not None and holder != hold_token:
+            raise SlotTaken(
+                'Otro paciente está reservando este horario',
+                SlotBookingService.alternatives(organization, date, time, doctor_id),
+            )
+
+        try:
+            with transaction.atomic():
+                appointment = Appointment.objects.create(
+                    organization=organization, appointment_date=date, appointment_time=time, **fields
+                )
+        except IntegrityError:
+            taken = Appointment.objects.unscoped().filter(
+                organization=organization, appointment_date=date, appointment_time=time
+            ).exclude(status='cancelled').exists()
+            if not taken:
+                raise
+            logger.info(f"Horario {date} {time} de la organización {_org_id(organization)} ya tomado")
+            raise SlotTaken(
+                'Este horario acaba de ser tomado',
+                SlotBookingService.alternatives(organization, date, time, doctor_id),
+            )
+
+        SlotBookingService.release(organization, date, time, hold_token)
+        return appointment
+
+    @staticmethod
+    def taken_response_data(error):
+        """Cuerpo de la respuesta 409 de las APIs de agendamiento"""
+        return {
+            'success': False,
+            'code': 'slot_taken',
+            'message': error.message,
+            'alternatives': error.alternatives,
+        }
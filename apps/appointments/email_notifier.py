@@ -14,10 +14,17 @@ logger = logging.getLogger(__name__)
 class EmailNotifier:
     """Clase para enviar notificaciones por Email"""
     
-    def __init__(self):
-        """Inicializa el notificador de email"""
+    def __init__(self, connection=None):
+        """
+        Inicializa el notificador de email
+
+        Args:
+            connection: Conexión SMTP abierta para reutilizar en varios envíos
+                        (None = una conexión por mensaje)
+        """
         self.enabled = True
         self.from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@oceanooptico.com')
+        self.connection = connection
     
     def send_appointment_confirmation(self, appointment):
         """
@@ -212,7 +219,8 @@ Llámanos al: {org_phone}
                 subject=subject,
                 body=text_content,
                 from_email=self.from_email,
-                to=[to_email]
+                to=[to_email],
+                connection=self.connection
             )
             msg.attach_alternative(html_content, "text/html")
             msg.send()
@@ -317,7 +325,7 @@ Si necesitas cancelar, llámanos:
 </html>
             """
             
-            msg = EmailMultiAlternatives(subject, text_content, self.from_email, [to_email])
+            msg = EmailMultiAlternatives(subject, text_content, self.from_email, [to_email], connection=self.connection)
             msg.attach_alternative(html_content, "text/html")
             msg.send()
             
@@ -415,7 +423,7 @@ Si deseas reagendar, puedes:
 </html>
             """
             
-            msg = EmailMultiAlternatives(subject, text_content, self.from_email, [to_email])
+            msg = EmailMultiAlternatives(subject, text_content, self.from_email, [to_email], connection=self.connection)
             msg.attach_alternative(html_content, "text/html")
             msg.send()
             
@@ -0,0 +1,54 @@
+"""
+Management command para programar los recordatorios de las próximas citas
+Uso: python manage.py send_appointment_reminders [--loop] [--dry-run]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.appointments.reminders import ReminderService
+
+
+class Command(BaseCommand):
+    help = 'Reclama los recordatorios vencidos de las próximas citas y los encola en el outbox de notificaciones'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Ejecutar continuamente en lugar de un solo tick'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Segundos entre ticks con --loop (default: 60)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo mostrar cuántos recordatorios están vencidos, sin reclamarlos'
+        )
+    
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            scanned, due, _ = ReminderService.find_due()
+            for organization_id, appointment_ids in due.items():
+                self.stdout.write(f"Organización {organization_id}: {len(appointment_ids)} recordatorios vencidos")
+            self.stdout.write(f"Citas revisadas: {scanned}")
+            return
+        
+        while True:
+            result = ReminderService.run()
+            self.stdout.write(
+                f"Revisadas: {result['scanned']} | Vencidas: {result['due']} | "
+                f"Reclamadas: {result['claimed']} | Notificaciones encoladas: {result['queued']}"
+            )
+            
+            if not options['loop']:
+                break
+            
+            close_old_connections()
+            time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS('✓ Programación de recordatorios completada'))
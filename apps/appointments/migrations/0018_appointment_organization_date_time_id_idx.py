@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0017_auto_20260108_1306'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['organization', 'appointment_date', 'appointment_time', 'id'], name='appointment_organiz_9f675d_idx'),
+        ),
+    ]
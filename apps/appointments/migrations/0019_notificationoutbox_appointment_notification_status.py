@@ -0,0 +1,51 @@
+# Generated by Django 4.2.16 on 2026-10-19 19:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('appointments', '0018_appointment_organization_date_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='notification_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pendiente'), ('sent', 'Enviada'), ('failed', 'Fallida')], max_length=20, verbose_name='Estado de notificación'),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última notificación enviada'),
+        ),
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('confirmation', 'Confirmación'), ('reminder', 'Recordatorio'), ('cancellation', 'Cancelación'), ('rescheduled', 'Reagendamiento')], max_length=20, verbose_name='Tipo')),
+                ('channel', models.CharField(choices=[('whatsapp', 'WhatsApp'), ('email', 'Email')], max_length=20, verbose_name='Canal')),
+                ('recipient', models.CharField(max_length=254, verbose_name='Destinatario')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Datos adicionales')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviada'), ('failed', 'Fallida')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo intento')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Bloqueada hasta')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviada en')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_notifications', to='appointments.appointment', verbose_name='Cita')),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='organizations.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Notificación en Cola',
+                'verbose_name_plural': 'Notificaciones en Cola',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='appointment_status_d97f19_idx'), models.Index(fields=['organization', 'channel', 'status', 'next_attempt_at'], name='appointment_organiz_035ca1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0019_notificationoutbox_appointment_notification_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminder_claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Recordatorio programado'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('reminder_claimed_at__isnull', True), ('status__in', ['pending', 'confirmed'])), fields=['appointment_date', 'appointment_time'], name='appointment_reminder_due_idx'),
+        ),
+    ]
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.db.models import Count
 from datetime import datetime, timedelta
 from apps.organizations.base_models import TenantModel
-from apps.appointments.models_notifications import NotificationSettings, AppointmentNotification
+from apps.appointments.models_notifications import NotificationSettings, AppointmentNotification, NotificationOutbox
 
 
 class AppointmentConfiguration(TenantModel):
@@ -293,6 +293,32 @@ class Appointment(TenantModel):
         verbose_name="Teléfono del acompañante"
     )
 
+    # Resultado de la última notificación al paciente (apps.appointments.outbox)
+    NOTIFICATION_STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviada'),
+        ('failed', 'Fallida'),
+    ]
+    notification_status = models.CharField(
+        max_length=20,
+        choices=NOTIFICATION_STATUS_CHOICES,
+        blank=True,
+        verbose_name="Estado de notificación"
+    )
+    notified_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Última notificación enviada"
+    )
+
+    # Recordatorio reclamado por el programador (apps.appointments.reminders);
+    # se limpia al reagendar para recordar la nueva fecha
+    reminder_claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Recordatorio programado"
+    )
+
     class Meta:
         verbose_name = "Cita"
         verbose_name_plural = "Citas"
@@ -300,6 +326,12 @@ class Appointment(TenantModel):
         indexes = [
             models.Index(fields=['organization', 'appointment_date', 'status']),
             models.Index(fields=['organization', 'phone_number']),
+            models.Index(fields=['organization', 'appointment_date', 'appointment_time', 'id']),
+            models.Index(
+                fields=['appointment_date', 'appointment_time'],
+                condition=models.Q(reminder_claimed_at__isnull=True, status__in=['pending', 'confirmed']),
+                name='appointment_reminder_due_idx'
+            ),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from apps.organizations.base_models import TenantModel
 
 
@@ -144,3 +145,68 @@ class AppointmentNotification(TenantModel):
     
     def __str__(self):
         return f"Notificación Push - {self.appointment}"
+
+
+class NotificationOutbox(TenantModel):
+    """
+    Outbox de notificaciones al paciente
+
+    Se escribe en la misma transacción que agenda, cancela o reagenda la cita
+    y el job `deliver_notifications` (apps/appointments/outbox.py) la entrega
+    en lotes por organización y canal, con reintentos.
+    """
+
+    KIND_CHOICES = [
+        ('confirmation', 'Confirmación'),
+        ('reminder', 'Recordatorio'),
+        ('cancellation', 'Cancelación'),
+        ('rescheduled', 'Reagendamiento'),
+    ]
+
+    CHANNEL_CHOICES = [
+        ('whatsapp', 'WhatsApp'),
+        ('email', 'Email'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviada'),
+        ('failed', 'Fallida'),
+    ]
+
+    appointment = models.ForeignKey(
+        'appointments.Appointment',
+        on_delete=models.CASCADE,
+        related_name='outbox_notifications',
+        verbose_name="Cita"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Tipo")
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, verbose_name="Canal")
+    recipient = models.CharField(max_length=254, verbose_name="Destinatario")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Datos adicionales")
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name="Estado"
+    )
+    attempts = models.IntegerField(default=0, verbose_name="Intentos")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Próximo intento")
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name="Bloqueada hasta")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Enviada en")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+
+    class Meta:
+        verbose_name = "Notificación en Cola"
+        verbose_name_plural = "Notificaciones en Cola"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['organization', 'channel', 'status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.channel}) - Cita #{self.appointment_id} - {self.status}"
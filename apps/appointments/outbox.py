@@ -0,0 +1,359 @@
+"""
+Outbox de notificaciones de citas
+
+Agendar, cancelar o reagendar una cita no envía nada dentro de la petición:
+los signals de apps/appointments/signals_setup.py escriben una fila de
+`NotificationOutbox` por canal en la misma transacción de la cita (si la
+transacción hace rollback no queda nada por enviar) y, al confirmarse,
+encolan `deliver_notifications` (apps/appointments/tasks.py).
+
+El job entrega por organización y canal, en lotes:
+
+- Email: una sola conexión SMTP abierta para todo el lote.
+- WhatsApp: la sesión del bot se verifica (y recupera) una vez por lote y
+  los mensajes reutilizan la conexión HTTP al servidor Baileys.
+
+WhatsApp además limita cada organización a WHATSAPP_MESSAGES_PER_MINUTE:
+cada entrega envía un solo mensaje (dentro de la capacidad que quede en el
+último minuto) y el job se reprograma para el siguiente, así el espaciado
+no bloquea al worker.
+
+Los fallos se reprograman con backoff exponencial hasta
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS y `flush_notification_outbox` (cada minuto)
+encola las entregas vencidas. El resultado queda en la fila del outbox y en
+`Appointment.notification_status` / `notified_at`.
+
+Uso:
+    from apps.appointments.outbox import NotificationOutboxService
+
+    NotificationOutboxService.enqueue(appointment, 'cancellation')
+    NotificationOutboxService.enqueue_many(appointments, 'reminder', notification_settings)
+    NotificationOutboxService.deliver(organization_id, 'email')  # desde el job
+"""
+import logging
+import random
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, NotificationOutbox, NotificationSettings
+
+logger = logging.getLogger(__name__)
+
+# Método del notificador (EmailNotifier / WhatsAppBaileysNotifier) por tipo
+KIND_METHODS = {
+    'confirmation': 'send_appointment_confirmation',
+    'reminder': 'send_appointment_reminder',
+    'cancellation': 'send_appointment_cancelled',
+    'rescheduled': 'send_appointment_rescheduled',
+}
+
+# EmailNotifier no tiene mensaje de reagendamiento
+EMAIL_KINDS = ('confirmation', 'reminder', 'cancellation')
+
+
+class DeliveryError(Exception):
+    """El canal no está disponible para entregar el lote"""
+
+
+class NotificationOutboxService:
+    """Servicio de encolado y entrega de notificaciones al paciente"""
+
+    LEASE_SECONDS = 300
+
+    @staticmethod
+    def backoff_seconds(attempts):
+        """Backoff exponencial con jitter: 60s, 120s, 240s, ... (máx. 1 hora)"""
+        base = settings.NOTIFICATION_OUTBOX_RETRY_BASE_SECONDS
+        delay = min(base * (2 ** max(0, attempts - 1)), 3600)
+        return delay + random.uniform(0, delay * 0.1)
+
+    # ==================== ENCOLADO ====================
+
+    @staticmethod
+    def channels_for(appointment, kind, notification_settings):
+        """
+        Canales por los que se notifica a la cita
+
+        La confirmación va solo por el método activo de la organización; la
+        cancelación, el reagendamiento y el recordatorio por todos los
+        canales habilitados.
+        """
+        if kind == 'confirmation':
+            if not notification_settings.send_confirmation:
+                return []
+            channels = {
+                'local_whatsapp': ['whatsapp'],
+                'email': ['email'],
+            }.get(notification_settings.get_active_method(), [])
+        else:
+            if kind == 'cancellation' and not notification_settings.send_cancellation:
+                return []
+            if kind == 'reminder' and not notification_settings.send_reminder:
+                return []
+            channels = []
+            if notification_settings.local_whatsapp_enabled:
+                channels.append('whatsapp')
+            if notification_settings.email_enabled:
+                channels.append('email')
+
+        return [
+            channel for channel in channels
+            if (channel == 'whatsapp' and appointment.phone_number)
+            or (channel == 'email' and appointment.email and kind in EMAIL_KINDS)
+        ]
+
+    @staticmethod
+    def enqueue(appointment, kind, payload=None):
+        """
+        Escribe en el outbox las notificaciones de `kind` de la cita y
+        programa su entrega al confirmarse la transacción
+
+        Args:
+            appointment: Cita a notificar
+            kind: 'confirmation', 'reminder', 'cancellation' o 'rescheduled'
+            payload: Datos adicionales del mensaje (ej: fecha y hora anteriores)
+
+        Returns:
+            list: Filas creadas (vacía si la organización no notifica ese tipo)
+        """
+        if appointment.organization_id is None:
+            return []
+
+        notification_settings = NotificationSettings.get_settings(appointment.organization)
+        return NotificationOutboxService.enqueue_many([appointment], kind, notification_settings, payload)
+
+    @staticmethod
+    def enqueue_many(appointments, kind, notification_settings, payload=None):
+        """
+        Escribe en el outbox las notificaciones de varias citas de una misma
+        organización (un solo INSERT) y programa su entrega
+
+        Returns:
+            list: Filas creadas
+        """
+        from .tasks import schedule_delivery
+
+        rows = [
+            NotificationOutbox(
+                organization_id=appointment.organization_id,
+                appointment=appointment,
+                kind=kind,
+                channel=channel,
+                recipient=appointment.email if channel == 'email' else appointment.phone_number,
+                payload=payload or {},
+            )
+            for appointment in appointments
+            for channel in NotificationOutboxService.channels_for(appointment, kind, notification_settings)
+        ]
+        if not rows:
+            return []
+
+        NotificationOutbox.objects.bulk_create(rows)
+        Appointment.objects.filter(pk__in={row.appointment_id for row in rows}).update(notification_status='pending')
+
+        for channel in sorted({row.channel for row in rows}):
+            schedule_delivery(rows[0].organization_id, channel)
+        return rows
+
+    # ==================== RECLAMACIÓN ====================
+
+    @staticmethod
+    def _due(queryset, now):
+        return queryset.filter(status='pending', next_attempt_at__lte=now).filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+        )
+
+    @staticmethod
+    def due_groups():
+        """
+        Pares (organización, canal) con notificaciones listas para enviarse
+
+        Returns:
+            list: [(organization_id, channel)]
+        """
+        queryset = NotificationOutboxService._due(NotificationOutbox.objects.all(), timezone.now())
+        return list(
+            queryset.order_by('organization_id', 'channel')
+            .values_list('organization_id', 'channel')
+            .distinct()
+        )
+
+    @staticmethod
+    def claim_batch(organization_id, channel, limit):
+        """
+        Reclama notificaciones pendientes de una organización y canal
+        marcándolas con un lease
+
+        Con PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED para que varios
+        workers no tomen las mismas filas. El UPDATE vuelve a exigir que la
+        notificación siga vencida y sin lease vigente (en SQLite no hay SKIP
+        LOCKED), y solo se retornan las filas que quedaron con el lease de
+        este worker.
+
+        Returns:
+            list: Notificaciones reclamadas (con la cita cargada)
+        """
+        now = timezone.now()
+        locked_until = now + timedelta(seconds=NotificationOutboxService.LEASE_SECONDS)
+
+        with transaction.atomic():
+            queryset = NotificationOutboxService._due(
+                NotificationOutbox.objects.filter(organization_id=organization_id, channel=channel), now
+            ).order_by('next_attempt_at')
+
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+
+            ids = list(queryset.values_list('id', flat=True)[:limit])
+            if not ids:
+                return []
+
+            claimed = NotificationOutboxService._due(
+                NotificationOutbox.objects.filter(id__in=ids), now
+            ).update(locked_until=locked_until)
+            if not claimed:
+                return []
+
+        return list(
+            NotificationOutbox.objects.filter(id__in=ids, locked_until=locked_until)
+            .select_related('appointment__organization', 'appointment__doctor')
+            .order_by('next_attempt_at')
+        )
+
+    @staticmethod
+    def capacity(organization_id, channel, limit):
+        """
+        Notificaciones que se pueden enviar ahora por el canal
+
+        WhatsApp: lo que quede de WHATSAPP_MESSAGES_PER_MINUTE en el último
+        minuto para la organización. Email: `limit`.
+        """
+        if channel != 'whatsapp':
+            return limit
+        recent = NotificationOutbox.objects.filter(
+            organization_id=organization_id,
+            channel='whatsapp',
+            status='sent',
+            sent_at__gte=timezone.now() - timedelta(minutes=1),
+        ).count()
+        return max(0, min(limit, settings.WHATSAPP_MESSAGES_PER_MINUTE - recent))
+
+    # ==================== ENTREGA ====================
+
+    @staticmethod
+    @contextmanager
+    def _notifier(organization, channel):
+        """Notificador del canal con la conexión abierta para todo el lote"""
+        if channel == 'email':
+            from .email_notifier import EmailNotifier
+
+            email_connection = get_connection(fail_silently=False)
+            try:
+                email_connection.open()
+            except Exception as e:
+                raise DeliveryError(f"No se pudo abrir la conexión SMTP: {e}")
+            try:
+                yield EmailNotifier(connection=email_connection)
+            finally:
+                email_connection.close()
+        else:
+            from .whatsapp_baileys_client import whatsapp_baileys_client
+            from .whatsapp_baileys_notifier import WhatsAppBaileysNotifier
+
+            is_connected, _ = whatsapp_baileys_client.verify_and_recover_connection(organization.id)
+            if not is_connected:
+                raise DeliveryError("WhatsApp no conectado para la organización")
+            yield WhatsAppBaileysNotifier(organization, auto_recover=False)
+
+    @staticmethod
+    def _send(notifier, item):
+        """
+        Returns:
+            tuple: (success, error)
+        """
+        args = [item.appointment]
+        if item.kind == 'rescheduled':
+            args += [date.fromisoformat(item.payload['old_date']), time.fromisoformat(item.payload['old_time'])]
+
+        try:
+            if getattr(notifier, KIND_METHODS[item.kind])(*args):
+                return True, ''
+            return False, 'El envío no fue aceptado'
+        except Exception as e:
+            logger.error(f"Error enviando notificación #{item.id} de cita #{item.appointment_id}: {e}", exc_info=True)
+            return False, str(e)[:500]
+
+    @staticmethod
+    def _record(item, success, error):
+        """Registra el resultado del envío en la notificación y en la cita"""
+        now = timezone.now()
+        attempts = item.attempts + 1
+
+        if success:
+            NotificationOutbox.objects.filter(pk=item.pk).update(
+                status='sent', attempts=attempts, last_error='', sent_at=now, locked_until=None
+            )
+            Appointment.objects.filter(pk=item.appointment_id).update(notification_status='sent', notified_at=now)
+            return
+
+        exhausted = attempts >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS
+        NotificationOutbox.objects.filter(pk=item.pk).update(
+            status='failed' if exhausted else 'pending',
+            attempts=attempts,
+            last_error=error,
+            next_attempt_at=now + timedelta(seconds=NotificationOutboxService.backoff_seconds(attempts)),
+            locked_until=None,
+        )
+        if exhausted:
+            logger.error(
+                f"Notificación #{item.id} ({item.kind}, {item.channel}) de cita #{item.appointment_id} "
+                f"fallida tras {attempts} intentos: {error}"
+            )
+            Appointment.objects.filter(pk=item.appointment_id).update(notification_status='failed')
+
+    @staticmethod
+    def deliver(organization_id, channel, limit=None):
+        """
+        Reclama y entrega un lote de notificaciones de una organización por un canal
+
+        Args:
+            organization_id: Organización
+            channel: 'whatsapp' o 'email'
+            limit: Tamaño del lote (por defecto NOTIFICATION_OUTBOX_BATCH_SIZE;
+                WhatsApp siempre toma un mensaje por entrega)
+
+        Returns:
+            dict: {'claimed', 'sent', 'failed'}
+        """
+        limit = NotificationOutboxService.capacity(
+            organization_id, channel, limit or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+        )
+        if channel == 'whatsapp':
+            limit = min(limit, 1)
+        items = NotificationOutboxService.claim_batch(organization_id, channel, limit) if limit else []
+        result = {'claimed': len(items), 'sent': 0, 'failed': 0}
+        if not items:
+            return result
+
+        recorded = 0
+        try:
+            with NotificationOutboxService._notifier(items[0].appointment.organization, channel) as notifier:
+                for item in items:
+                    success, error = NotificationOutboxService._send(notifier, item)
+                    # Registrar cada envío de inmediato: si el job se cae a mitad
+                    # del lote, lo ya entregado no se vuelve a enviar
+                    NotificationOutboxService._record(item, success, error)
+                    recorded += 1
+                    result['sent' if success else 'failed'] += 1
+        except DeliveryError as e:
+            logger.warning(f"Lote de {channel} de la organización {organization_id} no enviado: {e}")
+            for item in items[recorded:]:
+                NotificationOutboxService._record(item, False, str(e))
+                result['failed'] += 1
+        return result
@@ -0,0 +1,175 @@
+"""
+Programador de recordatorios de citas
+
+Cada tick (job `schedule_appointment_reminders` cada 5 minutos, o
+`python manage.py send_appointment_reminders`) hace una sola consulta por
+rango de fechas sobre las citas activas sin recordatorio, desde hoy hasta la
+mayor anticipación configurada. El índice parcial
+`appointment_reminder_due_idx` solo contiene citas pendientes o confirmadas
+que aún no tienen recordatorio, así que su tamaño no crece con el historial.
+
+El recordatorio de cada cita vence `reminder_hours_before` horas antes de
+ella según la NotificationSettings de su organización (las que tienen
+`send_reminder` deshabilitado se omiten). Las citas agendadas cuando ya
+corría ese plazo no se recuerdan: el paciente acaba de recibir la
+confirmación. Las vencidas se reclaman por
+organización con un UPDATE condicionado a `reminder_claimed_at IS NULL`:
+si varios programadores corren a la vez cada cita la gana uno solo y nunca
+se recuerda dos veces. Reagendar una cita limpia la marca.
+
+Los recordatorios reclamados se escriben en el outbox de notificaciones
+(apps.appointments.outbox) en la misma transacción del reclamo; el outbox
+los entrega en lotes por organización y canal, respetando
+WHATSAPP_MESSAGES_PER_MINUTE.
+
+Uso:
+    from apps.appointments.reminders import ReminderService
+
+    ReminderService.run()  # {'scanned', 'due', 'claimed', 'queued'}
+"""
+import logging
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Appointment, NotificationSettings
+from .outbox import NotificationOutboxService
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+# Filas leídas por viaje a la base de datos al recorrer las próximas citas
+SCAN_CHUNK_SIZE = 2000
+
+# Citas por UPDATE de reclamo (e INSERT en el outbox)
+CLAIM_CHUNK_SIZE = 500
+
+
+class ReminderService:
+    """Servicio de programación de recordatorios"""
+
+    @staticmethod
+    def max_lead_hours():
+        """Mayor anticipación de recordatorio entre las organizaciones que los envían"""
+        default = NotificationSettings._meta.get_field('reminder_hours_before').default
+        configured = NotificationSettings.objects.filter(send_reminder=True).aggregate(
+            hours=Max('reminder_hours_before')
+        )['hours']
+        return max(configured or 0, default)
+
+    @staticmethod
+    def due_at(appointment_date, appointment_time, hours_before):
+        """
+        Returns:
+            tuple: (inicio de la cita, momento del recordatorio)
+        """
+        starts = timezone.make_aware(datetime.combine(appointment_date, appointment_time))
+        return starts, starts - timedelta(hours=hours_before)
+
+    @staticmethod
+    def _settings_for(cache, organization_id):
+        """NotificationSettings de la organización (valores por defecto si no tiene)"""
+        if organization_id not in cache:
+            cache[organization_id] = (
+                NotificationSettings.objects.filter(organization_id=organization_id).first()
+                or NotificationSettings(organization_id=organization_id)
+            )
+        return cache[organization_id]
+
+    @staticmethod
+    def find_due(now=None):
+        """
+        Citas cuyo recordatorio ya venció, agrupadas por organización
+
+        Returns:
+            tuple: (citas revisadas, {organization_id: [appointment_id]},
+                    {organization_id: NotificationSettings})
+        """
+        now = now or timezone.now()
+        horizon = now + timedelta(hours=ReminderService.max_lead_hours())
+
+        upcoming = Appointment.objects.filter(
+            appointment_date__gte=timezone.localdate(now),
+            appointment_date__lte=timezone.localdate(horizon),
+            status__in=ACTIVE_STATUSES,
+            reminder_claimed_at__isnull=True,
+        ).order_by().values_list('id', 'organization_id', 'appointment_date', 'appointment_time', 'created_at')
+
+        scanned = 0
+        due = {}
+        settings_by_organization = {}
+        for pk, organization_id, appointment_date, appointment_time, created_at in upcoming.iterator(
+            chunk_size=SCAN_CHUNK_SIZE
+        ):
+            scanned += 1
+            if organization_id is None:
+                continue
+            notification_settings = ReminderService._settings_for(settings_by_organization, organization_id)
+            if not notification_settings.send_reminder:
+                continue
+            starts, remind_at = ReminderService.due_at(
+                appointment_date, appointment_time, notification_settings.reminder_hours_before
+            )
+            # Agendada dentro del plazo del recordatorio: ya tiene la confirmación
+            if created_at > remind_at:
+                continue
+            if remind_at <= now < starts:
+                due.setdefault(organization_id, []).append(pk)
+
+        return scanned, due, settings_by_organization
+
+    @staticmethod
+    def claim(appointment_ids):
+        """
+        Reclama el recordatorio de las citas dadas
+
+        Solo se actualizan las citas aún sin reclamar; la marca de tiempo de
+        este UPDATE identifica las que ganó este programador.
+
+        Returns:
+            list: Citas reclamadas (con organización y doctor)
+        """
+        claimed_at = timezone.now()
+        updated = Appointment.objects.filter(
+            pk__in=appointment_ids,
+            status__in=ACTIVE_STATUSES,
+            reminder_claimed_at__isnull=True,
+        ).update(reminder_claimed_at=claimed_at)
+        if not updated:
+            return []
+        return list(
+            Appointment.objects.filter(pk__in=appointment_ids, reminder_claimed_at=claimed_at)
+            .select_related('organization', 'doctor')
+        )
+
+    @staticmethod
+    def run(now=None):
+        """
+        Un tick del programador: busca, reclama y encola los recordatorios vencidos
+
+        Returns:
+            dict: {'scanned', 'due', 'claimed', 'queued'}
+        """
+        scanned, due, settings_by_organization = ReminderService.find_due(now)
+        result = {'scanned': scanned, 'due': sum(len(ids) for ids in due.values()), 'claimed': 0, 'queued': 0}
+
+        for organization_id, appointment_ids in due.items():
+            for start in range(0, len(appointment_ids), CLAIM_CHUNK_SIZE):
+                try:
+                    with transaction.atomic():
+                        appointments = ReminderService.claim(appointment_ids[start:start + CLAIM_CHUNK_SIZE])
+                        rows = NotificationOutboxService.enqueue_many(
+                            appointments, 'reminder', settings_by_organization[organization_id]
+                        )
+                except Exception as e:
+                    logger.error(
+                        f"Error programando recordatorios de la organización {organization_id}: {e}", exc_info=True
+                    )
+                    continue
+                result['claimed'] += len(appointments)
+                result['queued'] += len(rows)
+
+        return result
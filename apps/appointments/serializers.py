@@ -134,17 +134,8 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         if blocked_query.exists():
             raise serializers.ValidationError("La fecha seleccionada no está disponible.")
         
-        # Verificar que el horario no esté ocupado (filtrar por organización)
-        appointment_query = Appointment.objects.filter(
-            appointment_date=appointment_date,
-            appointment_time=appointment_time
-        ).exclude(status='cancelled')
-        
-        if organization:
-            appointment_query = appointment_query.filter(organization=organization)
-        
-        if appointment_query.exists():
-            raise serializers.ValidationError("Este horario ya está ocupado.")
+        # La ocupación del horario no se verifica aquí: create() lo reclama de
+        # forma atómica (SlotBookingService) y responde SlotTaken si ya fue tomado
         
         # Verificar horarios de trabajo (priorizar horarios específicos)
         from .models import SpecificDateSchedule
@@ -240,8 +231,16 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         except Exception as e:
             logger.warning(f"Error buscando paciente: {e}")
         
-        # Crear la cita
-        appointment = super().create(validated_data)
+        # Crear la cita reclamando el horario (lanza SlotTaken si ya fue tomado)
+        from .booking import SlotBookingService
+        appointment = SlotBookingService.book(
+            validated_data.pop('organization', None),
+            validated_data.pop('appointment_date'),
+            validated_data.pop('appointment_time'),
+            hold_token=self.context.get('hold_token'),
+            doctor_id=doctor_id,
+            **validated_data
+        )
         
         # Las notificaciones se manejan en la vista para no hacer fallar el create
         return appointment
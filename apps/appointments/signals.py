@@ -1,4 +1,5 @@
 from channels.layers import get_channel_layer
+from django.db import transaction
 from asgiref.sync import async_to_sync
 import logging
 
@@ -8,7 +9,8 @@ logger = logging.getLogger(__name__)
 def notify_new_appointment(appointment):
     """
     Envía notificación de nueva cita a todos los clientes conectados
-    Y envía notificación al paciente (WhatsApp/Email según entorno)
+    Y deja en el outbox la confirmación al paciente (WhatsApp/Email según
+    la configuración de la organización); la entrega un job fuera de la petición
     """
     # Notificación WebSocket
     channel_layer = get_channel_layer()
@@ -31,30 +33,23 @@ def notify_new_appointment(appointment):
         }
     )
     
-    # Envío de notificación automático según configuración de la organización
+    queue_patient_notification(appointment, 'confirmation')
+
+
+def queue_patient_notification(appointment, kind, payload=None):
+    """
+    Escribe la notificación al paciente en el outbox (apps.appointments.outbox)
+
+    Un error al encolar se registra sin afectar la operación sobre la cita.
+    """
+    from apps.appointments.outbox import NotificationOutboxService
+
     try:
-        from apps.appointments.models_notifications import NotificationSettings
-        from apps.appointments.notifications import get_notifier
-        
-        # Obtener configuración de notificaciones
-        notification_settings = NotificationSettings.get_settings(appointment.organization)
-        
-        # Verificar si las notificaciones de confirmación están habilitadas
-        if notification_settings and notification_settings.send_confirmation:
-            notifier = get_notifier(appointment.organization)
-            
-            # Enviar notificación según el método activo
-            active_method = notification_settings.get_active_method()
-            if active_method in ['whatsapp', 'twilio', 'local_whatsapp']:
-                notifier.send_appointment_confirmation(appointment)
-            elif active_method == 'email' and appointment.email:
-                notifier.send_appointment_confirmation(appointment)
-            
-            logger.info(f"Notificación de confirmación enviada para cita #{appointment.id} vía {active_method}")
-        else:
-            logger.info(f"Notificaciones de confirmación deshabilitadas para cita #{appointment.id}")
+        with transaction.atomic():
+            rows = NotificationOutboxService.enqueue(appointment, kind, payload)
+        logger.info(f"Notificación '{kind}' de cita #{appointment.id} encolada por {len(rows)} canal(es)")
     except Exception as e:
-        logger.error(f"Error al enviar notificación: {e}")
+        logger.error(f"Error al encolar notificación '{kind}' de cita #{appointment.id}: {e}", exc_info=True)
 
 
 def notify_appointment_updated(appointment):
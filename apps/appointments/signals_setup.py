@@ -1,11 +1,13 @@
 """
 Configuración de signals para Appointments
 """
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from apps.api.services import WebhookService
+from apps.appointments.booking import SlotBookingService
 from apps.appointments.models import Appointment
-from apps.appointments.signals import notify_new_appointment
-from apps.appointments.notifications import notify_appointment_cancelled, notify_appointment_rescheduled
+from apps.appointments.signals import notify_new_appointment, queue_patient_notification
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,33 +31,66 @@ def appointment_pre_save(sender, instance, **kwargs):
             pass
 
 
+def appointment_webhook_data(appointment):
+    """Datos de la cita que reciben los webhooks"""
+    return {
+        'id': appointment.id,
+        'patient_id': appointment.patient_id,
+        'full_name': appointment.full_name,
+        'phone_number': appointment.phone_number,
+        'appointment_date': str(appointment.appointment_date),
+        'appointment_time': str(appointment.appointment_time),
+        'status': appointment.status,
+    }
+
+
 @receiver(post_save, sender=Appointment)
 def appointment_post_save(sender, instance, created, **kwargs):
     """Signal que se ejecuta después de guardar una cita"""
     if created:
         logger.info(f"🔔 Signal: Nueva cita creada #{instance.id}")
         notify_new_appointment(instance)
+        WebhookService.emit(instance.organization, 'appointment.created', appointment_webhook_data(instance))
     else:
         logger.info(f"📝 Signal: Cita actualizada #{instance.id}")
         
         # Verificar si se canceló
         old_state = _appointment_old_state.get(instance.pk)
+        cancelled = (
+            old_state is not None
+            and old_state['status'] != 'cancelled' and instance.status == 'cancelled'
+        )
+        WebhookService.emit(
+            instance.organization,
+            'appointment.cancelled' if cancelled else 'appointment.updated',
+            appointment_webhook_data(instance)
+        )
         if old_state:
             # Detectar cancelación
-            if old_state['status'] != 'cancelled' and instance.status == 'cancelled':
+            if cancelled:
                 logger.info(f"❌ Signal: Cita cancelada #{instance.id}")
-                notify_appointment_cancelled(instance)
+                queue_patient_notification(instance, 'cancellation')
             
             # Detectar reagendamiento (cambio de fecha u hora)
             elif (old_state['appointment_date'] != instance.appointment_date or 
                   old_state['appointment_time'] != instance.appointment_time):
                 logger.info(f"🔄 Signal: Cita reagendada #{instance.id}")
-                notify_appointment_rescheduled(
-                    instance, 
-                    old_state['appointment_date'], 
-                    old_state['appointment_time']
-                )
+                # Recordar la nueva fecha aunque ya se hubiera recordado la anterior
+                if instance.reminder_claimed_at is not None:
+                    Appointment.objects.filter(pk=instance.pk).update(reminder_claimed_at=None)
+                    instance.reminder_claimed_at = None
+                queue_patient_notification(instance, 'rescheduled', {
+                    'old_date': old_state['appointment_date'].isoformat(),
+                    'old_time': old_state['appointment_time'].isoformat(),
+                })
             
             # Limpiar estado temporal
             del _appointment_old_state[instance.pk]
 
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def refresh_slot_availability(sender, instance, **kwargs):
+    """Invalida las horas ocupadas cacheadas de la organización al confirmarse el cambio"""
+    organization_id = instance.organization_id
+    transaction.on_commit(lambda: SlotBookingService.invalidate_availability(organization_id))
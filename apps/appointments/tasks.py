@@ -0,0 +1,97 @@
+"""
+Jobs en segundo plano de citas: entrega de las notificaciones del outbox
+(apps/appointments/outbox.py) y programación de recordatorios
+(apps/appointments/reminders.py)
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+
+from apps.jobs.registry import Reschedule, job
+
+logger = logging.getLogger(__name__)
+
+# Segundos que un job de entrega sigue tomando lotes (muy por debajo del
+# lease del worker de apps.jobs); lo pendiente lo retoma el siguiente job
+DELIVERY_TIME_BUDGET = 120
+
+
+@job(queue='notifications')
+def deliver_notifications(organization_id, channel):
+    """
+    Entrega las notificaciones pendientes de una organización por un canal,
+    lote tras lote hasta que no queden vencidas o se agote DELIVERY_TIME_BUDGET
+
+    WhatsApp envía un mensaje por ejecución y, si salió alguno, el job se
+    reprograma tras 60 / WHATSAPP_MESSAGES_PER_MINUTE segundos en vez de
+    esperar ocupando el worker.
+    """
+    from apps.appointments.outbox import NotificationOutboxService
+
+    started = time.monotonic()
+    totals = {'organization_id': organization_id, 'channel': channel, 'sent': 0, 'failed': 0}
+    while time.monotonic() - started < DELIVERY_TIME_BUDGET:
+        result = NotificationOutboxService.deliver(organization_id, channel)
+        totals['sent'] += result['sent']
+        totals['failed'] += result['failed']
+        if not result['claimed']:
+            break
+        if channel == 'whatsapp':
+            logger.info(
+                f"Notificaciones de la organización {organization_id} por whatsapp: "
+                f"{totals['sent']} enviadas, {totals['failed']} fallidas"
+            )
+            raise Reschedule(60 / settings.WHATSAPP_MESSAGES_PER_MINUTE)
+
+    logger.info(
+        f"Notificaciones de la organización {organization_id} por {channel}: "
+        f"{totals['sent']} enviadas, {totals['failed']} fallidas"
+    )
+    return totals
+
+
+@job(queue='notifications', every=timedelta(minutes=1))
+def flush_notification_outbox():
+    """
+    Encola la entrega de las notificaciones vencidas: reintentos con backoff
+    y las que quedaron sin job (ej: llegaron mientras otro lote se enviaba)
+    """
+    from apps.appointments.outbox import NotificationOutboxService
+
+    groups = NotificationOutboxService.due_groups()
+    for organization_id, channel in groups:
+        schedule_delivery(organization_id, channel, delay=0)
+    return {'groups': len(groups)}
+
+
+@job(queue='notifications', every=timedelta(minutes=5))
+def schedule_appointment_reminders():
+    """
+    Reclama los recordatorios vencidos de las próximas citas y los deja en el
+    outbox de notificaciones
+    """
+    from apps.appointments.reminders import ReminderService
+
+    result = ReminderService.run()
+    if result['claimed']:
+        logger.info(
+            f"Recordatorios: {result['claimed']} citas reclamadas, {result['queued']} notificaciones encoladas"
+        )
+    return result
+
+
+def schedule_delivery(organization_id, channel, delay=None):
+    """
+    Encola la entrega del outbox de una organización por un canal
+
+    Se espera NOTIFICATION_OUTBOX_BATCH_DELAY segundos para que las
+    notificaciones que lleguen mientras tanto salgan en el mismo lote; la
+    llave única evita más de un job pendiente por organización y canal.
+    """
+    return deliver_notifications.enqueue(
+        args=[organization_id, channel],
+        delay=settings.NOTIFICATION_OUTBOX_BATCH_DELAY if delay is None else delay,
+        unique_key=f"appointment-notifications:{organization_id}:{channel}"
+    )
@@ -1,3 +1,265 @@
-from django.test import TestCase
+"""
+Tests para citas.
+"""
+from datetime import time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.appointments.booking import SlotBookingService, SlotTaken
+from apps.appointments.email_notifier import EmailNotifier
+from apps.appointments.models import Appointment, NotificationOutbox, NotificationSettings, SpecificDateSchedule
+from apps.appointments.outbox import NotificationOutboxService
+from apps.appointments.reminders import ReminderService
+from apps.appointments.utils import get_available_slots_for_date
+from apps.jobs.models import Job
+from apps.organizations.models import Organization
+
+
+class SlotBookingTestCase(TestCase):
+    """Tests para la reserva atómica de horarios."""
+
+    def setUp(self):
+        """Configuración inicial."""
+        cache.clear()
+        self.organization = Organization.objects.create(name='Test Org', slug='test-org')
+        self.date = timezone.localdate() + timedelta(days=1)
+        SpecificDateSchedule.objects.create(
+            organization=self.organization, date=self.date,
+            start_time=time(8, 0), end_time=time(10, 0), slot_duration=30,
+        )
+
+    def _book(self, slot, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SlotBookingService.book(
+                self.organization, self.date, slot,
+                full_name='Paciente', phone_number='3001234567', **kwargs
+            )
+
+    def test_second_booking_of_a_slot_gets_alternatives(self):
+        """Prueba que el segundo paciente recibe SlotTaken con los horarios más cercanos."""
+        self._book('09:00')
+
+        with self.assertRaises(SlotTaken) as taken:
+            self._book(time(9, 0))
+
+        self.assertEqual(
+            [alt['time'] for alt in taken.exception.alternatives], ['08:30:00', '09:30:00', '08:00:00']
+        )
+        self.assertEqual(Appointment.objects.filter(appointment_date=self.date).count(), 1)
+
+    def test_hold_blocks_other_visitors(self):
+        """Prueba que un horario retenido solo lo puede reservar quien lo retuvo."""
+        token = SlotBookingService.hold(self.organization, self.date, '08:00:00')
+        self.assertIsNone(SlotBookingService.hold(self.organization, self.date, '08:00:00'))
+
+        slots = {s['time']: s['available'] for s in get_available_slots_for_date(self.date, self.organization)}
+        self.assertFalse(slots[time(8, 0)])
+        own = get_available_slots_for_date(self.date, self.organization, hold_token=token)
+        self.assertTrue(own[0]['available'])
+
+        with self.assertRaises(SlotTaken):
+            self._book('08:00', hold_token='otro')
+        self._book('08:00', hold_token=token)
+
+        # La reserva libera la retención y actualiza las horas ocupadas cacheadas
+        self.assertEqual(SlotBookingService.held_times(self.organization, self.date, [time(8, 0)]), set())
+        self.assertIn(time(8, 0), SlotBookingService.booked_times(self.organization, self.date))
+
+    def test_new_hold_releases_previous_slot(self):
+        """Prueba que un token retiene un solo horario."""
+        token = SlotBookingService.hold(self.organization, self.date, '08:00:00')
+        self.assertEqual(SlotBookingService.hold(self.organization, self.date, '08:30:00', token=token), token)
+
+        self.assertIsNotNone(SlotBookingService.hold(self.organization, self.date, '08:00:00'))
+
+
+    @override_settings(APPOINTMENT_MAX_HOLDS_PER_CLIENT=2)
+    def test_hold_limit_per_client(self):
+        """Prueba que los tokens los emite el servidor y el límite de retenciones por cliente."""
+        from apps.appointments.booking import HoldLimitReached
+
+        first = SlotBookingService.hold(self.organization, self.date, '08:00:00', token='elegido', client='1.2.3.4')
+        self.assertNotEqual(first, 'elegido')
+        SlotBookingService.hold(self.organization, self.date, '08:30:00', client='1.2.3.4')
+
+        with self.assertRaises(HoldLimitReached):
+            SlotBookingService.hold(self.organization, self.date, '09:00:00', client='1.2.3.4')
+        # Renovar o mover una retención propia no cuenta como una nueva
+        self.assertEqual(
+            SlotBookingService.hold(self.organization, self.date, '09:00:00', token=first, client='1.2.3.4'), first
+        )
+        self.assertIsNotNone(SlotBookingService.hold(self.organization, self.date, '09:30:00', client='5.6.7.8'))
+
+        SlotBookingService.release(self.organization, self.date, '09:00:00', first)
+        self.assertIsNotNone(SlotBookingService.hold(self.organization, self.date, '08:00:00', client='1.2.3.4'))
+
+    def test_booked_times_ignore_request_tenant(self):
+        """Prueba que las horas ocupadas no dependen de la organización de la sesión."""
+        from apps.organizations.base_models import tenant_context
+
+        self._book('08:00')
+        other = Organization.objects.create(name='Otra Org', slug='otra-org')
+
+        with tenant_context(other):
+            self.assertIn(time(8, 0), SlotBookingService.booked_times(self.organization, self.date))
+
+
+class NotificationOutboxTestCase(TestCase):
+    """Tests para el outbox de notificaciones al paciente."""
+
+    def setUp(self):
+        """Configuración inicial (notificaciones por email, el método por defecto)."""
+        cache.clear()
+        self.organization = Organization.objects.create(name='Test Org', slug='test-org')
+        self.date = timezone.localdate() + timedelta(days=1)
+
+    def _book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SlotBookingService.book(
+                self.organization, self.date, '09:00',
+                full_name='Paciente', phone_number='3001234567', email='paciente@example.com'
+            )
+
+    def test_booking_only_writes_outbox(self):
+        """Prueba que agendar no envía nada y que el worker entrega el lote."""
+        appointment = self._book()
+
+        self.assertEqual(len(mail.outbox), 0)
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual((notification.kind, notification.channel, notification.status), ('confirmation', 'email', 'pending'))
+        self.assertTrue(Job.objects.filter(unique_key=f'appointment-notifications:{self.organization.pk}:email').exists())
+
+        result = NotificationOutboxService.deliver(self.organization.pk, 'email')
+
+        self.assertEqual(result, {'claimed': 1, 'sent': 1, 'failed': 0})
+        self.assertEqual(mail.outbox[0].to, ['paciente@example.com'])
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.notification_status, 'sent')
+        self.assertIsNotNone(appointment.notified_at)
+
+    def test_claimed_rows_are_not_claimed_again(self):
+        """Prueba que un segundo worker no reclama notificaciones con lease vigente."""
+        self._book()
+
+        self.assertEqual(len(NotificationOutboxService.claim_batch(self.organization.pk, 'email', 10)), 1)
+        self.assertEqual(NotificationOutboxService.claim_batch(self.organization.pk, 'email', 10), [])
+
+    @override_settings(NOTIFICATION_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_delivery_retries_with_backoff(self):
+        """Prueba el reintento con backoff y el registro del fallo en la cita."""
+        appointment = self._book()
+
+        with mock.patch.object(EmailNotifier, 'send_appointment_confirmation', return_value=False):
+            NotificationOutboxService.deliver(self.organization.pk, 'email')
+            # El reintento aún no está vencido
+            self.assertEqual(NotificationOutboxService.deliver(self.organization.pk, 'email')['claimed'], 0)
+
+            notification = NotificationOutbox.objects.get()
+            self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+            self.assertGreater(notification.next_attempt_at, timezone.now())
+
+            NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+            NotificationOutboxService.deliver(self.organization.pk, 'email')
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'failed')
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.notification_status, 'failed')
+
+
+class ReminderServiceTestCase(TestCase):
+    """Tests para el programador de recordatorios."""
+
+    def setUp(self):
+        """Configuración inicial (recordatorio 24 horas antes, por email)."""
+        self.organization = Organization.objects.create(name='Test Org', slug='test-org')
+        NotificationSettings.objects.create(organization=self.organization, reminder_hours_before=24)
+
+    def _appointment(self, hours_ahead, status='pending', booked_hours_ago=48):
+        starts = timezone.localtime(timezone.now() + timedelta(hours=hours_ahead)).replace(microsecond=0)
+        appointment = Appointment.objects.create(
+            organization=self.organization, appointment_date=starts.date(), appointment_time=starts.time(),
+            full_name='Paciente', phone_number='3001234567', email='paciente@example.com', status=status,
+        )
+        Appointment.objects.filter(pk=appointment.pk).update(
+            created_at=timezone.now() - timedelta(hours=booked_hours_ago)
+        )
+        return appointment
+
+    def _run(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ReminderService.run()
+
+    def test_due_reminders_are_claimed_once(self):
+        """Prueba que solo se recuerdan las citas vencidas y una sola vez."""
+        due = self._appointment(2)
+        self._appointment(30)
+        self._appointment(3, status='cancelled')
+
+        result = self._run()
+
+        self.assertEqual((result['due'], result['claimed'], result['queued']), (1, 1, 1))
+        self.assertEqual(self._run()['claimed'], 0)
+        reminders = NotificationOutbox.objects.filter(kind='reminder')
+        self.assertEqual(list(reminders.values_list('appointment_id', 'channel')), [(due.pk, 'email')])
+
+    def test_booked_inside_window_is_not_reminded(self):
+        """Prueba que una cita agendada dentro del plazo del recordatorio no se recuerda."""
+        self._appointment(2, booked_hours_ago=1)
+
+        result = self._run()
+
+        self.assertEqual((result['due'], result['claimed']), (0, 0))
+
+    def test_rescheduling_clears_claim(self):
+        """Prueba que una cita reagendada vuelve a recibir recordatorio."""
+        appointment = self._appointment(2)
+        self._run()
+
+        appointment.refresh_from_db()
+        appointment.appointment_date += timedelta(days=1)
+        appointment.save()
+
+        appointment.refresh_from_db()
+        self.assertIsNone(appointment.reminder_claimed_at)
+
+    @override_settings(WHATSAPP_MESSAGES_PER_MINUTE=2)
+    def test_whatsapp_rate_limit(self):
+        """Prueba que WhatsApp no supera los mensajes por minuto de la organización."""
+        appointment = self._appointment(2)
+        for status in ('sent', 'sent', 'pending'):
+            NotificationOutbox.objects.create(
+                organization=self.organization, appointment=appointment, kind='reminder', channel='whatsapp',
+                recipient=appointment.phone_number, status=status,
+                sent_at=timezone.now() if status == 'sent' else None,
+            )
+
+        self.assertEqual(NotificationOutboxService.capacity(self.organization.pk, 'whatsapp', 50), 0)
+        self.assertEqual(NotificationOutboxService.capacity(self.organization.pk, 'email', 50), 50)
+        self.assertEqual(NotificationOutboxService.deliver(self.organization.pk, 'whatsapp')['claimed'], 0)
+
+    @override_settings(WHATSAPP_MESSAGES_PER_MINUTE=20)
+    def test_whatsapp_delivery_reschedules_instead_of_sleeping(self):
+        """Prueba que la entrega por WhatsApp envía un mensaje y reprograma el job."""
+        from apps.appointments.tasks import deliver_notifications
+        from apps.jobs.registry import Reschedule
+
+        appointment = self._appointment(2)
+        for _ in range(2):
+            NotificationOutbox.objects.create(
+                organization=self.organization, appointment=appointment, kind='reminder', channel='whatsapp',
+                recipient=appointment.phone_number,
+            )
+
+        with mock.patch.object(NotificationOutboxService, '_notifier') as notifier, \
+                mock.patch.object(NotificationOutboxService, '_send', return_value=(True, '')):
+            notifier.return_value.__enter__.return_value = object()
+            with self.assertRaises(Reschedule) as raised:
+                deliver_notifications.func(self.organization.pk, 'whatsapp')
+
+        self.assertEqual(raised.exception.delay, 3)
+        self.assertEqual(NotificationOutbox.objects.filter(status='sent').count(), 1)
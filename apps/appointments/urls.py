@@ -12,6 +12,7 @@ urlpatterns = [
     # APIs públicas (landing page)
     path('available-dates/', views.available_dates, name='available-dates'),
     path('available-slots/', views.available_slots, name='available-slots'),
+    path('hold-slot/', views.hold_slot, name='hold-slot'),
     path('book/', views.book_appointment, name='book-appointment'),
     
     # APIs administrativas
@@ -34,7 +34,7 @@ def generate_time_slots(start_time, end_time, duration_minutes=30):
     return slots
 
 
-def get_available_slots_for_date(date, organization=None, doctor_id=None, only_available=False):
+def get_available_slots_for_date(date, organization=None, doctor_id=None, only_available=False, hold_token=None):
     """
     Obtiene los horarios disponibles para una fecha específica
     
@@ -43,6 +43,8 @@ def get_available_slots_for_date(date, organization=None, doctor_id=None, only_a
         organization: Organización (opcional)
         doctor_id: ID del doctor (opcional)
         only_available: Si es True, solo devuelve slots disponibles (default: False)
+        hold_token: Retención del visitante; su propio horario retenido se
+                    sigue mostrando disponible
     
     Returns:
         Lista de diccionarios con información de slots disponibles
@@ -122,11 +124,16 @@ def get_available_slots_for_date(date, organization=None, doctor_id=None, only_a
             )
             all_slots.extend(slots)
     
-    # Obtener citas ya agendadas
-    booked_appointments = Appointment.objects.filter(
-        appointment_date=date,
-        **org_filter
-    ).exclude(status='cancelled').values_list('appointment_time', flat=True)
+    # Obtener citas ya agendadas y horarios retenidos por otros visitantes
+    if organization:
+        from .booking import SlotBookingService
+        booked_appointments = SlotBookingService.booked_times(organization, date)
+        held_slots = SlotBookingService.held_times(organization, date, all_slots, exclude_token=hold_token)
+    else:
+        booked_appointments = set(Appointment.objects.filter(
+            appointment_date=date
+        ).exclude(status='cancelled').values_list('appointment_time', flat=True))
+        held_slots = set()
     
     # Filtrar slots disponibles
     available_slots = []
@@ -144,7 +151,7 @@ def get_available_slots_for_date(date, organization=None, doctor_id=None, only_a
         if is_today and slot <= current_time:
             continue
         
-        is_available = slot not in booked_appointments
+        is_available = slot not in booked_appointments and slot not in held_slots
         
         # Si only_available=True, solo agregar slots disponibles
         if only_available and not is_available:
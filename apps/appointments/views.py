@@ -2,6 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes, throttle_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from datetime import datetime
@@ -14,6 +15,7 @@ from .models import (
     TimeSlot
 )
 from apps.patients.models import Patient
+from apps.api.throttling import PublicBookingRateThrottle, PublicBookingCreateRateThrottle
 from .serializers import (
     AppointmentConfigurationSerializer,
     WorkingHoursSerializer,
@@ -31,6 +33,8 @@ from .utils import (
     get_appointments_stats,
     check_slot_availability
 )
+from apps.organizations.decorators import without_tenant_scope
+from .booking import HoldLimitReached, SlotBookingService, SlotTaken, hold_client_id
 
 
 class AppointmentViewSet(viewsets.ModelViewSet):
@@ -103,7 +107,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
 @api_view(['GET'])
 @authentication_classes([])  # Sin autenticación requerida
 @permission_classes([AllowAny])
-@throttle_classes([])  # Desactivar throttling para endpoint público
+@throttle_classes([PublicBookingRateThrottle])  # Contadores en cache, sin escrituras en DB
 @csrf_exempt
 def available_dates(request):
     """
@@ -187,7 +191,7 @@ def available_dates(request):
 @api_view(['GET'])
 @authentication_classes([])  # Sin autenticación requerida
 @permission_classes([AllowAny])
-@throttle_classes([])  # Desactivar throttling para endpoint público
+@throttle_classes([PublicBookingRateThrottle])  # Contadores en cache, sin escrituras en DB
 @csrf_exempt
 def available_slots(request):
     """
@@ -224,7 +228,10 @@ def available_slots(request):
         only_available_param = request.GET.get('only_available', 'true') if hasattr(request, 'GET') else request.query_params.get('only_available', 'true')
         only_available = only_available_param.lower() == 'true'
         
-        slots = get_available_slots_for_date(date, organization, doctor_id, only_available)
+        # El horario retenido por este visitante se sigue mostrando disponible
+        hold_token = request.GET.get('hold_token') if hasattr(request, 'GET') else request.query_params.get('hold_token')
+        
+        slots = get_available_slots_for_date(date, organization, doctor_id, only_available, hold_token=hold_token)
         serializer = AvailableSlotsSerializer(slots, many=True)
         
         return Response({
@@ -239,10 +246,74 @@ def available_slots(request):
         return Response({'slots': [], 'error': 'Error al cargar los horarios'})
 
 
+@without_tenant_scope
+@api_view(['POST'])
+@authentication_classes([])  # Sin autenticación requerida
+@permission_classes([AllowAny])
+@throttle_classes([PublicBookingCreateRateThrottle])  # Contadores en cache, sin escrituras en DB
+@csrf_exempt
+def hold_slot(request):
+    """
+    API pública para retener un horario mientras el paciente llena el formulario
+    Endpoint: /api/hold-slot/
+    
+    Body:
+    {
+        "organization_id": 1,
+        "appointment_date": "2025-12-01",
+        "appointment_time": "10:00:00",
+        "hold_token": "..."  // Opcional: retención anterior del visitante (se libera)
+    }
+    
+    La retención vence a los APPOINTMENT_SLOT_HOLD_SECONDS; el token se envía
+    luego en /api/book/. Cada cliente puede tener a lo sumo
+    APPOINTMENT_MAX_HOLDS_PER_CLIENT retenciones activas por organización.
+    """
+    from apps.organizations.models import Organization
+    
+    try:
+        organization = Organization.objects.get(id=request.data.get('organization_id'), is_active=True)
+        date = datetime.strptime(request.data.get('appointment_date', ''), '%Y-%m-%d').date()
+        time = datetime.strptime(request.data.get('appointment_time', ''), '%H:%M:%S').time()
+    except (Organization.DoesNotExist, ValueError, TypeError):
+        return Response({
+            'success': False,
+            'message': 'Organización, fecha u hora inválidas'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if time in SlotBookingService.booked_times(organization, date):
+        token = None
+    else:
+        try:
+            token = SlotBookingService.hold(
+                organization, date, time,
+                token=request.data.get('hold_token') or None,
+                client=hold_client_id(request),
+            )
+        except HoldLimitReached:
+            return Response({
+                'success': False,
+                'code': 'hold_limit',
+                'message': 'Ya tiene horarios retenidos; complete o cancele esa reserva primero'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    if token is None:
+        error = SlotTaken(alternatives=SlotBookingService.alternatives(
+            organization, date, time, request.data.get('doctor_id')
+        ))
+        return Response(SlotBookingService.taken_response_data(error), status=status.HTTP_409_CONFLICT)
+    
+    return Response({
+        'success': True,
+        'hold_token': token,
+        'expires_in': settings.APPOINTMENT_SLOT_HOLD_SECONDS,
+    })
+
+
 @api_view(['POST'])
 @authentication_classes([])  # Sin autenticación requerida
 @permission_classes([AllowAny])
-@throttle_classes([])  # Desactivar throttling para endpoint público
+@throttle_classes([PublicBookingCreateRateThrottle])  # Contadores en cache, sin escrituras en DB
 @csrf_exempt  # Permitir requests desde landing page sin token CSRF
 def book_appointment(request):
     """
@@ -255,17 +326,25 @@ def book_appointment(request):
         "phone_number": "3001234567",
         "appointment_date": "2025-12-01",
         "appointment_time": "10:00:00",
-        "organization_id": 1
+        "organization_id": 1,
+        "hold_token": "..."  // Opcional, de /api/hold-slot/
     }
+    
+    Si el horario ya fue tomado responde 409 con horarios alternativos.
     """
     import logging
     logger = logging.getLogger(__name__)
     
     try:
-        serializer = AppointmentCreateSerializer(data=request.data)
+        serializer = AppointmentCreateSerializer(
+            data=request.data, context={'hold_token': request.data.get('hold_token') or None}
+        )
         
         if serializer.is_valid():
-            appointment = serializer.save()
+            try:
+                appointment = serializer.save()
+            except SlotTaken as e:
+                return Response(SlotBookingService.taken_response_data(e), status=status.HTTP_409_CONFLICT)
             
             # Crear notificación push para el dashboard
             try:
@@ -576,41 +655,28 @@ def book_patient_appointment(request):
                     'message': 'Doctor no encontrado'
                 }, status=status.HTTP_404_NOT_FOUND)
         
-        # Verificar que el horario esté disponible
-        existing = Appointment.objects.filter(
-            organization=request.organization,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time
-        ).exclude(status='cancelled').exists()
-        
-        if existing:
-            return Response({
-                'success': False,
-                'message': 'Este horario ya está ocupado'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Crear la cita
-        appointment = Appointment.objects.create(
-            organization=request.organization,
-            patient=patient,
-            doctor=doctor,
-            full_name=patient.full_name,
-            phone_number=phone,
-            email=email,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time,
-            notes=notes,
-            status='pending'
-        )
+        # Crear la cita reclamando el horario de forma atómica
+        try:
+            appointment = SlotBookingService.book(
+                request.organization,
+                appointment_date,
+                appointment_time,
+                hold_token=request.data.get('hold_token') or None,
+                doctor_id=doctor_id,
+                patient=patient,
+                doctor=doctor,
+                full_name=patient.full_name,
+                phone_number=phone,
+                email=email,
+                notes=notes,
+                status='pending'
+            )
+        except SlotTaken as e:
+            return Response(SlotBookingService.taken_response_data(e), status=status.HTTP_409_CONFLICT)
         
         logger.info(f"Appointment created with ID: {appointment.id}, Doctor: {appointment.doctor}")
         
-        # Enviar notificación (no fallar si hay error)
-        try:
-            from apps.appointments.signals import notify_new_appointment
-            notify_new_appointment(appointment)
-        except Exception as e:
-            logger.error(f"Error enviando notificación: {e}")
+        # La notificación al paciente la encola el signal post_save (apps.appointments.outbox)
         
         return Response({
             'success': True,
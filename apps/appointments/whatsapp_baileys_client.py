@@ -7,6 +7,8 @@ import logging
 import time
 from django.conf import settings
 
+from apps.api.services import get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,14 +25,14 @@ class WhatsAppBaileysClient:
         self.auto_recovery_enabled = True  # Habilitar auto-recuperación por defecto
     
     def _make_request(self, method, endpoint, data=None):
-        """Hacer petición HTTP al servidor"""
+        """Hacer petición HTTP al servidor (reutilizando la conexión keep-alive del hilo)"""
         url = f"{self.base_url}{endpoint}"
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=self.headers, timeout=10)
+                response = get_http_session().get(url, headers=self.headers, timeout=10)
             elif method == 'POST':
-                response = requests.post(url, json=data, headers=self.headers, timeout=10)
+                response = get_http_session().post(url, json=data, headers=self.headers, timeout=10)
             else:
                 raise ValueError(f"Método HTTP no soportado: {method}")
             
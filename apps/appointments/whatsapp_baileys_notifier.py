@@ -21,9 +21,16 @@ def format_time(time_value):
 class WhatsAppBaileysNotifier:
     """Notificador que usa WhatsApp Baileys (servidor Node.js)"""
     
-    def __init__(self, organization=None):
+    def __init__(self, organization=None, auto_recover=True):
+        """
+        Args:
+            organization: Organización que envía
+            auto_recover: Verificar (y recuperar) la sesión antes de cada mensaje;
+                          False cuando quien envía un lote ya la verificó
+        """
         self.organization = organization
         self.client = whatsapp_baileys_client
+        self.auto_recover = auto_recover
     
     def send_appointment_confirmation(self, appointment):
         """
@@ -99,7 +106,7 @@ Si necesitas cancelar o reagendar, contáctanos con anticipación.
             logger.info(f"BAILEYS: Enviando mensaje a {appointment.phone_number}")
             
             # Enviar mensaje CON auto-recuperación
-            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=True)
+            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=self.auto_recover)
             
             logger.info(f"BAILEYS: Resultado del envío: {result}")
             
@@ -130,28 +137,44 @@ Si necesitas cancelar o reagendar, contáctanos con anticipación.
             if not org_id:
                 return False
             
+            # Obtener configuración
+            from apps.appointments.models_notifications import NotificationSettings
+            settings = NotificationSettings.get_settings(appointment.organization)
+            
             org_name = appointment.organization.name if appointment.organization else 'OCEANO OPTICO'
             date_str = appointment.appointment_date.strftime('%d/%m/%Y')
             time_str = format_time(appointment.appointment_time)
+            doctor_name = appointment.doctor.full_name if appointment.doctor else 'Por asignar'
             
-            message = f"""
+            # Usar plantilla personalizada (la anticipación del recordatorio es configurable)
+            if settings and settings.reminder_message_template:
+                message = settings.reminder_message_template.format(
+                    organization=org_name,
+                    patient_name=appointment.full_name,
+                    date=date_str,
+                    time=time_str,
+                    doctor=doctor_name,
+                    arrival_minutes=settings.arrival_minutes_before
+                )
+            else:
+                message = f"""
 🔔 RECORDATORIO DE CITA - {org_name}
 
 Hola {appointment.full_name},
 
-Te recordamos tu cita programada para MAÑANA:
+Te recordamos tu cita:
 
 📅 Fecha: {date_str}
 🕒 Hora: {time_str}
-👤 Doctor: {appointment.doctor.full_name if appointment.doctor else 'Por asignar'}
+👤 Doctor: {doctor_name}
 
 Por favor, confirma tu asistencia.
 
 ¡Te esperamos! 👓
-            """.strip()
+                """.strip()
             
             # Enviar CON auto-recuperación
-            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=True)
+            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=self.auto_recover)
             
             if result and result.get('success'):
                 self._increment_whatsapp_usage()
@@ -207,7 +230,7 @@ Gracias por tu comprensión. 👓
                 """.strip()
             
             # Enviar CON auto-recuperación
-            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=True)
+            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=self.auto_recover)
             
             if result and result.get('success'):
                 self._increment_whatsapp_usage()
@@ -272,7 +295,7 @@ Llega {arrival_minutes} minutos antes de tu cita.
                 """.strip()
             
             # Enviar CON auto-recuperación
-            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=True)
+            result = self.client.send_message(org_id, appointment.phone_number, message, auto_recover=self.auto_recover)
             
             if result and result.get('success'):
                 self._increment_whatsapp_usage()
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_auto_20260109_2333'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_audit_organiz_c1c99d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['organization', '-created_at', '-id'], name='audit_audit_organiz_2ec13a_idx'),
+        ),
+    ]
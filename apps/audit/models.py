@@ -187,7 +187,7 @@ class AuditLog(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'action', '-created_at']),
-            models.Index(fields=['organization', '-created_at']),
+            models.Index(fields=['organization', '-created_at', '-id']),
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['action', '-created_at']),
             models.Index(fields=['ip_address', '-created_at']),
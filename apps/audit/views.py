@@ -12,6 +12,7 @@ from django.contrib import messages
 from datetime import datetime, timedelta
 import json
 import csv
+from apps.core.pagination import KeysetPaginator
 from .models import AuditLog, AuditConfig, AuditRetentionLog
 from .services import AuditService
 
@@ -132,10 +133,10 @@ def audit_logs(request):
     if ip_address:
         logs = logs.filter(ip_address=ip_address)
     
-    logs = logs.select_related('user', 'content_type').order_by('-created_at')
-    
-    # Paginación simple (primeros 100)
-    logs = logs[:100]
+    # Paginación por llave (created_at, id); el total es estimado salvo que se pida exacto
+    paginator = KeysetPaginator(logs.select_related('user', 'content_type'), per_page=100)
+    logs = paginator.page(request.GET.get('cursor'))
+    total_logs, total_is_estimate = paginator.count(exact=request.GET.get('exact_count') == '1')
     
     # Datos para filtros
     from django.contrib.auth import get_user_model
@@ -152,6 +153,9 @@ def audit_logs(request):
     
     context = {
         'logs': logs,
+        'page': logs,
+        'total_logs': total_logs,
+        'total_is_estimate': total_is_estimate,
         'action_choices': AuditLog.ACTION_CHOICES,
         'users': users,
         'content_types': content_types,
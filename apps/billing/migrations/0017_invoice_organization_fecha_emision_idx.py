@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0016_upload_paths'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['organization', 'fecha_emision'], name='billing_inv_organiz_61570e_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0017_invoice_organization_fecha_emision_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['organization', 'created_at'], name='billing_inv_organiz_892cfd_idx'),
+        ),
+    ]
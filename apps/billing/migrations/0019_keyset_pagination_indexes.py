@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0018_invoice_organization_created_at_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='invoice',
+            name='billing_inv_organiz_892cfd_idx',
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='billing_inv_organiz_0b69c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoiceproduct',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='billing_inv_organiz_52b045_idx'),
+        ),
+    ]
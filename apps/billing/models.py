@@ -701,6 +701,8 @@ class Invoice(TenantModel):
             models.Index(fields=['organization', 'numero_completo']),
             models.Index(fields=['organization', 'estado_dian']),
             models.Index(fields=['organization', 'estado_pago']),
+            models.Index(fields=['organization', 'fecha_emision']),
+            models.Index(fields=['organization', 'created_at', 'id']),
             models.Index(fields=['cufe']),
             models.Index(fields=['patient']),
         ]
@@ -809,20 +811,18 @@ class Invoice(TenantModel):
         if plan.max_invoices_month == 0:
             return True, "✅ Plan Empresarial - Facturas Ilimitadas"
         
-        # 4. Plan Profesional: Validar cuota mensual
-        # Contar facturas del mes actual
-        ahora = timezone.now()
-        inicio_mes = ahora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        # 4. Plan Profesional: Validar cupo (plan del mes + paquetes comprados)
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService
         
-        facturas_mes = Invoice.objects.filter(
-            organization=organization,
-            created_at__gte=inicio_mes
-        ).count()
+        cupo = InvoiceQuotaService.get_summary(organization)
         
-        if facturas_mes >= plan.max_invoices_month:
-            return False, f"❌ Límite mensual alcanzado: {facturas_mes}/{plan.max_invoices_month} facturas. Su plan permite {plan.max_invoices_month} facturas/mes"
+        if cupo['available'] is None:
+            return True, "✅ Facturas Ilimitadas"
         
-        restantes = plan.max_invoices_month - facturas_mes
+        if cupo['available'] <= 0:
+            return False, f"❌ Límite mensual alcanzado: {cupo['plan_used']}/{plan.max_invoices_month} facturas. Su plan permite {plan.max_invoices_month} facturas/mes"
+        
+        restantes = cupo['available']
         return True, f"✅ Puede crear factura ({restantes} restantes este mes)"
 
 
@@ -1803,6 +1803,7 @@ class InvoiceProduct(TenantModel):
         indexes = [
             models.Index(fields=['organization', 'is_active']),
             models.Index(fields=['organization', 'categoria']),
+            models.Index(fields=['organization', 'created_at', 'id']),
             models.Index(fields=['codigo_barras']),
             models.Index(fields=['marca']),
         ]
@@ -3,7 +3,9 @@ Señales para el módulo de facturación
 """
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Payment, InvoiceItem
+from apps.core.pdf import PDFCache
+from .models import Invoice, Payment, InvoiceItem
+from .tasks import schedule_pdf_prerender
 
 
 @receiver(post_save, sender=Payment)
@@ -42,3 +44,21 @@ def invoice_item_deleted(sender, instance, **kwargs):
     """
     if instance.invoice_id:
         instance.invoice.calcular_totales()
+
+
+@receiver(post_save, sender=Invoice)
+def invoice_saved_prerender_pdf(sender, instance, **kwargs):
+    """
+    Cuando la factura queda aprobada por la DIAN (ya no cambia), pre-renderiza
+    su PDF. Las demás facturas se renderizan en la primera descarga.
+    """
+    if instance.estado_dian == 'approved':
+        schedule_pdf_prerender(instance)
+
+
+@receiver(post_delete, sender=Invoice)
+def invoice_deleted_pdf(sender, instance, **kwargs):
+    """
+    Cuando se elimina una factura, borra su PDF almacenado
+    """
+    PDFCache.invalidate('invoice', instance.organization_id, instance.pk)
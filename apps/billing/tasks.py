@@ -0,0 +1,34 @@
+"""
+Jobs en segundo plano de facturación: pre-renderizado de PDFs
+"""
+from django.conf import settings
+
+from apps.jobs.registry import job
+
+
+@job(queue='pdf')
+def prerender_invoice_pdf(invoice_id):
+    """
+    Genera y guarda el PDF de una factura aprobada para que la descarga se
+    sirva directamente desde el almacenamiento
+    """
+    from apps.billing.models import Invoice
+    from apps.billing.views import get_invoice_pdf
+
+    invoice = Invoice.objects.select_related('organization').filter(pk=invoice_id).first()
+    if invoice is None:
+        return None
+
+    get_invoice_pdf(invoice, invoice.organization)
+    return {'invoice_id': invoice_id}
+
+
+def schedule_pdf_prerender(invoice):
+    """Encola el pre-renderizado del PDF de una factura"""
+    if not settings.PDF_PRERENDER:
+        return None
+    return prerender_invoice_pdf.enqueue(
+        args=[invoice.pk],
+        delay=30,
+        unique_key=f"pdf-prerender:invoice:{invoice.pk}"
+    )
@@ -11,6 +11,7 @@ urlpatterns = [
     
     # Facturas
     path('invoices/', views.invoice_list, name='invoice_list'),
+    path('invoices/pdf/', views.invoice_pdf_batch, name='invoice_pdf_batch'),
     path('invoices/create/', views.invoice_create, name='invoice_create'),
     path('invoices/<int:invoice_id>/', views.invoice_detail, name='invoice_detail'),
     path('invoices/<int:invoice_id>/pdf/', views.invoice_pdf, name='invoice_pdf'),
@@ -4,10 +4,12 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, DecimalField, F, Q, Sum
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from apps.core.pagination import KeysetPaginator
+from apps.core.pdf import PDFCache, fingerprint, get_stylesheet, paragraph_style
 from apps.organizations.models import Organization, OrganizationMember
 from apps.patients.models import Patient
 from .models import DianConfiguration, Invoice, InvoiceItem, Payment, Supplier, InvoiceProduct, InvoiceConfiguration
@@ -132,48 +134,44 @@ def invoice_list(request):
     fecha_inicio = request.GET.get('fecha_inicio', '')
     fecha_fin = request.GET.get('fecha_fin', '')
     
-    invoices = Invoice.objects.filter(organization=organization).select_related('patient')
-    
-    if estado_pago:
-        invoices = invoices.filter(estado_pago=estado_pago)
-    if estado_dian:
-        invoices = invoices.filter(estado_dian=estado_dian)
-    if fecha_inicio:
-        invoices = invoices.filter(created_at__gte=fecha_inicio)
-    if fecha_fin:
-        invoices = invoices.filter(created_at__lte=fecha_fin)
-    
-    # Estadísticas
-    stats = {
-        'total_facturas': invoices.count(),
-        'total_monto': invoices.aggregate(total=Sum('total'))['total'] or Decimal('0'),
-        'total_pagado': invoices.aggregate(total=Sum('total_pagado'))['total'] or Decimal('0'),
-        'pendiente_pago': invoices.filter(estado_pago__in=['unpaid', 'partial']).count(),
-        'pendiente_dian': invoices.filter(estado_dian='draft').count(),
-    }
+    invoices = filter_invoices(
+        Invoice.objects.filter(organization=organization).select_related('patient'), request.GET
+    )
+    
+    # Estadísticas (una sola pasada sobre el conjunto filtrado)
+    stats = invoices.aggregate(
+        total_facturas=Count('id'),
+        total_monto=Sum('total'),
+        total_pagado=Sum('total_pagado'),
+        pendiente_pago=Count('id', filter=Q(estado_pago__in=['unpaid', 'partial'])),
+        pendiente_dian=Count('id', filter=Q(estado_dian='draft')),
+    )
+    stats['total_monto'] = stats['total_monto'] or Decimal('0')
+    stats['total_pagado'] = stats['total_pagado'] or Decimal('0')
+    
+    # Paginación por llave (created_at, id)
+    page = KeysetPaginator(invoices, per_page=50).page(request.GET.get('cursor'))
     
     # Límite mensual (si aplica)
     subscription = organization.subscriptions.filter(is_active=True).first()
     plan = subscription.plan if subscription else None
     
     if plan and plan.allow_electronic_invoicing and plan.max_invoices_month > 0:
-        # Contar facturas del mes actual
-        inicio_mes = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        facturas_mes = Invoice.objects.filter(
-            organization=organization,
-            created_at__gte=inicio_mes
-        ).count()
+        # Cupo del mes (contador mensual + paquetes comprados)
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService
+        cupo = InvoiceQuotaService.get_summary(organization)
         
-        stats['facturas_mes'] = facturas_mes
+        stats['facturas_mes'] = cupo['plan_used']
         stats['limite_mes'] = plan.max_invoices_month
-        stats['restantes_mes'] = plan.max_invoices_month - facturas_mes
+        stats['restantes_mes'] = cupo['available']
     else:
         stats['facturas_mes'] = None
         stats['limite_mes'] = 0
         stats['restantes_mes'] = None
     
     context = {
-        'invoices': invoices[:100],  # Limitar a 100 registros
+        'invoices': page,
+        'page': page,
         'stats': stats,
         'can_create': can_use,
         'plan_message': message,
@@ -316,8 +314,19 @@ def invoice_create(request):
                         messages.error(request, '❌ No hay configuración DIAN. Configure primero la facturación electrónica.')
                         return redirect('billing:dian_configuration')
                     except ValueError as e:
+                        transaction.set_rollback(True)
                         messages.error(request, f'❌ Error en consecutivo DIAN: {str(e)}')
                         return redirect('billing:invoice_create')
+                    
+                    # Descontar el cupo con el consecutivo ya resuelto; si no hay
+                    # cupo se revierte también el consecutivo reservado
+                    from apps.organizations.services.invoice_quota import InvoiceQuotaService, InvoiceQuotaExceeded
+                    try:
+                        InvoiceQuotaService.consume(organization)
+                    except InvoiceQuotaExceeded as e:
+                        transaction.set_rollback(True)
+                        messages.error(request, f'❌ {str(e)}')
+                        return redirect('billing:invoice_list')
                 else:
                     # Factura Normal/Interna: Usar consecutivo interno
                     # Generar número de factura con lock para evitar duplicados
@@ -991,34 +1000,27 @@ def product_list(request):
     elif stock == 'agotado':
         products = products.filter(tipo_inventario='FISICO', stock_actual=0)
     
-    products = products.order_by('-created_at')
+    # Paginación por llave (created_at, id)
+    page = KeysetPaginator(products, per_page=50).page(request.GET.get('cursor'))
     
     # Proveedores para el filtro
     suppliers = Supplier.objects.filter(organization=organization, is_active=True)
     
-    # Estadísticas
-    stats = {
-        'total_productos': InvoiceProduct.objects.filter(organization=organization, is_active=True).count(),
-        'stock_bajo': InvoiceProduct.objects.filter(
-            organization=organization,
-            tipo_inventario='FISICO',
-            is_active=True
-        ).extra(where=['stock_actual <= stock_minimo']).count(),
-        'agotados': InvoiceProduct.objects.filter(
-            organization=organization,
-            tipo_inventario='FISICO',
-            stock_actual=0,
-            is_active=True
-        ).count(),
-        'valor_inventario': sum([p.valor_inventario for p in InvoiceProduct.objects.filter(
-            organization=organization,
-            tipo_inventario='FISICO',
-            is_active=True
-        )]),
-    }
+    # Estadísticas (una sola pasada sobre los productos activos)
+    fisico = Q(tipo_inventario='FISICO')
+    stats = InvoiceProduct.objects.filter(organization=organization, is_active=True).aggregate(
+        total_productos=Count('id'),
+        stock_bajo=Count('id', filter=fisico & Q(stock_actual__lte=F('stock_minimo'))),
+        agotados=Count('id', filter=fisico & Q(stock_actual=0)),
+        valor_inventario=Sum(
+            F('stock_actual') * F('precio_compra'), filter=fisico, output_field=DecimalField()
+        ),
+    )
+    stats['valor_inventario'] = stats['valor_inventario'] or Decimal('0')
     
     context = {
-        'products': products[:100],
+        'products': page,
+        'page': page,
         'suppliers': suppliers,
         'search': search,
         'categoria': categoria,
@@ -1510,27 +1512,19 @@ def send_invoice_to_dian(request, invoice_id):
     return redirect('billing:invoice_detail', invoice_id=invoice.id)
 
 
-@login_required
-def invoice_pdf(request, invoice_id):
-    """Generar PDF de la factura estilo profesional y moderno"""
-    from django.http import HttpResponse
+INVOICE_PDF_VERSION = 1
+
+
+def render_invoice_pdf(invoice, organization):
+    """Construye el PDF de la factura y retorna sus bytes"""
     from reportlab.lib.pagesizes import letter
     from reportlab.lib import colors
     from reportlab.lib.units import inch, cm
     from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT, TA_JUSTIFY
     import io
     import base64
     
-    org_member = OrganizationMember.objects.filter(user=request.user).first()
-    if not org_member:
-        messages.error(request, 'No tienes una organización asignada')
-        return redirect('dashboard:home')
-    
-    organization = org_member.organization
-    invoice = get_object_or_404(Invoice, id=invoice_id, organization=organization)
-    
     # Crear buffer
     buffer = io.BytesIO()
     
@@ -1545,12 +1539,12 @@ def invoice_pdf(request, invoice_id):
     )
     elements = []
     
-    styles = getSampleStyleSheet()
+    styles = get_stylesheet()
     
     # ===== ESTILOS PERSONALIZADOS =====
-    title_style = ParagraphStyle(
+    title_style = paragraph_style(
         'CustomTitle',
-        parent=styles['Heading1'],
+        'Heading1',
         fontSize=20,
         textColor=colors.HexColor('#1a202c'),
         spaceAfter=8,
@@ -1558,17 +1552,17 @@ def invoice_pdf(request, invoice_id):
         fontName='Helvetica-Bold'
     )
     
-    info_style = ParagraphStyle(
+    info_style = paragraph_style(
         'InfoText',
-        parent=styles['Normal'],
+        'Normal',
         fontSize=9,
         textColor=colors.HexColor('#2d3748'),
         leading=12
     )
     
-    bold_style = ParagraphStyle(
+    bold_style = paragraph_style(
         'BoldText',
-        parent=styles['Normal'],
+        'Normal',
         fontSize=9,
         fontName='Helvetica-Bold',
         textColor=colors.HexColor('#1a202c')
@@ -1681,7 +1675,7 @@ Estado: <b>{invoice.get_estado_dian_display()}</b>"""
         totals_data.append([
             Paragraph('<b>Saldo Pendiente:</b>', bold_style),
             Paragraph(f"<b>$ {invoice.saldo_pendiente:,.2f}</b>", 
-                     ParagraphStyle('Saldo', parent=bold_style, 
+                     paragraph_style('Saldo', bold_style, 
                                    textColor=colors.HexColor('#DC2626') if invoice.saldo_pendiente > 0 else colors.HexColor('#059669')))
         ])
     
@@ -1719,7 +1713,7 @@ Estado: <b>{invoice.get_estado_dian_display()}</b>"""
     if invoice.cufe:
         elements.append(Spacer(1, 0.3*cm))
         cufe_text = f"<b>CUFE:</b> <font size=7>{invoice.cufe}</font>"
-        cufe_para = Paragraph(cufe_text, ParagraphStyle('CUFE', parent=info_style, fontSize=7, textColor=colors.HexColor('#6B7280')))
+        cufe_para = Paragraph(cufe_text, paragraph_style('CUFE', info_style, fontSize=7, textColor=colors.HexColor('#6B7280')))
         
         cufe_table = Table([[cufe_para]], colWidths=[19*cm])
         cufe_table.setStyle(TableStyle([
@@ -1742,7 +1736,7 @@ Estado: <b>{invoice.get_estado_dian_display()}</b>"""
             
             qr_info = Paragraph(
                 "<b>Código QR de Validación</b><br/><font size=7>Escanee para validar autenticidad</font>",
-                ParagraphStyle('QRInfo', parent=info_style, fontSize=8, alignment=TA_CENTER)
+                paragraph_style('QRInfo', info_style, fontSize=8, alignment=TA_CENTER)
             )
             
             qr_table = Table([[img, qr_info]], colWidths=[4*cm, 15*cm])
@@ -1759,7 +1753,7 @@ Estado: <b>{invoice.get_estado_dian_display()}</b>"""
     elements.append(Spacer(1, 0.4*cm))
     legal_text = f"""<font size=7><i>Este documento fue generado por {organization.name}. 
 Para consultas o aclaraciones, contacte usando la información de contacto proporcionada.</i></font>"""
-    elements.append(Paragraph(legal_text, ParagraphStyle('Legal', parent=info_style, fontSize=7, textColor=colors.HexColor('#6B7280'), alignment=TA_CENTER)))
+    elements.append(Paragraph(legal_text, paragraph_style('Legal', info_style, fontSize=7, textColor=colors.HexColor('#6B7280'), alignment=TA_CENTER)))
     
     # Construir PDF
     doc.build(elements)
@@ -1768,14 +1762,121 @@ Para consultas o aclaraciones, contacte usando la información de contacto propo
     pdf = buffer.getvalue()
     buffer.close()
     
+    return pdf
+
+
+def get_invoice_pdf(invoice, organization):
+    """Ruta del PDF de la factura (lo genera si cambió o no existe)"""
+    items = list(invoice.items.all())
+    return PDFCache.get_or_render(
+        'invoice', invoice.organization_id, invoice.pk,
+        fingerprint(INVOICE_PDF_VERSION, invoice, items, organization),
+        lambda: render_invoice_pdf(invoice, organization)
+    )
+
+
+@login_required
+def invoice_pdf(request, invoice_id):
+    """Generar PDF de la factura estilo profesional y moderno"""
+    from django.http import FileResponse
+    
+    org_member = OrganizationMember.objects.filter(user=request.user).first()
+    if not org_member:
+        messages.error(request, 'No tienes una organización asignada')
+        return redirect('dashboard:home')
+    
+    organization = org_member.organization
+    invoice = get_object_or_404(Invoice, id=invoice_id, organization=organization)
+    
+    path = get_invoice_pdf(invoice, organization)
+    
     # Retornar respuesta
-    response = HttpResponse(content_type='application/pdf')
+    response = FileResponse(open(path, 'rb'), content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="Factura_{invoice.numero_completo}.pdf"'
-    response.write(pdf)
     
     return response
 
 
+def iter_invoice_pdfs(invoices, organization, workers=None, progress=None):
+    """
+    (nombre, bytes) del PDF de cada factura, en orden
+
+    Los PDFs ya almacenados se leen del disco; los demás se generan en el
+    pool de procesos de render_batch y se guardan en PDFCache.
+    """
+    from apps.core.pdf import render_batch
+    
+    pending = []
+    entries = []
+    for invoice in invoices:
+        items = list(invoice.items.all())
+        digest = fingerprint(INVOICE_PDF_VERSION, invoice, items, organization)
+        path = PDFCache.get('invoice', invoice.organization_id, invoice.pk, digest)
+        entries.append((invoice, digest, path))
+        if path is None:
+            pending.append(invoice)
+    
+    if progress is not None:
+        progress.start(len(entries))
+    rendered = render_batch(
+        render_invoice_pdf, pending, [invoice.pk for invoice in pending], organization, workers=workers
+    )
+    
+    try:
+        for invoice, digest, path in entries:
+            name = f"Factura_{invoice.numero_completo}.pdf"
+            if path is not None:
+                content = path.read_bytes()
+            else:
+                _, content = next(rendered)
+                PDFCache.store('invoice', invoice.organization_id, invoice.pk, digest, content)
+            if progress is not None:
+                progress.advance()
+            yield name, content
+    except Exception:
+        if progress is not None:
+            progress.fail()
+        raise
+    finally:
+        rendered.close()
+    
+    if progress is not None:
+        progress.finish()
+
+
+@login_required
+def invoice_pdf_batch(request):
+    """
+    Descarga en un ZIP los PDFs de las facturas filtradas
+
+    Acepta los mismos filtros del listado, ?ids=1,2,3 para elegir facturas y
+    ?progress=<token> para publicar el avance en /saas-admin/pdf/lotes/<token>/
+    """
+    from django.http import StreamingHttpResponse
+    from apps.core.pdf import BatchProgress, stream_zip
+    
+    organization = get_user_organization(request)
+    if not organization:
+        messages.error(request, 'No tienes una organización asignada')
+        return redirect('dashboard:home')
+    
+    invoices = filter_invoices(
+        Invoice.objects.filter(organization=organization)
+        .select_related('organization')
+        .prefetch_related('items'),
+        request.GET
+    ).order_by('fecha_emision', 'id')
+    
+    invoice_ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip().isdigit()]
+    if invoice_ids:
+        invoices = invoices.filter(pk__in=invoice_ids)
+    
+    files = iter_invoice_pdfs(list(invoices), organization, progress=BatchProgress.from_request(request))
+    response = StreamingHttpResponse(stream_zip(files), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="Facturas_{timezone.localdate():%Y%m%d}.zip"'
+    return response
+
+
 @login_required
 def invoice_delete(request, invoice_id):
     """Eliminar una factura"""
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cash_register', '0005_alter_cashclosure_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cashmovement',
+            index=models.Index(fields=['organization', 'created_at'], name='cash_regist_organiz_289c55_idx'),
+        ),
+    ]
@@ -322,6 +322,7 @@ class CashMovement(models.Model):
         indexes = [
             models.Index(fields=['cash_register', '-created_at']),
             models.Index(fields=['organization', 'movement_type']),
+            models.Index(fields=['organization', 'created_at']),
             models.Index(fields=['category']),
             models.Index(fields=['created_at']),
         ]
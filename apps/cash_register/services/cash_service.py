@@ -8,6 +8,7 @@ from django.db import transaction
 from django.utils import timezone
 from django.db.models import Sum, Q
 from datetime import date, datetime, timedelta
+from apps.core.date_ranges import end_of_day, local_day_range, range_filter, start_of_day
 from ..models import CashRegister, CashMovement, CashClosure
 
 
@@ -57,11 +58,11 @@ class CashService:
         Returns:
             Dict con estadísticas de la caja
         """
-        today = timezone.now().date()
+        today = timezone.localdate()
         
         # Movimientos del día
         today_movements = cash_register.movements.filter(
-            created_at__date=today,
+            **range_filter('created_at', *local_day_range(today)),
             is_deleted=False
         )
         
@@ -181,7 +182,7 @@ class CashService:
         if cash_register.status != 'OPEN':
             raise ValueError("La caja debe estar abierta para poder cerrarla")
         
-        today = timezone.now().date()
+        today = timezone.localdate()
         
         # Calcular totales del día
         summary = CashService.get_cash_register_summary(cash_register)
@@ -239,10 +240,10 @@ class CashService:
         )
         
         if start_date:
-            movements = movements.filter(created_at__date__gte=start_date)
+            movements = movements.filter(created_at__gte=start_of_day(start_date))
         
         if end_date:
-            movements = movements.filter(created_at__date__lte=end_date)
+            movements = movements.filter(created_at__lt=end_of_day(end_date))
         
         if cash_register:
             movements = movements.filter(cash_register=cash_register)
@@ -264,7 +265,7 @@ class CashService:
             Dict con resumen por caja y totales
         """
         if not date_filter:
-            date_filter = timezone.now().date()
+            date_filter = timezone.localdate()
         
         cash_registers = CashRegister.objects.filter(
             organization=organization,
@@ -277,7 +278,7 @@ class CashService:
         
         for register in cash_registers:
             movements = register.movements.filter(
-                created_at__date=date_filter,
+                **range_filter('created_at', *local_day_range(date_filter)),
                 is_deleted=False
             )
             
@@ -6,6 +6,7 @@ from decimal import Decimal
 from django.db.models import Sum, Count, Q, Avg
 from django.utils import timezone
 from datetime import timedelta
+from apps.core.date_ranges import local_day_range, range_filter
 from ..models import CashRegister, CashMovement, CashClosure
 
 
@@ -23,8 +24,7 @@ class ReportService:
         # Filtro base
         movements = CashMovement.objects.filter(
             organization=organization,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
+            **range_filter('created_at', *local_day_range(start_date, end_date)),
             is_deleted=False
         )
         
@@ -80,7 +80,7 @@ class ReportService:
         daily_summary = []
         current_date = start_date
         while current_date <= end_date:
-            day_movements = movements.filter(created_at__date=current_date)
+            day_movements = movements.filter(**range_filter('created_at', *local_day_range(current_date)))
             day_income = day_movements.filter(
                 movement_type='INCOME'
             ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
@@ -179,13 +179,12 @@ class ReportService:
         Returns:
             Dict con análisis de flujo
         """
-        end_date = timezone.now().date()
+        end_date = timezone.localdate()
         start_date = end_date - timedelta(days=days)
         
         movements = CashMovement.objects.filter(
             organization=organization,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
+            **range_filter('created_at', *local_day_range(start_date, end_date)),
             is_deleted=False
         )
         
@@ -194,7 +193,7 @@ class ReportService:
         current_date = start_date
         
         while current_date <= end_date:
-            day_movements = movements.filter(created_at__date=current_date)
+            day_movements = movements.filter(**range_filter('created_at', *local_day_range(current_date)))
             
             income = day_movements.filter(
                 movement_type='INCOME'
@@ -254,8 +253,7 @@ class ReportService:
         """
         movements = CashMovement.objects.filter(
             organization=organization,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
+            **range_filter('created_at', *local_day_range(start_date, end_date)),
             is_deleted=False
         )
         
@@ -298,8 +296,7 @@ class ReportService:
         for register in cash_registers:
             movements = CashMovement.objects.filter(
                 cash_register=register,
-                created_at__date__gte=start_date,
-                created_at__date__lte=end_date,
+                **range_filter('created_at', *local_day_range(start_date, end_date)),
                 is_deleted=False
             )
             
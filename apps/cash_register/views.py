@@ -15,6 +15,7 @@ from datetime import datetime, timedelta
 from .models import CashRegister, CashMovement, CashClosure, CashCategory
 from .services.cash_service import CashService
 from .services.report_service import ReportService
+from apps.core.date_ranges import end_of_day, local_day_range, range_filter, start_of_day
 
 
 @login_required
@@ -29,7 +30,7 @@ def dashboard(request):
     )
     
     # Resumen del día
-    today = timezone.now().date()
+    today = timezone.localdate()
     daily_summary = CashService.get_daily_summary(organization, today)
     
     # Últimos movimientos
@@ -118,9 +119,9 @@ def cash_register_detail(request, pk):
     summary = CashService.get_cash_register_summary(cash_register)
     
     # Movimientos del día
-    today = timezone.now().date()
+    today = timezone.localdate()
     movements = cash_register.movements.filter(
-        created_at__date=today,
+        **range_filter('created_at', *local_day_range(today)),
         is_deleted=False
     ).select_related('created_by')
     
@@ -200,10 +201,10 @@ def movement_list(request):
         movements = movements.filter(category=category)
     
     if start_date:
-        movements = movements.filter(created_at__date__gte=start_date)
+        movements = movements.filter(created_at__gte=start_of_day(start_date))
     
     if end_date:
-        movements = movements.filter(created_at__date__lte=end_date)
+        movements = movements.filter(created_at__lt=end_of_day(end_date))
     
     # Paginación
     paginator = Paginator(movements, 25)
@@ -217,9 +218,9 @@ def movement_list(request):
         is_deleted=False
     )
     if start_date:
-        total_income = total_income.filter(created_at__date__gte=start_date)
+        total_income = total_income.filter(created_at__gte=start_of_day(start_date))
     if end_date:
-        total_income = total_income.filter(created_at__date__lte=end_date)
+        total_income = total_income.filter(created_at__lt=end_of_day(end_date))
     total_income = total_income.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
     
     total_expense = CashMovement.objects.filter(
@@ -228,9 +229,9 @@ def movement_list(request):
         is_deleted=False
     )
     if start_date:
-        total_expense = total_expense.filter(created_at__date__gte=start_date)
+        total_expense = total_expense.filter(created_at__gte=start_of_day(start_date))
     if end_date:
-        total_expense = total_expense.filter(created_at__date__lte=end_date)
+        total_expense = total_expense.filter(created_at__lt=end_of_day(end_date))
     total_expense = total_expense.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
     
     # Cajas para filtro
@@ -404,7 +405,7 @@ def closure_detail(request, pk):
     # Movimientos del día
     movements = CashMovement.objects.filter(
         cash_register=closure.cash_register,
-        created_at__date=closure.closure_date,
+        **range_filter('created_at', *local_day_range(closure.closure_date)),
         is_deleted=False
     ).select_related('created_by')
     
@@ -494,7 +495,7 @@ def api_daily_report(request):
         if date_str:
             date_filter = datetime.strptime(date_str, '%Y-%m-%d').date()
         else:
-            date_filter = timezone.now().date()
+            date_filter = timezone.localdate()
         
         report = CashService.get_daily_summary(organization, date_filter)
         
@@ -526,7 +527,7 @@ def reports(request):
     organization = request.organization
     
     # Reportes predeterminados
-    today = timezone.now().date()
+    today = timezone.localdate()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     
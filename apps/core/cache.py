@@ -0,0 +1,230 @@
+"""
+Capa de cache compartida
+
+Construida sobre el cache `default` de Django (Redis, archivos o tabla de
+base de datos según CACHE_BACKEND; ver config/settings.py), agrega:
+
+- Espacios de nombres con versión: `invalidate()` incrementa un número de
+  versión en vez de borrar llaves, así invalidar una organización (o todo
+  el espacio) es una sola escritura visible para todos los workers. Las
+  versiones viven en el cache `versions`, separadas de los valores para
+  que purgar valores nunca reinicie una versión.
+- Protección contra estampidas en `get_or_set`: un solo proceso recalcula
+  (lock con `cache.add`); mientras tanto los demás sirven el valor vencido
+  o esperan brevemente a que aparezca.
+- Métricas de aciertos/fallos por espacio, acumuladas en memoria y
+  volcadas al cache compartido cada CACHE_METRICS_FLUSH_INTERVAL segundos.
+
+Uso:
+    from apps.core.cache import CacheNamespace
+
+    settings_cache = CacheNamespace('settings', timeout=3600)
+
+    value = settings_cache.get_or_set(
+        'theme', lambda: compute_theme(org), organization=org
+    )
+    settings_cache.invalidate(organization=org)   # solo esa organización
+    settings_cache.invalidate()                   # todo el espacio
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+METRIC_KINDS = ('hit', 'miss', 'stale', 'compute', 'wait')
+
+_namespaces = {}
+
+
+class CacheNamespace:
+    """
+    Espacio de nombres de cache con versión global y por organización
+
+    Args:
+        name: Prefijo único del espacio (ej: 'settings')
+        timeout: Vigencia por defecto de los valores, en segundos
+        stale_grace: Segundos que un valor vencido puede servirse mientras
+                     otro proceso lo recalcula
+        lock_timeout: Segundos máximos de un recálculo antes de liberar el lock
+    """
+
+    def __init__(self, name, timeout=300, stale_grace=None, lock_timeout=10):
+        self.name = name
+        self.timeout = timeout
+        self.stale_grace = stale_grace if stale_grace is not None else min(timeout, 60)
+        self.lock_timeout = lock_timeout
+        _namespaces[name] = self
+
+    def __repr__(self):
+        return f"CacheNamespace({self.name!r})"
+
+    # ==================== LLAVES Y VERSIONES ====================
+
+    def _version_keys(self, organization):
+        keys = [f"cachever:{self.name}"]
+        if organization is not None:
+            keys.append(f"cachever:{self.name}:{_org_id(organization)}")
+        return keys
+
+    def make_key(self, key, organization=None):
+        """Llave física versionada para `key` (global u organización)"""
+        versions = caches['versions'].get_many(self._version_keys(organization))
+        ns_version = versions.get(f"cachever:{self.name}", 0)
+        if organization is None:
+            return f"{self.name}:{ns_version}:global:{key}"
+        org_id = _org_id(organization)
+        org_version = versions.get(f"cachever:{self.name}:{org_id}", 0)
+        return f"{self.name}:{ns_version}:{org_id}.{org_version}:{key}"
+
+    def invalidate(self, organization=None):
+        """
+        Invalida los valores de una organización, o todo el espacio si
+        `organization` es None (incluye las llaves de todas las organizaciones)
+        """
+        versions = caches['versions']
+        key = self._version_keys(organization)[-1]
+        versions.add(key, 0, None)
+        try:
+            versions.incr(key)
+        except ValueError:
+            versions.set(key, 1, None)
+
+    # ==================== LECTURA / ESCRITURA ====================
+
+    def get(self, key, organization=None, default=None):
+        """Valor vigente de `key`, o `default` si no existe o venció"""
+        entry = cache.get(self.make_key(key, organization))
+        if entry is None or entry[1] < time.time():
+            _record(self.name, 'miss')
+            return default
+        _record(self.name, 'hit')
+        return entry[0]
+
+    def set(self, key, value, organization=None, timeout=None):
+        """Guarda `value` (puede ser None) durante `timeout` segundos"""
+        self._store(self.make_key(key, organization), value, timeout)
+
+    def delete(self, key, organization=None):
+        cache.delete(self.make_key(key, organization))
+
+    def _store(self, physical_key, value, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        cache.set(physical_key, (value, time.time() + timeout), timeout + self.stale_grace)
+
+    def get_or_set(self, key, compute, organization=None, timeout=None):
+        """
+        Retorna el valor cacheado o lo calcula con `compute()`
+
+        Solo un proceso recalcula a la vez: si el valor venció hace menos de
+        `stale_grace` segundos los demás reciben el valor anterior; si no
+        existe, esperan hasta `lock_timeout` segundos a que aparezca antes de
+        calcularlo ellos mismos.
+        """
+        physical_key = self.make_key(key, organization)
+        entry = cache.get(physical_key)
+        now = time.time()
+
+        if entry is not None and entry[1] >= now:
+            _record(self.name, 'hit')
+            return entry[0]
+
+        lock_key = f"cachelock:{physical_key}"
+        if cache.add(lock_key, 1, self.lock_timeout):
+            try:
+                _record(self.name, 'miss' if entry is None else 'stale')
+                _record(self.name, 'compute')
+                value = compute()
+                self._store(physical_key, value, timeout)
+                return value
+            finally:
+                cache.delete(lock_key)
+
+        if entry is not None:
+            # Otro proceso está recalculando: servir el valor vencido
+            _record(self.name, 'stale')
+            return entry[0]
+
+        _record(self.name, 'wait')
+        deadline = now + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(physical_key)
+            if entry is not None:
+                _record(self.name, 'hit')
+                return entry[0]
+
+        _record(self.name, 'miss')
+        _record(self.name, 'compute')
+        value = compute()
+        self._store(physical_key, value, timeout)
+        return value
+
+
+def _org_id(organization):
+    return getattr(organization, 'pk', organization)
+
+
+# ==================== MÉTRICAS ====================
+
+_metrics_lock = threading.Lock()
+_pending = Counter()
+_last_flush = [time.monotonic()]
+
+
+def _record(namespace, kind):
+    with _metrics_lock:
+        _pending[(namespace, kind)] += 1
+        due = time.monotonic() - _last_flush[0] >= getattr(settings, 'CACHE_METRICS_FLUSH_INTERVAL', 10)
+    if due:
+        flush_metrics()
+
+
+def flush_metrics():
+    """Vuelca los contadores locales al cache compartido"""
+    with _metrics_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush[0] = time.monotonic()
+
+    for (namespace, kind), count in pending.items():
+        key = f"cachestats:{namespace}:{kind}"
+        try:
+            cache.add(key, 0, None)
+            cache.incr(key, count)
+        except Exception as e:
+            logger.debug(f"No se pudo volcar la métrica de cache {key}: {e}")
+
+
+def get_metrics():
+    """
+    Métricas acumuladas de todos los workers por espacio de nombres
+
+    Returns:
+        dict: {namespace: {'hit', 'miss', 'stale', 'compute', 'wait', 'hit_ratio'}}
+    """
+    flush_metrics()
+    keys = [f"cachestats:{name}:{kind}" for name in _namespaces for kind in METRIC_KINDS]
+    values = cache.get_many(keys)
+
+    metrics = {}
+    for name in sorted(_namespaces):
+        stats = {kind: values.get(f"cachestats:{name}:{kind}", 0) for kind in METRIC_KINDS}
+        served = stats['hit'] + stats['stale']
+        total = served + stats['miss']
+        stats['hit_ratio'] = round(served / total, 4) if total else None
+        metrics[name] = stats
+    return metrics
+
+
+def reset_metrics():
+    """Reinicia los contadores compartidos y locales"""
+    with _metrics_lock:
+        _pending.clear()
+    cache.delete_many([f"cachestats:{name}:{kind}" for name in _namespaces for kind in METRIC_KINDS])
@@ -0,0 +1,96 @@
+"""
+Rangos de fechas para filtros que aprovechan índices
+
+Los lookups `campo__date=...`, `campo__year=...` o `campo__month=...` sobre
+un DateTimeField obligan a la base de datos a convertir cada fila antes de
+comparar, así que no pueden usar los índices del campo. Estas utilidades
+convierten días, semanas, meses y años locales (zona horaria actual, por
+defecto TIME_ZONE) en rangos semiabiertos [inicio, fin) de datetimes aware
+que se comparan directamente contra la columna.
+
+Uso:
+    from apps.core.date_ranges import period_range, range_filter
+
+    start, end = period_range('month')
+    Sale.objects.filter(**range_filter('created_at', start, end))
+    # created_at >= 2025-01-01 00:00-05:00 AND created_at < 2025-02-01 00:00-05:00
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+PERIODS = ('day', 'week', 'month', 'year')
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def period_dates(period, day=None):
+    """
+    Fechas locales [inicio, fin) del día, semana (lunes a domingo), mes o
+    año que contiene `day` (por defecto hoy)
+
+    Útil también para DateField: `appointment_date__gte=inicio, __lt=fin`
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Periodo desconocido: {period}")
+
+    day = _as_date(day) or timezone.localdate()
+
+    if period == 'day':
+        return day, day + timedelta(days=1)
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == 'month':
+        start = day.replace(day=1)
+        return start, (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    start = day.replace(month=1, day=1)
+    return start, date(start.year + 1, 1, 1)
+
+
+def start_of_day(day, tz=None):
+    """Inicio (00:00) de una fecha local como datetime aware"""
+    return timezone.make_aware(datetime.combine(_as_date(day), time.min), tz or timezone.get_current_timezone())
+
+
+def end_of_day(day, tz=None):
+    """Límite superior exclusivo de una fecha local (inicio del día siguiente)"""
+    return start_of_day(_as_date(day) + timedelta(days=1), tz)
+
+
+def local_day_range(start, end=None, tz=None):
+    """
+    Rango semiabierto [inicio de `start`, inicio del día siguiente a `end`)
+    en la zona horaria local, como datetimes aware
+
+    Args:
+        start: Fecha local inicial (date o 'YYYY-MM-DD')
+        end: Fecha local final, inclusive (por defecto `start`)
+        tz: Zona horaria (por defecto la actual)
+    """
+    return start_of_day(start, tz), end_of_day(start if end is None else end, tz)
+
+
+def period_range(period, day=None, tz=None):
+    """
+    Rango semiabierto de datetimes aware del periodo ('day', 'week',
+    'month' o 'year') que contiene `day`
+    """
+    start, end = period_dates(period, day)
+    return start_of_day(start, tz), start_of_day(end, tz)
+
+
+def range_filter(field, start, end):
+    """
+    Kwargs de filtro para un rango semiabierto
+
+    Ejemplo:
+        Sale.objects.filter(**range_filter('created_at', *period_range('day')))
+    """
+    return {f'{field}__gte': start, f'{field}__lt': end}
@@ -0,0 +1,246 @@
+"""
+Derivados de imágenes subidas (miniaturas y WebP)
+
+Cada imagen subida puede servirse en tamaños fijos (IMAGE_SIZES) en WebP
+y en un formato de respaldo (JPEG, o PNG si la imagen tiene
+transparencia). Los derivados se guardan junto al original:
+
+    org_1/landing/hero/portada.jpg
+    org_1/landing/hero/_derivatives/portada-hero-3f2a9c1b7d4e.webp
+    org_1/landing/hero/_derivatives/portada-hero-3f2a9c1b7d4e.jpg
+
+El sufijo es el hash del contenido del original, así un derivado nunca
+cambia y puede cachearse indefinidamente en el navegador o el CDN.
+
+- Al subir: OrganizationFileSystemStorage encola `generate_image_derivatives`
+  (apps/core/tasks.py) para las carpetas de UPLOAD_SIZES.
+- Al pedirlo: los template tags de `images` generan el derivado que falte
+  la primera vez y recuerdan su nombre en el cache.
+
+`prepare_upload()` valida y reduce una imagen recibida (ej: fotos del AR
+try-on) leyendo solo lo necesario: el formato y las dimensiones salen del
+encabezado y los JPEG se decodifican a escala reducida.
+
+Uso:
+    {% load images %}
+    {% picture frame.front_image 'medium' alt=frame.name class='w-full h-48' %}
+    <img src="{% image_url landing_config.logo 'small' %}">
+"""
+import hashlib
+import logging
+import os
+import re
+from io import BytesIO
+
+from tempfile import SpooledTemporaryFile
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+
+from apps.core.cache import CacheNamespace
+
+logger = logging.getLogger(__name__)
+
+derivatives_cache = CacheNamespace('image_derivatives', timeout=86400)
+
+DERIVATIVES_DIR = '_derivatives'
+
+# Nombre -> caja máxima (ancho, alto); la imagen conserva su proporción
+IMAGE_SIZES = {
+    'thumb': (160, 160),
+    'small': (400, 400),
+    'medium': (800, 800),
+    'large': (1280, 1280),
+    'hero': (1920, 1080),
+}
+
+# Tamaños generados al subir, por carpeta bajo org_{id}/
+UPLOAD_SIZES = {
+    'logos': ('small',),
+    'landing/logos': ('small',),
+    'landing/hero': ('hero', 'medium'),
+    'landing/services': ('medium', 'small'),
+    'ar_frames/front': ('medium', 'thumb'),
+    'ar_frames/side': ('medium', 'thumb'),
+    'doctors/photos': ('small', 'thumb'),
+    'products/images': ('medium', 'thumb'),
+}
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff'}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+_ORG_FOLDER_RE = re.compile(r'^org_\d+/')
+
+_DERIVATIVE_RE = re.compile(
+    r'^(?P<stem>.+)-(?P<size>%s)-[0-9a-f]{12}\.(?:webp|jpg|png)$' % '|'.join(IMAGE_SIZES)
+)
+
+
+class ImageDerivativeService:
+    """Servicio de derivados de imágenes"""
+
+    @staticmethod
+    def is_image(name):
+        return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+    @staticmethod
+    def is_derivative(name):
+        return DERIVATIVES_DIR in name.replace('\\', '/').split('/')[:-1]
+
+    @staticmethod
+    def upload_sizes(name):
+        """Tamaños a generar al subir `name` (vacío si su carpeta no tiene derivados)"""
+        name = name.replace('\\', '/')
+        match = _ORG_FOLDER_RE.match(name)
+        if not match or not ImageDerivativeService.is_image(name) or ImageDerivativeService.is_derivative(name):
+            return ()
+        return UPLOAD_SIZES.get(os.path.dirname(name[match.end():]), ())
+
+    @staticmethod
+    def content_hash(name, storage=default_storage):
+        """Hash corto del contenido del original"""
+        digest = hashlib.sha256()
+        with storage.open(name, 'rb') as original:
+            for chunk in iter(lambda: original.read(64 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:12]
+
+    @staticmethod
+    def derivative_name(name, size, extension, digest):
+        folder, filename = os.path.split(name)
+        stem = os.path.splitext(filename)[0]
+        return '/'.join(filter(None, [folder.replace('\\', '/'), DERIVATIVES_DIR, f'{stem}-{size}-{digest}.{extension}']))
+
+    @staticmethod
+    def _encode(image, extension):
+        buffer = BytesIO()
+        if extension == 'webp':
+            image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+        elif extension == 'png':
+            image.save(buffer, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def generate(name, sizes, storage=default_storage):
+        """
+        Genera (si no existen) los derivados WebP y de respaldo de `name`
+
+        Returns:
+            dict: {(tamaño, 'webp' | 'fallback'): nombre del derivado}
+        """
+        from PIL import Image, ImageOps
+
+        digest = ImageDerivativeService.content_hash(name, storage)
+        longest = max(max(IMAGE_SIZES[size]) for size in sizes)
+        with storage.open(name, 'rb') as original:
+            image = Image.open(original)
+            # JPEG: decodificar directamente a una escala reducida (no menor al tamaño pedido)
+            image.draft('RGB', (longest, longest))
+            image.load()
+        image = ImageOps.exif_transpose(image)
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        fallback = 'png' if has_alpha else 'jpg'
+
+        generated = {}
+        for size in sizes:
+            resized = None
+            for kind, extension in (('webp', 'webp'), ('fallback', fallback)):
+                target = ImageDerivativeService.derivative_name(name, size, extension, digest)
+                if not storage.exists(target):
+                    if resized is None:
+                        resized = image.copy()
+                        resized.thumbnail(IMAGE_SIZES[size], Image.LANCZOS)
+                    target = storage.save(target, ContentFile(ImageDerivativeService._encode(resized, extension)))
+                generated[(size, kind)] = target
+        return generated
+
+    @staticmethod
+    def get_name(name, size, kind='webp', storage=default_storage):
+        """
+        Nombre del derivado de `name`; lo genera la primera vez
+
+        Si el original no existe o no es una imagen válida retorna `name`.
+        """
+        def compute():
+            try:
+                return ImageDerivativeService.generate(name, [size], storage)[(size, kind)]
+            except Exception:
+                logger.warning(f"No se pudo generar el derivado {size} de {name}", exc_info=True)
+                return name
+
+        return derivatives_cache.get_or_set(f'{name}:{size}:{kind}', compute)
+
+    @staticmethod
+    def delete_for(name, storage=default_storage):
+        """Elimina los derivados de una imagen (al eliminar el original)"""
+        for size in IMAGE_SIZES:
+            for kind in ('webp', 'fallback'):
+                derivatives_cache.delete(f'{name}:{size}:{kind}')
+
+        folder, filename = os.path.split(name)
+        derivatives_folder = '/'.join(filter(None, [folder.replace('\\', '/'), DERIVATIVES_DIR]))
+        stem = os.path.splitext(filename)[0]
+        try:
+            _, files = storage.listdir(derivatives_folder)
+        except OSError:
+            return
+        for derivative in files:
+            match = _DERIVATIVE_RE.match(derivative)
+            if match and match.group('stem') == stem:
+                storage.delete(f'{derivatives_folder}/{derivative}')
+
+
+class InvalidImageError(ValueError):
+    """La imagen subida no es válida o excede los límites"""
+
+
+def prepare_upload(source, max_side, name, formats=('JPEG', 'PNG', 'WEBP'), max_pixels=40_000_000):
+    """
+    Valida una imagen subida y la reduce a `max_side` píxeles en su lado mayor
+
+    Args:
+        source: Archivo (o file-like) con la imagen original
+        max_side: Lado mayor máximo del resultado
+        name: Nombre del archivo resultante (la extensión se reemplaza por .jpg)
+        formats: Formatos aceptados (según el contenido, no la extensión)
+        max_pixels: Límite de píxeles del original (evita bombas de descompresión)
+
+    Returns:
+        File: JPEG en un archivo temporal (en disco si supera 1 MB)
+
+    Raises:
+        InvalidImageError
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(source)
+    except (UnidentifiedImageError, OSError):
+        raise InvalidImageError('El archivo no es una imagen válida')
+
+    if image.format not in formats:
+        raise InvalidImageError(f'Formato no permitido: {image.format}')
+    width, height = image.size
+    if width * height > max_pixels:
+        raise InvalidImageError(f'Imagen demasiado grande: {width}x{height} píxeles')
+
+    try:
+        # JPEG: decodificar directamente a una escala reducida
+        image.draft('RGB', (max_side, max_side))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(f'No se pudo leer la imagen: {e}')
+
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    output = SpooledTemporaryFile(max_size=1024 * 1024)
+    image.convert('RGB').save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    output.seek(0)
+    return File(output, name=f'{os.path.splitext(name)[0]}.jpg')
@@ -0,0 +1,53 @@
+"""
+Management command para generar los derivados de las imágenes ya subidas
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core.images import ImageDerivativeService, UPLOAD_SIZES
+
+
+class Command(BaseCommand):
+    help = 'Genera miniaturas y variantes WebP de las imágenes existentes en MEDIA_ROOT/org_*/'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            type=int,
+            action='append',
+            help='ID de la organización (se puede repetir; default: todas)'
+        )
+    
+    def handle(self, *args, **options):
+        media_root = str(settings.MEDIA_ROOT)
+        if options['organization']:
+            org_folders = [f'org_{pk}' for pk in options['organization']]
+        else:
+            org_folders = sorted(
+                name for name in os.listdir(media_root)
+                if name.startswith('org_') and os.path.isdir(os.path.join(media_root, name))
+            )
+        
+        generated = 0
+        failed = 0
+        for org_folder in org_folders:
+            for folder in UPLOAD_SIZES:
+                path = os.path.join(media_root, org_folder, folder)
+                if not os.path.isdir(path):
+                    continue
+                for filename in sorted(os.listdir(path)):
+                    name = f'{org_folder}/{folder}/{filename}'
+                    sizes = ImageDerivativeService.upload_sizes(name)
+                    if not sizes or not os.path.isfile(os.path.join(path, filename)):
+                        continue
+                    try:
+                        ImageDerivativeService.generate(name, sizes)
+                        generated += 1
+                    except Exception as e:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f'  - {name}: {e}'))
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {generated} imágenes procesadas ({failed} con error)')
+        )
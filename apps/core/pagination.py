@@ -0,0 +1,243 @@
+"""
+Paginación por llave (keyset / seek) y conteos estimados
+
+Con OFFSET la base de datos recorre y descarta todas las filas anteriores a
+la página pedida, así que las páginas profundas se vuelven lentas. La
+paginación por llave filtra a partir de la última fila mostrada:
+
+    WHERE created_at <= :created_at
+      AND (created_at < :created_at OR (created_at = :created_at AND id < :id))
+    ORDER BY created_at DESC, id DESC
+    LIMIT 51
+
+y con un índice (organization, created_at, id) cualquier página cuesta lo
+mismo. El cursor de la página siguiente/anterior viaja en ?cursor= con los
+valores de la llave codificados.
+
+Los totales exactos (COUNT(*)) sobre tablas grandes recorren todo el
+conjunto filtrado; `estimated_count()` usa el estimado del planificador de
+PostgreSQL (EXPLAIN, que a su vez parte de pg_class.reltuples) y solo
+cuenta exactamente cuando el conjunto es pequeño o se pide explícitamente.
+
+Uso:
+    from apps.core.pagination import KeysetPaginator
+
+    paginator = KeysetPaginator(invoices, per_page=50)
+    page = paginator.page(request.GET.get('cursor'))
+    total, estimated = paginator.count(exact=request.GET.get('exact_count') == '1')
+
+    {% include 'core/keyset_pagination.html' with page=page %}
+"""
+import base64
+import binascii
+import json
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+# Por debajo de este estimado se hace el COUNT exacto
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class InvalidCursor(ValueError):
+    """Cursor mal formado o que no corresponde al orden del listado"""
+
+
+def estimated_count(queryset, exact_below=EXACT_COUNT_THRESHOLD):
+    """
+    Total de filas de un queryset, estimado cuando es grande
+
+    En PostgreSQL se toma el estimado de filas del plan; si es menor a
+    `exact_below` se cuenta exactamente. En otros motores siempre se
+    cuenta exactamente.
+
+    Returns:
+        tuple: (total, es_estimado)
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate >= exact_below:
+            return estimate, True
+    return queryset.count(), False
+
+
+def _cursor_value(value):
+    """Valor de la llave serializable sin perder precisión (microsegundos incluidos)"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """Página de resultados de KeysetPaginator"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginador por llave
+
+    Args:
+        queryset: Queryset filtrado (sin orden; el orden lo define `ordering`)
+        per_page: Filas por página
+        ordering: Campos del orden ('-created_at', '-id'). Deben ser columnas
+                  no nulas del modelo; si el último no es único se agrega
+                  'id' como desempate.
+    """
+
+    def __init__(self, queryset, per_page=50, ordering=DEFAULT_ORDERING):
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    def count(self, exact=False):
+        """
+        Total de filas del listado
+
+        Returns:
+            tuple: (total, es_estimado)
+        """
+        if exact:
+            return self.queryset.count(), False
+        return estimated_count(self.queryset)
+
+    # ==================== CURSORES ====================
+
+    def _encode(self, obj, backwards):
+        values = [_cursor_value(getattr(obj, name)) for name, _ in self.fields]
+        payload = json.dumps(['p' if backwards else 'n', values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        """
+        Returns:
+            tuple: (hacia_atrás, valores de la llave)
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError, binascii.Error):
+            raise InvalidCursor(cursor)
+
+        if direction not in ('n', 'p') or not isinstance(raw_values, list) or len(raw_values) != len(self.fields):
+            raise InvalidCursor(cursor)
+
+        values = []
+        for (name, _), raw in zip(self.fields, raw_values):
+            try:
+                field = self.queryset.model._meta.get_field('id' if name == 'pk' else name)
+                value = field.to_python(raw)
+            except (FieldDoesNotExist, ValidationError):
+                raise InvalidCursor(cursor)
+            if value is None:
+                raise InvalidCursor(cursor)
+            values.append(value)
+        return direction == 'p', values
+
+    def _seek(self, values, backwards):
+        """
+        (a, b, c) después de (va, vb, vc) en el orden del listado
+
+        La condición redundante sobre el primer campo permite recorrer el
+        índice por rango en vez de evaluar el OR fila por fila.
+        """
+        first_name, first_descending = self.fields[0]
+        bound = 'lte' if first_descending != backwards else 'gte'
+        condition = Q()
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != backwards else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[index]})
+            for previous_index, (previous_name, _) in enumerate(self.fields[:index]):
+                term &= Q(**{previous_name: values[previous_index]})
+            condition |= term
+        return Q(**{f'{first_name}__{bound}': values[0]}) & condition
+
+    # ==================== PÁGINAS ====================
+
+    def page(self, cursor=None):
+        """
+        Página que sigue (o precede) al cursor; sin cursor o con un cursor
+        inválido retorna la primera página
+
+        Returns:
+            KeysetPage
+        """
+        backwards, values = False, None
+        if cursor:
+            try:
+                backwards, values = self._decode(cursor)
+            except InvalidCursor:
+                backwards, values = False, None
+
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        if not rows:
+            return KeysetPage(rows)
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(rows[-1], backwards=False) if has_next else None,
+            previous_cursor=self._encode(rows[0], backwards=True) if has_previous else None,
+        )
@@ -0,0 +1,367 @@
+"""
+Servicio compartido de renderizado de PDFs (ReportLab)
+
+- Estilos compartidos: `get_stylesheet()` construye una sola vez la hoja de
+  estilos de ReportLab y `paragraph_style()` reutiliza los estilos
+  personalizados entre documentos (son de solo lectura durante el
+  renderizado).
+- PDFs almacenados por hash de contenido: `PDFCache.get_or_render()` guarda
+  cada PDF en PDF_CACHE_ROOT/{tipo}/{organización}/{id}/{variante}-{hash}.pdf,
+  donde el hash se calcula con los campos de los registros que aparecen en el
+  documento. Si el registro cambia, el hash cambia y el PDF se vuelve a
+  generar; los signals de cada app borran las versiones anteriores con
+  `PDFCache.invalidate()`.
+- Lotes: `render_batch()` genera muchos PDFs en un pool de procesos (los
+  registros deben venir con todas sus relaciones precargadas: los procesos
+  hijos no consultan la base de datos), `stream_zip()` los empaqueta en un
+  ZIP que se envía a medida que se genera y `BatchProgress` publica el
+  avance en el cache para que el navegador lo consulte.
+
+Uso:
+    from apps.core.pdf import PDFCache, fingerprint, paragraph_style
+
+    title_style = paragraph_style('Title', 'Heading1', fontSize=18)
+
+    path = PDFCache.get_or_render(
+        'clinical_history', history.organization_id, history.pk,
+        fingerprint(history, history.patient, history.doctor),
+        lambda: render_clinical_history_pdf(history, organization),
+    )
+    return FileResponse(open(path, 'rb'), content_type='application/pdf')
+
+    files = render_batch(render_payslip_pdf, entries, names, progress=progress)
+    return StreamingHttpResponse(stream_zip(files), content_type='application/zip')
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== ESTILOS ====================
+
+_styles_lock = threading.Lock()
+_paragraph_styles = {}
+
+
+@lru_cache(maxsize=None)
+def get_stylesheet():
+    """Hoja de estilos base de ReportLab (construida una sola vez)"""
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    return getSampleStyleSheet()
+
+
+def paragraph_style(name, parent='Normal', **attrs):
+    """
+    ParagraphStyle compartido
+
+    Args:
+        name: Nombre del estilo
+        parent: Nombre de un estilo de la hoja base ('Normal', 'Heading1', ...)
+                u otro ParagraphStyle
+        **attrs: Atributos del estilo (fontSize, textColor, alignment, ...)
+    """
+    from reportlab.lib.styles import ParagraphStyle
+
+    parent_key = parent if isinstance(parent, str) else ('style', parent.name, id(parent))
+    key = (name, parent_key, tuple(sorted((k, repr(v)) for k, v in attrs.items())))
+    style = _paragraph_styles.get(key)
+    if style is None:
+        parent_style = get_stylesheet()[parent] if isinstance(parent, str) else parent
+        with _styles_lock:
+            style = _paragraph_styles.setdefault(
+                key, ParagraphStyle(name, parent=parent_style, **attrs)
+            )
+    return style
+
+
+# ==================== PDFs ALMACENADOS ====================
+
+def _field_values(obj):
+    if obj is None:
+        return None
+    if hasattr(obj, '_meta'):
+        return (obj._meta.label, tuple(
+            (field.attname, str(getattr(obj, field.attname)))
+            for field in obj._meta.concrete_fields
+        ))
+    if isinstance(obj, (list, tuple)):
+        return tuple(_field_values(item) for item in obj)
+    if isinstance(obj, dict):
+        return tuple(sorted((str(k), _field_values(v)) for k, v in obj.items()))
+    return str(obj)
+
+
+def fingerprint(*parts):
+    """
+    Hash del contenido de un documento
+
+    Args:
+        *parts: Instancias de modelos (se usan todos sus campos), listas de
+                instancias, diccionarios u otros valores (opciones, versión
+                de la plantilla, fecha impresa...)
+    """
+    return hashlib.sha256(repr(_field_values(parts)).encode('utf-8')).hexdigest()[:32]
+
+
+class PDFCache:
+    """PDFs renderizados guardados en disco por hash de contenido"""
+
+    @staticmethod
+    def _root():
+        return Path(settings.PDF_CACHE_ROOT)
+
+    @staticmethod
+    def _folder(kind, organization_id, object_id):
+        return PDFCache._root() / kind / str(organization_id or 'global') / str(object_id)
+
+    @staticmethod
+    def path(kind, organization_id, object_id, digest, variant='default'):
+        """
+        Ruta del PDF de un registro para un hash de contenido
+
+        `variant` distingue documentos distintos del mismo registro (ej: las
+        secciones elegidas del examen visual)
+        """
+        return PDFCache._folder(kind, organization_id, object_id) / f'{variant}-{digest}.pdf'
+
+    @staticmethod
+    def get(kind, organization_id, object_id, digest, variant='default'):
+        """Ruta del PDF si ya está renderizado, o None"""
+        path = PDFCache.path(kind, organization_id, object_id, digest, variant)
+        return path if path.exists() else None
+
+    @staticmethod
+    def store(kind, organization_id, object_id, digest, content, variant='default'):
+        """
+        Guarda un PDF (escritura atómica) y elimina las versiones anteriores
+        de la misma variante del registro
+        """
+        path = PDFCache.path(kind, organization_id, object_id, digest, variant)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        for other in path.parent.glob(f'{variant}-*.pdf'):
+            if other != path:
+                try:
+                    other.unlink()
+                except OSError:
+                    pass
+        return path
+
+    @staticmethod
+    def get_or_render(kind, organization_id, object_id, digest, render, variant='default'):
+        """
+        Ruta del PDF almacenado; si no existe lo genera con `render()`
+        (que debe retornar los bytes del PDF)
+        """
+        path = PDFCache.get(kind, organization_id, object_id, digest, variant)
+        if path is not None:
+            return path
+        return PDFCache.store(kind, organization_id, object_id, digest, render(), variant)
+
+    @staticmethod
+    def invalidate(kind, organization_id, object_id):
+        """Elimina todos los PDFs almacenados de un registro"""
+        folder = PDFCache._folder(kind, organization_id, object_id)
+        if folder.exists():
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+# ==================== LOTES ====================
+
+# Por debajo de este tamaño no vale la pena arrancar procesos
+BATCH_POOL_MIN_ITEMS = 8
+
+PROGRESS_TOKEN_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def _init_batch_worker():
+    """Inicializa Django en cada proceso del pool (contexto spawn)"""
+    import django
+
+    django.setup()
+
+
+def _batch_workers(workers):
+    if workers is None:
+        workers = settings.PDF_BATCH_WORKERS
+    return workers or os.cpu_count() or 1
+
+
+def render_batch(render, items, names, *extra_args, workers=None, progress=None):
+    """
+    Genera un PDF por registro y los entrega en orden a medida que terminan
+
+    Args:
+        render: Función de módulo (serializable) que recibe el registro y
+                `extra_args` y retorna los bytes del PDF
+        items: Registros con sus relaciones precargadas
+        names: Nombre de archivo de cada registro
+        *extra_args: Argumentos comunes a todos los registros (ej: organización)
+        workers: Procesos del pool (None = PDF_BATCH_WORKERS; 1 = sin pool)
+        progress: BatchProgress opcional
+
+    Yields:
+        tuple: (nombre, bytes del PDF)
+    """
+    items = list(items)
+    if progress is not None:
+        progress.start(len(items))
+
+    workers = min(_batch_workers(workers), len(items))
+    if workers <= 1 or len(items) < BATCH_POOL_MIN_ITEMS:
+        results = (render(item, *extra_args) for item in items)
+        executor = None
+    else:
+        # spawn: los hijos no heredan las conexiones abiertas a la base de datos
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_batch_worker,
+        )
+        chunksize = max(1, len(items) // (workers * 4))
+        results = executor.map(
+            render, items, *[[arg] * len(items) for arg in extra_args], chunksize=chunksize
+        )
+
+    try:
+        for name, content in zip(names, results):
+            if progress is not None:
+                progress.advance()
+            yield name, content
+        if progress is not None:
+            progress.finish()
+    except Exception:
+        logger.exception("Error generando lote de PDFs")
+        if progress is not None:
+            progress.fail()
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ZipStream:
+    """Destino de escritura no posicionable para zipfile; acumula los bytes escritos"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files):
+    """
+    Empaqueta (nombre, bytes) en un ZIP y lo entrega por partes, sin
+    construir el archivo completo en memoria
+
+    Los PDFs ya vienen comprimidos, se guardan sin volver a comprimir.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for name, content in files:
+            archive.writestr(name, content)
+            yield stream.drain()
+    yield stream.drain()
+
+
+class BatchProgress:
+    """
+    Avance de un lote de PDFs publicado en el cache
+
+    El navegador genera el token, lo envía al pedir la descarga (?progress=)
+    y consulta /pdf/lotes/<token>/ mientras el archivo se descarga.
+    """
+
+    TIMEOUT = 3600
+    LOG_EVERY = 50
+
+    def __init__(self, token, user_id=None):
+        self.token = token
+        self.user_id = user_id
+        self.total = 0
+        self.done = 0
+
+    @staticmethod
+    def _key(token):
+        return f'pdf_batch_progress:{token}'
+
+    @classmethod
+    def from_request(cls, request):
+        """BatchProgress si la petición trae un token válido, o None"""
+        token = request.GET.get('progress', '')
+        if not PROGRESS_TOKEN_RE.match(token):
+            return None
+        return cls(token, user_id=request.user.pk)
+
+    @classmethod
+    def get(cls, token):
+        """Estado publicado de un lote, o None"""
+        if not PROGRESS_TOKEN_RE.match(token or ''):
+            return None
+        return cache.get(cls._key(token))
+
+    def _publish(self, status):
+        cache.set(self._key(self.token), {
+            'user_id': self.user_id,
+            'status': status,
+            'total': self.total,
+            'done': self.done,
+        }, self.TIMEOUT)
+
+    def start(self, total):
+        self.total = total
+        self.done = 0
+        self._publish('running')
+
+    def advance(self, count=1):
+        self.done += count
+        if self.done % self.LOG_EVERY == 0:
+            logger.info(f"Lote de PDFs {self.token}: {self.done}/{self.total}")
+        if self.done < self.total:
+            self._publish('running')
+
+    def finish(self):
+        self._publish('done')
+
+    def fail(self):
+        self._publish('error')
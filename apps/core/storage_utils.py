@@ -3,6 +3,7 @@ Utilidades para manejo de almacenamiento de archivos
 Sistema multi-tenant: cada organización tiene su propia carpeta
 """
 import os
+from django.core.files.storage import FileSystemStorage
 from django.utils.deconstruct import deconstructible
 
 
@@ -138,7 +139,11 @@ def create_organization_media_folders(organization_id):
 
 def get_organization_storage_usage(organization_id):
     """
-    Calcula el uso de almacenamiento de una organización
+    Uso de almacenamiento de una organización
+    
+    Lee los contadores de StorageUsage (mantenidos por
+    OrganizationFileSystemStorage y los signals de documentos), sin recorrer
+    el disco.
     
     Args:
         organization_id: ID de la organización
@@ -146,35 +151,57 @@ def get_organization_storage_usage(organization_id):
     Returns:
         dict: Información de uso de almacenamiento
     """
-    import os
-    from pathlib import Path
+    from apps.organizations.services.storage_usage import StorageUsageService
     
-    org_path = get_organization_media_path(organization_id)
-    
-    if not org_path.exists():
-        return {
-            'total_bytes': 0,
-            'total_mb': 0,
-            'total_gb': 0,
-            'file_count': 0
-        }
-    
-    total_size = 0
-    file_count = 0
-    
-    for dirpath, dirnames, filenames in os.walk(org_path):
-        for filename in filenames:
-            if filename != '.gitkeep':
-                filepath = os.path.join(dirpath, filename)
-                try:
-                    total_size += os.path.getsize(filepath)
-                    file_count += 1
-                except OSError:
-                    pass
-    
-    return {
-        'total_bytes': total_size,
-        'total_mb': round(total_size / (1024 * 1024), 2),
-        'total_gb': round(total_size / (1024 * 1024 * 1024), 2),
-        'file_count': file_count
-    }
+    return StorageUsageService.get_usage(organization_id)
+
+
+@deconstructible
+class OrganizationFileSystemStorage(FileSystemStorage):
+    """
+    FileSystemStorage que registra cada archivo guardado o eliminado bajo
+    org_{id}/ en los contadores de uso por organización y categoría, y
+    mantiene los derivados de las imágenes (apps/core/images.py)
+    """
+    
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        self._record(name, 1)
+        self._schedule_derivatives(name)
+        return name
+    
+    def delete(self, name):
+        if name:
+            self._delete_derivatives(name)
+        size = None
+        if name and self.exists(name):
+            try:
+                size = self.size(name)
+            except OSError:
+                pass
+        super().delete(name)
+        if size is not None:
+            self._record(name, -1, size)
+    
+    def _schedule_derivatives(self, name):
+        from apps.core.tasks import schedule_image_derivatives
+        
+        schedule_image_derivatives(name)
+    
+    def _delete_derivatives(self, name):
+        from apps.core.images import ImageDerivativeService
+        
+        if ImageDerivativeService.is_image(name) and not ImageDerivativeService.is_derivative(name):
+            ImageDerivativeService.delete_for(name, storage=self)
+    
+    def _record(self, name, files_delta, size=None):
+        from apps.organizations.services.storage_usage import StorageUsageService
+        
+        if StorageUsageService.parse_path(name) is None:
+            return
+        if size is None:
+            try:
+                size = self.size(name)
+            except OSError:
+                return
+        StorageUsageService.record_path(name, files_delta * size, files_delta)
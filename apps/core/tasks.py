@@ -0,0 +1,32 @@
+"""
+Jobs en segundo plano de core: derivados de imágenes subidas
+"""
+from django.conf import settings
+
+from apps.jobs.registry import job
+
+
+@job(queue='images')
+def generate_image_derivatives(name):
+    """Genera las miniaturas y variantes WebP de una imagen recién subida"""
+    from django.core.files.storage import default_storage
+    from apps.core.images import ImageDerivativeService
+
+    sizes = ImageDerivativeService.upload_sizes(name)
+    if not sizes or not default_storage.exists(name):
+        return None
+
+    generated = ImageDerivativeService.generate(name, sizes)
+    return {'name': name, 'derivatives': len(generated)}
+
+
+def schedule_image_derivatives(name):
+    """Encola la generación de derivados si la carpeta de la imagen los usa"""
+    from apps.core.images import ImageDerivativeService
+
+    if not settings.IMAGE_DERIVATIVES_ON_UPLOAD or not ImageDerivativeService.upload_sizes(name):
+        return None
+    return generate_image_derivatives.enqueue(
+        args=[name],
+        unique_key=f"image-derivatives:{name}"
+    )
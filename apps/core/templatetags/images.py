@@ -0,0 +1,60 @@
+"""
+Template tags para servir imágenes en tamaños fijos (apps/core/images.py)
+"""
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from apps.core.images import IMAGE_SIZES, ImageDerivativeService
+
+register = template.Library()
+
+
+def _image_name(image):
+    """Nombre en el storage de un ImageField/FileField o de un string"""
+    return getattr(image, 'name', image) or ''
+
+
+def _derivative_url(name, size, kind):
+    if size not in IMAGE_SIZES:
+        raise template.TemplateSyntaxError(f"Tamaño de imagen desconocido: {size}")
+    return default_storage.url(ImageDerivativeService.get_name(name, size, kind))
+
+
+@register.simple_tag
+def image_url(image, size='medium', kind='webp'):
+    """
+    URL de la imagen en un tamaño fijo (WebP por defecto, kind='fallback'
+    para JPEG/PNG)
+
+    Uso en templates:
+        {% load images %}
+        <img src="{% image_url landing_config.logo 'small' %}">
+    """
+    name = _image_name(image)
+    if not name:
+        return ''
+    return _derivative_url(name, size, kind)
+
+
+@register.simple_tag
+def picture(image, size='medium', **attrs):
+    """
+    <picture> con la variante WebP y la de respaldo de una imagen
+
+    Uso en templates:
+        {% load images %}
+        {% picture frame.front_image 'medium' alt=frame.name class='w-full h-48 object-contain' %}
+    """
+    name = _image_name(image)
+    if not name:
+        return ''
+
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}"><img src="{}"{}></picture>',
+        _derivative_url(name, size, 'webp'),
+        _derivative_url(name, size, 'fallback'),
+        format_html_join('', ' {}="{}"', sorted(attrs.items())),
+    )
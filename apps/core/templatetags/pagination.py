@@ -0,0 +1,22 @@
+"""
+Template tags para la paginación por llave (apps/core/pagination.py)
+"""
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """
+    Querystring de la página indicada por `cursor`, conservando los filtros
+
+    Uso en templates:
+        {% load pagination %}
+        <a href="{% cursor_url page.next_cursor %}">Siguiente</a>
+    """
+    params = context['request'].GET.copy()
+    params.pop('cursor', None)
+    if cursor:
+        params['cursor'] = cursor
+    return f'?{params.urlencode()}'
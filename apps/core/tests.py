@@ -0,0 +1,300 @@
+from datetime import date, datetime
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.core.cache import CacheNamespace, get_metrics, reset_metrics
+from apps.core.date_ranges import local_day_range, period_dates, period_range, range_filter
+from apps.core.pdf import BatchProgress, PDFCache, fingerprint, paragraph_style, render_batch, stream_zip
+
+
+class DateRangesTestCase(TestCase):
+    """Tests para los rangos de fechas locales"""
+    
+    def test_period_dates(self):
+        """Test de límites de día, semana, mes y año"""
+        day = date(2024, 2, 29)  # jueves, año bisiesto
+        
+        self.assertEqual(period_dates('day', day), (date(2024, 2, 29), date(2024, 3, 1)))
+        self.assertEqual(period_dates('week', day), (date(2024, 2, 26), date(2024, 3, 4)))
+        self.assertEqual(period_dates('month', day), (date(2024, 2, 1), date(2024, 3, 1)))
+        self.assertEqual(period_dates('year', day), (date(2024, 1, 1), date(2025, 1, 1)))
+        self.assertEqual(period_dates('month', date(2024, 12, 15)), (date(2024, 12, 1), date(2025, 1, 1)))
+        with self.assertRaises(ValueError):
+            period_dates('quarter', day)
+    
+    def test_local_ranges_are_aware_and_half_open(self):
+        """Test que los rangos empiezan a medianoche local"""
+        start, end = local_day_range('2024-03-10', date(2024, 3, 11))
+        
+        self.assertEqual(timezone.localtime(start), timezone.make_aware(datetime(2024, 3, 10)))
+        self.assertEqual(timezone.localtime(end), timezone.make_aware(datetime(2024, 3, 12)))
+        self.assertEqual(period_range('month', date(2024, 3, 10))[1], timezone.make_aware(datetime(2024, 4, 1)))
+        self.assertEqual(range_filter('created_at', start, end), {
+            'created_at__gte': start, 'created_at__lt': end,
+        })
+
+
+class CacheNamespaceTestCase(TestCase):
+    """Tests para la capa de cache con espacios de nombres"""
+    
+    def setUp(self):
+        cache.clear()
+        self.ns = CacheNamespace('tests', timeout=60)
+        reset_metrics()
+    
+    def test_tenant_and_global_invalidation(self):
+        """Test que invalidar una organización no afecta a las demás"""
+        self.ns.set('theme', 'dark', organization=1)
+        self.ns.set('theme', 'light', organization=2)
+        self.ns.set('theme', 'blue')
+        
+        self.ns.invalidate(organization=1)
+        self.assertIsNone(self.ns.get('theme', organization=1))
+        self.assertEqual(self.ns.get('theme', organization=2), 'light')
+        self.assertEqual(self.ns.get('theme'), 'blue')
+        
+        self.ns.invalidate()
+        self.assertIsNone(self.ns.get('theme', organization=2))
+        self.assertIsNone(self.ns.get('theme'))
+    
+    def test_versions_survive_value_eviction(self):
+        """Test que purgar los valores no reinicia las versiones invalidadas"""
+        old_key = self.ns.make_key('theme', organization=1)
+        self.ns.invalidate(organization=1)
+        
+        cache.clear()
+        
+        self.assertNotEqual(self.ns.make_key('theme', organization=1), old_key)
+    
+    def test_get_or_set_computes_once(self):
+        """Test que get_or_set cachea el valor (incluido None)"""
+        compute = mock.Mock(return_value=None)
+        
+        self.assertIsNone(self.ns.get_or_set('missing', compute))
+        self.assertIsNone(self.ns.get_or_set('missing', compute))
+        self.assertEqual(compute.call_count, 1)
+        
+        stats = get_metrics()['tests']
+        self.assertEqual((stats['hit'], stats['miss'], stats['compute']), (1, 1, 1))
+    
+    def test_stale_value_served_while_recomputing(self):
+        """Test que con el lock tomado se sirve el valor vencido"""
+        self.ns.set('report', 'old', timeout=0)
+        physical_key = self.ns.make_key('report')
+        cache.add(f"cachelock:{physical_key}", 1, 10)
+        compute = mock.Mock(return_value='new')
+        
+        self.assertEqual(self.ns.get_or_set('report', compute), 'old')
+        compute.assert_not_called()
+        
+        cache.delete(f"cachelock:{physical_key}")
+        self.assertEqual(self.ns.get_or_set('report', compute), 'new')
+        self.assertEqual(get_metrics()['tests']['stale'], 2)
+
+
+class PDFCacheTestCase(TestCase):
+    """Tests para los estilos compartidos y los PDFs almacenados"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        override = override_settings(PDF_CACHE_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    def test_paragraph_styles_are_shared(self):
+        """Test que los estilos con los mismos atributos se reutilizan"""
+        title = paragraph_style('Title', 'Heading1', fontSize=18)
+        self.assertIs(paragraph_style('Title', 'Heading1', fontSize=18), title)
+        self.assertIsNot(paragraph_style('Title', 'Heading1', fontSize=12), title)
+        self.assertEqual(paragraph_style('Sub', title, fontSize=10).parent, title)
+    
+    def test_get_or_render_by_content_hash(self):
+        """Test que el PDF se genera una vez por hash de contenido y variante"""
+        render = mock.Mock(return_value=b'%PDF-1')
+        digest = fingerprint('v1', {'name': 'A'})
+        self.assertEqual(digest, fingerprint('v1', {'name': 'A'}))
+        
+        path = PDFCache.get_or_render('doc', 1, 10, digest, render)
+        self.assertEqual(PDFCache.get_or_render('doc', 1, 10, digest, render), path)
+        self.assertEqual(render.call_count, 1)
+        
+        # Contenido distinto: nuevo archivo y se elimina el anterior de la misma variante
+        other = PDFCache.get_or_render('doc', 1, 10, fingerprint('v1', {'name': 'B'}), render)
+        copy = PDFCache.get_or_render('doc', 1, 10, digest, render, variant='copy')
+        self.assertFalse(path.exists())
+        self.assertTrue(other.exists() and copy.exists())
+        
+        PDFCache.invalidate('doc', 1, 10)
+        self.assertFalse(other.exists() or copy.exists())
+
+    
+    def test_batch_streams_zip_and_reports_progress(self):
+        """Test que el lote se entrega como ZIP en orden y publica el avance"""
+        import io
+        import zipfile
+        
+        progress = BatchProgress('lote-de-prueba', user_id=7)
+        files = render_batch(
+            lambda item, prefix: f'{prefix}{item}'.encode(), [1, 2, 3], ['a.pdf', 'b.pdf', 'c.pdf'],
+            '%PDF-', workers=1, progress=progress
+        )
+        chunks = list(stream_zip(files))
+        self.assertGreater(len(chunks), 3)
+        
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(archive.namelist(), ['a.pdf', 'b.pdf', 'c.pdf'])
+        self.assertEqual(archive.read('c.pdf'), b'%PDF-3')
+        self.assertEqual(
+            BatchProgress.get('lote-de-prueba'),
+            {'user_id': 7, 'status': 'done', 'total': 3, 'done': 3}
+        )
+        self.assertIsNone(BatchProgress.get('../x'))
+
+
+class ImageDerivativeTestCase(TestCase):
+    """Tests para los derivados de imágenes"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        
+        from apps.organizations.models import Organization
+        self.org = f"org_{Organization.objects.create(name='Test Org', slug='test-org').pk}"
+    
+    def _upload(self, name, size=(2400, 1200), mode='RGB'):
+        from io import BytesIO
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from PIL import Image
+        
+        buffer = BytesIO()
+        Image.new(mode, size, 'red').save(buffer, 'PNG' if mode == 'RGBA' else 'JPEG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+    
+    def test_derivatives_by_content_hash(self):
+        """Test que los derivados se generan una vez, con hash de contenido y tamaño acotado"""
+        from django.core.files.storage import default_storage
+        from PIL import Image
+        from apps.core.images import ImageDerivativeService
+        
+        name = self._upload(f'{self.org}/landing/hero/portada.jpg')
+        self.assertEqual(ImageDerivativeService.upload_sizes(name), ('hero', 'medium'))
+        self.assertEqual(ImageDerivativeService.upload_sizes(f'{self.org}/otros/portada.jpg'), ())
+        
+        webp = ImageDerivativeService.get_name(name, 'medium')
+        self.assertRegex(webp, rf'^{self.org}/landing/hero/_derivatives/portada-medium-[0-9a-f]{{12}}\.webp$')
+        with default_storage.open(webp) as derivative:
+            self.assertEqual(Image.open(derivative).size, (800, 400))
+        self.assertTrue(ImageDerivativeService.get_name(name, 'medium', 'fallback').endswith('.jpg'))
+        
+        with mock.patch.object(ImageDerivativeService, 'generate') as generate:
+            self.assertEqual(ImageDerivativeService.get_name(name, 'medium'), webp)
+        generate.assert_not_called()
+        
+        # Las imágenes con transparencia usan PNG como respaldo
+        logo = self._upload(f'{self.org}/logos/logo.png', size=(100, 50), mode='RGBA')
+        self.assertTrue(ImageDerivativeService.get_name(logo, 'small', 'fallback').endswith('.png'))
+        
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(webp))
+        self.assertTrue(default_storage.exists(ImageDerivativeService.get_name(logo, 'small')))
+    
+    def test_prepare_upload_validates_and_downsizes(self):
+        """Test que las fotos subidas se validan y se reducen"""
+        from io import BytesIO
+        from PIL import Image
+        from apps.core.images import InvalidImageError, prepare_upload
+        
+        buffer = BytesIO()
+        Image.new('RGB', (3000, 2000), 'blue').save(buffer, 'PNG')
+        buffer.seek(0)
+        photo = prepare_upload(buffer, max_side=600, name='tryon_1.png')
+        self.assertEqual(photo.name, 'tryon_1.jpg')
+        self.assertEqual(Image.open(photo).size, (600, 400))
+        
+        with self.assertRaises(InvalidImageError):
+            prepare_upload(BytesIO(b'no es una imagen'), max_side=600, name='x.jpg')
+        buffer.seek(0)
+        with self.assertRaises(InvalidImageError):
+            prepare_upload(buffer, max_side=600, name='x.jpg', formats=('JPEG',))
+    
+    def test_template_tags(self):
+        """Test que los template tags retornan las URLs de los derivados"""
+        from django.template import Context, Template
+        
+        name = self._upload(f'{self.org}/ar_frames/front/montura.jpg', size=(1000, 500))
+        html = Template(
+            "{% load images %}{% picture image 'thumb' alt='Montura' %}|{% image_url empty 'thumb' %}"
+        ).render(Context({'image': name, 'empty': ''}))
+        
+        self.assertIn(f'type="image/webp" srcset="/media/{self.org}/ar_frames/front/_derivatives/montura-thumb-', html)
+        self.assertIn('alt="Montura"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertTrue(html.endswith('|'))
+
+
+class KeysetPaginatorTestCase(TestCase):
+    """Tests para la paginación por llave"""
+    
+    def setUp(self):
+        from apps.organizations.models import Organization
+        from apps.patients.models import Patient
+        
+        organization = Organization.objects.create(name='Test Org', slug='test-org')
+        base = timezone.make_aware(datetime(2024, 3, 10, 9, 0, 0, 123456))
+        for i in range(7):
+            patient = Patient.objects.create(
+                organization=organization, full_name=f'Paciente {i}', identification=f'100{i}'
+            )
+            # Tres pacientes comparten created_at (con microsegundos) para probar el desempate por id
+            Patient.objects.filter(pk=patient.pk).update(created_at=base if i < 3 else base.replace(hour=10 + i))
+        self.queryset = Patient.objects.filter(organization=organization)
+        self.expected = list(self.queryset.order_by('-created_at', '-id').values_list('pk', flat=True))
+    
+    def test_pages_forward_and_backward(self):
+        """Test que las páginas cubren todas las filas sin repetir y se puede volver atrás"""
+        from apps.core.pagination import KeysetPaginator
+        
+        paginator = KeysetPaginator(self.queryset, per_page=3)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+        self.assertEqual(
+            [p.pk for page in (first, second, third) for p in page], self.expected
+        )
+        self.assertEqual([p.pk for p in paginator.page(third.previous_cursor)], self.expected[3:6])
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual([p.pk for p in back], self.expected[:3])
+        self.assertFalse(back.has_previous)
+        self.assertEqual(paginator.count(), (7, False))
+    
+    def test_invalid_cursor_returns_first_page(self):
+        """Test que un cursor inválido retorna la primera página"""
+        from apps.core.pagination import KeysetPaginator
+        
+        paginator = KeysetPaginator(self.queryset, per_page=3)
+        cursor = paginator.page().next_cursor
+        for bad in ('no-es-un-cursor', cursor[:-4], cursor + 'x'):
+            self.assertEqual([p.pk for p in paginator.page(bad)], self.expected[:3])
+        by_name = KeysetPaginator(self.queryset, per_page=3, ordering=('full_name',))
+        self.assertEqual(by_name.ordering, ('full_name', 'id'))
@@ -0,0 +1,12 @@
+"""
+URLs de la app core
+"""
+from django.urls import path
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('cache/metrics/', views.cache_metrics, name='cache_metrics'),
+    path('pdf/lotes/<str:token>/', views.pdf_batch_progress, name='pdf_batch_progress'),
+]
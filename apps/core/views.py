@@ -0,0 +1,38 @@
+"""
+Vistas de la app core
+"""
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+
+from apps.core.cache import get_metrics
+from apps.core.pdf import BatchProgress
+
+
+@staff_member_required
+def cache_metrics(request):
+    """
+    Métricas de hit/miss de la capa de cache en JSON
+    Endpoint: /saas-admin/cache/metrics/
+    """
+    return JsonResponse({
+        'backend': settings.CACHE_BACKEND,
+        'namespaces': get_metrics(),
+    })
+
+
+@login_required
+def pdf_batch_progress(request, token):
+    """
+    Avance de un lote de PDFs (descarga de desprendibles o facturas)
+    Endpoint: /saas-admin/pdf/lotes/<token>/
+    """
+    state = BatchProgress.get(token)
+    if state is None or state['user_id'] != request.user.pk:
+        raise Http404
+    return JsonResponse({
+        'status': state['status'],
+        'total': state['total'],
+        'done': state['done'],
+    })
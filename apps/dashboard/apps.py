@@ -5,3 +5,7 @@ class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.dashboard'
     verbose_name = 'Dashboard'
+
+    def ready(self):
+        """Importar signals cuando la app esté lista."""
+        import apps.dashboard.signals  # noqa
@@ -45,16 +45,8 @@ def user_permissions(request):
             'user_role': membership.role,
         }
     
-    from apps.organizations.models import MemberModulePermission
-    
-    permissions = {}
-    for perm in MemberModulePermission.objects.filter(member=membership).select_related('module'):
-        permissions[perm.module.code] = {
-            'can_view': perm.can_view,
-            'can_create': perm.can_create,
-            'can_edit': perm.can_edit,
-            'can_delete': perm.can_delete,
-        }
+    # Permisos precompilados en el bitmap del miembro (sin consultas por módulo)
+    permissions = membership.get_module_permissions()
     
     return {
         'user_perms': permissions,
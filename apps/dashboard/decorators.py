@@ -94,15 +94,6 @@ def get_user_permissions(user):
     if membership.role in ['owner', 'admin']:
         return {'is_admin': True, 'all_access': True}
     
-    from apps.organizations.models import MemberModulePermission
-    
-    permissions = {}
-    for perm in MemberModulePermission.objects.filter(member=membership).select_related('module'):
-        permissions[perm.module.code] = {
-            'can_view': perm.can_view,
-            'can_create': perm.can_create,
-            'can_edit': perm.can_edit,
-            'can_delete': perm.can_delete,
-        }
+    permissions = membership.get_module_permissions()
     
     return permissions
@@ -0,0 +1,74 @@
+"""
+Signals del dashboard: mantienen el rollup diario de métricas (DashboardMetric)
+y los PDFs clínicos almacenados
+
+Cuando una venta, cita o paciente cambia en un día ya cerrado, se encola el
+recálculo de ese día. El día actual no se toca: siempre se calcula en vivo.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.core.pdf import PDFCache
+from apps.patients.models import ClinicalHistory, Patient
+from apps.sales.models import Sale
+from .tasks import schedule_pdf_prerender, schedule_refresh
+
+
+def _local_date(value):
+    return timezone.localdate(value) if value else None
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def refresh_rollup_on_sale_change(sender, instance, **kwargs):
+    """Recalcula el día de la venta"""
+    schedule_refresh(instance.organization_id, _local_date(instance.created_at))
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def refresh_rollup_on_patient_change(sender, instance, created=False, **kwargs):
+    """Recalcula el día de registro del paciente (solo altas y bajas)"""
+    if kwargs.get('signal') is post_save and not created:
+        return
+    schedule_refresh(instance.organization_id, _local_date(instance.created_at))
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_previous_appointment_date(sender, instance, update_fields=None, **kwargs):
+    """Guarda la fecha anterior para recalcular también el día original al reprogramar"""
+    instance._rollup_previous_date = None
+    if update_fields is not None and 'appointment_date' not in update_fields:
+        return
+    if instance.pk:
+        instance._rollup_previous_date = (
+            Appointment.objects.filter(pk=instance.pk)
+            .values_list('appointment_date', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def refresh_rollup_on_appointment_change(sender, instance, **kwargs):
+    """Recalcula el día de la cita (y el anterior si fue reprogramada)"""
+    schedule_refresh(instance.organization_id, instance.appointment_date)
+
+    previous = getattr(instance, '_rollup_previous_date', None)
+    if previous and previous != instance.appointment_date:
+        schedule_refresh(instance.organization_id, previous)
+
+
+@receiver(post_save, sender=ClinicalHistory)
+def prerender_clinical_history_pdfs_on_save(sender, instance, **kwargs):
+    """Pre-renderiza los PDFs de la historia (el hash de contenido descarta los anteriores)"""
+    schedule_pdf_prerender(instance)
+
+
+@receiver(post_delete, sender=ClinicalHistory)
+def delete_clinical_history_pdfs(sender, instance, **kwargs):
+    """Elimina los PDFs almacenados de la historia"""
+    PDFCache.invalidate('clinical_history', instance.organization_id, instance.pk)
+    PDFCache.invalidate('visual_exam', instance.organization_id, instance.pk)
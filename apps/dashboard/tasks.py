@@ -0,0 +1,110 @@
+"""
+Jobs en segundo plano del dashboard: rollup diario de métricas y
+pre-renderizado de PDFs clínicos
+"""
+import logging
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.jobs.registry import job
+
+logger = logging.getLogger(__name__)
+
+
+@job(queue='analytics')
+def refresh_daily_metrics(organization_id, day):
+    """
+    Recalcula el rollup de un día cerrado de una organización
+
+    Lo encolan los signals de ventas, citas y pacientes cuando un cambio
+    afecta un día anterior a hoy.
+    """
+    from apps.organizations.models import Organization
+    from apps.dashboard.utils_analytics import MetricsCalculator
+
+    organization = Organization.objects.filter(pk=organization_id).first()
+    if organization is None:
+        return None
+
+    day = date.fromisoformat(day)
+    MetricsCalculator(organization).store_daily_metrics(day)
+    return {'organization_id': organization_id, 'date': day.isoformat()}
+
+
+@job(queue='analytics', every=timedelta(days=1), at=time(0, 15))
+def compact_daily_metrics(days=1):
+    """
+    Cierra los últimos `days` días en el rollup de todas las organizaciones
+    activas (corre cada noche después de medianoche, hora local)
+    """
+    from apps.organizations.models import Organization
+    from apps.dashboard.utils_analytics import MetricsCalculator
+
+    yesterday = timezone.localdate() - timedelta(days=1)
+    start = yesterday - timedelta(days=days - 1)
+    processed = 0
+
+    for organization in Organization.objects.filter(is_active=True).iterator():
+        try:
+            calculator = MetricsCalculator(organization)
+            day = start
+            while day <= yesterday:
+                calculator.store_daily_metrics(day)
+                day += timedelta(days=1)
+            processed += 1
+        except Exception as e:
+            logger.error(f"Error compactando métricas de {organization.name}: {e}", exc_info=True)
+
+    logger.info(f"Rollup diario compactado para {processed} organizaciones")
+    return {'organizations': processed, 'start': start.isoformat(), 'end': yesterday.isoformat()}
+
+
+def schedule_refresh(organization_id, day):
+    """
+    Encola el recálculo del rollup si `day` ya está cerrado
+
+    El día actual se calcula siempre en vivo, así que no necesita rollup.
+    """
+    if organization_id is None or day is None or day >= timezone.localdate():
+        return None
+    return refresh_daily_metrics.enqueue(
+        args=[organization_id, day.isoformat()],
+        unique_key=f"dashboard-rollup:{organization_id}:{day.isoformat()}"
+    )
+
+
+@job(queue='pdf')
+def prerender_clinical_history_pdfs(history_id):
+    """
+    Genera y guarda los PDFs de una historia clínica (historia completa y
+    fórmula del examen visual con todas las secciones) para que la descarga
+    se sirva directamente desde el almacenamiento
+    """
+    from apps.patients.models import ClinicalHistory
+    from apps.dashboard.views_clinical import get_clinical_history_pdf, get_visual_exam_pdf
+
+    history = (
+        ClinicalHistory.objects.unscoped()
+        .select_related('patient', 'doctor', 'organization')
+        .filter(pk=history_id)
+        .first()
+    )
+    if history is None:
+        return None
+
+    get_clinical_history_pdf(history, history.organization)
+    get_visual_exam_pdf(history, history.organization)
+    return {'history_id': history_id}
+
+
+def schedule_pdf_prerender(history):
+    """Encola el pre-renderizado (agrupa guardados seguidos de la misma historia)"""
+    if not settings.PDF_PRERENDER:
+        return None
+    return prerender_clinical_history_pdfs.enqueue(
+        args=[history.pk],
+        delay=60,
+        unique_key=f"pdf-prerender:clinical_history:{history.pk}"
+    )
@@ -1,3 +1,231 @@
+"""
+Tests para el dashboard
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.dashboard.models_analytics import DashboardMetric, HeatmapData
+from apps.dashboard.utils_analytics import MetricsCalculator
+from apps.jobs.models import Job
+from apps.organizations.models import Organization
+from apps.sales.models import Sale
+
+
+class DailyMetricsRollupTestCase(TestCase):
+    """Tests para el rollup diario de métricas"""
+
+    def setUp(self):
+        """Setup test data"""
+        self.org = Organization.objects.create(name='Test Org', slug='test-org')
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        self.sequence = 0
+
+    def create_sale(self, day, total):
+        self.sequence += 1
+        sale = Sale.objects.create(
+            organization=self.org,
+            sale_number=f'V-{self.sequence}',
+            payment_method='cash',
+            total=Decimal(total)
+        )
+        created_at = timezone.make_aware(datetime.combine(day, time(12, 0)))
+        Sale.objects.filter(pk=sale.pk).update(created_at=created_at)
+        return sale
+
+    def create_appointment(self, day, status='pending'):
+        self.sequence += 1
+        return Appointment.objects.create(
+            organization=self.org,
+            full_name='Paciente',
+            phone_number='3000000000',
+            appointment_date=day,
+            appointment_time=time(8 + self.sequence, 0),
+            status=status
+        )
+
+    def test_store_daily_metrics(self):
+        """Test guardar el rollup de un día"""
+        self.create_sale(self.yesterday, '100')
+        self.create_sale(self.yesterday, '50')
+        self.create_appointment(self.yesterday, status='completed')
+        self.create_appointment(self.yesterday)
+
+        MetricsCalculator(self.org).store_daily_metrics(self.yesterday)
+
+        revenue = DashboardMetric.objects.get(organization=self.org, date=self.yesterday, metric_type='revenue')
+        self.assertEqual(revenue.value, Decimal('150'))
+        self.assertEqual(revenue.count, 2)
+        conversion = DashboardMetric.objects.get(organization=self.org, date=self.yesterday, metric_type='conversion')
+        self.assertEqual(conversion.value, Decimal('50'))
+
+        # El upsert no duplica filas
+        MetricsCalculator(self.org).store_daily_metrics(self.yesterday)
+        self.assertEqual(DashboardMetric.objects.filter(organization=self.org, date=self.yesterday).count(), 4)
+
+    def test_kpi_summary_reads_rollup_for_closed_days(self):
+        """Test que ayer se lee del rollup y hoy se calcula en vivo"""
+        self.create_sale(self.yesterday, '80')
+        self.create_sale(self.today, '120')
+        MetricsCalculator(self.org).store_daily_metrics(self.yesterday)
+
+        # Un cambio directo en la tabla de origen no altera el día cerrado
+        Sale.objects.filter(organization=self.org).update(total=Decimal('1'))
+        kpis = MetricsCalculator(self.org).get_kpi_summary()
+
+        self.assertEqual(kpis['revenue_today']['value'], Decimal('1'))
+        self.assertEqual(kpis['revenue_today']['previous'], Decimal('80'))
+
+    def test_period_totals_backfill_missing_days(self):
+        """Test totales del período con relleno de días faltantes"""
+        start = self.today - timedelta(days=3)
+        self.create_sale(start, '10')
+        self.create_sale(self.yesterday, '20')
+        self.create_sale(self.today, '5')
+
+        calculator = MetricsCalculator(self.org)
+        totals = calculator.get_period_totals(start, self.today)
+
+        self.assertEqual(totals['revenue']['value'], Decimal('35'))
+        self.assertEqual(totals['revenue']['count'], 3)
+        self.assertEqual(
+            DashboardMetric.objects.filter(organization=self.org, metric_type='revenue').count(), 3
+        )
+        self.assertEqual(calculator.ensure_rollup(start, self.today), 0)
+
+    def test_signal_enqueues_refresh_for_closed_day(self):
+        """Test que un cambio en un día cerrado encola el recálculo"""
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.create_appointment(self.today)
+        self.assertFalse(Job.objects.filter(name='apps.dashboard.tasks.refresh_daily_metrics').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_date = self.yesterday
+            appointment.save()
+
+        job = Job.objects.get(name='apps.dashboard.tasks.refresh_daily_metrics')
+        self.assertEqual(job.args, [self.org.pk, self.yesterday.isoformat()])
+
+
+class HeatmapTestCase(TestCase):
+    """Tests para el heatmap de horarios"""
+
+    def setUp(self):
+        """Setup test data"""
+        self.org = Organization.objects.create(name='Test Org', slug='test-org')
+        self.today = timezone.localdate()
+        # Último lunes dentro de la ventana
+        self.monday = self.today - timedelta(days=self.today.weekday() or 7)
+
+    def create_appointment(self, day, hour, status='confirmed'):
+        return Appointment.objects.create(
+            organization=self.org,
+            full_name='Paciente',
+            phone_number='3000000000',
+            appointment_date=day,
+            appointment_time=time(hour, 30),
+            status=status
+        )
+
+    def test_heatmap_grouped_with_revenue(self):
+        """Test agrupación por día/hora con ingresos de facturas"""
+        from apps.billing.models import Invoice
+        from apps.patients.models import Patient
+
+        patient = Patient.objects.create(organization=self.org, full_name='Paciente', phone_number='3000000000')
+        first = self.create_appointment(self.monday, 9)
+        self.create_appointment(self.monday - timedelta(days=7), 9, status='completed')
+        self.create_appointment(self.monday, 15, status='cancelled')
+        Invoice.objects.create(
+            organization=self.org,
+            patient=patient,
+            prefijo='F', numero=1, numero_completo='F1',
+            cliente_tipo_documento='CC', cliente_numero_documento='1', cliente_nombre='Paciente',
+            fecha_emision=timezone.now(),
+            appointment=first,
+            total=Decimal('200')
+        )
+
+        data = MetricsCalculator(self.org).calculate_heatmap_data(days=30)
+
+        self.assertEqual(data, {(0, 9): {'count': 2, 'revenue': Decimal('200')}})
+        self.assertEqual(HeatmapData.objects.filter(organization=self.org).count(), 7 * 24)
+
+    def test_recent_matrix_served_from_table(self):
+        """Test que un GET reciente lee la matriz guardada sin recalcular"""
+        self.create_appointment(self.monday, 10)
+        calculator = MetricsCalculator(self.org)
+        calculator.calculate_heatmap_data(days=30)
+        self.create_appointment(self.monday, 11)
+
+        with self.assertNumQueries(1):
+            data = calculator.get_heatmap_data(days=30)
+        self.assertEqual(list(data), [(0, 10)])
+
+        data = calculator.get_heatmap_data(days=30, max_age=0)
+        self.assertIn((0, 11), data)
+
+
+class ClinicalPDFTestCase(TestCase):
+    """Tests para los PDFs clínicos almacenados por hash de contenido"""
+
+    def setUp(self):
+        """Setup test data"""
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        from apps.patients.models import ClinicalHistory, Patient
+
+        pdf_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pdf_root, ignore_errors=True)
+        pdf_override = override_settings(PDF_CACHE_ROOT=pdf_root)
+        pdf_override.enable()
+        self.addCleanup(pdf_override.disable)
+
+        self.org = Organization.objects.create(name='Test Org', slug='test-org')
+        patient = Patient.objects.create(organization=self.org, full_name='Paciente', phone_number='3000000000')
+        self.history = ClinicalHistory.objects.create(
+            organization=self.org,
+            patient=patient,
+            date=timezone.localdate(),
+            chief_complaint='Visión borrosa',
+        )
+
+    def test_pdf_rendered_once_until_history_changes(self):
+        """Test que el PDF se sirve del almacenamiento hasta que la historia cambia"""
+        from unittest import mock
+        from apps.dashboard import views_clinical
+
+        with mock.patch.object(
+            views_clinical, 'render_clinical_history_pdf', wraps=views_clinical.render_clinical_history_pdf
+        ) as render:
+            path = views_clinical.get_clinical_history_pdf(self.history, self.org)
+            self.assertEqual(views_clinical.get_clinical_history_pdf(self.history, self.org), path)
+            self.assertEqual(render.call_count, 1)
+            self.assertTrue(path.read_bytes().startswith(b'%PDF'))
+
+            self.history.chief_complaint = 'Cefalea'
+            self.history.save()
+            new_path = views_clinical.get_clinical_history_pdf(self.history, self.org)
+
+        self.assertEqual(render.call_count, 2)
+        self.assertNotEqual(new_path, path)
+        self.assertFalse(path.exists())
+
+    def test_visual_exam_sections_are_separate_variants(self):
+        """Test que cada selección de secciones se guarda por separado"""
+        from apps.dashboard.views_clinical import get_visual_exam_pdf
+
+        full = get_visual_exam_pdf(self.history, self.org)
+        partial = get_visual_exam_pdf(self.history, self.org, ['refraccion', 'motivo'])
+
+        self.assertTrue(full.name.startswith('all-'))
+        self.assertTrue(partial.name.startswith('motivo-refraccion-'))
+        self.assertTrue(full.exists() and partial.exists())
 
-# Create your tests here.
+        self.history.delete()
+        self.assertFalse(full.exists() or partial.exists())
@@ -25,6 +25,7 @@ from .views_ar_tryon import (
     ar_tryon_session_detail,
     api_record_try_on,
     api_save_photo,
+    api_upload_photo,
     api_rate_frame,
     api_frame_details,
     api_detect_face_shape,
@@ -81,6 +82,7 @@ urlpatterns = [
     path('ar-tryon/sessions/<int:session_id>/', ar_tryon_session_detail, name='ar_tryon_session_detail'),
     path('ar-tryon/api/record-try-on/', api_record_try_on, name='api_record_try_on'),
     path('ar-tryon/api/save-photo/', api_save_photo, name='api_save_photo'),
+    path('ar-tryon/api/records/<int:record_id>/photo/', api_upload_photo, name='api_upload_photo'),
     path('ar-tryon/api/rate-frame/', api_rate_frame, name='api_rate_frame'),
     path('ar-tryon/api/frame/<int:frame_id>/', api_frame_details, name='api_frame_details'),
     path('ar-tryon/api/detect-face-shape/', api_detect_face_shape, name='api_detect_face_shape'),
@@ -1,31 +1,47 @@
 """
 Utilidades para cálculo de métricas y analytics
 """
+import json
 from datetime import datetime, timedelta
-from django.db.models import Sum, Count, Avg, Q, F
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Count, Avg, Q, F, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce, ExtractHour, ExtractIsoWeekDay
 from django.utils import timezone
 from decimal import Decimal
 
 from apps.appointments.models import Appointment
+from apps.billing.models import Invoice
 from apps.sales.models import Sale
 from apps.patients.models import Patient
+from apps.core.date_ranges import local_day_range, range_filter, start_of_day
 from .models_analytics import DashboardMetric, HeatmapData, CustomerSatisfaction
 
+# Tipos de métrica guardados en el rollup diario (DashboardMetric)
+ROLLUP_METRICS = ('revenue', 'appointments', 'patients', 'conversion')
+DECIMAL_METRICS = ('revenue', 'conversion')
+
 
 class MetricsCalculator:
     """Calculador de métricas del dashboard"""
     
     def __init__(self, organization):
         self.organization = organization
-        self.today = timezone.now().date()
+        self.today = timezone.localdate()
         self.yesterday = self.today - timedelta(days=1)
         self.week_start = self.today - timedelta(days=self.today.weekday())
         self.month_start = self.today.replace(day=1)
         self.last_month_start = (self.month_start - timedelta(days=1)).replace(day=1)
         self.last_month_end = self.month_start - timedelta(days=1)
+        self._today_metrics = None
+    
+    def _day_filters(self, field, start, end=None):
+        """Filtro de rango semiabierto en hora local para un campo DateTimeField"""
+        range_start, range_end = local_day_range(start, end or start)
+        return {f'{field}__gte': range_start, f'{field}__lt': range_end}
     
     def calculate_daily_metrics(self, date=None):
-        """Calcula métricas para un día específico"""
+        """Calcula métricas para un día específico desde las tablas de origen"""
         if date is None:
             date = self.today
         
@@ -34,32 +50,34 @@ class MetricsCalculator:
         # Ingresos del día
         revenue = Sale.objects.filter(
             organization=self.organization,
-            created_at__date=date
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0')
+            **self._day_filters('created_at', date)
+        ).aggregate(total=Sum('total'), count=Count('id'))
         
         metrics['revenue'] = {
-            'value': revenue,
-            'count': Sale.objects.filter(organization=self.organization, created_at__date=date).count()
+            'value': revenue['total'] or Decimal('0'),
+            'count': revenue['count']
         }
         
         # Citas del día
         appointments = Appointment.objects.filter(
             organization=self.organization,
-            date=date
+            appointment_date=date
+        ).aggregate(
+            count=Count('id'),
+            confirmed=Count('id', filter=Q(status='confirmed')),
+            completed=Count('id', filter=Q(status='completed')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
         )
         
         metrics['appointments'] = {
-            'value': appointments.count(),
-            'count': appointments.count(),
-            'confirmed': appointments.filter(status='confirmed').count(),
-            'completed': appointments.filter(status='completed').count(),
-            'cancelled': appointments.filter(status='cancelled').count(),
+            'value': appointments['count'],
+            **appointments
         }
         
         # Pacientes nuevos
         new_patients = Patient.objects.filter(
             organization=self.organization,
-            created_at__date=date
+            **self._day_filters('created_at', date)
         ).count()
         
         metrics['patients'] = {
@@ -67,19 +85,135 @@ class MetricsCalculator:
             'count': new_patients
         }
         
-        # Tasa de conversión (citas confirmadas / total de citas)
+        # Tasa de conversión (citas completadas / total de citas)
         if metrics['appointments']['count'] > 0:
             conversion = (metrics['appointments']['completed'] / metrics['appointments']['count']) * 100
         else:
             conversion = 0
         
         metrics['conversion'] = {
-            'value': Decimal(str(conversion)),
+            'value': Decimal(str(round(conversion, 2))),
             'count': metrics['appointments']['completed']
         }
         
         return metrics
     
+    # ==================== ROLLUP DIARIO ====================
+    
+    def store_daily_metrics(self, date):
+        """
+        Recalcula y guarda en DashboardMetric las métricas de un día
+        
+        Un upsert en lote por día (una fila por tipo de métrica).
+        """
+        metrics = self.calculate_daily_metrics(date)
+        rows = []
+        for metric_type in ROLLUP_METRICS:
+            data = metrics[metric_type]
+            details = {k: v for k, v in data.items() if k not in ('value', 'count')}
+            rows.append(DashboardMetric(
+                organization=self.organization,
+                date=date,
+                metric_type=metric_type,
+                value=data['value'],
+                count=data['count'],
+                details=json.dumps(details),
+            ))
+        
+        DashboardMetric.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['organization', 'date', 'metric_type'],
+            update_fields=['value', 'count', 'details', 'updated_at'],
+        )
+        return metrics
+    
+    def ensure_rollup(self, start, end):
+        """
+        Garantiza que existan filas de rollup para los días cerrados en
+        [start, end]; calcula solo los días faltantes
+        """
+        end = min(end, self.yesterday)
+        if start > end:
+            return 0
+        
+        existing = set(DashboardMetric.objects.filter(
+            organization=self.organization,
+            metric_type='revenue',
+            date__gte=start,
+            date__lte=end
+        ).values_list('date', flat=True))
+        
+        missing = [
+            start + timedelta(days=offset)
+            for offset in range((end - start).days + 1)
+            if start + timedelta(days=offset) not in existing
+        ]
+        for day in missing:
+            self.store_daily_metrics(day)
+        return len(missing)
+    
+    def get_today_metrics(self):
+        """Métricas del día actual (parcial), calculadas en vivo una vez por instancia"""
+        if self._today_metrics is None:
+            self._today_metrics = self.calculate_daily_metrics(self.today)
+        return self._today_metrics
+    
+    def get_daily_metrics(self, date):
+        """
+        Métricas de un día: el día actual (parcial) se calcula en vivo y los
+        días cerrados se leen del rollup
+        """
+        if date == self.today:
+            return self.get_today_metrics()
+        if date > self.today:
+            return self.calculate_daily_metrics(date)
+        
+        rows = DashboardMetric.objects.filter(
+            organization=self.organization,
+            date=date,
+            metric_type__in=ROLLUP_METRICS
+        )
+        metrics = {}
+        for row in rows:
+            metrics[row.metric_type] = {
+                'value': row.value if row.metric_type in DECIMAL_METRICS else int(row.value),
+                'count': row.count,
+                **json.loads(row.details or '{}'),
+            }
+        
+        if len(metrics) < len(ROLLUP_METRICS):
+            return self.store_daily_metrics(date)
+        return metrics
+    
+    def get_period_totals(self, start, end):
+        """
+        Totales de un período sumando filas del rollup (días cerrados) más el
+        día actual en vivo si está dentro del período
+        
+        Returns:
+            dict: {metric_type: {'value': Decimal, 'count': int}}
+        """
+        self.ensure_rollup(start, end)
+        
+        totals = {metric_type: {'value': Decimal('0'), 'count': 0} for metric_type in ROLLUP_METRICS}
+        rows = DashboardMetric.objects.filter(
+            organization=self.organization,
+            date__gte=start,
+            date__lte=min(end, self.yesterday),
+            metric_type__in=ROLLUP_METRICS
+        ).values('metric_type').annotate(value=Sum('value'), count=Sum('count')).order_by()
+        for row in rows:
+            totals[row['metric_type']] = {'value': row['value'] or Decimal('0'), 'count': row['count'] or 0}
+        
+        if start <= self.today <= end:
+            today_metrics = self.get_today_metrics()
+            for metric_type in ROLLUP_METRICS:
+                totals[metric_type]['value'] += Decimal(str(today_metrics[metric_type]['value']))
+                totals[metric_type]['count'] += today_metrics[metric_type]['count']
+        
+        return totals
+    
     def calculate_comparison(self, current_value, previous_value):
         """Calcula el porcentaje de cambio entre dos valores"""
         if previous_value == 0:
@@ -90,8 +224,8 @@ class MetricsCalculator:
     
     def get_kpi_summary(self):
         """Obtiene resumen de KPIs principales"""
-        today_metrics = self.calculate_daily_metrics(self.today)
-        yesterday_metrics = self.calculate_daily_metrics(self.yesterday)
+        today_metrics = self.get_daily_metrics(self.today)
+        yesterday_metrics = self.get_daily_metrics(self.yesterday)
         
         kpis = {
             'revenue_today': {
@@ -136,34 +270,20 @@ class MetricsCalculator:
     
     def get_monthly_comparison(self):
         """Compara mes actual vs mes anterior"""
-        # Mes actual
-        current_month_revenue = Sale.objects.filter(
-            organization=self.organization,
-            created_at__date__gte=self.month_start,
-            created_at__date__lte=self.today
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0')
-        
-        current_month_appointments = Appointment.objects.filter(
-            organization=self.organization,
-            date__gte=self.month_start,
-            date__lte=self.today
-        ).count()
-        
         # Mes anterior (mismo período)
         days_elapsed = (self.today - self.month_start).days + 1
-        last_month_period_end = self.last_month_start + timedelta(days=days_elapsed - 1)
+        last_month_period_end = min(
+            self.last_month_start + timedelta(days=days_elapsed - 1),
+            self.last_month_end
+        )
         
-        last_month_revenue = Sale.objects.filter(
-            organization=self.organization,
-            created_at__date__gte=self.last_month_start,
-            created_at__date__lte=last_month_period_end
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0')
+        current = self.get_period_totals(self.month_start, self.today)
+        previous = self.get_period_totals(self.last_month_start, last_month_period_end)
         
-        last_month_appointments = Appointment.objects.filter(
-            organization=self.organization,
-            date__gte=self.last_month_start,
-            date__lte=last_month_period_end
-        ).count()
+        current_month_revenue = current['revenue']['value']
+        last_month_revenue = previous['revenue']['value']
+        current_month_appointments = int(current['appointments']['value'])
+        last_month_appointments = int(previous['appointments']['value'])
         
         return {
             'revenue': {
@@ -181,59 +301,113 @@ class MetricsCalculator:
             }
         }
     
-    def calculate_heatmap_data(self, days=30):
-        """Calcula datos para heatmap de horarios populares"""
+    def _heatmap_period(self, days):
         end_date = self.today
-        start_date = end_date - timedelta(days=days)
+        return end_date - timedelta(days=days), end_date
+    
+    def calculate_heatmap_data(self, days=30):
+        """
+        Calcula datos para heatmap de horarios populares
+        
+        Una sola consulta agrupa las citas confirmadas/completadas por día de
+        la semana y hora, sumando con una subconsulta los ingresos de las
+        facturas asociadas a cada cita. La matriz completa (7x24) se guarda
+        con un upsert en lote para el período.
+        """
+        start_date, end_date = self._heatmap_period(days)
+        
+        invoice_revenue = Invoice.objects.filter(
+            appointment=OuterRef('pk'),
+            estado_pago__in=['unpaid', 'partial', 'paid']
+        ).values('appointment').annotate(total=Sum('total')).values('total')
+        
+        rows = (
+            Appointment.objects.filter(
+                organization=self.organization,
+                appointment_date__gte=start_date,
+                appointment_date__lte=end_date,
+                status__in=['confirmed', 'completed']
+            )
+            .annotate(
+                weekday=ExtractIsoWeekDay('appointment_date'),
+                hour=ExtractHour('appointment_time'),
+                revenue=Coalesce(
+                    Subquery(invoice_revenue, output_field=DecimalField(max_digits=12, decimal_places=2)),
+                    Value(Decimal('0')),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)
+                ),
+            )
+            .values('weekday', 'hour')
+            .annotate(count=Count('id'), revenue_total=Sum('revenue'))
+            .order_by()
+        )
         
-        appointments = Appointment.objects.filter(
-            organization=self.organization,
-            date__gte=start_date,
-            date__lte=end_date,
-            status__in=['confirmed', 'completed']
-        ).select_related('patient')
-        
-        # Agrupar por día de la semana y hora
-        heatmap_data = {}
-        
-        for appointment in appointments:
-            day_of_week = appointment.date.weekday()
-            # Extraer hora del time_slot (formato "HH:MM")
-            if appointment.time_slot:
-                hour = int(appointment.time_slot.split(':')[0])
-            else:
-                continue
-            
-            key = (day_of_week, hour)
-            if key not in heatmap_data:
-                heatmap_data[key] = {
-                    'count': 0,
-                    'revenue': Decimal('0')
-                }
-            
-            heatmap_data[key]['count'] += 1
-            
-            # Si hay venta asociada, sumar al revenue
-            if hasattr(appointment, 'sales'):
-                for sale in appointment.sales.all():
-                    heatmap_data[key]['revenue'] += sale.total
-        
-        # Guardar o actualizar en la base de datos
-        for (day_of_week, hour), data in heatmap_data.items():
-            HeatmapData.objects.update_or_create(
+        # ISO: 1 = lunes ... 7 = domingo → 0 = lunes ... 6 = domingo
+        heatmap_data = {
+            (row['weekday'] - 1, row['hour']): {
+                'count': row['count'],
+                'revenue': row['revenue_total'] or Decimal('0')
+            }
+            for row in rows
+        }
+        
+        cells = [
+            HeatmapData(
                 organization=self.organization,
                 day_of_week=day_of_week,
                 hour=hour,
                 period_start=start_date,
                 period_end=end_date,
-                defaults={
-                    'appointment_count': data['count'],
-                    'revenue_total': data['revenue']
-                }
+                appointment_count=heatmap_data.get((day_of_week, hour), {}).get('count', 0),
+                revenue_total=heatmap_data.get((day_of_week, hour), {}).get('revenue', Decimal('0')),
             )
+            for day_of_week in range(7)
+            for hour in range(24)
+        ]
+        
+        with transaction.atomic():
+            HeatmapData.objects.bulk_create(
+                cells,
+                update_conflicts=True,
+                unique_fields=['organization', 'day_of_week', 'hour', 'period_start', 'period_end'],
+                update_fields=['appointment_count', 'revenue_total', 'updated_at'],
+            )
+            # Los períodos anteriores quedan obsoletos al avanzar el día
+            HeatmapData.objects.filter(
+                organization=self.organization,
+                period_end__lt=end_date
+            ).delete()
         
         return heatmap_data
     
+    def get_heatmap_data(self, days=30, max_age=None):
+        """
+        Heatmap del período, leído de HeatmapData si se calculó hace menos de
+        `max_age` segundos; si no, se recalcula
+        """
+        if max_age is None:
+            max_age = getattr(settings, 'DASHBOARD_HEATMAP_MAX_AGE', 900)
+        start_date, end_date = self._heatmap_period(days)
+        
+        cells = list(HeatmapData.objects.filter(
+            organization=self.organization,
+            period_start=start_date,
+            period_end=end_date,
+            updated_at__gte=timezone.now() - timedelta(seconds=max_age)
+        ).values('day_of_week', 'hour', 'appointment_count', 'revenue_total'))
+        
+        if len(cells) < 7 * 24:
+            return self.calculate_heatmap_data(days=days)
+        
+        return {
+            (cell['day_of_week'], cell['hour']): {
+                'count': cell['appointment_count'],
+                'revenue': cell['revenue_total']
+            }
+            for cell in cells
+            if cell['appointment_count']
+        }
+    
     def get_satisfaction_summary(self):
         """Obtiene resumen de satisfacción del cliente"""
         # Últimas 100 encuestas
@@ -287,7 +461,7 @@ class MetricsCalculator:
         
         top_items = SaleItem.objects.filter(
             sale__organization=self.organization,
-            sale__created_at__date__gte=self.month_start
+            sale__created_at__gte=start_of_day(self.month_start)
         ).values('product__name').annotate(
             total_sold=Sum('quantity'),
             total_revenue=Sum(F('quantity') * F('price'))
@@ -302,8 +476,7 @@ class MetricsCalculator:
         
         daily_revenue = Sale.objects.filter(
             organization=self.organization,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
+            **range_filter('created_at', *local_day_range(start_date, end_date))
         ).values('created_at__date').annotate(
             total=Sum('total')
         ).order_by('created_at__date')
@@ -40,6 +40,8 @@ from apps.appointments.models import (
 from apps.patients.models import Patient
 from apps.sales.models import Sale
 from apps.billing.models import Invoice, Payment
+from apps.core.date_ranges import period_dates, period_range, range_filter
+from apps.core.pagination import KeysetPaginator
 from decimal import Decimal
 from apps.appointments.utils import (
     get_available_slots_for_date,
@@ -346,7 +348,8 @@ def dashboard_home(request):
         messages.info(request, 'Por favor selecciona una empresa para comenzar')
         return redirect('organizations:list')
     
-    today = timezone.now().date()
+    today = timezone.localdate()
+    today_range = range_filter('created_at', *period_range('day', today))
     
     # Filtrar por organización si existe
     org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
@@ -355,9 +358,9 @@ def dashboard_home(request):
     today_appointments = Appointment.objects.filter(appointment_date=today, **org_filter)
     
     # Estadísticas de ventas
-    today_sales = Sale.objects.filter(created_at__date=today, status='completed', **org_filter)
+    today_sales = Sale.objects.filter(**today_range, status='completed', **org_filter)
     today_revenue = sum(sale.total for sale in today_sales)
-    month_sales = Sale.objects.filter(created_at__date__year=today.year, created_at__date__month=today.month, status='completed', **org_filter)
+    month_sales = Sale.objects.filter(**range_filter('created_at', *period_range('month', today)), status='completed', **org_filter)
     month_revenue = sum(sale.total for sale in month_sales)
     
     stats = {
@@ -410,8 +413,7 @@ def dashboard_home(request):
     # ===== ESTADÍSTICAS DE FACTURACIÓN =====
     # Facturas del mes actual
     invoices_month = Invoice.objects.filter(
-        fecha_emision__year=today.year,
-        fecha_emision__month=today.month,
+        **range_filter('fecha_emision', *period_range('month', today)),
         **org_filter
     )
     
@@ -464,7 +466,7 @@ def dashboard_home(request):
     
     # Movimientos de hoy
     today_movements = CashMovement.objects.filter(
-        created_at__date=today,
+        **today_range,
         **org_filter
     )
     
@@ -581,7 +583,12 @@ def appointments_list(request):
             Q(phone_number__icontains=search)
         )
     
-    all_appointments = all_appointments.order_by('-appointment_date', '-appointment_time')
+    # Paginación por llave (fecha, hora, id); el total es estimado salvo que se pida exacto
+    paginator = KeysetPaginator(
+        all_appointments, per_page=50, ordering=('-appointment_date', '-appointment_time', '-id')
+    )
+    total_appointments, total_is_estimate = paginator.count(exact=request.GET.get('exact_count') == '1')
+    all_appointments = paginator.page(request.GET.get('cursor'))
     
     # Estadísticas
     stats = get_appointments_stats()
@@ -593,6 +600,8 @@ def appointments_list(request):
         'today_appointments': today_appointments,
         'appointments': all_appointments,  # Para list.html
         'all_appointments': all_appointments,  # Para index.html
+        'total_appointments': total_appointments,
+        'total_is_estimate': total_is_estimate,
         'status_choices': Appointment.STATUS_CHOICES,
         'doctors': doctors,
         'today': today,
@@ -719,9 +728,6 @@ def appointment_edit(request, pk):
                     }, status=400)
             
             # Actualizar la cita
-            old_date = appointment.appointment_date
-            old_time = appointment.appointment_time
-            
             appointment.appointment_date = new_date
             appointment.appointment_time = new_time
             if notes:
@@ -739,16 +745,9 @@ def appointment_edit(request, pk):
             
             appointment.save()
             
-            # Notificar cambio
+            # Notificar cambio (la notificación al paciente la encola el signal post_save)
             notify_appointment_updated(appointment)
             
-            # Enviar notificación al paciente sobre el cambio
-            try:
-                from apps.appointments.notifications import notify_appointment_rescheduled
-                notify_appointment_rescheduled(appointment, old_date, old_time)
-            except:
-                pass
-            
             return JsonResponse({
                 'success': True,
                 'message': f'Cita reagendada para {new_date.strftime("%d/%m/%Y")} a las {new_time.strftime("%H:%M")}'
@@ -783,19 +782,9 @@ def appointment_change_status(request, pk):
             
             appointment.save()
             
-            # Notificar cambio en tiempo real
+            # Notificar cambio en tiempo real (la cancelación al paciente la encola el signal post_save)
             notify_appointment_updated(appointment)
             
-            # Enviar notificación si se cancela la cita (WhatsApp/Email según entorno)
-            if new_status == 'cancelled':
-                try:
-                    from apps.appointments.notifications import notify_appointment_cancelled
-                    notify_appointment_cancelled(appointment)
-                except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Error al enviar notificación de cancelación: {e}")
-            
             return JsonResponse({
                 'success': True,
                 'message': f'Estado cambiado a {appointment.get_status_display()}'
@@ -991,9 +980,10 @@ def calendar_view(request):
     
     # Obtener todas las citas del mes
     org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
+    month_start, month_end = period_dates('month', datetime(year, month, 1).date())
     appointments = Appointment.objects.filter(
-        appointment_date__year=year,
-        appointment_date__month=month,
+        appointment_date__gte=month_start,
+        appointment_date__lt=month_end,
         **org_filter
     ).values('appointment_date').annotate(count=Count('id'))
     
@@ -120,11 +120,14 @@ def api_heatmap_data(request):
     if not request.organization:
         return JsonResponse({'error': 'No organization'}, status=400)
     
-    days = int(request.GET.get('days', 30))
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
     calculator = MetricsCalculator(request.organization)
     
-    # Calcular y guardar datos
-    heatmap_data = calculator.calculate_heatmap_data(days=days)
+    # Matriz guardada si es reciente; si no, se recalcula y guarda
+    heatmap_data = calculator.get_heatmap_data(days=days)
     
     # Formatear para visualización
     formatted_data = []
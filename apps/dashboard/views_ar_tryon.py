@@ -3,13 +3,17 @@ Vistas para AR Virtual Try-On
 """
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.db.models import Q, Count, Avg
 from django.core.files.base import ContentFile
+from tempfile import SpooledTemporaryFile
 import base64
 import json
 
+from apps.core.images import InvalidImageError, prepare_upload
+
 from .models_ar_tryon import (
     FrameCategory,
     Frame,
@@ -176,10 +180,98 @@ def api_record_try_on(request):
         return JsonResponse({'error': str(e)}, status=400)
 
 
+def _store_tryon_photo(record, source):
+    """Valida, reduce y guarda la foto de una prueba (reemplaza la anterior)"""
+    photo_file = prepare_upload(
+        source,
+        max_side=settings.AR_TRYON_PHOTO_MAX_SIDE,
+        name=f'tryon_{record.id}.jpg'
+    )
+    previous = record.photo.name
+    try:
+        record.photo.save(photo_file.name, photo_file, save=False)
+    finally:
+        photo_file.close()
+    record.save(update_fields=['photo'])
+    
+    if previous and previous != record.photo.name:
+        record.photo.storage.delete(previous)
+
+
+def _read_body(request, max_bytes):
+    """
+    Copia el cuerpo binario de la petición a un archivo temporal por bloques
+
+    Returns:
+        SpooledTemporaryFile, o None si el cuerpo excede `max_bytes`
+    """
+    content_length = request.META.get('CONTENT_LENGTH')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        return None
+    
+    body = SpooledTemporaryFile(max_size=1024 * 1024)
+    received = 0
+    for chunk in iter(lambda: request.read(64 * 1024), b''):
+        received += len(chunk)
+        if received > max_bytes:
+            body.close()
+            return None
+        body.write(chunk)
+    body.seek(0)
+    return body
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_upload_photo(request, record_id):
+    """
+    API para subir la foto de una prueba sin base64
+
+    Acepta multipart/form-data (campo `photo`) o el archivo como cuerpo de la
+    petición (Content-Type: image/jpeg, image/png o image/webp). El archivo
+    se recibe por bloques, se valida con Pillow y se guarda reducido.
+    """
+    if not request.organization:
+        return JsonResponse({'error': 'No organization'}, status=400)
+    
+    record = get_object_or_404(FrameTryOnRecord, id=record_id, session__organization=request.organization)
+    max_bytes = settings.AR_TRYON_PHOTO_MAX_BYTES
+    
+    if request.content_type == 'multipart/form-data':
+        source = request.FILES.get('photo')
+        if source is None:
+            return JsonResponse({'error': 'No photo data'}, status=400)
+        if source.size > max_bytes:
+            return JsonResponse({'error': 'La foto excede el tamaño máximo'}, status=413)
+    elif request.content_type.startswith('image/'):
+        source = _read_body(request, max_bytes)
+        if source is None:
+            return JsonResponse({'error': 'La foto excede el tamaño máximo'}, status=413)
+    else:
+        return JsonResponse({'error': 'Tipo de contenido no soportado'}, status=415)
+    
+    try:
+        _store_tryon_photo(record, source)
+    except InvalidImageError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    finally:
+        source.close()
+    
+    return JsonResponse({
+        'success': True,
+        'photo_url': record.photo.url,
+        'message': 'Foto guardada exitosamente'
+    })
+
+
 @login_required
 @require_http_methods(["POST"])
 def api_save_photo(request):
-    """API para guardar foto con montura"""
+    """
+    API para guardar foto con montura (base64 en JSON)
+
+    Se mantiene para clientes anteriores; la cámara usa api_upload_photo.
+    """
     if not request.organization:
         return JsonResponse({'error': 'No organization'}, status=400)
     
@@ -192,12 +284,9 @@ def api_save_photo(request):
         
         # Decodificar imagen base64
         if photo_data and 'base64,' in photo_data:
-            format, imgstr = photo_data.split('base64,')
-            ext = format.split('/')[-1].split(';')[0]
+            _, imgstr = photo_data.split('base64,')
             
-            photo_file = ContentFile(base64.b64decode(imgstr), name=f'tryon_{record_id}.{ext}')
-            record.photo = photo_file
-            record.save()
+            _store_tryon_photo(record, ContentFile(base64.b64decode(imgstr)))
             
             return JsonResponse({
                 'success': True,
@@ -3,13 +3,15 @@ Vistas para Historia Clínica Oftalmológica
 """
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse
+from django.utils import timezone
 from django.core.paginator import Paginator
-from django.db.models import Q
 from datetime import datetime
 from io import BytesIO
 
 from apps.patients.models import Patient, ClinicalHistory, ClinicalHistoryAttachment, Doctor
+from apps.patients.services import ClinicalCatalogService
+from apps.core.pdf import PDFCache, fingerprint, get_stylesheet, paragraph_style
 
 
 @login_required
@@ -37,31 +39,10 @@ def clinical_history_create(request, patient_id):
     org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
     patient = get_object_or_404(Patient, id=patient_id, **org_filter)
     
-    # Obtener doctores activos de la organización
-    doctors = Doctor.objects.filter(
-        organization=request.organization,
-        is_active=True
-    ).order_by('full_name')
-    
-    # Obtener parámetros clínicos
-    from apps.patients.models import ClinicalParameter
-    lens_materials = ClinicalParameter.objects.filter(
-        Q(organization=request.organization) | Q(organization__isnull=True),
-        parameter_type='lens_material',
-        is_active=True
-    ).order_by('display_order', 'name')
-    
-    lens_coatings = ClinicalParameter.objects.filter(
-        Q(organization=request.organization) | Q(organization__isnull=True),
-        parameter_type='treatment',
-        is_active=True
-    ).order_by('display_order', 'name')
-    
-    medications = ClinicalParameter.objects.filter(
-        Q(organization=request.organization) | Q(organization__isnull=True),
-        parameter_type__in=['medication', 'topical_medication', 'systemic_medication'],
-        is_active=True
-    ).order_by('display_order', 'name')
+    # Doctores activos y parámetros clínicos (catálogo cacheado por organización)
+    catalog = ClinicalCatalogService.get_catalog(getattr(request, 'organization', None))
+    doctors = catalog.doctors
+    clinical_choices = catalog.clinical_history_choices()
     
     if request.method == 'POST':
         try:
@@ -315,9 +296,7 @@ def clinical_history_create(request, patient_id):
         'patient': patient,
         'today': datetime.now().date(),
         'doctors': doctors,
-        'lens_materials': lens_materials,
-        'lens_coatings': lens_coatings,
-        'medications': medications,
+        **clinical_choices,
         'last_exam': last_exam,  # Último examen para pre-cargar datos
     }
     
@@ -346,31 +325,10 @@ def clinical_history_edit(request, patient_id, history_id):
     patient = get_object_or_404(Patient, id=patient_id, **org_filter)
     history = get_object_or_404(ClinicalHistory, id=history_id, patient=patient, **org_filter)
     
-    # Obtener doctores activos de la organización
-    doctors = Doctor.objects.filter(
-        organization=request.organization,
-        is_active=True
-    ).order_by('full_name')
-    
-    # Obtener parámetros clínicos
-    from apps.patients.models import ClinicalParameter
-    lens_materials = ClinicalParameter.objects.filter(
-        Q(organization=request.organization) | Q(organization__isnull=True),
-        parameter_type='lens_material',
-        is_active=True
-    ).order_by('display_order', 'name')
-    
-    lens_coatings = ClinicalParameter.objects.filter(
-        Q(organization=request.organization) | Q(organization__isnull=True),
-        parameter_type='treatment',
-        is_active=True
-    ).order_by('display_order', 'name')
-    
-    medications = ClinicalParameter.objects.filter(
-        Q(organization=request.organization) | Q(organization__isnull=True),
-        parameter_type__in=['medication', 'topical_medication', 'systemic_medication'],
-        is_active=True
-    ).order_by('display_order', 'name')
+    # Doctores activos y parámetros clínicos (catálogo cacheado por organización)
+    catalog = ClinicalCatalogService.get_catalog(getattr(request, 'organization', None))
+    doctors = catalog.doctors
+    clinical_choices = catalog.clinical_history_choices()
     
     if request.method == 'POST':
         try:
@@ -637,9 +595,7 @@ def clinical_history_edit(request, patient_id, history_id):
         'patient': patient,
         'history': history,
         'doctors': doctors,
-        'lens_materials': lens_materials,
-        'lens_coatings': lens_coatings,
-        'medications': medications,
+        **clinical_choices,
         'is_edit': True,
     }
     
@@ -713,11 +669,12 @@ def latest_fundoscopy(request, patient_id):
         })
 
 
-@login_required
-def clinical_history_pdf(request, patient_id, history_id):
-    """Generar PDF de historia clínica"""
+CLINICAL_HISTORY_PDF_VERSION = 1
+
+
+def render_clinical_history_pdf(history, organization=None):
+    """Construye el PDF de historia clínica y retorna sus bytes"""
     from reportlab.lib.pagesizes import letter
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.units import inch
     from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
     from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
@@ -727,9 +684,7 @@ def clinical_history_pdf(request, patient_id, history_id):
         draw_keratometry_table, draw_iop_table, NumberedCanvas
     )
     
-    org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
-    patient = get_object_or_404(Patient, id=patient_id, **org_filter)
-    history = get_object_or_404(ClinicalHistory, id=history_id, patient=patient, **org_filter)
+    patient = history.patient
     
     # Crear buffer para el PDF
     buffer = BytesIO()
@@ -745,11 +700,11 @@ def clinical_history_pdf(request, patient_id, history_id):
     )
     
     # Estilos
-    styles = getSampleStyleSheet()
+    styles = get_stylesheet()
     
-    title_style = ParagraphStyle(
+    title_style = paragraph_style(
         'CustomTitle',
-        parent=styles['Heading1'],
+        'Heading1',
         fontSize=18,
         textColor=colors.Color(0.2, 0.4, 0.6),
         spaceAfter=30,
@@ -757,9 +712,9 @@ def clinical_history_pdf(request, patient_id, history_id):
         fontName='Helvetica-Bold'
     )
     
-    heading_style = ParagraphStyle(
+    heading_style = paragraph_style(
         'CustomHeading',
-        parent=styles['Heading2'],
+        'Heading2',
         fontSize=13,
         textColor=colors.Color(0.2, 0.4, 0.6),
         spaceAfter=12,
@@ -771,9 +726,9 @@ def clinical_history_pdf(request, patient_id, history_id):
         backColor=colors.Color(0.9, 0.95, 1)
     )
     
-    normal_style = ParagraphStyle(
+    normal_style = paragraph_style(
         'CustomNormal',
-        parent=styles['Normal'],
+        'Normal',
         fontSize=10,
         alignment=TA_JUSTIFY,
         spaceAfter=10
@@ -1105,9 +1060,9 @@ def clinical_history_pdf(request, patient_id, history_id):
         story.append(PageBreak())
         
         # Encabezado estilo fórmula profesional
-        formula_title_style = ParagraphStyle(
+        formula_title_style = paragraph_style(
             'FormulaTitle',
-            parent=title_style,
+            title_style,
             fontSize=16,
             textColor=colors.Color(0.1, 0.3, 0.5),
             spaceAfter=20,
@@ -1253,9 +1208,9 @@ def clinical_history_pdf(request, patient_id, history_id):
             story.append(Spacer(1, 0.2*inch))
         
         # Nota de advertencia (similar a la imagen)
-        warning_style = ParagraphStyle(
+        warning_style = paragraph_style(
             'Warning',
-            parent=normal_style,
+            normal_style,
             fontSize=8,
             alignment=TA_CENTER,
             textColor=colors.Color(0.3, 0.3, 0.3),
@@ -1267,7 +1222,7 @@ def clinical_history_pdf(request, patient_id, history_id):
         story.append(Spacer(1, 0.3*inch))
         
         # Información del optómetra y sello
-        org_name = request.organization.name if hasattr(request, 'organization') and request.organization else 'ÓPTICA'
+        org_name = organization.name if organization else 'ÓPTICA'
         org_info = f"<b>Optómetra:</b> {history.doctor.full_name if history.doctor else 'N/A'}<br/>"
         org_info += f"<b>Reg Médico:</b> {history.doctor.professional_card if history.doctor and history.doctor.professional_card else 'N/A'}"
         
@@ -1335,7 +1290,7 @@ def clinical_history_pdf(request, patient_id, history_id):
     story.append(signature_table)
     
     # Construir PDF con canvas personalizado
-    organization_name = request.organization.name if hasattr(request, 'organization') and request.organization else 'Óptica'
+    organization_name = organization.name if organization else 'Óptica'
     doctor_name = history.doctor.full_name if history.doctor else ''
     
     doc.build(
@@ -1348,9 +1303,35 @@ def clinical_history_pdf(request, patient_id, history_id):
         )
     )
     
+    return buffer.getvalue()
+
+
+def clinical_history_pdf_fingerprint(history, organization=None):
+    """Hash del contenido impreso en el PDF de historia clínica"""
+    return fingerprint(CLINICAL_HISTORY_PDF_VERSION, history, history.patient, history.doctor, organization)
+
+
+def get_clinical_history_pdf(history, organization=None):
+    """Ruta del PDF de historia clínica (lo genera si cambió o no existe)"""
+    return PDFCache.get_or_render(
+        'clinical_history', history.organization_id, history.pk,
+        clinical_history_pdf_fingerprint(history, organization),
+        lambda: render_clinical_history_pdf(history, organization)
+    )
+
+
+@login_required
+def clinical_history_pdf(request, patient_id, history_id):
+    """Generar PDF de historia clínica (servido desde el almacenamiento si no cambió)"""
+    org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
+    patient = get_object_or_404(Patient, id=patient_id, **org_filter)
+    history = get_object_or_404(ClinicalHistory, id=history_id, patient=patient, **org_filter)
+    organization = request.organization if hasattr(request, 'organization') and request.organization else None
+    
+    path = get_clinical_history_pdf(history, organization)
+    
     # Retornar PDF
-    buffer.seek(0)
-    response = HttpResponse(buffer.read(), content_type='application/pdf')
+    response = FileResponse(open(path, 'rb'), content_type='application/pdf')
     filename = f'Historia_Clinica_{patient.full_name.replace(" ", "_")}_{history.date}.pdf'
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
@@ -1363,11 +1344,9 @@ def visual_exam_create(request, patient_id):
     org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
     patient = get_object_or_404(Patient, id=patient_id, **org_filter)
     
-    # Obtener doctores activos de la organización
-    doctors = Doctor.objects.filter(
-        organization=request.organization,
-        is_active=True
-    ).order_by('full_name')
+    # Doctores activos y parámetros clínicos (catálogo cacheado por organización)
+    catalog = ClinicalCatalogService.get_catalog(getattr(request, 'organization', None))
+    doctors = catalog.doctors
     
     if request.method == 'POST':
         try:
@@ -1675,59 +1654,11 @@ def visual_exam_create(request, patient_id):
             }, status=400)
     
     # GET - Mostrar formulario
-    # Obtener parámetros clínicos
-    from apps.patients.models import ClinicalParameter
-    
-    # Función auxiliar para obtener parámetros por tipo
-    def get_params(param_types):
-        if isinstance(param_types, str):
-            param_types = [param_types]
-        return ClinicalParameter.objects.filter(
-            Q(organization=request.organization) | Q(organization__isnull=True),
-            parameter_type__in=param_types,
-            is_active=True
-        ).order_by('display_order', 'name')
-    
     context = {
         'patient': patient,
         'doctors': doctors,
         'today': datetime.now().date(),
-        
-        # Medicamentos
-        'medications': get_params(['medication', 'topical_medication', 'systemic_medication']),
-        'topical_medications': get_params('topical_medication'),
-        'systemic_medications': get_params('systemic_medication'),
-        
-        # Lentes Oftálmicos
-        'lens_types': get_params('lens_type'),
-        'lens_materials': get_params('lens_material'),
-        'lens_coatings': get_params(['lens_coating', 'treatment']),
-        'lens_brands': get_params('lens_brand'),
-        'frame_types': get_params('frame_type'),
-        
-        # Lentes de Contacto
-        'contact_lens_types': get_params('contact_lens_type'),
-        'contact_lens_brands': get_params('contact_lens_brand'),
-        'contact_lens_materials': get_params('contact_lens_material'),
-        'contact_lens_wearings': get_params('contact_lens_wearing'),
-        
-        # Diagnósticos
-        'diagnoses': get_params('diagnosis'),
-        'diagnosis_categories': get_params('diagnosis_category'),
-        
-        # Tratamientos y Terapias
-        'treatments': get_params('treatment'),
-        'therapies': get_params('therapy'),
-        'visual_therapies': get_params('visual_therapy'),
-        
-        # Exámenes
-        'complementary_exams': get_params('complementary_exam'),
-        'lab_tests': get_params('lab_test'),
-        
-        # Otros
-        'recommendations': get_params('recommendation'),
-        'referral_specialties': get_params('referral_specialty'),
-        'follow_up_reasons': get_params('follow_up_reason'),
+        **catalog.visual_exam_choices(),
     }
     
     return render(request, 'dashboard/patients/visual_exam_form.html', context)
@@ -1740,11 +1671,9 @@ def visual_exam_edit(request, patient_id, history_id):
     patient = get_object_or_404(Patient, id=patient_id, **org_filter)
     history = get_object_or_404(ClinicalHistory, id=history_id, patient=patient, **org_filter)
     
-    # Obtener doctores activos de la organización
-    doctors = Doctor.objects.filter(
-        organization=request.organization,
-        is_active=True
-    ).order_by('full_name')
+    # Doctores activos y parámetros clínicos (catálogo cacheado por organización)
+    catalog = ClinicalCatalogService.get_catalog(getattr(request, 'organization', None))
+    doctors = catalog.doctors
     
     if request.method == 'POST':
         try:
@@ -2105,60 +2034,12 @@ def visual_exam_edit(request, patient_id, history_id):
             }, status=400)
     
     # GET - Mostrar formulario con datos
-    # Obtener parámetros clínicos
-    from apps.patients.models import ClinicalParameter
-    
-    # Función auxiliar para obtener parámetros por tipo
-    def get_params(param_types):
-        if isinstance(param_types, str):
-            param_types = [param_types]
-        return ClinicalParameter.objects.filter(
-            Q(organization=request.organization) | Q(organization__isnull=True),
-            parameter_type__in=param_types,
-            is_active=True
-        ).order_by('display_order', 'name')
-    
     context = {
         'patient': patient,
         'doctors': doctors,
         'history': history,
         'today': datetime.now().date(),
-        
-        # Medicamentos
-        'medications': get_params(['medication', 'topical_medication', 'systemic_medication']),
-        'topical_medications': get_params('topical_medication'),
-        'systemic_medications': get_params('systemic_medication'),
-        
-        # Lentes Oftálmicos
-        'lens_types': get_params('lens_type'),
-        'lens_materials': get_params('lens_material'),
-        'lens_coatings': get_params(['lens_coating', 'treatment']),
-        'lens_brands': get_params('lens_brand'),
-        'frame_types': get_params('frame_type'),
-        
-        # Lentes de Contacto
-        'contact_lens_types': get_params('contact_lens_type'),
-        'contact_lens_brands': get_params('contact_lens_brand'),
-        'contact_lens_materials': get_params('contact_lens_material'),
-        'contact_lens_wearings': get_params('contact_lens_wearing'),
-        
-        # Diagnósticos
-        'diagnoses': get_params('diagnosis'),
-        'diagnosis_categories': get_params('diagnosis_category'),
-        
-        # Tratamientos y Terapias
-        'treatments': get_params('treatment'),
-        'therapies': get_params('therapy'),
-        'visual_therapies': get_params('visual_therapy'),
-        
-        # Exámenes
-        'complementary_exams': get_params('complementary_exam'),
-        'lab_tests': get_params('lab_test'),
-        
-        # Otros
-        'recommendations': get_params('recommendation'),
-        'referral_specialties': get_params('referral_specialty'),
-        'follow_up_reasons': get_params('follow_up_reason'),
+        **catalog.visual_exam_choices(),
     }
     
     return render(request, 'dashboard/patients/visual_exam_form.html', context)
@@ -2196,22 +2077,38 @@ def visual_exam_delete(request, patient_id, history_id):
     return redirect('dashboard:patient_detail', patient_id=patient_id)
 
 
-@login_required
-def visual_exam_pdf(request, patient_id, history_id):
-    """Generar PDF del examen visual con secciones seleccionables"""
+VISUAL_EXAM_PDF_VERSION = 1
+VISUAL_EXAM_PDF_SECTIONS = (
+    'motivo', 'refraccion', 'contacto', 'medicamentos', 'diagnostico', 'tratamiento', 'seguimiento',
+)
+
+
+def normalize_visual_exam_sections(sections):
+    """Secciones válidas y ordenadas; ('all',) si no se eligió ninguna"""
+    sections = set(sections or [])
+    if not sections or 'all' in sections:
+        return ('all',)
+    return tuple(sorted(sections & set(VISUAL_EXAM_PDF_SECTIONS))) or ('none',)
+
+
+def render_visual_exam_pdf(history, organization=None, sections=None, rendered_on=None):
+    """
+    Construye el PDF del examen visual y retorna sus bytes
+    
+    Args:
+        sections: Secciones a incluir (None o ('all',) = todas)
+        rendered_on: Fecha impresa en el encabezado (por defecto hoy)
+    """
     from reportlab.lib.pagesizes import letter
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.units import inch
     from reportlab.lib.enums import TA_CENTER, TA_LEFT
     from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
     from reportlab.lib import colors
     
-    org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
-    patient = get_object_or_404(Patient, id=patient_id, **org_filter)
-    history = get_object_or_404(ClinicalHistory, id=history_id, patient=patient, **org_filter)
+    patient = history.patient
+    rendered_on = rendered_on or timezone.localdate()
     
-    # Obtener secciones seleccionadas del GET
-    selected_sections = request.GET.getlist('sections')
+    selected_sections = list(sections or [])
     # Si no se especifican secciones, incluir todas por defecto
     include_all = 'all' in selected_sections or not selected_sections
     
@@ -2229,11 +2126,11 @@ def visual_exam_pdf(request, patient_id, history_id):
     )
     
     # Estilos
-    styles = getSampleStyleSheet()
+    styles = get_stylesheet()
     
-    title_style = ParagraphStyle(
+    title_style = paragraph_style(
         'Title',
-        parent=styles['Heading1'],
+        'Heading1',
         fontSize=12,
         textColor=colors.Color(0.1, 0.3, 0.5),
         spaceAfter=10,
@@ -2241,18 +2138,18 @@ def visual_exam_pdf(request, patient_id, history_id):
         fontName='Helvetica-Bold'
     )
     
-    heading_style = ParagraphStyle(
+    heading_style = paragraph_style(
         'Heading',
-        parent=styles['Heading2'],
+        'Heading2',
         fontSize=9,
         textColor=colors.Color(0.2, 0.2, 0.2),
         spaceAfter=4,
         fontName='Helvetica-Bold'
     )
     
-    normal_style = ParagraphStyle(
+    normal_style = paragraph_style(
+        'Normal',
         'Normal',
-        parent=styles['Normal'],
         fontSize=7,
         spaceAfter=3
     )
@@ -2262,15 +2159,15 @@ def visual_exam_pdf(request, patient_id, history_id):
     
     # ========== ENCABEZADO PROFESIONAL ==========
     # Crear tabla de encabezado con logo y datos de la óptica
-    org_name = request.organization.name if hasattr(request, 'organization') and request.organization else 'Óptica'
-    org_address = request.organization.address if hasattr(request, 'organization') and request.organization and request.organization.address else 'Dirección no especificada'
-    org_phone = request.organization.phone if hasattr(request, 'organization') and request.organization and request.organization.phone else ''
-    org_email = request.organization.email if hasattr(request, 'organization') and request.organization and request.organization.email else ''
+    org_name = organization.name if organization else 'Óptica'
+    org_address = organization.address if organization and organization.address else 'Dirección no especificada'
+    org_phone = organization.phone if organization and organization.phone else ''
+    org_email = organization.email if organization and organization.email else ''
     
     # Estilos para el encabezado
-    header_org_style = ParagraphStyle(
+    header_org_style = paragraph_style(
         'HeaderOrg',
-        parent=styles['Normal'],
+        'Normal',
         fontSize=14,
         textColor=colors.Color(0.0, 0.2, 0.5),
         fontName='Helvetica-Bold',
@@ -2278,9 +2175,9 @@ def visual_exam_pdf(request, patient_id, history_id):
         leading=16
     )
     
-    header_subtitle_style = ParagraphStyle(
+    header_subtitle_style = paragraph_style(
         'HeaderSubtitle',
-        parent=styles['Normal'],
+        'Normal',
         fontSize=8,
         textColor=colors.Color(0.2, 0.2, 0.2),
         fontName='Helvetica',
@@ -2288,9 +2185,9 @@ def visual_exam_pdf(request, patient_id, history_id):
         leading=10
     )
     
-    header_title_style = ParagraphStyle(
+    header_title_style = paragraph_style(
         'HeaderTitle',
-        parent=styles['Normal'],
+        'Normal',
         fontSize=11,
         textColor=colors.black,
         fontName='Helvetica-Bold',
@@ -2299,9 +2196,9 @@ def visual_exam_pdf(request, patient_id, history_id):
         spaceAfter=2
     )
     
-    header_date_style = ParagraphStyle(
+    header_date_style = paragraph_style(
         'HeaderDate',
-        parent=styles['Normal'],
+        'Normal',
         fontSize=8,
         textColor=colors.black,
         fontName='Helvetica',
@@ -2310,8 +2207,7 @@ def visual_exam_pdf(request, patient_id, history_id):
     )
     
     # Tabla del encabezado (3 columnas: Logo | Info Central | Código)
-    from datetime import datetime
-    current_date = datetime.now().strftime('%Y-%m-%d')
+    current_date = rendered_on.strftime('%Y-%m-%d')
     
     header_data = [
         [
@@ -2396,9 +2292,9 @@ def visual_exam_pdf(request, patient_id, history_id):
     # RX FINAL - PRESCRIPCIÓN DEFINITIVA
     if (include_all or 'refraccion' in selected_sections) and (history.final_rx_od_sphere or history.final_rx_os_sphere):
         # Título de sección con estilo destacado
-        section_title = ParagraphStyle(
+        section_title = paragraph_style(
             'SectionTitle',
-            parent=styles['Heading2'],
+            'Heading2',
             fontSize=10,
             textColor=colors.white,
             backColor=colors.Color(0.0, 0.2, 0.5),
@@ -2584,9 +2480,9 @@ def visual_exam_pdf(request, patient_id, history_id):
         story.append(Spacer(1, 0.2*inch))
         
         # Nota adicional sobre espejados
-        note_style = ParagraphStyle(
+        note_style = paragraph_style(
             'Note',
-            parent=normal_style,
+            normal_style,
             fontSize=7,
             alignment=TA_LEFT,
             textColor=colors.black,
@@ -2689,9 +2585,9 @@ def visual_exam_pdf(request, patient_id, history_id):
         story.append(Spacer(1, 0.2*inch))
     
     # Advertencia
-    warning_style = ParagraphStyle(
+    warning_style = paragraph_style(
         'Warning',
-        parent=normal_style,
+        normal_style,
         fontSize=8,
         alignment=TA_CENTER,
         textColor=colors.Color(0.3, 0.3, 0.3),
@@ -2732,9 +2628,34 @@ def visual_exam_pdf(request, patient_id, history_id):
     # Construir PDF
     doc.build(story)
     
+    return buffer.getvalue()
+
+
+def get_visual_exam_pdf(history, organization=None, sections=None):
+    """Ruta del PDF del examen visual (lo genera si cambió o no existe)"""
+    sections = normalize_visual_exam_sections(sections)
+    rendered_on = timezone.localdate()
+    return PDFCache.get_or_render(
+        'visual_exam', history.organization_id, history.pk,
+        fingerprint(VISUAL_EXAM_PDF_VERSION, history, history.patient, history.doctor, organization, rendered_on),
+        lambda: render_visual_exam_pdf(history, organization, sections, rendered_on),
+        variant='-'.join(sections)
+    )
+
+
+@login_required
+def visual_exam_pdf(request, patient_id, history_id):
+    """Generar PDF del examen visual con secciones seleccionables"""
+    org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
+    patient = get_object_or_404(Patient, id=patient_id, **org_filter)
+    history = get_object_or_404(ClinicalHistory, id=history_id, patient=patient, **org_filter)
+    organization = request.organization if hasattr(request, 'organization') and request.organization else None
+    
+    # Secciones seleccionadas del GET
+    path = get_visual_exam_pdf(history, organization, request.GET.getlist('sections'))
+    
     # Retornar respuesta
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
+    response = FileResponse(open(path, 'rb'), content_type='application/pdf')
     response['Content-Disposition'] = f'inline; filename="formula_lentes_{patient.full_name.replace(" ", "_")}_{history.date}.pdf"'
     
     return response
@@ -2,7 +2,7 @@
 Servicios para el sistema de documentos.
 Gestiona subida, descarga y organización de archivos.
 """
-from django.db.models import Q, Sum
+from django.db.models import Count, Q, Sum
 from django.core.files.uploadedfile import UploadedFile
 from django.utils import timezone
 from datetime import timedelta
@@ -311,24 +311,21 @@ class DocumentService:
         Returns:
             Dict con estadísticas
         """
-        documents = Document.objects.filter(organization=organization)
-        
-        total_size = documents.aggregate(Sum('file_size'))['file_size__sum'] or 0
-        total_count = documents.count()
+        rows = (
+            Document.objects.filter(organization=organization)
+            .values('document_type')
+            .annotate(count=Count('id'), size=Sum('file_size'))
+            .order_by()
+        )
         
-        # Por tipo
-        by_type = {}
-        for doc_type, _ in Document.DOCUMENT_TYPE_CHOICES:
-            count = documents.filter(document_type=doc_type).count()
-            size = documents.filter(document_type=doc_type).aggregate(
-                Sum('file_size')
-            )['file_size__sum'] or 0
-            
-            if count > 0:
-                by_type[doc_type] = {
-                    'count': count,
-                    'size': size
-                }
+        # Por tipo (una sola consulta agrupada)
+        by_type = {
+            row['document_type']: {'count': row['count'], 'size': row['size'] or 0}
+            for row in rows
+            if row['count'] > 0
+        }
+        total_size = sum(item['size'] for item in by_type.values())
+        total_count = sum(item['count'] for item in by_type.values())
         
         return {
             'total_size': total_size,
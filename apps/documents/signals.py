@@ -1,16 +1,39 @@
 """
 Signals para documentos.
 """
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 import os
 
+from apps.organizations.services.storage_usage import DOCUMENTS_CATEGORY, StorageUsageService
+
 from .models import Document
 
 
+@receiver(post_init, sender=Document)
+def remember_document_file_size(sender, instance, **kwargs):
+    """Guarda el tamaño cargado para calcular la diferencia al guardar."""
+    instance._original_file_size = instance.file_size if instance.pk else 0
+
+
+@receiver(post_save, sender=Document)
+def update_storage_usage_on_save(sender, instance, created, **kwargs):
+    """Actualiza el uso de almacenamiento de la organización."""
+    previous = 0 if created else getattr(instance, '_original_file_size', 0)
+    delta = (instance.file_size or 0) - previous
+    if created or delta:
+        StorageUsageService.record(
+            instance.organization_id, DOCUMENTS_CATEGORY, delta, 1 if created else 0
+        )
+    instance._original_file_size = instance.file_size or 0
+
+
 @receiver(post_delete, sender=Document)
 def delete_file_on_document_delete(sender, instance, **kwargs):
     """Elimina el archivo físico cuando se elimina el documento."""
+    StorageUsageService.record(
+        instance.organization_id, DOCUMENTS_CATEGORY, -(instance.file_size or 0), -1
+    )
     if instance.file:
         if os.path.isfile(instance.file.path):
             os.remove(instance.file.path)
@@ -0,0 +1,4 @@
+"""
+Jobs App - Ejecución de trabajos en segundo plano respaldada por la base de datos
+Funciona solo con PostgreSQL o SQLite, sin Celery ni brokers externos
+"""
@@ -0,0 +1,44 @@
+"""
+Admin para jobs en segundo plano
+"""
+from django.contrib import admin
+from django.utils import timezone
+from apps.jobs.models import Job, PeriodicJobState
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        'name', 'queue', 'priority', 'status', 'attempts',
+        'run_at', 'started_at', 'finished_at', 'organization'
+    ]
+    list_filter = ['status', 'queue', 'name']
+    search_fields = ['name', 'unique_key', 'last_error']
+    readonly_fields = [
+        'attempts', 'locked_by', 'lease_expires_at', 'started_at',
+        'finished_at', 'result', 'last_error', 'created_at'
+    ]
+    
+    actions = ['retry_jobs', 'cancel_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        """Vuelve a encolar los jobs seleccionados"""
+        updated = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0, last_error=''
+        )
+        self.message_user(request, f'{updated} jobs encolados de nuevo')
+    retry_jobs.short_description = 'Reintentar jobs seleccionados'
+    
+    def cancel_jobs(self, request, queryset):
+        """Cancela los jobs en cola seleccionados"""
+        updated = queryset.filter(status='queued').update(
+            status='cancelled', finished_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} jobs cancelados')
+    cancel_jobs.short_description = 'Cancelar jobs seleccionados'
+
+
+@admin.register(PeriodicJobState)
+class PeriodicJobStateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'next_run_at', 'last_enqueued_at']
+    search_fields = ['name']
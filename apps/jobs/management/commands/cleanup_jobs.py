@@ -0,0 +1,28 @@
+"""
+Management command para eliminar jobs terminados antiguos
+"""
+from django.core.management.base import BaseCommand
+from apps.jobs.services import JobService
+
+
+class Command(BaseCommand):
+    help = 'Elimina jobs completados o cancelados antiguos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Días de antigüedad para eliminar (default: 7)'
+        )
+    
+    def handle(self, *args, **options):
+        days = options['days']
+        
+        self.stdout.write(f'Eliminando jobs terminados de más de {days} días...')
+        
+        deleted = JobService.cleanup(days=days)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {deleted} jobs eliminados')
+        )
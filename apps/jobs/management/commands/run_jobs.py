@@ -0,0 +1,119 @@
+"""
+Management command que ejecuta los workers de jobs en segundo plano
+Uso: python manage.py run_jobs [--processes 4] [--queues default,notifications] [--once]
+"""
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+
+
+def _worker_process(options):
+    """Punto de entrada de cada proceso worker (spawn: configura Django de nuevo)"""
+    import django
+    django.setup()
+
+    from apps.jobs.registry import autodiscover
+    from apps.jobs.services import JobWorker
+
+    autodiscover()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    stop = {'requested': False}
+
+    def request_stop(signum, frame):
+        stop['requested'] = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+
+    JobWorker(
+        queues=options['queues'],
+        batch_size=options['batch_size'],
+        lease_seconds=options['lease'],
+    ).run_forever(interval=options['interval'], should_stop=lambda: stop['requested'])
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los workers que procesan los jobs en segundo plano'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Número de procesos worker (default: 1)'
+        )
+        parser.add_argument(
+            '--queues',
+            type=str,
+            default='',
+            help='Colas a procesar separadas por coma (default: todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5,
+            help='Jobs a reclamar por ciclo (default: 5)'
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=300,
+            help='Segundos antes de considerar perdido un job en ejecución (default: 300)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Segundos de espera cuando no hay jobs (default: 1)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar un solo ciclo en este proceso y salir'
+        )
+    
+    def handle(self, *args, **options):
+        from django.db import connections
+        from apps.jobs.registry import autodiscover
+        from apps.jobs.services import JobWorker
+        
+        options['queues'] = [q.strip() for q in options['queues'].split(',') if q.strip()] or None
+        
+        if options['once']:
+            autodiscover()
+            executed = JobWorker(
+                queues=options['queues'],
+                batch_size=options['batch_size'],
+                lease_seconds=options['lease'],
+            ).run_once()
+            self.stdout.write(self.style.SUCCESS(f'✓ {executed} jobs ejecutados'))
+            return
+        
+        processes = max(1, options['processes'])
+        worker_options = {
+            key: options[key] for key in ('queues', 'batch_size', 'lease', 'interval')
+        }
+        
+        self.stdout.write(f'Iniciando {processes} worker(s) de jobs...')
+        
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=_worker_process, args=(worker_options,), name=f'jobs-worker-{i}')
+            for i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo workers...')
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+        
+        self.stdout.write(self.style.SUCCESS('✓ Workers detenidos'))
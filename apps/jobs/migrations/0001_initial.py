@@ -0,0 +1,65 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('organizations', '0025_alter_organization_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodicJobState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Nombre')),
+                ('next_run_at', models.DateTimeField(verbose_name='Próxima Ejecución')),
+                ('last_enqueued_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Encolada')),
+            ],
+            options={
+                'verbose_name': 'Job Periódico',
+                'verbose_name_plural': 'Jobs Periódicos',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, help_text='Ruta del job registrado (ej: apps.organizations.tasks.check_trial_status_daily)', max_length=255, verbose_name='Nombre')),
+                ('queue', models.CharField(default='default', max_length=50, verbose_name='Cola')),
+                ('priority', models.IntegerField(default=0, help_text='Mayor número = se ejecuta antes', verbose_name='Prioridad')),
+                ('args', models.JSONField(blank=True, default=list, verbose_name='Argumentos')),
+                ('kwargs', models.JSONField(blank=True, default=dict, verbose_name='Argumentos con Nombre')),
+                ('status', models.CharField(choices=[('queued', 'En Cola'), ('running', 'En Ejecución'), ('succeeded', 'Completado'), ('failed', 'Fallido'), ('cancelled', 'Cancelado')], default='queued', max_length=20, verbose_name='Estado')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar en')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('max_attempts', models.IntegerField(default=3, verbose_name='Máximo Intentos')),
+                ('unique_key', models.CharField(blank=True, help_text='Evita encolar dos veces el mismo trabajo mientras esté pendiente', max_length=255, null=True, verbose_name='Llave Única')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Lease Expira')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha Creación')),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='organizations.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Trabajo',
+                'verbose_name_plural': 'Trabajos',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'queue', 'priority', 'run_at'], name='jobs_job_status_feddf2_idx'), models.Index(fields=['status', 'lease_expires_at'], name='jobs_job_status_8b8fc1_idx'), models.Index(fields=['name', 'status'], name='jobs_job_name_282392_idx'), models.Index(fields=['organization', 'created_at'], name='jobs_job_organiz_5519d5_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('unique_key',), name='unique_pending_job_key'),
+        ),
+    ]
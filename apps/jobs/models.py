@@ -0,0 +1,110 @@
+"""
+Modelos para el sistema de trabajos en segundo plano
+"""
+from django.db import models
+from django.utils import timezone
+from apps.organizations.base_models import TenantModel
+
+
+class Job(TenantModel):
+    """
+    Trabajo encolado para ejecutarse fuera del ciclo request/response
+
+    Los workers (`python manage.py run_jobs`) reclaman trabajos con
+    SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL) y los ejecutan según
+    prioridad y fecha programada.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'En Cola'),
+        ('running', 'En Ejecución'),
+        ('succeeded', 'Completado'),
+        ('failed', 'Fallido'),
+        ('cancelled', 'Cancelado'),
+    ]
+
+    name = models.CharField(
+        'Nombre',
+        max_length=255,
+        db_index=True,
+        help_text='Ruta del job registrado (ej: apps.organizations.tasks.check_trial_status_daily)'
+    )
+    queue = models.CharField('Cola', max_length=50, default='default')
+    priority = models.IntegerField('Prioridad', default=0, help_text='Mayor número = se ejecuta antes')
+
+    args = models.JSONField('Argumentos', default=list, blank=True)
+    kwargs = models.JSONField('Argumentos con Nombre', default=dict, blank=True)
+
+    status = models.CharField('Estado', max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    run_at = models.DateTimeField('Ejecutar en', default=timezone.now)
+    attempts = models.IntegerField('Intentos', default=0)
+    max_attempts = models.IntegerField('Máximo Intentos', default=3)
+
+    unique_key = models.CharField(
+        'Llave Única',
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text='Evita encolar dos veces el mismo trabajo mientras esté pendiente'
+    )
+
+    locked_by = models.CharField('Worker', max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField('Lease Expira', null=True, blank=True)
+
+    started_at = models.DateTimeField('Inicio', null=True, blank=True)
+    finished_at = models.DateTimeField('Fin', null=True, blank=True)
+
+    result = models.JSONField('Resultado', null=True, blank=True)
+    last_error = models.TextField('Último Error', blank=True)
+
+    created_at = models.DateTimeField('Fecha Creación', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Trabajo'
+        verbose_name_plural = 'Trabajos'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'priority', 'run_at']),
+            models.Index(fields=['status', 'lease_expires_at']),
+            models.Index(fields=['name', 'status']),
+            models.Index(fields=['organization', 'created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_pending_job_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+    @property
+    def duration(self):
+        """Duración de la última ejecución en segundos"""
+        if self.started_at and self.finished_at:
+            return (self.finished_at - self.started_at).total_seconds()
+        return None
+
+
+class PeriodicJobState(models.Model):
+    """
+    Estado de programación de un job periódico
+
+    Una fila por job periódico registrado; los workers la bloquean para
+    encolar la siguiente ejecución una sola vez aunque haya varios procesos.
+    """
+
+    name = models.CharField('Nombre', max_length=255, unique=True)
+    next_run_at = models.DateTimeField('Próxima Ejecución')
+    last_enqueued_at = models.DateTimeField('Última Encolada', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Job Periódico'
+        verbose_name_plural = 'Jobs Periódicos'
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} → {self.next_run_at}"
@@ -0,0 +1,166 @@
+"""
+Registro de jobs
+
+Uso:
+    from apps.jobs.registry import job
+
+    @job(queue='notifications', max_attempts=5)
+    def send_reminder(appointment_id):
+        ...
+
+    send_reminder.delay(appointment.id)             # Encolar
+    send_reminder.enqueue(args=[1], delay=60)       # Encolar con opciones
+
+    @job(every=timedelta(days=1), at=time(9, 0))    # Job periódico (9 AM hora local)
+    def check_trial_status_daily():
+        ...
+
+    raise Reschedule(delay=5)                       # Dentro de un job: volver a correr en 5s
+"""
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules, import_string
+
+_registry = {}
+
+
+class Reschedule(Exception):
+    """
+    Lanzada por un job para volver a la cola dentro de `delay` segundos sin
+    contar como intento fallido (ej: envíos espaciados sin bloquear el worker)
+
+    El job conserva su fila y su `unique_key`, así no se duplica mientras espera.
+    """
+
+    def __init__(self, delay):
+        super().__init__(f"Reprogramado en {delay}s")
+        self.delay = delay
+
+
+class JobDefinition:
+    """Función registrada como job con sus opciones por defecto"""
+
+    def __init__(self, func, name, queue='default', priority=0, max_attempts=3, every=None, at=None):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.every = every
+        self.at = at
+        self.__doc__ = func.__doc__
+        self.__name__ = func.__name__
+        self.__module__ = func.__module__
+
+    def __call__(self, *args, **kwargs):
+        """Ejecuta la función directamente (sin encolar)"""
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<Job {self.name}>"
+
+    @property
+    def is_periodic(self):
+        return self.every is not None
+
+    def delay(self, *args, **kwargs):
+        """Encola el job con los argumentos dados (misma firma que la función)"""
+        return self.enqueue(args=args, kwargs=kwargs)
+
+    def enqueue(self, args=(), kwargs=None, **options):
+        """
+        Encola el job
+
+        Args:
+            args: Argumentos posicionales (serializables a JSON)
+            kwargs: Argumentos con nombre (serializables a JSON)
+            **options: run_at, delay, priority, queue, max_attempts,
+                       organization, unique_key, on_commit
+
+        Returns:
+            Job, o None si la creación se difiere hasta el commit
+        """
+        from apps.jobs.services import enqueue
+        return enqueue(self, args=args, kwargs=kwargs, **options)
+
+    def first_run_at(self, now=None):
+        """Primera ejecución de un job periódico, alineada a `at` si existe"""
+        now = now or timezone.now()
+        if self.at is None:
+            return now
+
+        local_now = timezone.localtime(now)
+        candidate = timezone.make_aware(
+            datetime.combine(local_now.date(), self.at),
+            timezone.get_current_timezone()
+        )
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        return candidate
+
+    def next_run_after(self, previous, now=None):
+        """Siguiente ejecución en el futuro, saltando las ejecuciones perdidas"""
+        now = now or timezone.now()
+        next_run = previous + self.every
+        if next_run <= now:
+            missed = int((now - previous) / self.every)
+            next_run = previous + self.every * (missed + 1)
+        return next_run
+
+
+def job(func=None, *, name=None, queue='default', priority=0, max_attempts=3, every=None, at=None):
+    """
+    Decorador que registra una función como job
+
+    Args:
+        name: Nombre del job (por defecto la ruta `modulo.funcion`)
+        queue: Cola en la que se encola
+        priority: Prioridad por defecto (mayor = antes)
+        max_attempts: Intentos antes de marcar como fallido
+        every: timedelta para jobs periódicos
+        at: datetime.time local para alinear la ejecución periódica
+    """
+    def decorator(f):
+        definition = JobDefinition(
+            f,
+            name=name or f"{f.__module__}.{f.__name__}",
+            queue=queue,
+            priority=priority,
+            max_attempts=max_attempts,
+            every=every,
+            at=at,
+        )
+        _registry[definition.name] = definition
+        return definition
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def autodiscover():
+    """Importa los módulos `tasks` y `jobs` de las apps para registrar sus jobs"""
+    autodiscover_modules('tasks', 'jobs')
+
+
+def get_job(name):
+    """
+    Obtiene la definición de un job por nombre
+
+    Si el módulo no se ha importado aún, lo importa por su ruta.
+    """
+    if name not in _registry:
+        try:
+            import_string(name)
+        except ImportError:
+            pass
+
+    if name not in _registry:
+        raise LookupError(f"Job no registrado: {name}")
+    return _registry[name]
+
+
+def periodic_jobs():
+    """Lista de jobs periódicos registrados"""
+    return [definition for definition in _registry.values() if definition.is_periodic]
@@ -0,0 +1,401 @@
+"""
+Servicios del sistema de trabajos en segundo plano: encolado, ejecución y métricas
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from apps.jobs.models import Job, PeriodicJobState
+from apps.jobs.registry import JobDefinition, Reschedule, get_job, periodic_jobs
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(job, args=(), kwargs=None, run_at=None, delay=None, priority=None, queue=None,
+            max_attempts=None, organization=None, unique_key=None, on_commit=True):
+    """
+    Encola un job
+
+    Si se llama dentro de una transacción y `on_commit=True`, la fila se
+    crea con `transaction.on_commit`: el job no existe si la operación que lo
+    originó hace rollback, y no se ejecuta antes de que sus datos sean
+    visibles para el worker.
+
+    Args:
+        job: JobDefinition o nombre del job registrado
+        args: Argumentos posicionales (serializables a JSON)
+        kwargs: Argumentos con nombre (serializables a JSON)
+        run_at: Fecha/hora de ejecución
+        delay: Segundos de espera (alternativa a run_at)
+        priority: Prioridad (mayor = antes)
+        queue: Cola
+        max_attempts: Intentos máximos
+        organization: Organización asociada (para métricas y auditoría)
+        unique_key: Evita duplicados mientras haya uno pendiente
+        on_commit: Diferir la creación hasta el commit de la transacción actual
+
+    Returns:
+        Job, o None si se difiere hasta el commit o ya existe uno pendiente
+        con la misma `unique_key`
+    """
+    definition = job if isinstance(job, JobDefinition) else get_job(job)
+
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+
+    fields = {
+        'name': definition.name,
+        'queue': queue or definition.queue,
+        'priority': definition.priority if priority is None else priority,
+        'max_attempts': max_attempts or definition.max_attempts,
+        'args': list(args),
+        'kwargs': kwargs or {},
+        'run_at': run_at,
+        'organization': organization,
+        'unique_key': unique_key,
+    }
+
+    def create():
+        try:
+            with transaction.atomic():
+                return Job.objects.create(**fields)
+        except IntegrityError:
+            if unique_key:
+                logger.debug(f"Job {definition.name} ya encolado con llave {unique_key}")
+                return None
+            raise
+
+    if on_commit and connection.in_atomic_block:
+        transaction.on_commit(create)
+        return None
+
+    return create()
+
+
+class JobWorker:
+    """
+    Worker que reclama y ejecuta jobs
+
+    Varios workers (hilos, procesos o servidores) pueden correr en paralelo:
+    en PostgreSQL la reclamación usa SELECT ... FOR UPDATE SKIP LOCKED y cada
+    job reclamado queda con un lease que, si vence, lo devuelve a la cola.
+    Mientras el lote se ejecuta, un hilo de heartbeat renueva el lease cada
+    `heartbeat_seconds`, así un job largo no vuelve a la cola mientras corre;
+    solo vence si el worker muere.
+    """
+
+    def __init__(self, queues=None, batch_size=5, lease_seconds=300, worker_id=None, heartbeat_seconds=None):
+        self.queues = queues
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds or max(1, lease_seconds / 3)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def backoff_seconds(attempts):
+        """Backoff exponencial con jitter: 10s, 20s, 40s, ... (máx. 1 hora)"""
+        delay = min(10 * (2 ** max(0, attempts - 1)), 3600)
+        return delay + random.uniform(0, delay * 0.1)
+
+    def _locked(self, queryset):
+        if connection.features.has_select_for_update_skip_locked:
+            return queryset.select_for_update(skip_locked=True)
+        return queryset
+
+    # ==================== RECLAMACIÓN ====================
+
+    def claim(self):
+        """
+        Reclama hasta `batch_size` jobs listos para ejecutarse
+
+        Returns:
+            list: Jobs reclamados
+        """
+        now = timezone.now()
+
+        with transaction.atomic():
+            queryset = Job.objects.filter(status='queued', run_at__lte=now)
+            if self.queues:
+                queryset = queryset.filter(queue__in=self.queues)
+            queryset = self._locked(queryset.order_by('-priority', 'run_at'))
+
+            ids = list(queryset.values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                return []
+
+            Job.objects.filter(id__in=ids, status='queued').update(
+                status='running',
+                attempts=F('attempts') + 1,
+                locked_by=self.worker_id,
+                started_at=now,
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+            )
+
+        return list(
+            Job.objects.filter(id__in=ids, locked_by=self.worker_id, status='running')
+            .order_by('-priority', 'run_at')
+        )
+
+    def requeue_stale(self):
+        """
+        Devuelve a la cola los jobs cuyo worker murió (lease vencido)
+
+        Returns:
+            int: Jobs recuperados
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            stale = list(self._locked(
+                Job.objects.filter(status='running', lease_expires_at__lt=now)
+            ))
+            for job in stale:
+                exhausted = job.attempts >= job.max_attempts
+                job.status = 'failed' if exhausted else 'queued'
+                job.last_error = f"Lease vencido (worker {job.locked_by})"
+                job.locked_by = ''
+                job.lease_expires_at = None
+                job.finished_at = now if exhausted else None
+                job.save(update_fields=['status', 'last_error', 'locked_by', 'lease_expires_at', 'finished_at'])
+        return len(stale)
+
+    def renew_leases(self):
+        """
+        Extiende el lease de los jobs que este worker tiene en ejecución
+
+        Returns:
+            int: Jobs renovados
+        """
+        return Job.objects.filter(status='running', locked_by=self.worker_id).update(
+            lease_expires_at=timezone.now() + timedelta(seconds=self.lease_seconds)
+        )
+
+    @contextmanager
+    def _heartbeat(self):
+        """Renueva los leases en un hilo aparte mientras se ejecuta el bloque"""
+        stop = threading.Event()
+
+        def beat():
+            try:
+                while not stop.wait(self.heartbeat_seconds):
+                    try:
+                        self.renew_leases()
+                    except Exception as e:
+                        logger.warning(f"Error renovando leases del worker {self.worker_id}: {e}")
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=beat, name=f"jobs-heartbeat-{self.worker_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    # ==================== PROGRAMACIÓN ====================
+
+    def schedule_periodic(self):
+        """
+        Encola las ejecuciones vencidas de los jobs periódicos registrados
+
+        Returns:
+            int: Jobs encolados
+        """
+        now = timezone.now()
+        enqueued = 0
+
+        for definition in periodic_jobs():
+            state, created = PeriodicJobState.objects.get_or_create(
+                name=definition.name,
+                defaults={'next_run_at': definition.first_run_at(now)}
+            )
+            if created or state.next_run_at > now:
+                continue
+
+            with transaction.atomic():
+                state = self._locked(
+                    PeriodicJobState.objects.filter(pk=state.pk, next_run_at__lte=now)
+                ).first()
+                if state is None:
+                    continue
+
+                job = enqueue(
+                    definition,
+                    unique_key=f"periodic:{definition.name}",
+                    on_commit=False
+                )
+                state.last_enqueued_at = now
+                state.next_run_at = definition.next_run_after(state.next_run_at, now)
+                state.save(update_fields=['last_enqueued_at', 'next_run_at'])
+                if job:
+                    enqueued += 1
+
+        return enqueued
+
+    # ==================== EJECUCIÓN ====================
+
+    def execute(self, job):
+        """Ejecuta un job reclamado y registra el resultado"""
+        try:
+            definition = get_job(job.name)
+            result = definition.func(*job.args, **job.kwargs)
+            try:
+                result = json.loads(json.dumps(result, default=str))
+            except (TypeError, ValueError):
+                result = None
+
+            Job.objects.filter(pk=job.pk).update(
+                status='succeeded',
+                result=result,
+                last_error='',
+                finished_at=timezone.now(),
+                lease_expires_at=None,
+            )
+            return True
+
+        except Reschedule as reschedule:
+            Job.objects.filter(pk=job.pk).update(
+                status='queued',
+                run_at=timezone.now() + timedelta(seconds=reschedule.delay),
+                attempts=F('attempts') - 1,
+                locked_by='',
+                lease_expires_at=None,
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error ejecutando job {job.name} #{job.pk}: {e}", exc_info=True)
+            error = f"{e}\n{traceback.format_exc()}"[-5000:]
+            now = timezone.now()
+
+            if job.attempts >= job.max_attempts:
+                updates = {'status': 'failed', 'finished_at': now}
+            else:
+                updates = {
+                    'status': 'queued',
+                    'run_at': now + timedelta(seconds=self.backoff_seconds(job.attempts)),
+                }
+            Job.objects.filter(pk=job.pk).update(
+                last_error=error, lease_expires_at=None, locked_by='', **updates
+            )
+            return False
+
+    def run_once(self):
+        """
+        Un ciclo del worker: programa periódicos, recupera leases vencidos y
+        ejecuta un lote
+
+        Returns:
+            int: Jobs ejecutados
+        """
+        self.schedule_periodic()
+        self.requeue_stale()
+
+        jobs = self.claim()
+        if jobs:
+            with self._heartbeat():
+                for job in jobs:
+                    self.execute(job)
+        return len(jobs)
+
+    def run_forever(self, interval=1.0, should_stop=None):
+        """Ejecuta ciclos hasta que `should_stop()` retorne True"""
+        while not (should_stop and should_stop()):
+            try:
+                executed = self.run_once()
+            except Exception as e:
+                logger.error(f"Error en worker de jobs {self.worker_id}: {e}", exc_info=True)
+                executed = 0
+            finally:
+                close_old_connections()
+
+            if not executed:
+                time.sleep(interval)
+
+
+class JobService:
+    """Consultas de estado y métricas del sistema de jobs"""
+
+    @staticmethod
+    def metrics(hours=1):
+        """
+        Métricas de la cola de jobs
+
+        Args:
+            hours: Ventana para throughput y duración promedio
+
+        Returns:
+            dict: Conteos por estado y cola, antigüedad del job más viejo en
+                  cola, throughput, duración promedio y jobs periódicos
+        """
+        now = timezone.now()
+        since = now - timedelta(hours=hours)
+
+        by_status = dict(
+            Job.objects.values_list('status').annotate(count=Count('id')).order_by()
+        )
+        by_queue = list(
+            Job.objects.filter(status__in=['queued', 'running'])
+            .values('queue', 'status').annotate(count=Count('id')).order_by('queue')
+        )
+        oldest_queued = Job.objects.filter(
+            status='queued', run_at__lte=now
+        ).aggregate(oldest=Min('run_at'))['oldest']
+
+        recent = Job.objects.filter(finished_at__gte=since)
+        recent_stats = recent.aggregate(
+            succeeded=Count('id', filter=Q(status='succeeded')),
+            failed=Count('id', filter=Q(status='failed')),
+        )
+        avg_duration = recent.filter(status='succeeded').aggregate(
+            avg=Avg(F('finished_at') - F('started_at'))
+        )['avg']
+
+        slowest = list(
+            recent.filter(status='succeeded')
+            .values('name')
+            .annotate(avg=Avg(F('finished_at') - F('started_at')), count=Count('id'))
+            .order_by('-avg')[:10]
+        )
+
+        return {
+            'by_status': by_status,
+            'by_queue': by_queue,
+            'oldest_queued_seconds': (now - oldest_queued).total_seconds() if oldest_queued else 0,
+            'window_hours': hours,
+            'succeeded': recent_stats['succeeded'],
+            'failed': recent_stats['failed'],
+            'avg_duration_seconds': avg_duration.total_seconds() if avg_duration else 0,
+            'slowest': [
+                {'name': row['name'], 'count': row['count'], 'avg_seconds': row['avg'].total_seconds()}
+                for row in slowest if row['avg'] is not None
+            ],
+            'periodic': list(
+                PeriodicJobState.objects.values('name', 'next_run_at', 'last_enqueued_at')
+            ),
+        }
+
+    @staticmethod
+    def cleanup(days=7):
+        """
+        Elimina jobs terminados antiguos
+
+        Returns:
+            int: Jobs eliminados
+        """
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = Job.objects.filter(
+            status__in=['succeeded', 'cancelled'], finished_at__lt=cutoff
+        ).delete()
+        return deleted
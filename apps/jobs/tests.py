@@ -0,0 +1,212 @@
+"""
+Tests para el sistema de jobs
+"""
+from datetime import time, timedelta
+
+from django.test import TestCase
+from django.db import transaction
+from django.utils import timezone
+
+from apps.jobs.models import Job, PeriodicJobState
+from apps.jobs.registry import Reschedule, job, get_job
+from apps.jobs.services import JobWorker, JobService, enqueue
+
+CALLS = []
+
+
+@job(name='tests.add')
+def add_job(a, b):
+    CALLS.append((a, b))
+    return a + b
+
+
+@job(name='tests.fail', max_attempts=2)
+def fail_job():
+    raise ValueError('boom')
+
+
+@job(name='tests.reschedule')
+def reschedule_job():
+    raise Reschedule(delay=30)
+
+
+@job(name='tests.periodic', every=timedelta(hours=1))
+def periodic_job():
+    return 'ok'
+
+
+class JobQueueTestCase(TestCase):
+    """Tests para encolado y ejecución de jobs"""
+
+    def setUp(self):
+        """Setup test data"""
+        CALLS.clear()
+        self.worker = JobWorker(batch_size=10, worker_id='test-worker')
+
+    def enqueue_now(self, definition, *args, **options):
+        """Encola sin diferir al commit (TestCase corre dentro de una transacción)"""
+        return definition.enqueue(args=args, on_commit=False, **options)
+
+    def test_delay_and_execute(self):
+        """Test encolar con delay() y ejecutar con un worker"""
+        with self.captureOnCommitCallbacks(execute=True):
+            add_job.delay(2, 3)
+
+        job_obj = Job.objects.get(name='tests.add')
+        self.assertEqual(job_obj.status, 'queued')
+        self.assertEqual(job_obj.args, [2, 3])
+
+        executed = self.worker.run_once()
+
+        self.assertEqual(executed, 1)
+        job_obj.refresh_from_db()
+        self.assertEqual(job_obj.status, 'succeeded')
+        self.assertEqual(job_obj.result, 5)
+        self.assertEqual(job_obj.attempts, 1)
+        self.assertEqual(CALLS, [(2, 3)])
+
+    def test_future_job_not_claimed(self):
+        """Test que los jobs programados a futuro no se reclaman"""
+        self.enqueue_now(add_job, 1, 1, delay=3600)
+
+        self.assertEqual(self.worker.claim(), [])
+
+    def test_priority_order(self):
+        """Test que se reclama primero el job de mayor prioridad"""
+        self.enqueue_now(add_job, 1, 1, priority=0)
+        self.enqueue_now(add_job, 9, 9, priority=10)
+
+        self.worker.batch_size = 1
+        claimed = self.worker.claim()
+
+        self.assertEqual(claimed[0].args, [9, 9])
+        self.assertEqual(claimed[0].status, 'running')
+        self.assertEqual(claimed[0].locked_by, 'test-worker')
+
+    def test_retry_then_fail(self):
+        """Test reintento con backoff y fallo al agotar intentos"""
+        self.enqueue_now(fail_job)
+
+        self.worker.run_once()
+        job_obj = Job.objects.get(name='tests.fail')
+        self.assertEqual(job_obj.status, 'queued')
+        self.assertGreater(job_obj.run_at, timezone.now())
+        self.assertIn('boom', job_obj.last_error)
+
+        Job.objects.filter(pk=job_obj.pk).update(run_at=timezone.now())
+        self.worker.run_once()
+        job_obj.refresh_from_db()
+        self.assertEqual(job_obj.status, 'failed')
+        self.assertEqual(job_obj.attempts, 2)
+
+    def test_reschedule_keeps_job_queued(self):
+        """Test que Reschedule devuelve el job a la cola sin gastar un intento"""
+        self.enqueue_now(reschedule_job, unique_key='reschedule')
+
+        self.worker.run_once()
+
+        job_obj = Job.objects.get(name='tests.reschedule')
+        self.assertEqual((job_obj.status, job_obj.attempts, job_obj.locked_by), ('queued', 0, ''))
+        self.assertGreater(job_obj.run_at, timezone.now() + timedelta(seconds=20))
+        self.assertIsNone(self.enqueue_now(reschedule_job, unique_key='reschedule'))
+
+    def test_unique_key_dedupe(self):
+        """Test que unique_key evita duplicados pendientes"""
+        first = self.enqueue_now(add_job, 1, 2, unique_key='add:1:2')
+        second = self.enqueue_now(add_job, 1, 2, unique_key='add:1:2')
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(Job.objects.filter(unique_key='add:1:2').count(), 1)
+
+        self.worker.run_once()
+        third = self.enqueue_now(add_job, 1, 2, unique_key='add:1:2')
+        self.assertIsNotNone(third)
+
+    def test_enqueue_deferred_until_commit(self):
+        """Test que dentro de una transacción el job se crea en el commit"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                result = enqueue('tests.add', args=[4, 4])
+                self.assertIsNone(result)
+                self.assertFalse(Job.objects.filter(name='tests.add').exists())
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(Job.objects.filter(name='tests.add').exists())
+
+    def test_requeue_stale_lease(self):
+        """Test que un job con lease vencido vuelve a la cola"""
+        self.enqueue_now(add_job, 1, 1)
+        claimed = self.worker.claim()
+        Job.objects.filter(pk=claimed[0].pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(self.worker.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=claimed[0].pk).status, 'queued')
+
+    def test_renew_leases(self):
+        """Test que el heartbeat extiende el lease de los jobs en ejecución del worker"""
+        self.enqueue_now(add_job, 1, 1)
+        self.enqueue_now(add_job, 2, 2)
+        mine, other = self.worker.claim()
+        Job.objects.filter(pk=other.pk).update(locked_by='other-worker')
+        Job.objects.filter(pk__in=[mine.pk, other.pk]).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(self.worker.renew_leases(), 1)
+        self.assertGreater(Job.objects.get(pk=mine.pk).lease_expires_at, timezone.now())
+        self.assertEqual(self.worker.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=mine.pk).status, 'running')
+
+    def test_get_job_unknown(self):
+        """Test job no registrado"""
+        with self.assertRaises(LookupError):
+            get_job('tests.missing')
+
+
+class PeriodicJobTestCase(TestCase):
+    """Tests para jobs periódicos y métricas"""
+
+    def test_schedule_periodic(self):
+        """Test que los periódicos se encolan una vez por vencimiento"""
+        worker = JobWorker(worker_id='test-worker')
+        definition = get_job('tests.periodic')
+
+        worker.schedule_periodic()
+        state = PeriodicJobState.objects.get(name='tests.periodic')
+
+        # Aislar la prueba de los jobs periódicos registrados por las apps
+        PeriodicJobState.objects.exclude(pk=state.pk).update(next_run_at=timezone.now() + timedelta(days=1))
+        PeriodicJobState.objects.filter(pk=state.pk).update(
+            next_run_at=timezone.now() - timedelta(hours=5)
+        )
+        self.assertEqual(worker.schedule_periodic(), 1)
+        self.assertEqual(worker.schedule_periodic(), 0)
+
+        state.refresh_from_db()
+        self.assertGreater(state.next_run_at, timezone.now())
+        self.assertLessEqual(state.next_run_at, timezone.now() + definition.every)
+        self.assertEqual(Job.objects.filter(name='tests.periodic').count(), 1)
+
+    def test_first_run_aligned(self):
+        """Test alineación de la primera ejecución a la hora local"""
+        definition = job(name='tests.aligned', every=timedelta(days=1), at=time(9, 0))(lambda: None)
+
+        first = definition.first_run_at()
+
+        self.assertEqual(timezone.localtime(first).hour, 9)
+        self.assertGreater(first, timezone.now())
+
+    def test_metrics(self):
+        """Test métricas de la cola"""
+        add_job.enqueue(args=[1, 2], on_commit=False)
+        fail_job.enqueue(max_attempts=1, on_commit=False)
+        JobWorker(worker_id='test-worker').run_once()
+
+        metrics = JobService.metrics(hours=1)
+
+        self.assertEqual(metrics['succeeded'], 1)
+        self.assertEqual(metrics['failed'], 1)
+        self.assertEqual(metrics['by_status'].get('succeeded'), 1)
@@ -0,0 +1,11 @@
+"""
+URLs para el sistema de jobs
+"""
+from django.urls import path
+from . import views
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('metrics/', views.job_metrics, name='metrics'),
+]
@@ -0,0 +1,21 @@
+"""
+Vistas del sistema de jobs
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from apps.jobs.services import JobService
+
+
+@staff_member_required
+def job_metrics(request):
+    """
+    Métricas de la cola de jobs en JSON
+    Endpoint: /saas-admin/jobs/metrics/?hours=1
+    """
+    try:
+        hours = max(1, min(int(request.GET.get('hours', 1)), 168))
+    except ValueError:
+        hours = 1
+    
+    return JsonResponse(JobService.metrics(hours=hours))
@@ -1,6 +1,82 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.db import models
 
 
+# Organización (tenant) de la petición actual; la establece TenantMiddleware
+_current_organization = ContextVar('current_organization', default=None)
+
+
+def get_current_organization():
+    """Retorna la organización ligada al contexto actual (o None)"""
+    return _current_organization.get()
+
+
+def set_current_organization(organization):
+    """
+    Liga una organización al contexto actual
+
+    Returns:
+        Token para restaurar el valor anterior con reset_current_organization
+    """
+    return _current_organization.set(organization)
+
+
+def reset_current_organization(token):
+    """Restaura la organización que había antes de set_current_organization"""
+    _current_organization.reset(token)
+
+
+@contextmanager
+def tenant_context(organization):
+    """
+    Ejecuta un bloque con `organization` como tenant actual
+
+    Uso:
+        with tenant_context(org):
+            Sale.objects.count()  # Solo ventas de org
+
+        with tenant_context(None):
+            Sale.objects.count()  # Sin filtro de organización
+    """
+    token = set_current_organization(organization)
+    try:
+        yield organization
+    finally:
+        reset_current_organization(token)
+
+
+class TenantQuerySet(models.QuerySet):
+    """QuerySet de modelos multi-tenant"""
+
+    def for_organization(self, organization):
+        """Filtra explícitamente por organización"""
+        return self.filter(organization=organization)
+
+
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+    """
+    Manager que agrega automáticamente el filtro por la organización del
+    contexto actual
+
+    Sin tenant ligado (comandos, jobs, admin, superusuarios) no filtra.
+    Para consultas entre organizaciones dentro de una petición usar
+    `Model.objects.unscoped()`.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        organization = get_current_organization()
+        if organization is not None:
+            queryset = queryset.filter(organization=organization)
+        return queryset
+
+    def unscoped(self):
+        """QuerySet sin el filtro automático de organización"""
+        return super().get_queryset()
+
+
 class TenantModel(models.Model):
     """
     Modelo abstracto base para todos los modelos que deben ser multi-tenant
@@ -13,7 +89,9 @@ class TenantModel(models.Model):
         null=True,  # Temporal para migración
         blank=True  # Temporal para migración
     )
-    
+
+    objects = TenantManager()
+
     class Meta:
         abstract = True
         indexes = [
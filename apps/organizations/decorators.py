@@ -6,9 +6,25 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import JsonResponse
 from django.urls import reverse
+from .base_models import tenant_context
 from .plan_features import has_module_access, get_required_plan_for_module, get_module_info
 
 
+def without_tenant_scope(view_func):
+    """
+    Ejecuta la vista sin el filtro automático de organización
+
+    Para vistas públicas que reciben la organización por URL (landing,
+    agendamiento) y no deben quedar limitadas a la organización del usuario
+    que tenga sesión iniciada.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        with tenant_context(None):
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
 def require_module(module_code):
     """
     Decorador que requiere acceso a un módulo específico
@@ -0,0 +1,39 @@
+"""
+Management command para conciliar el uso de almacenamiento por organización
+"""
+from django.core.management.base import BaseCommand
+from apps.organizations.services.storage_usage import StorageUsageService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de almacenamiento recorriendo MEDIA_ROOT'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            type=int,
+            action='append',
+            help='ID de la organización (se puede repetir; default: todas)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Hilos para recorrer carpetas en paralelo (default: 4)'
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('Conciliando uso de almacenamiento...')
+        
+        drift = StorageUsageService.reconcile(
+            organization_ids=options['organization'],
+            workers=options['workers'],
+        )
+        
+        for organization_id, delta in drift.items():
+            if delta:
+                self.stdout.write(f'  - Organización {organization_id}: {delta:+,} bytes corregidos')
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {len(drift)} organizaciones conciliadas')
+        )
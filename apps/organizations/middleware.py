@@ -2,6 +2,7 @@ from django.utils.deprecation import MiddlewareMixin
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
+from .base_models import tenant_context
 from .models import Organization, OrganizationMember
 
 
@@ -9,6 +10,9 @@ class TenantMiddleware(MiddlewareMixin):
     """
     Middleware que identifica y establece la organización (tenant) actual
     basándose en el subdominio o en la sesión del usuario
+
+    La organización queda ligada al contexto durante la petición, de modo que
+    los managers de TenantModel filtran por ella automáticamente.
     """
     
     EXEMPT_PATHS = [
@@ -20,14 +24,30 @@ class TenantMiddleware(MiddlewareMixin):
         '/api/configuration/',  # Endpoint público para verificar sistema
         '/api/available-dates/',  # API pública de disponibilidad
         '/api/available-slots/',  # API pública de slots
+        '/api/hold-slot/',  # API pública de retención de horarios
         '/api/book/',  # API pública de reservas
     ]
     
+    # El tenant se liga al contexto alrededor de get_response (solo síncrono)
+    async_capable = False
+    
+    def __call__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            with tenant_context(request.organization):
+                response = self.get_response(request)
+        return response
+    
     def process_request(self, request):
         # Inicializar el tenant en None
         request.organization = None
         request.tenant = None
         
+        self._resolve_organization(request)
+        return None
+    
+    def _resolve_organization(self, request):
+        """Determina la organización de la petición"""
         # Verificar si la ruta está exenta
         for exempt_path in self.EXEMPT_PATHS:
             if request.path.startswith(exempt_path):
@@ -462,18 +482,12 @@ class LimitEnforcementMiddleware(MiddlewareMixin):
             except:
                 counts['appointments'] = 0
         
-        # Facturas del mes actual
+        # Facturas electrónicas: uso efectivo del cupo (plan - disponibles),
+        # así los paquetes comprados extienden el límite del plan
         if limit_type == 'invoices':
-            try:
-                from apps.billing.models import Invoice
-                now = datetime.now()
-                start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                counts['invoices'] = Invoice.objects.filter(
-                    organization=organization,
-                    created_at__gte=start_of_month
-                ).count()
-            except:
-                counts['invoices'] = 0
+            from .services.invoice_quota import InvoiceQuotaService
+            cupo = InvoiceQuotaService.get_summary(organization)
+            counts['invoices'] = (cupo['plan_limit'] or 0) - (cupo['available'] or 0)
         
         return counts.get(limit_type, 0)
     
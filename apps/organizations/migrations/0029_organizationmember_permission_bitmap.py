@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0028_organization_upload_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organizationmember',
+            name='permission_bitmap',
+            field=models.TextField(blank=True, editable=False, null=True, verbose_name='Bitmap de Permisos'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0029_organizationmember_permission_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceQuotaCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='Primer día del mes', verbose_name='Mes')),
+                ('plan_limit', models.IntegerField(blank=True, help_text='Facturas/mes del plan al momento del cálculo (vacío = ilimitado)', null=True, verbose_name='Cupo del Plan')),
+                ('used_plan', models.IntegerField(default=0, verbose_name='Usadas del Plan')),
+                ('used_packages', models.IntegerField(default=0, verbose_name='Usadas de Paquetes')),
+                ('reserved', models.IntegerField(default=0, verbose_name='Reservadas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_quota_counters', to='organizations.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Contador de Facturas Electrónicas',
+                'verbose_name_plural': 'Contadores de Facturas Electrónicas',
+                'ordering': ['-period'],
+                'unique_together': {('organization', 'period')},
+            },
+        ),
+    ]
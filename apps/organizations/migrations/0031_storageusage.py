@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0030_invoicequotacounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100, verbose_name='Categoría')),
+                ('bytes_used', models.BigIntegerField(default=0, verbose_name='Bytes Usados')),
+                ('file_count', models.IntegerField(default=0, verbose_name='Archivos')),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Conciliación')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='storage_usage', to='organizations.organization', verbose_name='Organización')),
+            ],
+            options={
+                'verbose_name': 'Uso de Almacenamiento',
+                'verbose_name_plural': 'Uso de Almacenamiento',
+                'ordering': ['organization', 'category'],
+                'unique_together': {('organization', 'category')},
+            },
+        ),
+    ]
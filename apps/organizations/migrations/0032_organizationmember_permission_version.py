@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0031_storageusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organizationmember',
+            name='permission_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión de Permisos'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
 from apps.core.storage_utils import OrganizationUploadPath
 from datetime import timedelta
@@ -382,55 +383,25 @@ class Organization(models.Model):
     def get_available_invoices(self):
         """
         Calcula el total de facturas electrónicas disponibles.
-        Incluye las del plan + paquetes comprados.
+        Incluye las del plan + paquetes comprados, menos las reservadas.
         """
-        total_available = 0
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService
         
-        # Facturas del plan
-        subscription = self.current_subscription
-        if subscription and subscription.plan.allow_electronic_invoicing:
-            plan_invoices = subscription.plan.max_invoices_month
-            if plan_invoices == 0:  # Ilimitado
-                return 999999
-            total_available += plan_invoices
-        
-        # Facturas de paquetes comprados
-        invoice_purchases = self.invoice_purchases.filter(
-            payment_status='paid'
-        )
-        
-        for purchase in invoice_purchases:
-            if purchase.is_valid:
-                total_available += purchase.remaining_invoices
-        
-        return total_available
+        available = InvoiceQuotaService.get_summary(self)['available']
+        return 999999 if available is None else available
     
     def use_invoice(self):
         """
         Registra el uso de una factura electrónica.
-        Descuenta primero de los paquetes comprados, luego del plan.
+        Descuenta primero del cupo mensual del plan, luego de los paquetes comprados.
         """
-        # Intentar usar de paquetes comprados primero
-        invoice_purchases = self.invoice_purchases.filter(
-            payment_status='paid'
-        ).order_by('purchased_at')
-        
-        for purchase in invoice_purchases:
-            if purchase.is_valid and purchase.remaining_invoices > 0:
-                purchase.used_invoices += 1
-                purchase.save()
-                return True
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService, InvoiceQuotaExceeded
         
-        # Si no hay paquetes, verificar si el plan permite
-        subscription = self.current_subscription
-        if subscription and subscription.plan.allow_electronic_invoicing:
-            if subscription.plan.max_invoices_month == 0:  # Ilimitado
-                return True
-            # Si tiene límite, deberíamos llevar un contador mensual
-            # Por ahora retornamos True si el plan lo permite
-            return True
-        
-        return False
+        try:
+            InvoiceQuotaService.consume(self)
+        except InvoiceQuotaExceeded:
+            return False
+        return True
 
 
 class Subscription(models.Model):
@@ -543,6 +514,31 @@ class ModulePermission(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.code})"
+    
+    INDEX_CACHE_KEY = 'organizations:module_index'
+    INDEX_CACHE_TIMEOUT = 300
+    
+    @classmethod
+    def get_index(cls):
+        """
+        Índice de módulos {code: (id, is_active)} usado por los bitmaps de
+        permisos de los miembros
+        
+        Los signals de save/delete lo invalidan; el TTL acota lo que dura un
+        índice viejo tras cambios que no disparan signals (ej: update()).
+        """
+        index = cache.get(cls.INDEX_CACHE_KEY)
+        if index is None:
+            index = {
+                code: (pk, is_active)
+                for pk, code, is_active in cls.objects.values_list('pk', 'code', 'is_active')
+            }
+            cache.set(cls.INDEX_CACHE_KEY, index, cls.INDEX_CACHE_TIMEOUT)
+        return index
+    
+    @classmethod
+    def clear_index_cache(cls):
+        cache.delete(cls.INDEX_CACHE_KEY)
 
 
 class OrganizationMember(models.Model):
@@ -574,6 +570,11 @@ class OrganizationMember(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     invited_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='invited_members')
     
+    # Bitmap de permisos por módulo (hex); None = pendiente de reconstruir
+    permission_bitmap = models.TextField(null=True, blank=True, editable=False, verbose_name='Bitmap de Permisos')
+    # Se incrementa con cada invalidación del bitmap
+    permission_version = models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión de Permisos')
+    
     class Meta:
         verbose_name = 'Miembro de Organización'
         verbose_name_plural = 'Miembros de Organización'
@@ -582,66 +583,120 @@ class OrganizationMember(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username} - {self.organization.name} ({self.get_role_display()})"
     
+    # ==================== PERMISOS POR MÓDULO ====================
+    # Los permisos de MemberModulePermission se compilan en un bitmap con 5
+    # bits por módulo (ver, crear, editar, eliminar y "asignado"; posición =
+    # id del módulo * 5) guardado en hexadecimal en `permission_bitmap`. Los
+    # signals lo invalidan al cambiar un permiso (y suben
+    # `permission_version`) y se reconstruye en el siguiente uso.
+    
+    PERMISSION_BITS = ('view', 'create', 'edit', 'delete')
+    PERMISSION_SLOT = 5
+    ASSIGNED_BIT = 1 << 4
+    
+    def rebuild_permission_bitmap(self, save=True):
+        """
+        Recompila el bitmap desde MemberModulePermission
+        
+        Solo se guarda si `permission_version` no cambió desde antes de leer
+        los permisos: si un signal lo invalidó mientras tanto, el bitmap
+        calculado ya es viejo y se deja en NULL para la siguiente lectura.
+        """
+        version = None
+        if save and self.pk:
+            version = OrganizationMember.objects.filter(pk=self.pk).values_list(
+                'permission_version', flat=True
+            ).first()
+        
+        bitmap = 0
+        rows = MemberModulePermission.objects.filter(member=self).values_list(
+            'module_id', 'can_view', 'can_create', 'can_edit', 'can_delete'
+        )
+        for module_id, *flags in rows:
+            slot = self.ASSIGNED_BIT
+            for offset, allowed in enumerate(flags):
+                if allowed:
+                    slot |= 1 << offset
+            bitmap |= slot << (module_id * self.PERMISSION_SLOT)
+        
+        self.permission_bitmap = format(bitmap, 'x')
+        self._permission_bits = bitmap
+        if version is not None:
+            OrganizationMember.objects.filter(pk=self.pk, permission_version=version).update(
+                permission_bitmap=self.permission_bitmap
+            )
+        return bitmap
+    
+    def get_permission_bits(self):
+        """Bitmap de permisos como entero (lo reconstruye si fue invalidado)"""
+        bits = getattr(self, '_permission_bits', None)
+        if bits is None:
+            if self.permission_bitmap is None:
+                bits = self.rebuild_permission_bitmap()
+            else:
+                bits = int(self.permission_bitmap or '0', 16)
+            self._permission_bits = bits
+        return bits
+    
+    def _module_flags(self, module_code):
+        """Bits de permisos de un módulo y si el módulo está activo"""
+        entry = ModulePermission.get_index().get(module_code)
+        if entry is None:
+            return 0, False
+        module_id, is_active = entry
+        return (self.get_permission_bits() >> (module_id * self.PERMISSION_SLOT)) & 0b11111, is_active
+    
+    def has_permission(self, module_code, permission_type='view'):
+        """Verifica un permiso ('view', 'create', 'edit', 'delete') sobre un módulo"""
+        if self.role in ['owner', 'admin']:
+            return True
+        
+        flags, _ = self._module_flags(module_code)
+        return bool(flags & (1 << self.PERMISSION_BITS.index(permission_type)))
+    
+    def get_module_permissions(self):
+        """
+        Permisos por código de módulo para templates
+        
+        Returns:
+            dict: {code: {'can_view', 'can_create', 'can_edit', 'can_delete'}}
+        """
+        bits = self.get_permission_bits()
+        permissions = {}
+        for code, (module_id, _) in ModulePermission.get_index().items():
+            flags = (bits >> (module_id * self.PERMISSION_SLOT)) & 0b11111
+            if flags & self.ASSIGNED_BIT:
+                permissions[code] = {
+                    f'can_{name}': bool(flags & (1 << offset))
+                    for offset, name in enumerate(self.PERMISSION_BITS)
+                }
+        return permissions
+    
     def has_module_access(self, module_code):
         """Verifica si el miembro tiene acceso a un módulo específico"""
         # Owner y Admin tienen acceso total
         if self.role in ['owner', 'admin']:
             return True
         
-        # Verificar permisos personalizados
-        return self.custom_permissions.filter(code=module_code, is_active=True).exists()
+        # Verificar permisos personalizados (módulo asignado y activo)
+        flags, is_active = self._module_flags(module_code)
+        return bool(flags & self.ASSIGNED_BIT) and is_active
     
     def can_view(self, module_code):
         """Verifica si puede ver un módulo"""
-        if self.role in ['owner', 'admin']:
-            return True
-        
-        perm = MemberModulePermission.objects.filter(
-            member=self, 
-            module__code=module_code
-        ).first()
-        return perm.can_view if perm else False
+        return self.has_permission(module_code, 'view')
     
     def can_create(self, module_code):
         """Verifica si puede crear en un módulo"""
-        if self.role in ['owner', 'admin']:
-            return True
-        
-        perm = MemberModulePermission.objects.filter(
-            member=self, 
-            module__code=module_code
-        ).first()
-        return perm.can_create if perm else False
+        return self.has_permission(module_code, 'create')
     
     def can_edit(self, module_code):
         """Verifica si puede editar en un módulo"""
-        if self.role in ['owner', 'admin']:
-            return True
-        
-        perm = MemberModulePermission.objects.filter(
-            member=self, 
-            module__code=module_code
-        ).first()
-        return perm.can_edit if perm else False
+        return self.has_permission(module_code, 'edit')
     
     def can_delete(self, module_code):
         """Verifica si puede eliminar en un módulo"""
-        if self.role in ['owner', 'admin']:
-            return True
-        
-        perm = MemberModulePermission.objects.filter(
-            member=self, 
-            module__code=module_code
-        ).first()
-        return perm.can_delete if perm else False
-        # CÓDIGO ORIGINAL:
-        # if self.role in ['owner', 'admin']:
-        #     return True
-        # perm = MemberModulePermission.objects.filter(
-        #     member=self, 
-        #     module__code=module_code
-        # ).first()
-        # return perm.can_delete if perm else False
+        return self.has_permission(module_code, 'delete')
 
 
 class MemberModulePermission(models.Model):
@@ -1346,6 +1401,81 @@ class InvoicePackagePurchase(models.Model):
         return True
 
 
+class InvoiceQuotaCounter(models.Model):
+    """
+    Contador mensual de facturas electrónicas por organización
+
+    Lleva el consumo del cupo del plan y las facturas reservadas para
+    lotes. Se actualiza con F() bajo select_for_update desde
+    InvoiceQuotaService.
+    """
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='invoice_quota_counters',
+        verbose_name='Organización'
+    )
+    period = models.DateField(verbose_name='Mes', help_text='Primer día del mes')
+    
+    plan_limit = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Cupo del Plan',
+        help_text='Facturas/mes del plan al momento del cálculo (vacío = ilimitado)'
+    )
+    used_plan = models.IntegerField(default=0, verbose_name='Usadas del Plan')
+    used_packages = models.IntegerField(default=0, verbose_name='Usadas de Paquetes')
+    reserved = models.IntegerField(default=0, verbose_name='Reservadas')
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Contador de Facturas Electrónicas'
+        verbose_name_plural = 'Contadores de Facturas Electrónicas'
+        unique_together = ['organization', 'period']
+        ordering = ['-period']
+    
+    def __str__(self):
+        return f"{self.organization.name} - {self.period:%Y-%m} ({self.used_plan + self.used_packages} usadas)"
+    
+    @property
+    def plan_remaining(self):
+        """Facturas restantes del cupo del plan (None = ilimitado)"""
+        if self.plan_limit is None:
+            return None
+        return max(0, self.plan_limit - self.used_plan)
+
+
+class StorageUsage(models.Model):
+    """
+    Uso de almacenamiento por organización y categoría (carpeta de primer
+    nivel dentro de org_{id}/, o 'documents' para el gestor documental)
+
+    Se actualiza de forma incremental al guardar/eliminar archivos y se
+    corrige con `python manage.py reconcile_storage_usage`.
+    """
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='storage_usage',
+        verbose_name='Organización'
+    )
+    category = models.CharField(max_length=100, verbose_name='Categoría')
+    bytes_used = models.BigIntegerField(default=0, verbose_name='Bytes Usados')
+    file_count = models.IntegerField(default=0, verbose_name='Archivos')
+    reconciled_at = models.DateTimeField(null=True, blank=True, verbose_name='Última Conciliación')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Uso de Almacenamiento'
+        verbose_name_plural = 'Uso de Almacenamiento'
+        unique_together = ['organization', 'category']
+        ordering = ['organization', 'category']
+    
+    def __str__(self):
+        return f"{self.organization.name} - {self.category} ({self.bytes_used} bytes)"
+
+
 class AddonPurchase(models.Model):
     """Compra de add-ons/módulos individuales"""
     BILLING_CYCLES = [
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Cupo de facturas electrónicas por organización
+
+El cupo disponible es el del plan para el mes en curso (InvoiceQuotaCounter)
+más el saldo de los paquetes comprados (InvoicePackagePurchase), menos las
+facturas reservadas por lotes en curso. Todo consumo se hace dentro de una
+transacción con el contador del mes bloqueado (select_for_update) y
+actualizaciones con F(), de modo que dos facturas simultáneas no puedan
+gastar el mismo cupo.
+
+Uso:
+    from apps.organizations.services.invoice_quota import InvoiceQuotaService
+
+    InvoiceQuotaService.consume(organization)      # una factura
+
+    with InvoiceQuotaService.reservation(organization, 50) as quota:
+        for invoice in batch:
+            ...
+            quota.consume()                        # lo no usado se libera
+"""
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from apps.organizations.models import InvoiceQuotaCounter, InvoicePackagePurchase
+
+
+class InvoiceQuotaExceeded(ValueError):
+    """No hay cupo de facturas electrónicas suficiente"""
+
+
+class InvoiceQuotaReservation:
+    """Cupo reservado para un lote de facturas"""
+
+    def __init__(self, organization, period, count):
+        self.organization = organization
+        self.period = period
+        self.count = count
+        self.used = 0
+
+    @property
+    def remaining(self):
+        return self.count - self.used
+
+    def consume(self, count=1):
+        """Consume facturas de la reserva"""
+        if count > self.remaining:
+            raise InvoiceQuotaExceeded(
+                f"La reserva solo tiene {self.remaining} facturas disponibles"
+            )
+        InvoiceQuotaService.consume(self.organization, count, reservation=self)
+        self.used += count
+
+    def release(self):
+        """Libera lo que quede sin usar de la reserva"""
+        if self.remaining > 0:
+            InvoiceQuotaService.release(self.organization, self.remaining, self.period)
+            self.count = self.used
+
+
+class InvoiceQuotaService:
+    """Servicio de cupo de facturas electrónicas"""
+
+    CACHE_TIMEOUT = 300
+
+    @staticmethod
+    def current_period():
+        """Primer día del mes actual (hora local)"""
+        return timezone.localdate().replace(day=1)
+
+    @staticmethod
+    def _cache_key(organization):
+        return f"invoice_quota:{organization.pk}"
+
+    @staticmethod
+    def clear_cache(organization):
+        """Invalida el resumen cacheado (también al confirmar la transacción)"""
+        key = InvoiceQuotaService._cache_key(organization)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+    @staticmethod
+    def get_plan_limit(organization):
+        """
+        Facturas/mes que otorga el plan actual
+
+        Returns:
+            int: Cupo mensual (0 si el plan no incluye facturación electrónica),
+                 o None si es ilimitado
+        """
+        subscription = organization.current_subscription
+        if not subscription or not subscription.plan.allow_electronic_invoicing:
+            return 0
+        if subscription.plan.max_invoices_month == 0:
+            return None
+        return subscription.plan.max_invoices_month
+
+    @staticmethod
+    def get_counter(organization, period=None, lock=False):
+        """
+        Contador del mes (lo crea con el cupo del plan si no existe)
+
+        Args:
+            lock: Bloquear la fila (requiere transacción abierta)
+        """
+        period = period or InvoiceQuotaService.current_period()
+        counter, created = InvoiceQuotaCounter.objects.get_or_create(
+            organization=organization,
+            period=period,
+            defaults={'plan_limit': InvoiceQuotaService.get_plan_limit(organization)}
+        )
+        if lock:
+            counter = InvoiceQuotaCounter.objects.select_for_update().get(pk=counter.pk)
+        return counter
+
+    @staticmethod
+    def _valid_packages(organization):
+        now = timezone.now()
+        return InvoicePackagePurchase.objects.filter(
+            organization=organization,
+            payment_status='paid',
+            used_invoices__lt=F('quantity'),
+        ).filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+
+    @staticmethod
+    def get_summary(organization):
+        """
+        Resumen del cupo (cacheado; lectura O(1) para middleware y vistas)
+
+        Returns:
+            dict: plan_limit, plan_used, plan_remaining (None = ilimitado),
+                  package_remaining, reserved, available (None = ilimitado)
+        """
+        key = InvoiceQuotaService._cache_key(organization)
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+
+        counter = InvoiceQuotaService.get_counter(organization)
+        # El plan pudo cambiar desde que se creó el contador del mes (igual que en consume())
+        plan_limit = InvoiceQuotaService.get_plan_limit(organization)
+        if counter.plan_limit != plan_limit:
+            InvoiceQuotaCounter.objects.filter(pk=counter.pk).update(plan_limit=plan_limit)
+            counter.plan_limit = plan_limit
+        package_remaining = InvoiceQuotaService._valid_packages(organization).aggregate(
+            total=Sum(F('quantity') - F('used_invoices'))
+        )['total'] or 0
+
+        plan_remaining = counter.plan_remaining
+        if plan_remaining is None:
+            available = None
+        else:
+            available = max(0, plan_remaining + package_remaining - counter.reserved)
+
+        summary = {
+            'period': counter.period,
+            'plan_limit': counter.plan_limit,
+            'plan_used': counter.used_plan,
+            'plan_remaining': plan_remaining,
+            'package_used': counter.used_packages,
+            'package_remaining': package_remaining,
+            'reserved': counter.reserved,
+            'available': available,
+        }
+        cache.set(key, summary, InvoiceQuotaService.CACHE_TIMEOUT)
+        return summary
+
+    @staticmethod
+    def consume(organization, count=1, reservation=None):
+        """
+        Consume facturas del cupo: primero del plan (vence con el mes) y
+        luego de los paquetes, del más antiguo al más nuevo
+
+        Args:
+            count: Cantidad de facturas
+            reservation: InvoiceQuotaReservation de la que salen las facturas
+
+        Raises:
+            InvoiceQuotaExceeded: Si no hay cupo suficiente
+        """
+        with transaction.atomic():
+            counter = InvoiceQuotaService.get_counter(organization, lock=True)
+            counter.plan_limit = InvoiceQuotaService.get_plan_limit(organization)
+
+            reserved_credit = 0
+            if reservation is not None:
+                if reservation.period == counter.period:
+                    reserved_credit = count
+                else:
+                    # Reserva de un mes anterior: se libera allá y se cobra en el mes actual
+                    InvoiceQuotaService.release(organization, count, reservation.period)
+
+            packages = list(
+                InvoiceQuotaService._valid_packages(organization)
+                .select_for_update()
+                .order_by('purchased_at')
+            )
+            plan_remaining = counter.plan_remaining
+            package_remaining = sum(p.quantity - p.used_invoices for p in packages)
+            reserved_by_others = counter.reserved - reserved_credit
+
+            if plan_remaining is not None:
+                if plan_remaining + package_remaining - reserved_by_others < count:
+                    raise InvoiceQuotaExceeded(
+                        f"Cupo de facturas electrónicas agotado: "
+                        f"{max(0, plan_remaining + package_remaining - reserved_by_others)} disponibles"
+                    )
+                from_plan = min(count, plan_remaining)
+            else:
+                from_plan = count
+
+            pending = count - from_plan
+            for package in packages:
+                if not pending:
+                    break
+                take = min(pending, package.quantity - package.used_invoices)
+                InvoicePackagePurchase.objects.filter(pk=package.pk).update(
+                    used_invoices=F('used_invoices') + take
+                )
+                pending -= take
+
+            InvoiceQuotaCounter.objects.filter(pk=counter.pk).update(
+                plan_limit=counter.plan_limit,
+                used_plan=F('used_plan') + from_plan,
+                used_packages=F('used_packages') + (count - from_plan),
+                reserved=F('reserved') - reserved_credit,
+                updated_at=timezone.now(),
+            )
+
+        InvoiceQuotaService.clear_cache(organization)
+
+    @staticmethod
+    def reserve(organization, count):
+        """
+        Reserva cupo para un lote de facturas
+
+        Returns:
+            InvoiceQuotaReservation
+
+        Raises:
+            InvoiceQuotaExceeded: Si no hay cupo suficiente para el lote
+        """
+        with transaction.atomic():
+            counter = InvoiceQuotaService.get_counter(organization, lock=True)
+            counter.plan_limit = InvoiceQuotaService.get_plan_limit(organization)
+
+            if counter.plan_remaining is not None:
+                package_remaining = InvoiceQuotaService._valid_packages(organization).aggregate(
+                    total=Sum(F('quantity') - F('used_invoices'))
+                )['total'] or 0
+                available = counter.plan_remaining + package_remaining - counter.reserved
+                if available < count:
+                    raise InvoiceQuotaExceeded(
+                        f"Cupo insuficiente para el lote: {max(0, available)} disponibles, {count} solicitadas"
+                    )
+
+            InvoiceQuotaCounter.objects.filter(pk=counter.pk).update(
+                plan_limit=counter.plan_limit,
+                reserved=F('reserved') + count,
+                updated_at=timezone.now(),
+            )
+
+        InvoiceQuotaService.clear_cache(organization)
+        return InvoiceQuotaReservation(organization, counter.period, count)
+
+    @staticmethod
+    def release(organization, count, period=None):
+        """Devuelve al cupo facturas reservadas y no usadas"""
+        period = period or InvoiceQuotaService.current_period()
+        InvoiceQuotaCounter.objects.filter(
+            organization=organization, period=period, reserved__gte=count
+        ).update(reserved=F('reserved') - count, updated_at=timezone.now())
+        InvoiceQuotaService.clear_cache(organization)
+
+    @staticmethod
+    @contextmanager
+    def reservation(organization, count):
+        """
+        Reserva cupo durante un bloque y libera lo no usado al salir
+
+        Uso:
+            with InvoiceQuotaService.reservation(org, len(batch)) as quota:
+                for item in batch:
+                    quota.consume()
+        """
+        reservation = InvoiceQuotaService.reserve(organization, count)
+        try:
+            yield reservation
+        finally:
+            reservation.release()
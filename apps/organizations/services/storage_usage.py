@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Contabilidad incremental del almacenamiento por organización
+
+Los archivos subidos con OrganizationUploadPath quedan en
+MEDIA_ROOT/org_{id}/{categoría}/...; OrganizationFileSystemStorage
+(apps/core/storage_utils.py) registra aquí cada archivo guardado o
+eliminado, y los documentos (que viven en MEDIA_ROOT/documents/) se
+registran con los signals de apps.documents. Leer el uso de una
+organización es una consulta sobre unas pocas filas de StorageUsage.
+
+La conciliación (`reconcile`) recorre el árbol en paralelo con os.scandir
+y corrige la deriva (archivos escritos fuera del storage, fallos entre el
+guardado y el registro, etc.).
+"""
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from apps.organizations.models import Organization, StorageUsage
+
+logger = logging.getLogger(__name__)
+
+ORG_PATH_RE = re.compile(r'^org_(\d+)(?:/([^/]+))?/')
+
+# Categoría de los archivos del gestor documental (fuera del árbol org_{id})
+DOCUMENTS_CATEGORY = 'documents'
+# Archivos directamente en org_{id}/ (sin subcarpeta)
+ROOT_CATEGORY = 'general'
+
+IGNORED_FILES = {'.gitkeep'}
+
+
+class StorageUsageService:
+    """Servicio de uso de almacenamiento por organización"""
+
+    @staticmethod
+    def parse_path(name):
+        """
+        Organización y categoría de un path relativo a MEDIA_ROOT
+
+        Returns:
+            tuple: (organization_id, category), o None si el path no
+                   pertenece a una organización
+        """
+        match = ORG_PATH_RE.match(name.replace('\\', '/'))
+        if not match:
+            return None
+        return int(match.group(1)), match.group(2) or ROOT_CATEGORY
+
+    @staticmethod
+    def record(organization_id, category, bytes_delta, files_delta):
+        """Suma (o resta) bytes y archivos al contador de una categoría"""
+        updated = StorageUsage.objects.filter(
+            organization_id=organization_id, category=category
+        ).update(
+            bytes_used=F('bytes_used') + bytes_delta,
+            file_count=F('file_count') + files_delta,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            return
+        if not Organization.objects.filter(pk=organization_id).exists():
+            # Las FK se validan al confirmar: no crear filas de organizaciones inexistentes
+            logger.warning(f"Uso de almacenamiento de una organización inexistente: {organization_id}")
+            return
+
+        try:
+            with transaction.atomic():
+                StorageUsage.objects.create(
+                    organization_id=organization_id,
+                    category=category,
+                    bytes_used=max(0, bytes_delta),
+                    file_count=max(0, files_delta),
+                )
+        except IntegrityError:
+            # Otro proceso creó la fila entre el update y el create
+            StorageUsage.objects.filter(
+                organization_id=organization_id, category=category
+            ).update(
+                bytes_used=F('bytes_used') + bytes_delta,
+                file_count=F('file_count') + files_delta,
+                updated_at=timezone.now(),
+            )
+
+    @staticmethod
+    def record_path(name, bytes_delta, files_delta):
+        """Registra un cambio a partir del path del archivo (ignora paths sin organización)"""
+        parsed = StorageUsageService.parse_path(name)
+        if parsed is None or os.path.basename(name) in IGNORED_FILES:
+            return
+        organization_id, category = parsed
+        StorageUsageService.record(organization_id, category, bytes_delta, files_delta)
+
+    @staticmethod
+    def get_usage(organization_id):
+        """
+        Uso actual de almacenamiento de una organización
+
+        Returns:
+            dict: total_bytes, total_mb, total_gb, file_count y by_category
+        """
+        rows = list(
+            StorageUsage.objects.filter(organization_id=organization_id)
+            .values_list('category', 'bytes_used', 'file_count')
+        )
+        total_size = sum(row[1] for row in rows)
+
+        return {
+            'total_bytes': total_size,
+            'total_mb': round(total_size / (1024 * 1024), 2),
+            'total_gb': round(total_size / (1024 * 1024 * 1024), 2),
+            'file_count': sum(row[2] for row in rows),
+            'by_category': {
+                category: {'bytes': size, 'files': count}
+                for category, size, count in rows
+            },
+        }
+
+    @staticmethod
+    def check_quota(organization, incoming_bytes=0):
+        """
+        Verifica el límite de almacenamiento del plan
+
+        Args:
+            organization: Organización
+            incoming_bytes: Tamaño del archivo que se quiere subir
+
+        Returns:
+            tuple: (allowed: bool, used_mb: float, max_mb: int o 'unlimited')
+        """
+        usage = StorageUsageService.get_usage(organization.pk)
+        used_mb = (usage['total_bytes'] + incoming_bytes) / (1024 * 1024)
+
+        subscription = organization.current_subscription
+        if not subscription:
+            return True, round(used_mb, 2), 'unlimited'
+
+        plan = subscription.plan
+        if plan.unlimited_storage:
+            return True, round(used_mb, 2), 'unlimited'
+        return used_mb <= plan.max_storage_mb, round(used_mb, 2), plan.max_storage_mb
+
+    # ==================== CONCILIACIÓN ====================
+
+    @staticmethod
+    def _scan_tree(path):
+        """Bytes y cantidad de archivos bajo `path` (os.scandir iterativo)"""
+        total_size = 0
+        file_count = 0
+        pending = [path]
+
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False) and entry.name not in IGNORED_FILES:
+                                total_size += entry.stat(follow_symlinks=False).st_size
+                                file_count += 1
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+
+        return total_size, file_count
+
+    @staticmethod
+    def scan_organization(organization_id, executor=None):
+        """
+        Recorre org_{id}/ y retorna {categoría: (bytes, archivos)}
+
+        Cada carpeta de primer nivel se recorre en un hilo del `executor`.
+        """
+        org_path = Path(settings.MEDIA_ROOT) / f'org_{organization_id}'
+        usage = {}
+        if not org_path.is_dir():
+            return usage
+
+        root_size, root_count = 0, 0
+        folders = []
+        with os.scandir(org_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry)
+                elif entry.is_file(follow_symlinks=False) and entry.name not in IGNORED_FILES:
+                    root_size += entry.stat(follow_symlinks=False).st_size
+                    root_count += 1
+
+        if root_count:
+            usage[ROOT_CATEGORY] = (root_size, root_count)
+
+        if executor is None:
+            results = map(StorageUsageService._scan_tree, [f.path for f in folders])
+        else:
+            results = executor.map(StorageUsageService._scan_tree, [f.path for f in folders])
+        for folder, (size, count) in zip(folders, results):
+            if count:
+                usage[folder.name] = (size, count)
+
+        return usage
+
+    @staticmethod
+    def _document_usage(organization_ids):
+        from apps.documents.models import Document
+
+        rows = (
+            Document.objects.filter(organization_id__in=organization_ids)
+            .values('organization_id')
+            .annotate(size=Sum('file_size'), count=Count('id'))
+            .order_by()
+        )
+        return {row['organization_id']: (row['size'] or 0, row['count']) for row in rows}
+
+    @staticmethod
+    def reconcile(organization_ids=None, workers=4):
+        """
+        Recalcula los contadores desde el disco (y los documentos desde la BD)
+
+        Args:
+            organization_ids: Organizaciones a conciliar (None = todas)
+            workers: Hilos para recorrer carpetas en paralelo
+
+        Returns:
+            dict: {organization_id: bytes de diferencia corregidos}
+        """
+        if organization_ids is None:
+            organization_ids = list(Organization.objects.values_list('id', flat=True))
+
+        documents = StorageUsageService._document_usage(organization_ids)
+        drift = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for organization_id in organization_ids:
+                usage = StorageUsageService.scan_organization(organization_id, executor)
+                if organization_id in documents:
+                    usage[DOCUMENTS_CATEGORY] = documents[organization_id]
+                drift[organization_id] = StorageUsageService._apply_scan(organization_id, usage)
+
+        return drift
+
+    @staticmethod
+    def _apply_scan(organization_id, usage):
+        now = timezone.now()
+        with transaction.atomic():
+            current = {
+                row.category: row
+                for row in StorageUsage.objects.select_for_update().filter(organization_id=organization_id)
+            }
+            before = sum(row.bytes_used for row in current.values())
+
+            for category, row in current.items():
+                if category not in usage:
+                    row.bytes_used, row.file_count = 0, 0
+            for category, (size, count) in usage.items():
+                row = current.get(category) or StorageUsage(organization_id=organization_id, category=category)
+                row.bytes_used, row.file_count = size, count
+                current[category] = row
+
+            for row in current.values():
+                row.reconciled_at = now
+                row.save()
+
+        return sum(size for size, _ in usage.values()) - before
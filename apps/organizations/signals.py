@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Organization, OrganizationMember
+from .models import (
+    Organization, OrganizationMember, MemberModulePermission, ModulePermission,
+    InvoicePackagePurchase, InvoiceQuotaCounter, Subscription,
+)
 
 
 @receiver(post_save, sender=Organization)
@@ -15,3 +19,38 @@ def create_owner_membership(sender, instance, created, **kwargs):
             user=instance.owner,
             role='owner'
         )
+
+
+@receiver([post_save, post_delete], sender=MemberModulePermission)
+def invalidate_member_permission_bitmap(sender, instance, **kwargs):
+    """
+    Marca el bitmap de permisos del miembro para reconstruirse en el
+    siguiente uso
+    """
+    OrganizationMember.objects.filter(pk=instance.member_id).update(
+        permission_bitmap=None, permission_version=F('permission_version') + 1
+    )
+
+
+@receiver([post_save, post_delete], sender=ModulePermission)
+def invalidate_module_index(sender, instance, **kwargs):
+    """Invalida el índice cacheado de módulos"""
+    ModulePermission.clear_index_cache()
+
+
+@receiver(post_save, sender=Subscription)
+@receiver([post_save, post_delete], sender=InvoicePackagePurchase)
+def refresh_invoice_quota(sender, instance, **kwargs):
+    """
+    Recalcula el cupo de facturas electrónicas al cambiar el plan o un
+    paquete comprado
+    """
+    from .services.invoice_quota import InvoiceQuotaService
+    
+    organization = instance.organization
+    if sender is Subscription:
+        InvoiceQuotaCounter.objects.filter(
+            organization=organization,
+            period=InvoiceQuotaService.current_period()
+        ).update(plan_limit=InvoiceQuotaService.get_plan_limit(organization))
+    InvoiceQuotaService.clear_cache(organization)
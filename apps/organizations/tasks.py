@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 """
-Tareas Celery para gestión automática de trials y suscripciones
+Jobs en segundo plano para gestión automática de trials y suscripciones
+Se ejecutan con los workers de apps.jobs (python manage.py run_jobs)
 """
-from celery import shared_task
+from apps.jobs.registry import job
+from django.db import models
 from django.utils import timezone
-from datetime import timedelta
+from datetime import time, timedelta
 from apps.organizations.models import Organization, TrialStatus
 from apps.organizations.services.notifications import TrialNotificationService
 import logging
@@ -12,7 +14,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-@shared_task
+@job(every=timedelta(days=1), at=time(9, 0))
 def check_trial_status_daily():
     """
     Tarea diaria para verificar el estado de los trials
@@ -101,10 +103,13 @@ def check_trial_status_daily():
     return stats
 
 
-@shared_task
+# Sin `every=`: el flujo de archivo/eliminación aún no está confirmado, así
+# que no corre solo al iniciar `run_jobs`; se ejecuta a mano
+# (archive_expired_organizations.delay())
+@job
 def archive_expired_organizations():
     """
-    Tarea semanal para archivar organizaciones que no pagaron
+    Tarea para archivar organizaciones que no pagaron
     Día 90: Archivar datos
     """
     logger.info("📦 Iniciando proceso de archivo de organizaciones")
@@ -156,10 +161,10 @@ Recuperar datos: https://www.optikaapp.com/dashboard/modules/select/
     return {'archived': archived_count}
 
 
-@shared_task
+@job
 def delete_archived_organizations():
     """
-    Tarea mensual para eliminar organizaciones archivadas hace mucho tiempo
+    Tarea para eliminar organizaciones archivadas hace mucho tiempo
     Día 210: Eliminación permanente
     """
     logger.info("🗑️ Iniciando proceso de eliminación de organizaciones")
@@ -173,22 +178,11 @@ def delete_archived_organizations():
             org_name = trial.organization.name
             user_email = trial.organization.owner.email if trial.organization.owner else None
             
-            # Enviar última notificación
-            if user_email:
-                try:
-                    from django.core.mail import send_mail
-                    send_mail(
-                        subject="Cuenta eliminada - Esperamos verte pronto",
-                        message=f"Tu cuenta de {org_name} ha sido eliminada permanentemente.",
-                        from_email='noreply@optikaapp.com',
-                        recipient_list=[user_email],
-                        fail_silently=True,
-                    )
-                except:
-                    pass
-            
-            # ELIMINAR (comentado por seguridad - descomentar en producción)
+            # ELIMINAR (comentado por seguridad - descomentar en producción).
+            # El aviso al dueño va junto con la eliminación: no se anuncia una
+            # eliminación que no ocurrió
             # trial.organization.delete()
+            # _send_deletion_notice(org_name, user_email)
             logger.warning(f"⚠️ PENDIENTE ELIMINACIÓN: {org_name}")
             deleted_count += 1
     
@@ -196,7 +190,24 @@ def delete_archived_organizations():
     return {'deleted': deleted_count}
 
 
-@shared_task
+def _send_deletion_notice(org_name, user_email):
+    """Última notificación al dueño de una organización eliminada"""
+    if not user_email:
+        return
+    try:
+        from django.core.mail import send_mail
+        send_mail(
+            subject="Cuenta eliminada - Esperamos verte pronto",
+            message=f"Tu cuenta de {org_name} ha sido eliminada permanentemente.",
+            from_email='noreply@optikaapp.com',
+            recipient_list=[user_email],
+            fail_silently=True,
+        )
+    except Exception as e:
+        logger.error(f"Error enviando notificación de eliminación: {str(e)}")
+
+
+@job(queue='notifications', priority=10)
 def send_welcome_email_after_registration(organization_id):
     """
     Enviar email y WhatsApp de bienvenida inmediatamente después del registro
@@ -227,7 +238,7 @@ def send_welcome_email_after_registration(organization_id):
         return {'success': False, 'error': str(e)}
 
 
-@shared_task
+@job(every=timedelta(days=1), at=time(2, 0))
 def update_module_usage_stats():
     """
     Actualizar estadísticas de uso de módulos para cada organización
@@ -277,3 +288,18 @@ def update_module_usage_stats():
     
     logger.info(f"✅ Estadísticas actualizadas para {trials.count()} organizaciones")
     return {'updated': trials.count()}
+
+
+@job(every=timedelta(days=1), at=time(3, 30))
+def reconcile_storage_usage():
+    """
+    Conciliar los contadores de almacenamiento con el disco
+    Corrige la deriva de los registros incrementales (ver StorageUsageService)
+    """
+    from apps.organizations.services.storage_usage import StorageUsageService
+    
+    drift = StorageUsageService.reconcile()
+    corrected = {org_id: delta for org_id, delta in drift.items() if delta}
+    
+    logger.info(f"💾 Almacenamiento conciliado: {len(drift)} organizaciones, {len(corrected)} con diferencias")
+    return {'organizations': len(drift), 'corrected': len(corrected)}
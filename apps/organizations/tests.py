@@ -8,6 +8,7 @@ from apps.organizations.models import (
 )
 from apps.organizations.middleware import TenantMiddleware
 from datetime import timedelta
+from unittest.mock import patch
 from django.utils import timezone
 
 
@@ -232,3 +233,419 @@ class OrganizationViewsTest(TestCase):
         self.assertTrue(
             Organization.objects.filter(name='New Optica').exists()
         )
+
+
+class TenantManagerTest(TestCase):
+    """Tests para el filtro automático de organización en TenantModel"""
+    
+    def setUp(self):
+        from apps.sales.models import Category
+        
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.organization = Organization.objects.create(
+            name='Test Optica',
+            slug='test-optica',
+            email='contact@testoptica.com',
+            owner=self.user
+        )
+        self.other = Organization.objects.create(
+            name='Otra Optica',
+            slug='otra-optica',
+            email='contact@otra.com',
+            owner=self.user
+        )
+        Category.objects.create(organization=self.organization, name='Monturas')
+        Category.objects.create(organization=self.other, name='Lentes')
+    
+    def test_no_tenant_no_filter(self):
+        """Test que sin tenant ligado no se filtra"""
+        from apps.sales.models import Category
+        
+        self.assertEqual(Category.objects.count(), 2)
+    
+    def test_tenant_context_filters(self):
+        """Test que con tenant ligado se filtra automáticamente"""
+        from apps.sales.models import Category
+        from apps.organizations.base_models import tenant_context, get_current_organization
+        
+        with tenant_context(self.organization):
+            self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['Monturas'])
+            self.assertEqual(Category.objects.unscoped().count(), 2)
+            self.assertEqual(Category.objects.for_organization(self.other).count(), 0)
+        
+        self.assertIsNone(get_current_organization())
+    
+    def test_middleware_binds_tenant_during_request(self):
+        """Test que el middleware liga el tenant solo durante la petición"""
+        from apps.sales.models import Category
+        from apps.organizations.base_models import get_current_organization
+        
+        OrganizationMember.objects.get_or_create(
+            organization=self.other, user=self.user, defaults={'role': 'owner', 'is_active': True}
+        )
+        seen = {}
+        
+        def get_response(request):
+            seen['organization'] = get_current_organization()
+            seen['names'] = list(Category.objects.values_list('name', flat=True))
+        
+        request = self.factory.get('/dashboard/')
+        request.user = self.user
+        request.session = {'current_organization_id': self.other.id}
+        TenantMiddleware(get_response=get_response)(request)
+        
+        self.assertEqual(seen['organization'], self.other)
+        self.assertEqual(seen['names'], ['Lentes'])
+        self.assertIsNone(get_current_organization())
+
+
+class MemberPermissionBitmapTest(TestCase):
+    """Tests para el bitmap de permisos por módulo de OrganizationMember"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.organizations.models import ModulePermission, MemberModulePermission
+        
+        cache.clear()
+        owner = User.objects.create_user(username='owner', password='testpass123')
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        self.organization = Organization.objects.create(
+            name='Test Optica',
+            slug='test-optica',
+            email='contact@testoptica.com',
+            owner=owner
+        )
+        self.member = OrganizationMember.objects.create(
+            organization=self.organization, user=self.user, role='staff'
+        )
+        self.patients = ModulePermission.objects.create(code='patients', name='Pacientes', category='clinical')
+        self.sales = ModulePermission.objects.create(code='sales', name='Ventas', category='sales')
+        self.reports = ModulePermission.objects.create(code='reports', name='Reportes', category='admin')
+        MemberModulePermission.objects.create(
+            member=self.member, module=self.patients, can_view=True, can_create=True
+        )
+        MemberModulePermission.objects.create(
+            member=self.member, module=self.sales, can_view=True, can_delete=True
+        )
+        MemberModulePermission.objects.create(member=self.member, module=self.reports, can_view=False)
+    
+    def test_permission_checks_use_bitmap(self):
+        """Test que los permisos salen del bitmap sin consultas tras compilarlo"""
+        member = OrganizationMember.objects.get(pk=self.member.pk)
+        member.has_module_access('patients')
+        
+        with self.assertNumQueries(0):
+            self.assertTrue(member.can_view('patients'))
+            self.assertTrue(member.can_create('patients'))
+            self.assertFalse(member.can_edit('patients'))
+            self.assertTrue(member.can_delete('sales'))
+            self.assertFalse(member.can_create('sales'))
+            self.assertFalse(member.can_view('reports'))
+            self.assertTrue(member.has_module_access('reports'))
+            self.assertFalse(member.has_module_access('inventory'))
+            self.assertEqual(member.get_module_permissions()['sales'], {
+                'can_view': True, 'can_create': False, 'can_edit': False, 'can_delete': True,
+            })
+        
+        # El bitmap queda guardado: una nueva instancia no lo recompila
+        member = OrganizationMember.objects.get(pk=self.member.pk)
+        self.assertIsNotNone(member.permission_bitmap)
+        with self.assertNumQueries(0):
+            self.assertTrue(member.can_view('sales'))
+    
+    def test_permission_change_invalidates_bitmap(self):
+        """Test que cambiar un permiso o desactivar un módulo invalida el bitmap"""
+        from apps.organizations.models import MemberModulePermission
+        
+        self.member.rebuild_permission_bitmap()
+        perm = MemberModulePermission.objects.get(member=self.member, module=self.patients)
+        perm.can_edit = True
+        perm.save()
+        
+        member = OrganizationMember.objects.get(pk=self.member.pk)
+        self.assertIsNone(member.permission_bitmap)
+        self.assertTrue(member.can_edit('patients'))
+        
+        MemberModulePermission.objects.filter(member=self.member, module=self.sales).delete()
+        self.reports.is_active = False
+        self.reports.save()
+        
+        member = OrganizationMember.objects.get(pk=self.member.pk)
+        self.assertFalse(member.can_view('sales'))
+        self.assertFalse(member.has_module_access('reports'))
+    
+    def test_rebuild_overlapping_invalidation_is_discarded(self):
+        """Test que un rebuild que se cruza con una invalidación no guarda un bitmap viejo"""
+        from apps.organizations.models import MemberModulePermission
+        
+        member = OrganizationMember.objects.get(pk=self.member.pk)
+        version = member.permission_version
+        real_filter = MemberModulePermission.objects.filter
+        
+        def filter_then_invalidate(*args, **kwargs):
+            rows = real_filter(*args, **kwargs)
+            # La invalidación llega después de leer la versión y antes de guardar
+            MemberModulePermission.objects.get(member=self.member, module=self.patients).save()
+            return rows
+        
+        with patch.object(MemberModulePermission.objects, 'filter', side_effect=filter_then_invalidate):
+            member.rebuild_permission_bitmap()
+        
+        member = OrganizationMember.objects.get(pk=self.member.pk)
+        self.assertIsNone(member.permission_bitmap)
+        self.assertEqual(member.permission_version, version + 1)
+    
+    def test_owner_has_all_permissions(self):
+        """Test que owner y admin tienen todos los permisos"""
+        owner = OrganizationMember.objects.get(organization=self.organization, role='owner')
+        
+        with self.assertNumQueries(0):
+            self.assertTrue(owner.can_delete('patients'))
+            self.assertTrue(owner.has_module_access('inventory'))
+
+
+class InvoiceQuotaServiceTest(TestCase):
+    """Tests para el cupo de facturas electrónicas"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.organizations.models import InvoicePackagePurchase
+        
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.organization = Organization.objects.create(
+            name='Test Optica',
+            slug='test-optica',
+            email='contact@testoptica.com',
+            owner=self.user
+        )
+        self.plan = SubscriptionPlan.objects.create(
+            name='Profesional',
+            slug='profesional',
+            plan_type='professional',
+            price_monthly=99.99,
+            price_yearly=999.99,
+            allow_electronic_invoicing=True,
+            max_invoices_month=2
+        )
+        Subscription.objects.create(
+            organization=self.organization,
+            plan=self.plan,
+            billing_cycle='monthly'
+        )
+        self.package = InvoicePackagePurchase.objects.create(
+            organization=self.organization,
+            quantity=50,
+            price=19900,
+            payment_status='paid',
+            used_invoices=47
+        )
+    
+    def test_consume_plan_then_packages(self):
+        """Test que se consume primero el cupo del plan y luego los paquetes"""
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService, InvoiceQuotaExceeded
+        
+        self.assertEqual(self.organization.get_available_invoices(), 5)
+        
+        InvoiceQuotaService.consume(self.organization, 3)
+        
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.used_invoices, 48)
+        summary = InvoiceQuotaService.get_summary(self.organization)
+        self.assertEqual(summary['plan_used'], 2)
+        self.assertEqual(summary['available'], 2)
+        
+        self.assertTrue(self.organization.use_invoice())
+        self.assertTrue(self.organization.use_invoice())
+        self.assertFalse(self.organization.use_invoice())
+        with self.assertRaises(InvoiceQuotaExceeded):
+            InvoiceQuotaService.consume(self.organization)
+        self.assertEqual(self.organization.get_available_invoices(), 0)
+    
+    def test_reservation_holds_quota(self):
+        """Test que una reserva aparta cupo y libera lo no usado"""
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService, InvoiceQuotaExceeded
+        
+        with InvoiceQuotaService.reservation(self.organization, 4) as quota:
+            self.assertEqual(self.organization.get_available_invoices(), 1)
+            with self.assertRaises(InvoiceQuotaExceeded):
+                InvoiceQuotaService.reserve(self.organization, 2)
+            
+            quota.consume(2)
+            self.assertEqual(quota.remaining, 2)
+            self.assertEqual(self.organization.get_available_invoices(), 1)
+        
+        summary = InvoiceQuotaService.get_summary(self.organization)
+        self.assertEqual(summary['reserved'], 0)
+        self.assertEqual(summary['available'], 3)
+    
+    def test_unlimited_plan(self):
+        """Test que un plan con max_invoices_month = 0 es ilimitado"""
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService
+        
+        self.plan.max_invoices_month = 0
+        self.plan.save()
+        Subscription.objects.filter(organization=self.organization).first().save()
+        
+        InvoiceQuotaService.consume(self.organization, 10)
+        
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.used_invoices, 47)
+        self.assertEqual(self.organization.get_available_invoices(), 999999)
+
+    
+    def test_summary_refreshes_stale_plan_limit(self):
+        """Test que el resumen toma el cupo del plan actual aunque el contador sea viejo"""
+        from django.core.cache import cache
+        from apps.billing.models import Invoice
+        from apps.organizations.models import InvoiceQuotaCounter
+        from apps.organizations.services.invoice_quota import InvoiceQuotaService
+        
+        InvoiceQuotaService.get_counter(self.organization)
+        InvoiceQuotaCounter.objects.filter(organization=self.organization).update(plan_limit=None)
+        cache.clear()
+        
+        summary = InvoiceQuotaService.get_summary(self.organization)
+        self.assertEqual(summary['plan_limit'], 2)
+        self.assertEqual(summary['available'], 5)
+        self.assertTrue(Invoice.puede_crear_factura_electronica(self.organization)[0])
+
+class StorageUsageServiceTest(TestCase):
+    """Tests para la contabilidad de almacenamiento por organización"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.organization = Organization.objects.create(
+            name='Test Optica',
+            slug='test-optica',
+            email='contact@testoptica.com',
+            owner=self.user
+        )
+    
+    def _storage(self):
+        from apps.core.storage_utils import OrganizationFileSystemStorage
+        return OrganizationFileSystemStorage(location=self.media_root)
+    
+    def test_storage_records_saves_and_deletes(self):
+        """Test que el storage actualiza los contadores al guardar y eliminar"""
+        from django.core.files.base import ContentFile
+        from apps.core.storage_utils import get_organization_storage_usage
+        
+        storage = self._storage()
+        logo = storage.save(f'org_{self.organization.id}/logos/logo.png', ContentFile(b'x' * 1000))
+        storage.save(f'org_{self.organization.id}/invoices/f1.pdf', ContentFile(b'x' * 500))
+        storage.save('public/ignored.txt', ContentFile(b'x' * 300))
+        
+        usage = get_organization_storage_usage(self.organization.id)
+        self.assertEqual(usage['total_bytes'], 1500)
+        self.assertEqual(usage['file_count'], 2)
+        self.assertEqual(usage['by_category']['logos'], {'bytes': 1000, 'files': 1})
+        
+        storage.delete(logo)
+        usage = get_organization_storage_usage(self.organization.id)
+        self.assertEqual(usage['total_bytes'], 500)
+        self.assertEqual(usage['by_category']['logos'], {'bytes': 0, 'files': 0})
+    
+    def test_document_signals_update_usage(self):
+        """Test que los documentos (fuera de org_{id}/) se cuentan por signals"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apps.documents.models import Document
+        from apps.organizations.services.storage_usage import StorageUsageService
+        
+        document = Document.objects.create(
+            title='Fórmula',
+            organization=self.organization,
+            file=SimpleUploadedFile('formula.pdf', b'x' * 700),
+        )
+        usage = StorageUsageService.get_usage(self.organization.id)
+        self.assertEqual(usage['by_category']['documents'], {'bytes': 700, 'files': 1})
+        
+        Document.objects.get(pk=document.pk).delete()
+        usage = StorageUsageService.get_usage(self.organization.id)
+        self.assertEqual(usage['by_category']['documents'], {'bytes': 0, 'files': 0})
+    
+    def test_reconcile_corrects_drift(self):
+        """Test que la conciliación recalcula los contadores desde el disco"""
+        import os
+        from apps.organizations.services.storage_usage import StorageUsageService
+        
+        StorageUsageService.record(self.organization.id, 'logos', 9999, 3)
+        
+        folder = os.path.join(self.media_root, f'org_{self.organization.id}', 'products', 'images')
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, 'p1.jpg'), 'wb') as f:
+            f.write(b'x' * 2048)
+        
+        drift = StorageUsageService.reconcile([self.organization.id], workers=2)
+        
+        self.assertEqual(drift[self.organization.id], 2048 - 9999)
+        usage = StorageUsageService.get_usage(self.organization.id)
+        self.assertEqual(usage['total_bytes'], 2048)
+        self.assertEqual(usage['file_count'], 1)
+        self.assertEqual(usage['by_category']['products'], {'bytes': 2048, 'files': 1})
+        self.assertEqual(usage['by_category']['logos'], {'bytes': 0, 'files': 0})
+    
+    def test_check_quota(self):
+        """Test que el límite del plan se verifica con los contadores"""
+        from apps.organizations.services.storage_usage import StorageUsageService
+        
+        plan = SubscriptionPlan.objects.create(
+            name='Básico',
+            slug='basico',
+            plan_type='basic',
+            price_monthly=9.99,
+            price_yearly=99.99,
+            max_storage_mb=1
+        )
+        Subscription.objects.create(organization=self.organization, plan=plan, billing_cycle='monthly')
+        StorageUsageService.record(self.organization.id, 'logos', 1024 * 1024 - 100, 1)
+        
+        self.assertTrue(StorageUsageService.check_quota(self.organization)[0])
+        self.assertFalse(StorageUsageService.check_quota(self.organization, incoming_bytes=200)[0])
+
+
+class TrialLifecycleJobsTest(TestCase):
+    """Tests para los jobs de archivo y eliminación de organizaciones"""
+
+    def test_archive_and_delete_are_not_periodic(self):
+        """Archivar y eliminar solo corren a mano hasta confirmar el flujo"""
+        from apps.jobs.registry import periodic_jobs
+        from apps.organizations import tasks
+
+        names = {definition.name for definition in periodic_jobs()}
+        self.assertNotIn(tasks.archive_expired_organizations.name, names)
+        self.assertNotIn(tasks.delete_archived_organizations.name, names)
+        self.assertIn(tasks.check_trial_status_daily.name, names)
+
+    @patch('django.core.mail.send_mail')
+    def test_delete_does_not_announce_pending_deletion(self, send_mail):
+        """No se envía el aviso de eliminación mientras no se elimina nada"""
+        from apps.organizations import tasks
+        from apps.organizations.models import TrialStatus
+
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        organization = Organization.objects.create(name='Archivada', slug='archivada', owner=owner)
+        TrialStatus.objects.create(
+            organization=organization, state='expired_archived',
+            trial_start=timezone.now() - timedelta(days=400),
+        )
+
+        tasks.delete_archived_organizations()
+
+        send_mail.assert_not_called()
+        self.assertTrue(Organization.objects.filter(pk=organization.pk).exists())
@@ -5,3 +5,7 @@ class PatientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.patients'
     verbose_name = 'Pacientes'
+
+    def ready(self):
+        """Importar signals cuando la app esté lista."""
+        import apps.patients.signals  # noqa
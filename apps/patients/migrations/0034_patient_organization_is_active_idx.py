@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0033_doctor_upload_paths'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['organization', 'is_active'], name='patients_pa_organiz_ddb2ed_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0034_patient_organization_is_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='patients_pa_organiz_ce339a_idx'),
+        ),
+    ]
@@ -116,6 +116,8 @@ class Patient(TenantModel):
         indexes = [
             models.Index(fields=['organization', 'phone_number']),
             models.Index(fields=['organization', 'identification']),
+            models.Index(fields=['organization', 'is_active']),
+            models.Index(fields=['organization', 'created_at', 'id']),
         ]
         unique_together = [
             ['organization', 'identification'],
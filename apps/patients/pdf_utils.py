@@ -15,6 +15,8 @@ from reportlab.pdfgen import canvas
 from reportlab.graphics.shapes import Drawing, Circle, Line, Rect, String
 from reportlab.graphics import renderPDF
 from django.conf import settings
+from functools import lru_cache
+import copy
 import os
 
 
@@ -22,6 +24,9 @@ def draw_eye_fundus_diagram(width=200, height=200, eye='OD'):
     """
     Dibuja un diagrama de fondo de ojo
     
+    El dibujo es estático: se construye una vez por tamaño y ojo y cada
+    llamada retorna una copia superficial (las figuras se comparten).
+    
     Args:
         width: Ancho del dibujo
         height: Alto del dibujo
@@ -30,6 +35,11 @@ def draw_eye_fundus_diagram(width=200, height=200, eye='OD'):
     Returns:
         Drawing object de reportlab
     """
+    return copy.copy(_build_eye_fundus_diagram(width, height, eye))
+
+
+@lru_cache(maxsize=16)
+def _build_eye_fundus_diagram(width, height, eye):
     d = Drawing(width, height)
     
     # Centro del dibujo
@@ -0,0 +1,197 @@
+"""
+Catálogo clínico por organización
+
+Los formularios de historia clínica y examen visual necesitan decenas de
+listas de parámetros (materiales, tratamientos, medicamentos, diagnósticos,
+etc.). ClinicalCatalogService carga en una pasada todos los parámetros
+activos globales y de la organización, las plantillas, los protocolos y los
+doctores activos; los agrupa por tipo y los cachea por organización. Los
+signals de apps/patients/signals.py invalidan la versión del cache al
+guardar o eliminar cualquiera de esos registros.
+
+Uso:
+    from apps.patients.services import ClinicalCatalogService
+
+    catalog = ClinicalCatalogService.get_catalog(request.organization)
+    catalog.parameters('lens_material')
+    context.update(catalog.visual_exam_choices())
+"""
+from itertools import chain
+from types import MappingProxyType
+
+from django.db.models import Q
+
+from apps.core.cache import CacheNamespace
+
+from .models import (
+    ClinicalParameter,
+    Doctor,
+    MedicationTemplate,
+    OpticalPrescriptionTemplate,
+    TreatmentProtocol,
+)
+
+
+catalog_cache = CacheNamespace('clinical_catalog', timeout=3600)
+
+MEDICATION_TYPES = ('medication', 'topical_medication', 'systemic_medication')
+
+# Variable de contexto -> tipos de parámetro del formulario de examen visual
+VISUAL_EXAM_CHOICES = {
+    # Medicamentos
+    'medications': MEDICATION_TYPES,
+    'topical_medications': ('topical_medication',),
+    'systemic_medications': ('systemic_medication',),
+
+    # Lentes Oftálmicos
+    'lens_types': ('lens_type',),
+    'lens_materials': ('lens_material',),
+    'lens_coatings': ('lens_coating', 'treatment'),
+    'lens_brands': ('lens_brand',),
+    'frame_types': ('frame_type',),
+
+    # Lentes de Contacto
+    'contact_lens_types': ('contact_lens_type',),
+    'contact_lens_brands': ('contact_lens_brand',),
+    'contact_lens_materials': ('contact_lens_material',),
+    'contact_lens_wearings': ('contact_lens_wearing',),
+
+    # Diagnósticos
+    'diagnoses': ('diagnosis',),
+    'diagnosis_categories': ('diagnosis_category',),
+
+    # Tratamientos y Terapias
+    'treatments': ('treatment',),
+    'therapies': ('therapy',),
+    'visual_therapies': ('visual_therapy',),
+
+    # Exámenes
+    'complementary_exams': ('complementary_exam',),
+    'lab_tests': ('lab_test',),
+
+    # Otros
+    'recommendations': ('recommendation',),
+    'referral_specialties': ('referral_specialty',),
+    'follow_up_reasons': ('follow_up_reason',),
+}
+
+# Variable de contexto -> tipos de parámetro del formulario de historia clínica
+CLINICAL_HISTORY_CHOICES = {
+    'lens_materials': ('lens_material',),
+    'lens_coatings': ('treatment',),
+    'medications': MEDICATION_TYPES,
+}
+
+
+def _sort_key(parameter):
+    return (parameter.display_order, parameter.name)
+
+
+class ClinicalCatalog:
+    """Catálogo clínico de solo lectura de una organización"""
+
+    __slots__ = ('_parameters', 'medication_templates', 'treatment_protocols',
+                 'prescription_templates', 'doctors')
+
+    def __init__(self, data):
+        self._parameters = MappingProxyType(data['parameters'])
+        self.medication_templates = data['medication_templates']
+        self.treatment_protocols = data['treatment_protocols']
+        self.prescription_templates = data['prescription_templates']
+        self.doctors = data['doctors']
+
+    def parameters(self, *parameter_types):
+        """
+        Parámetros activos de uno o varios tipos, ordenados por
+        display_order y nombre
+
+        Returns:
+            tuple: Instancias de ClinicalParameter
+        """
+        if len(parameter_types) == 1:
+            return self._parameters.get(parameter_types[0], ())
+        return tuple(sorted(
+            chain.from_iterable(self._parameters.get(t, ()) for t in parameter_types),
+            key=_sort_key
+        ))
+
+    def choices(self, mapping):
+        """Listas listas para el contexto de un formulario: {variable: tuple}"""
+        return {name: self.parameters(*types) for name, types in mapping.items()}
+
+    def visual_exam_choices(self):
+        return self.choices(VISUAL_EXAM_CHOICES)
+
+    def clinical_history_choices(self):
+        return self.choices(CLINICAL_HISTORY_CHOICES)
+
+
+class ClinicalCatalogService:
+    """Servicio del catálogo clínico cacheado"""
+
+    @staticmethod
+    def _load(organization):
+        """Consulta los registros activos globales y de la organización"""
+        scope = Q(organization__isnull=True)
+        if organization is not None:
+            scope |= Q(organization=organization)
+
+        parameters = {}
+        rows = ClinicalParameter.objects.unscoped().filter(scope, is_active=True).order_by(
+            'parameter_type', 'display_order', 'name'
+        )
+        for parameter in rows:
+            parameters.setdefault(parameter.parameter_type, []).append(parameter)
+
+        doctors = ()
+        if organization is not None:
+            doctors = tuple(
+                Doctor.objects.unscoped()
+                .filter(organization=organization, is_active=True)
+                .order_by('full_name')
+            )
+
+        return {
+            'parameters': {key: tuple(items) for key, items in parameters.items()},
+            'medication_templates': tuple(
+                MedicationTemplate.objects.unscoped()
+                .filter(scope, is_active=True)
+                .prefetch_related('medications')
+            ),
+            'treatment_protocols': tuple(
+                TreatmentProtocol.objects.unscoped()
+                .filter(scope, is_active=True)
+                .prefetch_related('medications')
+            ),
+            'prescription_templates': tuple(
+                OpticalPrescriptionTemplate.objects.unscoped()
+                .filter(scope, is_active=True)
+                .select_related('lens_type', 'lens_material')
+                .prefetch_related('lens_coatings')
+            ),
+            'doctors': doctors,
+        }
+
+    @staticmethod
+    def get_catalog(organization, use_cache=True):
+        """
+        Catálogo clínico de una organización (incluye los parámetros globales)
+
+        Returns:
+            ClinicalCatalog
+        """
+        if not use_cache:
+            return ClinicalCatalog(ClinicalCatalogService._load(organization))
+        return ClinicalCatalog(catalog_cache.get_or_set(
+            'catalog',
+            lambda: ClinicalCatalogService._load(organization),
+            organization=organization
+        ))
+
+    @staticmethod
+    def invalidate(organization_id=None):
+        """
+        Invalida el catálogo de una organización, o el de todas si el
+        registro modificado es global (organization_id None)
+        """
+        catalog_cache.invalidate(organization_id)
@@ -0,0 +1,74 @@
+"""
+Signals para invalidar el catálogo clínico cacheado.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.api.services import WebhookService
+
+from .models import (
+    ClinicalParameter,
+    Doctor,
+    MedicationTemplate,
+    OpticalPrescriptionTemplate,
+    Patient,
+    TreatmentProtocol,
+)
+from .services import ClinicalCatalogService
+
+CATALOG_MODELS = (
+    ClinicalParameter,
+    MedicationTemplate,
+    TreatmentProtocol,
+    OpticalPrescriptionTemplate,
+    Doctor,
+)
+
+
+def invalidate_catalog(sender, instance, update_fields=None, **kwargs):
+    """Invalida el catálogo de la organización del registro (o todos si es global)."""
+    if update_fields is not None and set(update_fields) <= {'usage_count'}:
+        # increment_usage() no cambia el contenido del catálogo
+        return
+    ClinicalCatalogService.invalidate(instance.organization_id)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f'clinical_catalog_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f'clinical_catalog_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=MedicationTemplate.medications.through)
+@receiver(m2m_changed, sender=TreatmentProtocol.medications.through)
+@receiver(m2m_changed, sender=OpticalPrescriptionTemplate.lens_coatings.through)
+def invalidate_catalog_on_m2m_change(sender, instance, action, **kwargs):
+    """Invalida el catálogo cuando cambian los parámetros de una plantilla."""
+    if action.startswith('post_') and isinstance(instance, CATALOG_MODELS):
+        ClinicalCatalogService.invalidate(instance.organization_id)
+
+
+def patient_webhook_data(patient):
+    """Datos del paciente que reciben los webhooks."""
+    return {
+        'id': patient.pk,
+        'full_name': patient.full_name,
+        'identification_type': patient.identification_type,
+        'identification': patient.identification,
+        'phone_number': patient.phone_number,
+        'email': patient.email,
+    }
+
+
+@receiver(post_save, sender=Patient)
+def patient_webhook_on_save(sender, instance, created, **kwargs):
+    """Encola los webhooks patient.created / patient.updated."""
+    event = 'patient.created' if created else 'patient.updated'
+    WebhookService.emit(instance.organization, event, patient_webhook_data(instance))
+
+
+@receiver(post_delete, sender=Patient)
+def patient_webhook_on_delete(sender, instance, origin=None, **kwargs):
+    """Encola el webhook patient.deleted (no al borrar la organización en cascada)."""
+    if getattr(origin, 'model', type(origin)) is not Patient:
+        return
+    WebhookService.emit(instance.organization, 'patient.deleted', patient_webhook_data(instance))
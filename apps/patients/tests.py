@@ -1,3 +1,72 @@
+"""
+Tests para pacientes.
+"""
 from django.test import TestCase
+from django.core.cache import cache
 
-# Create your tests here.
+from apps.organizations.base_models import tenant_context
+from apps.organizations.models import Organization
+from apps.patients.models import ClinicalParameter
+from apps.patients.services import ClinicalCatalogService
+
+
+class ClinicalCatalogTestCase(TestCase):
+    """Tests para el catálogo clínico cacheado."""
+
+    def setUp(self):
+        """Configuración inicial."""
+        cache.clear()
+        self.organization = Organization.objects.create(name='Test Org', slug='test-org')
+        self.other = Organization.objects.create(name='Other Org', slug='other-org')
+
+        ClinicalParameter.objects.create(parameter_type='lens_material', name='Policarbonato', display_order=2)
+        ClinicalParameter.objects.create(
+            parameter_type='lens_material', name='CR-39', display_order=1, organization=self.organization
+        )
+        ClinicalParameter.objects.create(
+            parameter_type='lens_material', name='Trivex', organization=self.other
+        )
+        ClinicalParameter.objects.create(
+            parameter_type='treatment', name='Antirreflejo', display_order=5, organization=self.organization
+        )
+        ClinicalParameter.objects.create(parameter_type='lens_coating', name='Filtro azul', display_order=3)
+        ClinicalParameter.objects.create(
+            parameter_type='lens_material', name='Vidrio', is_active=False, organization=self.organization
+        )
+
+    def test_catalog_groups_global_and_org_parameters(self):
+        """Prueba que el catálogo combina globales y de la organización, ordenados."""
+        with tenant_context(self.organization):
+            catalog = ClinicalCatalogService.get_catalog(self.organization)
+
+        names = [p.name for p in catalog.parameters('lens_material')]
+        self.assertEqual(names, ['CR-39', 'Policarbonato'])
+
+        choices = catalog.visual_exam_choices()
+        self.assertEqual([p.name for p in choices['lens_coatings']], ['Filtro azul', 'Antirreflejo'])
+        self.assertEqual(choices['diagnoses'], ())
+        self.assertEqual(
+            [p.name for p in catalog.clinical_history_choices()['lens_coatings']], ['Antirreflejo']
+        )
+
+    def test_catalog_is_cached_and_invalidated_by_signals(self):
+        """Prueba que el catálogo se cachea y se invalida al guardar."""
+        ClinicalCatalogService.get_catalog(self.organization)
+        with self.assertNumQueries(0):
+            ClinicalCatalogService.get_catalog(self.organization)
+
+        parameter = ClinicalParameter.objects.create(
+            parameter_type='lens_material', name='Alto índice', display_order=0, organization=self.organization
+        )
+        names = [p.name for p in ClinicalCatalogService.get_catalog(self.organization).parameters('lens_material')]
+        self.assertEqual(names[0], 'Alto índice')
+
+        # Un parámetro global invalida el catálogo de todas las organizaciones
+        ClinicalParameter.objects.create(parameter_type='diagnosis', name='Miopía')
+        self.assertEqual(len(ClinicalCatalogService.get_catalog(self.other).parameters('diagnosis')), 1)
+
+        # increment_usage no invalida el catálogo
+        ClinicalCatalogService.get_catalog(self.organization)
+        parameter.increment_usage()
+        with self.assertNumQueries(0):
+            ClinicalCatalogService.get_catalog(self.organization)
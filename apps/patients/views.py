@@ -3,15 +3,24 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db.models import Q, Count, Prefetch
-from django.core.paginator import Paginator
 from django.core.cache import cache
 from django.views.decorators.cache import cache_page
 from datetime import datetime
 
+from apps.core.pagination import KeysetPaginator
 from .models import Patient
 from apps.appointments.models import Appointment
 
 
+# Órdenes permitidos en la lista de pacientes (paginación por llave)
+PATIENT_LIST_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    'created_at': ('created_at', 'id'),
+    'full_name': ('full_name', 'id'),
+    '-full_name': ('-full_name', '-id'),
+}
+
+
 def patient_list(request):
     """Lista de pacientes con búsqueda y filtros - OPTIMIZADO con cache"""
     org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
@@ -19,10 +28,12 @@ def patient_list(request):
     # Generar cache key
     search = request.GET.get('search', '')
     order_by = request.GET.get('order', '-created_at')
-    page_number = request.GET.get('page', '1')
+    if order_by not in PATIENT_LIST_ORDERINGS:
+        order_by = '-created_at'
+    cursor = request.GET.get('cursor', '')
     org_id = getattr(request, 'tenant_id', 'no_org')
     
-    cache_key = f"patients_list:{org_id}:{search}:{order_by}:{page_number}"
+    cache_key = f"patients_list:{org_id}:{search}:{order_by}:{cursor}"
     
     # Intentar obtener del cache
     cached_data = cache.get(cache_key)
@@ -62,12 +73,10 @@ def patient_list(request):
         }
         cache.set(stats_cache_key, stats, 300)  # 5 minutos
     
-    # Ordenar
-    patients = patients.order_by(order_by)
-    
-    # Paginación
-    paginator = Paginator(patients, 20)
-    page_obj = paginator.get_page(page_number)
+    # Paginación por llave (el orden lo define el paginador)
+    paginator = KeysetPaginator(patients, per_page=20, ordering=PATIENT_LIST_ORDERINGS[order_by])
+    matching_patients, matching_is_estimate = paginator.count()
+    page_obj = paginator.page(cursor)
     
     # Prefetch última historia clínica (1 query en lugar de N queries)
     from apps.patients.models_clinical import ClinicalHistory
@@ -87,6 +96,8 @@ def patient_list(request):
     
     context = {
         'patients': page_obj,
+        'matching_patients': matching_patients,
+        'matching_is_estimate': matching_is_estimate,
         'total_patients': stats['total_patients'],
         'patients_with_appointments': stats['patients_with_appointments'],
         'search': search,
@@ -10,10 +10,115 @@ from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT, TA_JUSTIFY
 from reportlab.pdfgen import canvas
 from io import BytesIO
 from datetime import datetime
+from functools import lru_cache
 from django.conf import settings
 import os
 
 
+@lru_cache(maxsize=None)
+def _payslip_stylesheet():
+    """Hoja de estilos del desprendible (construida una vez por proceso)"""
+    styles = getSampleStyleSheet()
+    
+    # Título principal
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=20,
+        textColor=colors.HexColor('#1a202c'),
+        spaceAfter=12,
+        spaceBefore=0,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+    
+    # Info texto normal
+    styles.add(ParagraphStyle(
+        name='InfoText',
+        parent=styles['Normal'],
+        fontSize=9,
+        textColor=colors.HexColor('#2d3748'),
+        leading=12,
+        alignment=TA_LEFT
+    ))
+    
+    # Info texto bold
+    styles.add(ParagraphStyle(
+        name='InfoTextBold',
+        parent=styles['Normal'],
+        fontSize=9,
+        textColor=colors.HexColor('#1a202c'),
+        fontName='Helvetica-Bold',
+        leading=12,
+        alignment=TA_LEFT
+    ))
+    
+    # Encabezado de tabla
+    styles.add(ParagraphStyle(
+        name='TableHeader',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.white,
+        fontName='Helvetica-Bold',
+        alignment=TA_CENTER
+    ))
+    
+    # Pie de página
+    styles.add(ParagraphStyle(
+        name='Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.HexColor('#4a5568'),
+        alignment=TA_CENTER,
+        leading=10
+    ))
+    
+    return styles
+
+
+def _payslip_document(buffer):
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=1*cm,
+        leftMargin=1*cm,
+        topMargin=1*cm,
+        bottomMargin=1*cm,
+    )
+
+
+def render_payslip_pdf(payroll_entry):
+    """
+    Bytes del PDF del desprendible de una entrada de nómina
+
+    Función de módulo para poder ejecutarse en el pool de procesos de
+    apps.core.pdf.render_batch.
+    """
+    return PayslipPDFGenerator(payroll_entry).generate().getvalue()
+
+
+def render_payslips_merged(payroll_entries):
+    """
+    Un solo PDF con el desprendible de cada entrada (uno por página)
+
+    Returns:
+        BytesIO con el contenido del PDF
+    """
+    buffer = BytesIO()
+    story = []
+    for payroll_entry in payroll_entries:
+        if story:
+            story.append(PageBreak())
+        story.extend(PayslipPDFGenerator(payroll_entry).build_story())
+    
+    if not story:
+        story.append(Paragraph("No hay desprendibles en este período", _payslip_stylesheet()['InfoText']))
+    
+    _payslip_document(buffer).build(story)
+    buffer.seek(0)
+    return buffer
+
+
 class PayslipPDFGenerator:
     """
     Generador de desprendibles de pago (payslips) en PDF
@@ -32,55 +137,8 @@ class PayslipPDFGenerator:
         # Buffer para PDF
         self.buffer = BytesIO()
         
-        # Configurar estilos
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        """Configura estilos personalizados"""
-        
-        # Título principal
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#1a202c'),
-            spaceAfter=12,
-            spaceBefore=0,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        ))
-        
-        # Info texto normal
-        self.styles.add(ParagraphStyle(
-            name='InfoText',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#2d3748'),
-            leading=12,
-            alignment=TA_LEFT
-        ))
-        
-        # Info texto bold
-        self.styles.add(ParagraphStyle(
-            name='InfoTextBold',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#1a202c'),
-            fontName='Helvetica-Bold',
-            leading=12,
-            alignment=TA_LEFT
-        ))
-        
-        # Encabezado de tabla
-        self.styles.add(ParagraphStyle(
-            name='TableHeader',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            textColor=colors.white,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER
-        ))
+        # Estilos compartidos entre desprendibles
+        self.styles = _payslip_stylesheet()
     
     def generate(self):
         """
@@ -89,17 +147,16 @@ class PayslipPDFGenerator:
         Returns:
             BytesIO con el contenido del PDF
         """
-        # Crear documento
-        doc = SimpleDocTemplate(
-            self.buffer,
-            pagesize=letter,
-            rightMargin=1*cm,
-            leftMargin=1*cm,
-            topMargin=1*cm,
-            bottomMargin=1*cm,
-        )
+        # Construir PDF
+        _payslip_document(self.buffer).build(self.build_story())
         
-        # Contenido del documento
+        # Resetear buffer
+        self.buffer.seek(0)
+        
+        return self.buffer
+    
+    def build_story(self):
+        """Contenido (flowables) del desprendible"""
         story = []
         
         # Título centrado
@@ -121,13 +178,13 @@ class PayslipPDFGenerator:
         # Footer con texto informativo
         story.append(self._create_footer())
         
-        # Construir PDF
-        doc.build(story)
-        
-        # Resetear buffer
-        self.buffer.seek(0)
-        
-        return self.buffer
+        return story
+    
+    def _lines(self, related_name):
+        """Devengados o deducciones con su concepto (usa los precargados si existen)"""
+        if related_name in getattr(self.payroll_entry, '_prefetched_objects_cache', {}):
+            return getattr(self.payroll_entry, related_name).all()
+        return getattr(self.payroll_entry, related_name).select_related('concepto').all()
     
     def _create_header_info(self):
         """Crea el encabezado con info de empresa, empleado y periodo"""
@@ -171,8 +228,8 @@ Salario básico: <b>${self.employee.salario_basico:,.2f}</b>"""
         """Crea las tablas de INGRESOS y DEDUCCIONES lado a lado"""
         
         # Obtener datos
-        accruals = self.payroll_entry.accruals.select_related('concepto').all()
-        deductions = self.payroll_entry.deductions.select_related('concepto').all()
+        accruals = self._lines('accruals')
+        deductions = self._lines('deductions')
         
         # --- TABLA INGRESOS ---
         ingresos_data = [
@@ -322,19 +379,10 @@ Salario básico: <b>${self.employee.salario_basico:,.2f}</b>"""
     def _create_footer(self):
         """Crea el pie de página con texto informativo"""
         
-        footer_style = ParagraphStyle(
-            name='Footer',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            textColor=colors.HexColor('#4a5568'),
-            alignment=TA_CENTER,
-            leading=10
-        )
-        
         footer_text = f"""Este comprobante de nómina fue elaborado y enviado a través de {self.organization.name}. 
 Si tiene alguna pregunta o necesita aclaración, por favor contacte al departamento de recursos humanos."""
         
-        return Paragraph(footer_text, footer_style)
+        return Paragraph(footer_text, self.styles['Footer'])
 
 
 class PayrollReportPDFGenerator:
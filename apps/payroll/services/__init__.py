@@ -3,5 +3,6 @@ Servicios avanzados de nómina
 """
 from .calculation_engine import PayrollCalculationEngine
 from .automation_service import PayrollAutomationService
+from .payslip_batch import PayslipBatchService
 
-__all__ = ['PayrollCalculationEngine', 'PayrollAutomationService']
+__all__ = ['PayrollCalculationEngine', 'PayrollAutomationService', 'PayslipBatchService']
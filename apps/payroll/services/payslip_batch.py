@@ -0,0 +1,77 @@
+"""
+Generación de desprendibles de pago en lote
+
+Carga todas las entradas de un período con empleado, devengados y
+deducciones (con sus conceptos) en tres consultas y genera los PDFs en
+el pool de procesos de apps.core.pdf. El resultado se entrega como un ZIP
+que se envía a medida que se genera, o como un solo PDF con un
+desprendible por página.
+"""
+from django.db.models import Prefetch
+
+from apps.core.pdf import render_batch, stream_zip
+
+from ..models import Accrual, Deduction, PayrollEntry
+from ..pdf_generator import render_payslip_pdf, render_payslips_merged
+
+
+class PayslipBatchService:
+    """Servicio de desprendibles de pago en lote"""
+
+    @staticmethod
+    def get_entries(period, entry_ids=None):
+        """
+        Entradas de un período con todo lo que necesita el desprendible
+
+        Args:
+            period: PayrollPeriod
+            entry_ids: Limitar a estas entradas (opcional)
+        """
+        entries = (
+            PayrollEntry.objects.filter(periodo=period)
+            .select_related('empleado', 'periodo', 'organization')
+            .prefetch_related(
+                Prefetch('accruals', queryset=Accrual.objects.select_related('concepto').order_by('concepto__codigo', 'id')),
+                Prefetch('deductions', queryset=Deduction.objects.select_related('concepto').order_by('concepto__codigo', 'id')),
+            )
+            .order_by('empleado__primer_apellido', 'empleado__primer_nombre', 'id')
+        )
+        if entry_ids:
+            entries = entries.filter(pk__in=entry_ids)
+        return list(entries)
+
+    @staticmethod
+    def filename(entry):
+        """Nombre del desprendible dentro del ZIP"""
+        return f"desprendible_{entry.empleado.numero_documento}_{entry.periodo.nombre}.pdf"
+
+    @staticmethod
+    def stream_zip(entries, workers=None, progress=None):
+        """
+        ZIP con un PDF por entrada, entregado por partes
+
+        Args:
+            entries: Entradas de get_entries()
+            workers: Procesos del pool (None = PDF_BATCH_WORKERS)
+            progress: BatchProgress opcional
+        """
+        names = [PayslipBatchService.filename(entry) for entry in entries]
+        return stream_zip(render_batch(
+            render_payslip_pdf, entries, names, workers=workers, progress=progress
+        ))
+
+    @staticmethod
+    def render_merged(entries, progress=None):
+        """
+        Un solo PDF con todos los desprendibles
+
+        Returns:
+            BytesIO con el contenido del PDF
+        """
+        if progress is not None:
+            progress.start(len(entries))
+        buffer = render_payslips_merged(entries)
+        if progress is not None:
+            progress.done = len(entries)
+            progress.finish()
+        return buffer
@@ -12,7 +12,7 @@ from .views import (
     period_list, period_create, period_detail, period_calculate, period_approve,
     concept_list, accrual_concept_create, accrual_concept_edit, accrual_concept_delete,
     deduction_concept_create, deduction_concept_edit, deduction_concept_delete,
-    download_payslip, download_payroll_report, send_to_dian, check_dian_status,
+    download_payslip, download_period_payslips, download_payroll_report, send_to_dian, check_dian_status,
     # Vistas del workflow
     workflow_dashboard, workflow_enviar_revision, workflow_aprobar, workflow_rechazar,
     workflow_procesar, workflow_period_detail, workflow_generar_borrador, workflow_configuracion,
@@ -70,6 +70,7 @@ urlpatterns = [
     
     # PDFs y DIAN
     path('descargar-desprendible/<int:entry_id>/', download_payslip, name='download_payslip'),
+    path('descargar-desprendibles/<int:period_id>/', download_period_payslips, name='download_period_payslips'),
     path('descargar-reporte/<int:period_id>/', download_payroll_report, name='download_payroll_report'),
     path('enviar-dian/<int:period_id>/', send_to_dian, name='send_to_dian'),
     path('consultar-dian/<int:period_id>/', check_dian_status, name='check_dian_status'),
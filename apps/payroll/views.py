@@ -1284,7 +1284,8 @@ def download_payslip(request, entry_id):
     from .pdf_generator import PayslipPDFGenerator
     
     entry = get_object_or_404(
-        PayrollEntry,
+        PayrollEntry.objects.select_related('empleado', 'periodo', 'organization')
+        .prefetch_related('accruals__concepto', 'deductions__concepto'),
         pk=entry_id,
         organization=request.organization
     )
@@ -1301,6 +1302,45 @@ def download_payslip(request, entry_id):
     return response
 
 
+@login_required
+def download_period_payslips(request, period_id):
+    """
+    Descarga los desprendibles de todo un período
+    
+    ?formato=zip (un PDF por empleado, por defecto) o ?formato=pdf (un solo
+    PDF); ?entradas=1,2,3 limita la descarga a esas entradas y ?progress=<token>
+    publica el avance en /saas-admin/pdf/lotes/<token>/
+    """
+    from django.http import StreamingHttpResponse
+    from apps.core.pdf import BatchProgress
+    from .services import PayslipBatchService
+    
+    period = get_object_or_404(
+        PayrollPeriod,
+        pk=period_id,
+        organization=request.organization
+    )
+    
+    entry_ids = [int(pk) for pk in request.GET.get('entradas', '').split(',') if pk.strip().isdigit()]
+    entries = PayslipBatchService.get_entries(period, entry_ids)
+    progress = BatchProgress.from_request(request)
+    
+    if request.GET.get('formato') == 'pdf':
+        pdf_buffer = PayslipBatchService.render_merged(entries, progress=progress)
+        response = StreamingHttpResponse(
+            iter(lambda: pdf_buffer.read(64 * 1024), b''), content_type='application/pdf'
+        )
+        filename = f"desprendibles_{period.nombre}.pdf"
+    else:
+        response = StreamingHttpResponse(
+            PayslipBatchService.stream_zip(entries, progress=progress), content_type='application/zip'
+        )
+        filename = f"desprendibles_{period.nombre}.zip"
+    
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def download_payroll_report(request, period_id):
     """Descarga reporte consolidado de nómina"""
@@ -5,3 +5,7 @@ class PublicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.public'
     verbose_name = 'Página Pública'
+
+    def ready(self):
+        """Importar signals cuando la app esté lista."""
+        import apps.public.signals  # noqa
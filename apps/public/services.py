@@ -0,0 +1,146 @@
+"""
+Contexto cacheado del sitio público (landing, agendamiento y tienda)
+
+Las páginas públicas reciben tráfico anónimo alto (campañas de anuncios) y
+su contenido solo cambia cuando la organización edita su landing, sus
+horarios o sus doctores. Se cachean en dos espacios de apps.core.cache:
+
+- `site_cache` (por organización): la organización, su LandingPageConfig y
+  si el agendamiento está abierto. Se invalida con la versión de la
+  organización al guardar cualquiera de esos registros.
+- `directory_cache` (global): slug -> organización, las organizaciones con
+  horarios disponibles y sus doctores, y la organización por defecto de la
+  tienda. Cruza organizaciones, así que se invalida completo al cambiar
+  una organización, un horario o un doctor.
+
+Cada valor lleva una `version` aleatoria generada al construirlo; las vistas
+la usan como ETag, así que un navegador que ya tiene la página recibe un
+304 sin que se consulte la base de datos ni se renderice el template.
+
+Los signals de apps/public/signals.py hacen la invalidación.
+"""
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.cache import CacheNamespace
+
+site_cache = CacheNamespace('public_site', timeout=settings.PUBLIC_SITE_CACHE_TIMEOUT)
+directory_cache = CacheNamespace('public_directory', timeout=settings.PUBLIC_SITE_CACHE_TIMEOUT)
+
+
+def _version():
+    return uuid.uuid4().hex[:16]
+
+
+class PublicSiteService:
+    """Servicio del contexto cacheado de las páginas públicas"""
+
+    # ==================== ORGANIZACIÓN ====================
+
+    @staticmethod
+    def organization_id(slug):
+        """Id de la organización activa con ese slug, o None"""
+        from apps.organizations.models import Organization
+
+        return directory_cache.get_or_set(
+            f'slug:{slug}',
+            lambda: Organization.objects.filter(slug=slug, is_active=True).values_list('pk', flat=True).first(),
+        )
+
+    @staticmethod
+    def _load_site(organization_id):
+        from apps.appointments.models import AppointmentConfiguration
+        from apps.organizations.models import LandingPageConfig, Organization
+
+        organization = Organization.objects.filter(pk=organization_id, is_active=True).first()
+        if organization is None:
+            return None
+        config = AppointmentConfiguration.get_config(organization)
+        return {
+            'organization': organization,
+            'landing_config': LandingPageConfig.objects.filter(organization=organization).first(),
+            'system_open': config.is_open if config else True,
+            'version': _version(),
+        }
+
+    @staticmethod
+    def get_site(organization_id):
+        """
+        Organización, LandingPageConfig y estado del agendamiento
+
+        Returns:
+            dict o None si la organización no existe o está inactiva
+        """
+        if organization_id is None:
+            return None
+        return site_cache.get_or_set(
+            'site', lambda: PublicSiteService._load_site(organization_id), organization=organization_id
+        )
+
+    # ==================== DIRECTORIO ====================
+
+    @staticmethod
+    def _load_booking_directory(reference, today):
+        from apps.appointments.models import SpecificDateSchedule
+        from apps.organizations.models import Organization
+        from apps.patients.models import Doctor
+
+        orgs_with_schedules = SpecificDateSchedule.objects.filter(
+            date__gte=today,
+            is_active=True
+        ).values_list('organization_id', flat=True).distinct()
+
+        organizations = Organization.objects.filter(id__in=orgs_with_schedules, is_active=True)
+        if reference is not None:
+            organizations = organizations.filter(owner_id=reference.owner_id)
+        organizations = list(organizations.order_by('name'))
+
+        doctors = []
+        if organizations:
+            doctors = list(Doctor.objects.filter(
+                is_active=True,
+                organization_id__in=[org.pk for org in organizations]
+            ).values('id', 'full_name', 'organization_id'))
+
+        return {'organizations': organizations, 'doctors': doctors, 'version': _version()}
+
+    @staticmethod
+    def get_booking_directory(reference=None):
+        """
+        Organizaciones con horarios disponibles desde hoy y sus doctores
+
+        Args:
+            reference: Organización del slug; limita el directorio a las
+                       organizaciones de su mismo dueño
+
+        Returns:
+            dict: {'organizations': [Organization], 'doctors': [dict], 'version'}
+        """
+        today = timezone.localdate()
+        scope = 'all' if reference is None else f'owner-{reference.owner_id}'
+        return directory_cache.get_or_set(
+            f'booking:{scope}:{today.isoformat()}',
+            lambda: PublicSiteService._load_booking_directory(reference, today),
+        )
+
+    @staticmethod
+    def default_organization_id():
+        """Organización que muestra la tienda a visitantes anónimos (la primera activa)"""
+        from apps.organizations.models import Organization
+
+        return directory_cache.get_or_set(
+            'default_organization',
+            lambda: Organization.objects.filter(is_active=True).values_list('pk', flat=True).first(),
+        )
+
+    # ==================== INVALIDACIÓN ====================
+
+    @staticmethod
+    def invalidate_site(organization_id):
+        site_cache.invalidate(organization=organization_id)
+
+    @staticmethod
+    def invalidate_directory():
+        directory_cache.invalidate()
@@ -0,0 +1,32 @@
+"""
+Signals para invalidar el contexto cacheado del sitio público.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.appointments.models import AppointmentConfiguration, SpecificDateSchedule
+from apps.organizations.models import LandingPageConfig, Organization
+from apps.patients.models import Doctor
+
+from .services import PublicSiteService
+
+
+@receiver([post_save, post_delete], sender=Organization)
+def invalidate_public_organization(sender, instance, **kwargs):
+    """Los datos de la organización aparecen en su landing y en el directorio."""
+    PublicSiteService.invalidate_site(instance.pk)
+    PublicSiteService.invalidate_directory()
+
+
+@receiver([post_save, post_delete], sender=LandingPageConfig)
+@receiver([post_save, post_delete], sender=AppointmentConfiguration)
+def invalidate_public_site(sender, instance, **kwargs):
+    """Invalida la landing de la organización del registro."""
+    PublicSiteService.invalidate_site(instance.organization_id)
+
+
+@receiver([post_save, post_delete], sender=SpecificDateSchedule)
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_public_directory(sender, instance, **kwargs):
+    """Los horarios y doctores definen las organizaciones del agendamiento."""
+    PublicSiteService.invalidate_directory()
@@ -1,11 +1,37 @@
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from datetime import datetime, timedelta
 from apps.appointments.models import AppointmentConfiguration, WorkingHours
 from apps.appointments.utils import get_available_slots_for_date
+from apps.organizations.decorators import without_tenant_scope
+from .services import PublicSiteService
 
 
+def _cached_page(request, version, template_name, context, public=True):
+    """
+    Respuesta de una página pública cacheada con ETag = versión del contexto
+
+    Si el navegador ya tiene esa versión responde 304 sin renderizar.
+    `public=False` para páginas con token CSRF (no deben guardarse en caches
+    compartidos).
+    """
+    etag = f'"{version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render(request, template_name, context)
+    response['ETag'] = etag
+    if public:
+        patch_cache_control(response, public=True, max_age=settings.PUBLIC_SITE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+@without_tenant_scope
 def home(request):
     """Página principal pública - Nueva landing profesional de OptikaApp"""
     from apps.organizations.models import SubscriptionPlan, PlanFeature, OrganizationMember
@@ -40,49 +66,65 @@ def home(request):
     return render(request, 'public/landing_optikaapp.html', context)
 
 
+@without_tenant_scope
 def organization_landing(request, org_slug):
-    """Landing page específica de una organización por su slug"""
-    from apps.organizations.models import LandingPageConfig, Organization
-    from django.shortcuts import get_object_or_404
+    """Landing page específica de una organización por su slug (contexto cacheado)"""
+    site = PublicSiteService.get_site(PublicSiteService.organization_id(org_slug))
+    if site is None:
+        raise Http404("Organización no encontrada")
     
-    # Obtener la organización por su slug
-    organization = get_object_or_404(Organization, slug=org_slug, is_active=True)
+    context = {
+        'system_open': site['system_open'],
+        'organization_data': site['organization'],
+        'landing_config': site['landing_config'],
+        'org_slug': org_slug,
+    }
     
-    config = AppointmentConfiguration.get_config(organization)
+    return _cached_page(request, site['version'], 'public/organization_landing.html', context)
+
+
+def _public_booking(request, org_slug):
+    """Agendamiento para visitantes anónimos (contexto cacheado)"""
+    site = None
+    if org_slug:
+        site = PublicSiteService.get_site(PublicSiteService.organization_id(org_slug))
+        if site is None:
+            raise Http404("Organización no encontrada")
     
-    # Obtener configuración de la landing page
-    landing_config = None
-    try:
-        landing_config = LandingPageConfig.objects.get(organization=organization)
-    except LandingPageConfig.DoesNotExist:
-        pass
+    directory = PublicSiteService.get_booking_directory(site['organization'] if site else None)
+    
+    # Si no hay organización, usar la primera disponible
+    if site is None and directory['organizations']:
+        site = PublicSiteService.get_site(directory['organizations'][0].pk)
     
     context = {
-        'system_open': config.is_open if config else True,
-        'organization_data': organization,
-        'landing_config': landing_config,
+        'system_closed': False,
+        'available_organizations': directory['organizations'],
+        'available_doctors': directory['doctors'],
+        'organization_data': site['organization'] if site else None,
+        'landing_config': site['landing_config'] if site else None,
         'org_slug': org_slug,
     }
     
-    return render(request, 'public/organization_landing.html', context)
+    version = f"{directory['version']}-{site['version'] if site else 'none'}"
+    # El formulario lleva token CSRF: solo el navegador puede guardar la página
+    return _cached_page(request, version, 'public/booking.html', context, public=False)
 
 
+@without_tenant_scope
 def booking(request, org_slug=None):
     """Página de agendamiento de citas"""
-    from apps.organizations.models import Organization, LandingPageConfig
-    from django.contrib.auth.models import Group
+    from apps.organizations.models import Organization, LandingPageConfig, OrganizationMember
+    from apps.appointments.models import SpecificDateSchedule
     
-    # Obtener todas las organizaciones con horarios disponibles
-    first_organization = None
-    available_organizations = Organization.objects.none()
+    # Los visitantes anónimos reciben el contexto cacheado
+    if not request.user.is_authenticated:
+        return _public_booking(request, org_slug)
     
-    from apps.appointments.models import SpecificDateSchedule
-    import pytz
-    from django.conf import settings
+    first_organization = None
     
     # Obtener fecha local de Colombia
-    colombia_tz = pytz.timezone(settings.TIME_ZONE)
-    today = timezone.now().astimezone(colombia_tz).date()
+    today = timezone.localdate()
     
     # Si hay org_slug, filtrar por el owner de esa organización
     owner_filter = {}
@@ -92,49 +134,34 @@ def booking(request, org_slug=None):
         owner_filter = {'owner': reference_org.owner}
         first_organization = reference_org
     
-    if request.user.is_authenticated:
-        from apps.organizations.models import OrganizationMember
-        
-        # Obtener organizaciones del usuario que tienen horarios configurados
-        user_org_ids = OrganizationMember.objects.filter(
+    # Obtener organizaciones del usuario que tienen horarios configurados
+    user_org_ids = OrganizationMember.objects.filter(
+        user=request.user,
+        is_active=True
+    ).values_list('organization_id', flat=True)
+    
+    # Filtrar organizaciones con horarios específicos configurados
+    orgs_with_schedules = SpecificDateSchedule.objects.filter(
+        date__gte=today,
+        is_active=True,
+        organization_id__in=user_org_ids  # Solo las del usuario
+    ).values_list('organization_id', flat=True).distinct()
+    
+    available_organizations = Organization.objects.filter(
+        id__in=orgs_with_schedules,
+        is_active=True,
+        **owner_filter  # Filtrar por owner si org_slug fue proporcionado
+    ).order_by('name')
+    
+    # Si no se proporcionó org_slug, obtener primera organización del usuario
+    if not first_organization:
+        first_membership = OrganizationMember.objects.filter(
             user=request.user,
             is_active=True
-        ).values_list('organization_id', flat=True)
-        
-        # Filtrar organizaciones con horarios específicos configurados
-        orgs_with_schedules = SpecificDateSchedule.objects.filter(
-            date__gte=today,
-            is_active=True,
-            organization_id__in=user_org_ids  # Solo las del usuario
-        ).values_list('organization_id', flat=True).distinct()
-        
-        available_organizations = Organization.objects.filter(
-            id__in=orgs_with_schedules,
-            is_active=True,
-            **owner_filter  # Filtrar por owner si org_slug fue proporcionado
-        ).order_by('name')
-        
-        # Si no se proporcionó org_slug, obtener primera organización del usuario
-        if not first_organization:
-            first_membership = OrganizationMember.objects.filter(
-                user=request.user,
-                is_active=True
-            ).select_related('organization').first()
-            
-            if first_membership:
-                first_organization = first_membership.organization
-    else:
-        # Si no está autenticado, obtener todas las organizaciones públicas con horarios
-        orgs_with_schedules = SpecificDateSchedule.objects.filter(
-            date__gte=today,
-            is_active=True
-        ).values_list('organization_id', flat=True).distinct()
+        ).select_related('organization').first()
         
-        available_organizations = Organization.objects.filter(
-            id__in=orgs_with_schedules,
-            is_active=True,
-            **owner_filter  # Filtrar por owner si org_slug fue proporcionado
-        ).order_by('name')
+        if first_membership:
+            first_organization = first_membership.organization
     
     # Si no hay organización, usar la primera disponible
     if not first_organization:
@@ -148,26 +175,13 @@ def booking(request, org_slug=None):
         except LandingPageConfig.DoesNotExist:
             pass
     
-    # Obtener doctores según las organizaciones disponibles
+    # Obtener doctores de las organizaciones del usuario
     from apps.patients.models import Doctor
     
-    if request.user.is_authenticated and available_organizations.exists():
-        # Solo mostrar doctores de las organizaciones del usuario
-        org_ids = available_organizations.values_list('id', flat=True)
-        available_doctors = Doctor.objects.filter(
-            is_active=True,
-            organization_id__in=org_ids
-        ).values('id', 'full_name', 'organization_id')
-    else:
-        # Para usuarios no autenticados, mostrar doctores de organizaciones públicas
-        if available_organizations.exists():
-            org_ids = available_organizations.values_list('id', flat=True)
-            available_doctors = Doctor.objects.filter(
-                is_active=True,
-                organization_id__in=org_ids
-            ).values('id', 'full_name', 'organization_id')
-        else:
-            available_doctors = Doctor.objects.none()
+    available_doctors = Doctor.objects.filter(
+        is_active=True,
+        organization_id__in=available_organizations.values_list('id', flat=True)
+    ).values('id', 'full_name', 'organization_id')
     
     context = {
         'system_closed': False,
@@ -181,10 +195,20 @@ def booking(request, org_slug=None):
     return render(request, 'public/booking.html', context)
 
 
+@without_tenant_scope
 def shop(request):
     """Tienda de monturas (placeholder)"""
     from apps.organizations.models import LandingPageConfig, Organization
     
+    # Los visitantes anónimos ven la primera organización activa (contexto cacheado)
+    if not request.user.is_authenticated:
+        site = PublicSiteService.get_site(PublicSiteService.default_organization_id())
+        context = {
+            'organization_data': site['organization'] if site else None,
+            'landing_config': site['landing_config'] if site else None,
+        }
+        return _cached_page(request, site['version'] if site else 'none', 'public/shop.html', context)
+    
     # Si el usuario está autenticado, obtener su primera organización
     first_organization = None
     if request.user.is_authenticated:
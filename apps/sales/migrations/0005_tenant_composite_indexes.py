@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_cascade_delete_on_user_deletion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['organization', 'is_active'], name='sales_produ_organiz_1ee7ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['organization', 'status'], name='sales_sale_organiz_d17eae_idx'),
+        ),
+    ]
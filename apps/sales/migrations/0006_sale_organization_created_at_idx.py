@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_tenant_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['organization', 'created_at'], name='sales_sale_organiz_f4df3c_idx'),
+        ),
+    ]
@@ -41,6 +41,9 @@ class Product(TenantModel):
         verbose_name_plural = 'Productos'
         ordering = ['name']
         unique_together = [['organization', 'sku']]
+        indexes = [
+            models.Index(fields=['organization', 'is_active']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.sku})"
@@ -92,6 +95,10 @@ class Sale(TenantModel):
         verbose_name_plural = 'Ventas'
         ordering = ['-created_at']
         unique_together = [['organization', 'sale_number']]
+        indexes = [
+            models.Index(fields=['organization', 'status']),
+            models.Index(fields=['organization', 'created_at']),
+        ]
     
     def __str__(self):
         return f"Venta {self.sale_number} - {self.get_customer_display()}"
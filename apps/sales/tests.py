@@ -0,0 +1,121 @@
+"""
+Tests para ventas
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.organizations.models import Organization
+from apps.sales.models import Sale
+from apps.sales.timeseries import get_series, bucket_starts
+
+
+class SalesTimeSeriesTestCase(TestCase):
+    """Tests para las series de tiempo de ventas"""
+
+    def setUp(self):
+        """Setup test data"""
+        cache.clear()
+        self.org = Organization.objects.create(name='Test Org', slug='test-org')
+        self.other_org = Organization.objects.create(name='Other Org', slug='other-org')
+        self.sequence = 0
+
+    def create_sale(self, local_dt, total, organization=None, status='completed'):
+        self.sequence += 1
+        sale = Sale.objects.create(
+            organization=organization or self.org,
+            sale_number=f'V-{self.sequence}',
+            payment_method='cash',
+            status=status,
+            total=Decimal(total)
+        )
+        created_at = timezone.make_aware(local_dt, timezone.get_current_timezone())
+        Sale.objects.filter(pk=sale.pk).update(created_at=created_at)
+        return sale
+
+    def test_daily_series_single_query_zero_filled(self):
+        """Test serie diaria en una consulta y sin huecos"""
+        self.create_sale(datetime(2025, 3, 2, 10, 0), '100')
+        self.create_sale(datetime(2025, 3, 2, 15, 0), '50')
+        self.create_sale(datetime(2025, 3, 4, 9, 0), '30')
+        self.create_sale(datetime(2025, 3, 4, 9, 0), '999', status='cancelled')
+        self.create_sale(datetime(2025, 3, 4, 9, 0), '999', organization=self.other_org)
+
+        with self.assertNumQueries(1):
+            points = get_series('sales', 'day', date(2025, 3, 1), date(2025, 3, 5), self.org)
+
+        self.assertEqual([p['bucket'] for p in points], [date(2025, 3, d) for d in range(1, 6)])
+        self.assertEqual(points[0]['count'], 0)
+        self.assertEqual(points[1]['total'], Decimal('150'))
+        self.assertEqual(points[1]['count'], 2)
+        self.assertEqual(points[3]['total'], Decimal('30'))
+
+    def test_local_day_boundaries(self):
+        """Test que los buckets usan el día local y el rango es semiabierto"""
+        self.create_sale(datetime(2025, 3, 1, 23, 30), '10')
+        self.create_sale(datetime(2025, 3, 2, 0, 0), '20')
+        self.create_sale(datetime(2025, 3, 3, 0, 0), '40')
+
+        points = get_series('sales', 'day', date(2025, 3, 1), date(2025, 3, 2), self.org)
+
+        self.assertEqual(points[0]['total'], Decimal('10'))
+        self.assertEqual(points[1]['total'], Decimal('20'))
+
+    def test_weekly_buckets_end_on_range_end(self):
+        """Test semanas de 7 días contadas desde el inicio del rango"""
+        end = date(2025, 3, 14)
+        start = end - timedelta(days=13)
+        self.create_sale(datetime.combine(start, time(12, 0)), '5')
+        self.create_sale(datetime.combine(end, time(12, 0)), '7')
+
+        points = get_series('sales', 'week', start, end, self.org)
+
+        self.assertEqual([p['bucket'] for p in points], [start, start + timedelta(days=7)])
+        self.assertEqual(points[0]['total'], Decimal('5'))
+        self.assertEqual(points[1]['total'], Decimal('7'))
+
+    def test_monthly_buckets(self):
+        """Test buckets mensuales"""
+        self.assertEqual(len(bucket_starts('month', date(2025, 1, 1), date(2025, 12, 31))), 12)
+
+        self.create_sale(datetime(2025, 2, 28, 20, 0), '12')
+        points = get_series('sales', 'month', date(2025, 1, 1), date(2025, 12, 31), self.org)
+
+        self.assertEqual(points[1]['bucket'], date(2025, 2, 1))
+        self.assertEqual(points[1]['total'], Decimal('12'))
+        self.assertEqual(sum(p['count'] for p in points), 1)
+
+    def test_appointments_source(self):
+        """Test serie de citas (campo de fecha)"""
+        for status in ['pending', 'cancelled']:
+            Appointment.objects.create(
+                organization=self.org,
+                full_name='Paciente',
+                phone_number='3000000000',
+                appointment_date=date(2025, 3, 2),
+                appointment_time=time(10, 0),
+                status=status
+            )
+
+        points = get_series('appointments', 'day', date(2025, 3, 1), date(2025, 3, 2), self.org)
+
+        self.assertEqual(points[1]['count'], 1)
+        self.assertEqual(points[1]['total'], Decimal('0'))
+
+    def test_cached_per_organization(self):
+        """Test cache por organización"""
+        get_series('sales', 'day', date(2025, 3, 1), date(2025, 3, 2), self.org)
+
+        with self.assertNumQueries(0):
+            get_series('sales', 'day', date(2025, 3, 1), date(2025, 3, 2), self.org)
+        with self.assertNumQueries(1):
+            get_series('sales', 'day', date(2025, 3, 1), date(2025, 3, 2), self.other_org)
+
+    def test_invalid_source(self):
+        """Test fuente inválida"""
+        with self.assertRaises(ValueError):
+            get_series('refunds', 'day', date(2025, 3, 1), date(2025, 3, 2))
@@ -9,12 +9,14 @@ import json
 
 from .models import Sale, SaleItem, Product, Category
 from apps.billing.models import Invoice, Payment  # Importar modelos de facturación
+from apps.core.date_ranges import local_day_range, range_filter, start_of_day
+from .timeseries import SERIES_SOURCES, get_series
 
 
 @login_required
 def sales_dashboard(request):
     """Dashboard principal de ventas con estadísticas y gráficos - SINCRONIZADO con facturas"""
-    today = timezone.now().date()
+    today = timezone.localdate()
     
     # Filtros de fecha
     period = request.GET.get('period', 'today')
@@ -35,14 +37,16 @@ def sales_dashboard(request):
         start_date = today
         end_date = today
     
+    # Rango semiabierto en hora local (usa los índices sobre las fechas)
+    range_start, range_end = local_day_range(start_date, end_date)
+    
     # Filtrar por organización
     org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
     
     # ==================== VENTAS DEL MÓDULO DE VENTAS ====================
     # Solo ventas completadas (excluye canceladas y pendientes)
     sales = Sale.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date,
+        **range_filter('created_at', range_start, range_end),
         status='completed',  # Excluye las canceladas automáticamente
         **org_filter
     )
@@ -53,8 +57,7 @@ def sales_dashboard(request):
     # ==================== FACTURAS DEL MÓDULO DE FACTURACIÓN ====================
     # Solo facturas activas (excluye las que tienen ventas canceladas)
     invoices = Invoice.objects.filter(
-        fecha_emision__gte=start_date,
-        fecha_emision__lte=end_date,
+        **range_filter('fecha_emision', range_start, range_end),
         estado_pago__in=['unpaid', 'partial', 'paid'],  # Todos los estados activos
         **org_filter
     ).exclude(
@@ -78,8 +81,7 @@ def sales_dashboard(request):
     
     # Pagos de facturas
     invoice_payments = Payment.objects.filter(
-        invoice__fecha_emision__gte=start_date,
-        invoice__fecha_emision__lte=end_date,
+        **range_filter('invoice__fecha_emision', range_start, range_end),
         status='approved',
         **{f'invoice__{k}': v for k, v in org_filter.items()}
     ).values('payment_method').annotate(
@@ -132,9 +134,9 @@ def sales_dashboard(request):
     # ==================== PRODUCTOS MÁS VENDIDOS ====================
     # Solo del módulo de ventas completadas (excluye canceladas)
     top_products = SaleItem.objects.filter(
-        sale__created_at__date__gte=start_date,
-        sale__created_at__date__lte=end_date,
-        sale__status='completed'  # Excluye items de ventas canceladas
+        **range_filter('sale__created_at', range_start, range_end),
+        sale__status='completed',  # Excluye items de ventas canceladas
+        **{f'sale__{k}': v for k, v in org_filter.items()}
     ).values('product__name').annotate(
         quantity=Sum('quantity'),
         revenue=Sum('subtotal')
@@ -214,32 +216,32 @@ def sale_detail(request, pk):
 
 # ==================== API ENDPOINTS PARA GRÁFICOS ====================
 
+def _series_request(request):
+    """Fuente de la serie (?source=) y organización de la petición"""
+    source = request.GET.get('source', 'sales')
+    organization = request.organization if hasattr(request, 'organization') and request.organization else None
+    return source, organization
+
+
 @login_required
 def daily_stats_api(request):
     """Estadísticas de ventas diarias de los últimos 30 días"""
-    today = timezone.now().date()
+    today = timezone.localdate()
     start_date = today - timedelta(days=29)
     
-    org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
+    source, organization = _series_request(request)
+    if source not in SERIES_SOURCES:
+        return JsonResponse({'error': 'Fuente inválida'}, status=400)
     
-    # Ventas por día
-    daily_sales = []
-    for i in range(30):
-        date = start_date + timedelta(days=i)
-        sales = Sale.objects.filter(
-            created_at__date=date,
-            status='completed',
-            **org_filter
-        )
-        total = sales.aggregate(Sum('total'))['total__sum'] or 0
-        count = sales.count()
-        
-        daily_sales.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'label': date.strftime('%d/%m'),
-            'total': float(total),
-            'count': count
-        })
+    daily_sales = [
+        {
+            'date': point['bucket'].strftime('%Y-%m-%d'),
+            'label': point['bucket'].strftime('%d/%m'),
+            'total': float(point['total']),
+            'count': point['count']
+        }
+        for point in get_series(source, 'day', start_date, today, organization)
+    ]
     
     return JsonResponse({'data': daily_sales})
 
@@ -247,29 +249,21 @@ def daily_stats_api(request):
 @login_required
 def weekly_stats_api(request):
     """Estadísticas de ventas semanales de las últimas 12 semanas"""
-    today = timezone.now().date()
-    
-    org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
-    
-    weekly_sales = []
-    for i in range(12):
-        week_end = today - timedelta(days=i*7)
-        week_start = week_end - timedelta(days=6)
-        
-        sales = Sale.objects.filter(
-            created_at__date__gte=week_start,
-            created_at__date__lte=week_end,
-            status='completed',
-            **org_filter
-        )
-        total = sales.aggregate(Sum('total'))['total__sum'] or 0
-        count = sales.count()
-        
-        weekly_sales.insert(0, {
-            'week': f'Semana {week_start.strftime("%d/%m")}',
-            'total': float(total),
-            'count': count
-        })
+    today = timezone.localdate()
+    start_date = today - timedelta(days=12 * 7 - 1)
+    
+    source, organization = _series_request(request)
+    if source not in SERIES_SOURCES:
+        return JsonResponse({'error': 'Fuente inválida'}, status=400)
+    
+    weekly_sales = [
+        {
+            'week': f'Semana {point["bucket"].strftime("%d/%m")}',
+            'total': float(point['total']),
+            'count': point['count']
+        }
+        for point in get_series(source, 'week', start_date, today, organization)
+    ]
     
     return JsonResponse({'data': weekly_sales})
 
@@ -277,29 +271,24 @@ def weekly_stats_api(request):
 @login_required
 def monthly_stats_api(request):
     """Estadísticas de ventas mensuales del año actual"""
-    today = timezone.now().date()
-    year = today.year
+    today = timezone.localdate()
+    year_start = today.replace(month=1, day=1)
+    year_end = today.replace(month=12, day=31)
     
-    org_filter = {'organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
+    source, organization = _series_request(request)
+    if source not in SERIES_SOURCES:
+        return JsonResponse({'error': 'Fuente inválida'}, status=400)
     
-    monthly_sales = []
     months = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
     
-    for month in range(1, 13):
-        sales = Sale.objects.filter(
-            created_at__date__year=year,
-            created_at__date__month=month,
-            status='completed',
-            **org_filter
-        )
-        total = sales.aggregate(Sum('total'))['total__sum'] or 0
-        count = sales.count()
-        
-        monthly_sales.append({
-            'month': months[month-1],
-            'total': float(total),
-            'count': count
-        })
+    monthly_sales = [
+        {
+            'month': months[point['bucket'].month - 1],
+            'total': float(point['total']),
+            'count': point['count']
+        }
+        for point in get_series(source, 'month', year_start, year_end, organization)
+    ]
     
     return JsonResponse({'data': monthly_sales})
 
@@ -308,7 +297,7 @@ def monthly_stats_api(request):
 def top_products_api(request):
     """Productos más vendidos"""
     period = request.GET.get('period', 'month')
-    today = timezone.now().date()
+    today = timezone.localdate()
     
     if period == 'week':
         start_date = today - timedelta(days=7)
@@ -317,9 +306,13 @@ def top_products_api(request):
     else:
         start_date = today.replace(month=1, day=1)
     
+    # SaleItem no es TenantModel: se filtra por la organización de la venta
+    org_filter = {'sale__organization': request.organization} if hasattr(request, 'organization') and request.organization else {}
+    
     top_products = SaleItem.objects.filter(
-        sale__created_at__date__gte=start_date,
-        sale__status='completed'
+        sale__created_at__gte=start_of_day(start_date),
+        sale__status='completed',
+        **org_filter
     ).values('product__name').annotate(
         quantity=Sum('quantity'),
         revenue=Sum('subtotal')
@@ -71,13 +71,19 @@ class AppSettingAdmin(admin.ModelAdmin):
     
     def activate_settings(self, request, queryset):
         """Activa las configuraciones seleccionadas."""
+        organizations = set(queryset.values_list('organization', flat=True))
         count = queryset.update(is_active=True)
+        for organization in organizations:
+            SettingsService.clear_cache(organization)
         self.message_user(request, f"{count} configuraciones activadas.")
     activate_settings.short_description = "Activar configuraciones"
     
     def deactivate_settings(self, request, queryset):
         """Desactiva las configuraciones seleccionadas."""
+        organizations = set(queryset.values_list('organization', flat=True))
         count = queryset.update(is_active=False)
+        for organization in organizations:
+            SettingsService.clear_cache(organization)
         self.message_user(request, f"{count} configuraciones desactivadas.")
     deactivate_settings.short_description = "Desactivar configuraciones"
     
@@ -2,20 +2,70 @@
 Servicios para el sistema de configuraciones.
 Proporciona funciones para obtener, establecer y gestionar configuraciones.
 """
-from django.core.cache import cache
-from django.db.models import Q
+from django.db.models import F, Q
+from types import MappingProxyType
 import json
 
+from apps.core.cache import CacheNamespace
 from .models import AppSetting, IntegrationConfig, SettingCategory
 
 
+# Snapshot de configuraciones por organización; una configuración global se
+# invalida con la versión del espacio completo
+settings_cache = CacheNamespace('settings', timeout=3600)
+
+
 class SettingsService:
     """
     Servicio para gestionar configuraciones de la aplicación.
     Incluye cache para mejorar el rendimiento.
     """
     
-    CACHE_TIMEOUT = 3600  # 1 hora
+    CACHE_TIMEOUT = settings_cache.timeout  # 1 hora
+    
+    @staticmethod
+    def _load_snapshot(organization):
+        """
+        Carga en una sola consulta las configuraciones activas globales y de
+        la organización (la de la organización reemplaza a la global)
+        """
+        filters = Q(organization__isnull=True)
+        if organization:
+            filters |= Q(organization=organization)
+        
+        values = {}
+        modules = {}
+        # Las globales (organization NULL) primero para que las de la org las reemplacen
+        rows = AppSetting.objects.filter(filters, is_active=True).order_by(
+            F('organization').asc(nulls_first=True)
+        )
+        for setting in rows:
+            values[setting.key] = setting.get_value()
+            modules[setting.key] = setting.module
+        
+        return {'values': values, 'modules': modules}
+    
+    @staticmethod
+    def get_snapshot(organization=None, use_cache=True):
+        """
+        Todas las configuraciones efectivas de una organización
+        
+        El snapshot se cachea completo (incluye la ausencia de claves, así que
+        una clave inexistente tampoco consulta la base de datos) y se
+        invalida con la versión del cache en set/delete.
+        
+        Returns:
+            MappingProxyType: {key: value} de solo lectura
+        """
+        if use_cache:
+            snapshot = settings_cache.get_or_set(
+                'snapshot',
+                lambda: SettingsService._load_snapshot(organization),
+                organization=organization
+            )
+        else:
+            snapshot = SettingsService._load_snapshot(organization)
+        return MappingProxyType(snapshot['values'])
     
     @staticmethod
     def get(key, organization=None, default=None, use_cache=True):
@@ -32,42 +82,10 @@ class SettingsService:
         Returns:
             Valor de la configuración o default
         """
-        # Intentar obtener de cache
-        if use_cache:
-            cache_key = f"setting_{key}_{organization.id if organization else 'global'}"
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
+        value = SettingsService.get_snapshot(organization, use_cache=use_cache).get(key)
         
-        # Buscar configuración específica de la organización
-        if organization:
-            setting = AppSetting.objects.filter(
-                key=key,
-                organization=organization,
-                is_active=True
-            ).first()
-            
-            if setting:
-                value = setting.get_value()
-                if use_cache:
-                    cache.set(cache_key, value, SettingsService.CACHE_TIMEOUT)
-                return value
-        
-        # Buscar configuración global
-        setting = AppSetting.objects.filter(
-            key=key,
-            organization__isnull=True,
-            is_active=True
-        ).first()
-        
-        if setting:
-            value = setting.get_value()
-            if use_cache:
-                cache.set(cache_key, value, SettingsService.CACHE_TIMEOUT)
-            return value
-        
-        # Retornar valor por defecto
-        return default
+        # Retornar valor por defecto si no existe
+        return default if value is None else value
     
     @staticmethod
     def set(key, value, organization=None, value_type='string', 
@@ -110,9 +128,8 @@ class SettingsService:
             }
         )
         
-        # Invalidar cache
-        cache_key = f"setting_{key}_{organization.id if organization else 'global'}"
-        cache.delete(cache_key)
+        # Invalidar cache (una global afecta a todas las organizaciones)
+        settings_cache.invalidate(organization)
         
         return setting
     
@@ -128,22 +145,17 @@ class SettingsService:
         Returns:
             Dict con configuraciones {key: value}
         """
-        filters = Q(module=module, is_active=True)
-        
-        if organization:
-            filters &= Q(organization=organization) | Q(organization__isnull=True)
-        else:
-            filters &= Q(organization__isnull=True)
-        
-        settings = AppSetting.objects.filter(filters)
-        
-        result = {}
-        for setting in settings:
-            # Si hay org específica y global, preferir org específica
-            if setting.key not in result or setting.organization == organization:
-                result[setting.key] = setting.get_value()
+        snapshot = settings_cache.get_or_set(
+            'snapshot',
+            lambda: SettingsService._load_snapshot(organization),
+            organization=organization
+        )
         
-        return result
+        return {
+            key: value
+            for key, value in snapshot['values'].items()
+            if snapshot['modules'][key] == module
+        }
     
     @staticmethod
     def delete(key, organization=None):
@@ -162,9 +174,8 @@ class SettingsService:
             organization=organization
         ).delete()[0]
         
-        # Invalidar cache
-        cache_key = f"setting_{key}_{organization.id if organization else 'global'}"
-        cache.delete(cache_key)
+        # Invalidar cache (una global afecta a todas las organizaciones)
+        settings_cache.invalidate(organization)
         
         return count
     
@@ -176,16 +187,7 @@ class SettingsService:
         Args:
             organization: Organización (None = limpiar todo)
         """
-        if organization:
-            # Limpiar cache de la organización
-            settings = AppSetting.objects.filter(organization=organization)
-            for setting in settings:
-                cache_key = f"setting_{setting.key}_{organization.id}"
-                cache.delete(cache_key)
-        else:
-            # Limpiar todo el cache de settings
-            # (en producción se debería usar un prefijo para los keys)
-            cache.clear()
+        settings_cache.invalidate(organization)
 
 
 class IntegrationService:
@@ -2,6 +2,7 @@
 Tests para el sistema de configuraciones.
 """
 from django.test import TestCase
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
 from apps.organizations.models import Organization
@@ -82,6 +83,7 @@ class SettingsServiceTestCase(TestCase):
     
     def setUp(self):
         """Configuración inicial."""
+        cache.clear()
         self.organization = Organization.objects.create(
             name='Test Org',
             slug='test-org'
@@ -132,6 +134,32 @@ class SettingsServiceTestCase(TestCase):
         self.assertIn('email.port', settings)
         self.assertEqual(settings['email.host'], 'smtp.test.com')
         self.assertEqual(settings['email.port'], 587)
+    
+    def test_snapshot_org_overrides_global(self):
+        """Prueba que el snapshot combina globales y de la organización."""
+        SettingsService.set('ui.theme', 'light')
+        SettingsService.set('ui.lang', 'es')
+        SettingsService.set('ui.theme', 'dark', organization=self.organization)
+        
+        snapshot = SettingsService.get_snapshot(self.organization)
+        self.assertEqual(dict(snapshot), {'ui.theme': 'dark', 'ui.lang': 'es'})
+        self.assertEqual(SettingsService.get('ui.theme'), 'light')
+        with self.assertRaises(TypeError):
+            snapshot['ui.theme'] = 'blue'
+    
+    def test_snapshot_cached_with_missing_keys(self):
+        """Prueba que las lecturas, incluso de claves inexistentes, no consultan la BD."""
+        SettingsService.set('ui.theme', 'dark', organization=self.organization)
+        SettingsService.get('ui.theme', organization=self.organization)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(SettingsService.get('ui.theme', organization=self.organization), 'dark')
+            self.assertIsNone(SettingsService.get('missing.key', organization=self.organization))
+        
+        # Cambiar una global invalida el snapshot de las organizaciones
+        SettingsService.set('missing.key', 'now', module='ui')
+        self.assertEqual(SettingsService.get('missing.key', organization=self.organization), 'now')
+        self.assertEqual(SettingsService.get_module_settings('ui', self.organization), {'missing.key': 'now'})
 
 
 class IntegrationServiceTestCase(TestCase):
@@ -93,6 +93,7 @@ INSTALLED_APPS = [
     'apps.api',  # API REST completa con autenticación y webhooks
     'apps.tasks',  # Sistema de gestión de tareas y seguimiento
     'apps.workflows',  # Sistema de flujos de trabajo automatizados
+    'apps.jobs',  # Jobs en segundo plano respaldados por la base de datos
     'apps.appointments',
     'apps.patients',
     'apps.users',
@@ -126,6 +127,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'apps.audit.middleware.AuditMiddleware',  # Captura info de requests para auditoría
     'apps.audit.middleware.ErrorCaptureMiddleware',  # Monitoreo de errores (similar a Sentry)
+    'apps.api.middleware.APILoggingMiddleware',  # Telemetría de /api/ en buffer (apps.api.telemetry)
+    'apps.api.middleware.RateLimitHeadersMiddleware',  # Headers X-RateLimit-* de la API
 ]
 
 # Configurar Whitenoise para NO servir archivos de MEDIA en desarrollo
@@ -270,6 +273,9 @@ else:
 # localmente se cargarán desde esta URL
 PRODUCTION_MEDIA_URL = config('PRODUCTION_MEDIA_URL', default='https://opticaapp.onrender.com/media/')
 
+# Storage de media que registra en StorageUsage los bytes por organización/categoría
+DEFAULT_FILE_STORAGE = 'apps.core.storage_utils.OrganizationFileSystemStorage'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -410,3 +416,123 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
 }
+
+# Rate limiting de la API: contadores atómicos en cache (sin filas por request)
+API_RATE_LIMIT_BACKEND = config('API_RATE_LIMIT_BACKEND', default='cache')  # cache | local
+API_RATE_LIMIT_CACHE_ALIAS = config('API_RATE_LIMIT_CACHE_ALIAS', default='default')
+# Segundos entre persistencias de agregados en RateLimitRecord (0 = desactivado)
+API_RATE_LIMIT_PERSIST_INTERVAL = config('API_RATE_LIMIT_PERSIST_INTERVAL', default=0, cast=int)
+
+# Telemetría de la API: logs en buffer escritos en lote desde un hilo en segundo plano
+API_LOG_SAMPLE_RATE = config('API_LOG_SAMPLE_RATE', default=1.0, cast=float)  # Por defecto para keys sin valor
+API_LOG_MAX_BODY_BYTES = config('API_LOG_MAX_BODY_BYTES', default=4096, cast=int)
+API_TELEMETRY_BUFFER_SIZE = config('API_TELEMETRY_BUFFER_SIZE', default=5000, cast=int)
+API_TELEMETRY_BATCH_SIZE = config('API_TELEMETRY_BATCH_SIZE', default=500, cast=int)
+API_TELEMETRY_FLUSH_INTERVAL = config('API_TELEMETRY_FLUSH_INTERVAL', default=5, cast=int)  # segundos
+# False = sin hilo de flush: los logs se escriben solo con flush() explícito o al salir del proceso
+API_TELEMETRY_BACKGROUND = config('API_TELEMETRY_BACKGROUND', default=True, cast=bool)
+
+# Cache de API keys verificadas (segundos)
+API_KEY_CACHE_TIMEOUT = config('API_KEY_CACHE_TIMEOUT', default=60, cast=int)
+API_KEY_NEGATIVE_CACHE_TIMEOUT = config('API_KEY_NEGATIVE_CACHE_TIMEOUT', default=30, cast=int)
+
+# Outbox de webhooks (worker: python manage.py deliver_webhooks --loop)
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=10, cast=int)  # segundos por envío
+WEBHOOK_RETRY_BASE_SECONDS = config('WEBHOOK_RETRY_BASE_SECONDS', default=30, cast=int)
+
+# Series de tiempo de los gráficos de ventas (cache por organización, segundos)
+SALES_SERIES_CACHE_TIMEOUT = config('SALES_SERIES_CACHE_TIMEOUT', default=60, cast=int)
+
+# Heatmap del dashboard: segundos que se sirve la matriz guardada antes de recalcularla
+DASHBOARD_HEATMAP_MAX_AGE = config('DASHBOARD_HEATMAP_MAX_AGE', default=900, cast=int)
+
+# ==================== CACHE ====================
+# Cache compartido entre workers (gunicorn/daphne): redis | file | db | locmem
+# - redis: requiere el paquete `redis` (incluido con channels-redis); es el
+#   único con add/incr atómicos entre procesos (locks anti-estampida y
+#   métricas de apps.core.cache)
+# - db: requiere `python manage.py createcachetable`
+# - file: solo para un servidor sin redis; add/incr no son atómicos
+# - locmem: solo por proceso (desarrollo y tests)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem' if DEBUG else 'redis')
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='redis://127.0.0.1:6379/1')
+CACHE_FILE_PATH = config('CACHE_FILE_PATH', default=str(BASE_DIR / '.cache'))
+CACHE_DB_TABLE = config('CACHE_DB_TABLE', default='django_cache')
+# Entradas antes de purgar (file, db y locmem; redis usa su política de memoria)
+CACHE_MAX_ENTRIES = config('CACHE_MAX_ENTRIES', default=20000, cast=int)
+CACHE_KEY_PREFIX = config('CACHE_KEY_PREFIX', default='opticaapp')
+
+_cache_backends = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', CACHE_REDIS_URL, CACHE_REDIS_URL),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        CACHE_FILE_PATH, str(Path(CACHE_FILE_PATH) / 'versions'),
+    ),
+    'db': ('django.core.cache.backends.db.DatabaseCache', CACHE_DB_TABLE, f'{CACHE_DB_TABLE}_versions'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'opticaapp', 'opticaapp-versions'),
+}
+_cache_backend, _cache_location, _cache_versions_location = _cache_backends[CACHE_BACKEND]
+CACHES = {
+    'default': {
+        'BACKEND': _cache_backend,
+        'LOCATION': _cache_location,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+        'TIMEOUT': config('CACHE_DEFAULT_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {} if CACHE_BACKEND == 'redis' else {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    # Versiones de los espacios de apps.core.cache: pocas llaves sin vencimiento
+    # que no deben purgarse junto con los valores (perder una versión revive
+    # valores ya invalidados). En redis no vencen ni las desaloja una política
+    # volatile-*; en los demás backends van aparte y con un límite inalcanzable.
+    'versions': {
+        'BACKEND': _cache_backend,
+        'LOCATION': _cache_versions_location,
+        'KEY_PREFIX': f'{CACHE_KEY_PREFIX}:versions',
+        'TIMEOUT': None,
+        'OPTIONS': {} if CACHE_BACKEND == 'redis' else {'MAX_ENTRIES': 10 ** 7},
+    },
+}
+
+# Segundos entre volcados de las métricas de hit/miss de apps.core.cache
+CACHE_METRICS_FLUSH_INTERVAL = config('CACHE_METRICS_FLUSH_INTERVAL', default=10, cast=int)
+
+# ==================== PDFs ====================
+# PDFs renderizados (historias clínicas, exámenes visuales, facturas) guardados
+# por hash de contenido. Fuera de MEDIA_ROOT porque /media/ se sirve públicamente.
+PDF_CACHE_ROOT = config('PDF_CACHE_ROOT', default=str(BASE_DIR / '.cache' / 'pdf'))
+# Pre-renderizar en segundo plano (apps.jobs) al guardar historias y aprobar facturas
+PDF_PRERENDER = config('PDF_PRERENDER', default=True, cast=bool)
+# Procesos para generar lotes de PDFs (desprendibles, facturas); 0 = un proceso por CPU
+PDF_BATCH_WORKERS = config('PDF_BATCH_WORKERS', default=0, cast=int)
+
+# ==================== IMÁGENES ====================
+# Generar miniaturas y WebP (apps.core.images) en segundo plano al subir logos,
+# imágenes de landing, monturas, fotos de doctores y productos
+IMAGE_DERIVATIVES_ON_UPLOAD = config('IMAGE_DERIVATIVES_ON_UPLOAD', default=True, cast=bool)
+# Fotos del AR try-on: tamaño máximo recibido y lado mayor con que se guardan
+AR_TRYON_PHOTO_MAX_BYTES = config('AR_TRYON_PHOTO_MAX_BYTES', default=8 * 1024 * 1024, cast=int)
+AR_TRYON_PHOTO_MAX_SIDE = config('AR_TRYON_PHOTO_MAX_SIDE', default=1600, cast=int)
+
+# ==================== SITIO PÚBLICO ====================
+# Vigencia del contexto cacheado de landing, agendamiento y tienda (apps.public.services);
+# se invalida antes al cambiar la organización, su landing, horarios o doctores
+PUBLIC_SITE_CACHE_TIMEOUT = config('PUBLIC_SITE_CACHE_TIMEOUT', default=600, cast=int)
+# max-age del Cache-Control de las páginas públicas (el navegador revalida con ETag)
+PUBLIC_SITE_MAX_AGE = config('PUBLIC_SITE_MAX_AGE', default=60, cast=int)
+
+# ==================== AGENDAMIENTO ====================
+# Segundos que un horario queda retenido para el paciente que llena el formulario
+# de agendamiento (apps.appointments.booking)
+APPOINTMENT_SLOT_HOLD_SECONDS = config('APPOINTMENT_SLOT_HOLD_SECONDS', default=300, cast=int)
+# Retenciones activas que un mismo cliente (IP) puede tener por organización
+APPOINTMENT_MAX_HOLDS_PER_CLIENT = config('APPOINTMENT_MAX_HOLDS_PER_CLIENT', default=2, cast=int)
+# Notificaciones al paciente (apps.appointments.outbox): segundos que se espera para
+# agrupar en un lote los envíos de una organización, tamaño del lote, intentos antes
+# de darla por fallida y base del backoff entre reintentos
+NOTIFICATION_OUTBOX_BATCH_DELAY = config('NOTIFICATION_OUTBOX_BATCH_DELAY', default=5, cast=int)
+NOTIFICATION_OUTBOX_BATCH_SIZE = config('NOTIFICATION_OUTBOX_BATCH_SIZE', default=50, cast=int)
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = config('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+NOTIFICATION_OUTBOX_RETRY_BASE_SECONDS = config('NOTIFICATION_OUTBOX_RETRY_BASE_SECONDS', default=60, cast=int)
+# Mensajes de WhatsApp por minuto y organización que envía el outbox (el bot de
+# Baileys se bloquea con ráfagas); los recordatorios se programan cada 5 minutos
+WHATSAPP_MESSAGES_PER_MINUTE = config('WHATSAPP_MESSAGES_PER_MINUTE', default=20, cast=int)
@@ -60,6 +60,12 @@ urlpatterns = [
     # Audit URLs
     path('dashboard/audit/', include('apps.audit.urls')),
     
+    # Jobs en segundo plano (métricas)
+    path('saas-admin/jobs/', include('apps.jobs.urls')),
+    
+    # Capa de cache (métricas)
+    path('saas-admin/', include('apps.core.urls')),
+    
     # Testing URLs (Bot de Testing Automatizado)
     path('saas-admin/testing/', include('apps.testing.urls')),
     